@@ -56,7 +56,23 @@ CREATE TABLE IF NOT EXISTS redemptions (
     used_at TIMESTAMP NOT NULL
 );
 
+CREATE TABLE IF NOT EXISTS code_counters (
+    id TEXT PRIMARY KEY,
+    tenant_id TEXT NOT NULL,
+    partner_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    shard INTEGER NOT NULL DEFAULT 0,
+    generated INTEGER NOT NULL DEFAULT 0,
+    redeemed INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP NOT NULL DEFAULT now(),
+    updated_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_code_counters_tenant_partner_day
+    ON code_counters (tenant_id, partner_id, day);
+
 -- Limpar dados existentes
+TRUNCATE TABLE code_counters;
 TRUNCATE TABLE redemptions CASCADE;
 TRUNCATE TABLE validation_codes CASCADE;
 TRUNCATE TABLE promotions CASCADE;
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Backfill e verificação dos contadores de códigos de validação.
+
+Reconstrói os contadores de códigos gerados/resgatados por (tenant, parceiro,
+dia) a partir da coleção `validation_codes` ou apenas compara os contadores
+gravados com a varredura (`--check`). Como a limpeza de códigos expirados
+remove documentos de `validation_codes`, o backfill por padrão só aumenta
+contadores; `--exact` grava exatamente a varredura.
+
+Rode com pouco tráfego: incrementos feitos durante a reconstrução podem se
+perder (confira depois com `--check`).
+
+Uso:
+    python scripts/maintenance/rebuild_code_counters.py --tenant knn-dev-tenant
+    python scripts/maintenance/rebuild_code_counters.py --tenant knn-dev-tenant --check
+    python scripts/maintenance/rebuild_code_counters.py --tenant knn-dev-tenant \\
+        --backend postgres
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# Adicionar o diretório raiz ao path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.db import firestore_client, postgres_client  # noqa: E402
+from src.db.firestore import initialize_firestore_databases  # noqa: E402
+from src.utils import logger  # noqa: E402
+from src.utils.code_counters import code_counters  # noqa: E402
+
+BACKENDS = {"firestore": firestore_client, "postgres": postgres_client}
+
+
+async def run(tenants: list[str], backend: str, check: bool, exact: bool) -> bool:
+    """
+    Reconstrói ou verifica os contadores de cada tenant.
+
+    Returns:
+        True se todos os tenants estão consistentes (ou foram reconstruídos)
+    """
+    client = BACKENDS[backend]
+    if backend == "firestore":
+        initialize_firestore_databases()
+
+    consistent = True
+    for tenant_id in tenants:
+        if check:
+            report = await code_counters.check(tenant_id, client)
+            consistent = consistent and report["consistent"]
+            logger.info(
+                f"Tenant {tenant_id}: {report['keys_checked']} chaves, "
+                f"{len(report['missing'])} abaixo da varredura, "
+                f"{len(report['surplus'])} acima"
+            )
+        else:
+            report = await code_counters.rebuild(tenant_id, client, exact=exact)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    if backend == "postgres":
+        await postgres_client.close_pool()
+    return consistent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tenant", action="append", required=True)
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="firestore")
+    parser.add_argument(
+        "--check", action="store_true", help="Apenas compara, sem gravar"
+    )
+    parser.add_argument(
+        "--exact", action="store_true", help="Grava exatamente a varredura"
+    )
+    args = parser.parse_args()
+
+    consistent = asyncio.run(run(args.tenant, args.backend, args.check, args.exact))
+    sys.exit(0 if consistent else 1)
+
+
+if __name__ == "__main__":
+    main()
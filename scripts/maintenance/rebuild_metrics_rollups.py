@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Backfill dos rollups das métricas históricas.
+
+Recalcula os rollups por hora, dia, semana e mês (`metrics_rollups`) de cada
+tenant a partir dos documentos de `metrics_snapshots`. Necessário uma vez para
+os snapshots salvos antes dos rollups; as faixas encontradas são
+sobrescritas.
+
+Rode com pouco tráfego: snapshots salvos durante a reconstrução podem ficar
+fora das faixas recalculadas.
+
+Uso:
+    python scripts/maintenance/rebuild_metrics_rollups.py --tenant knn-dev-tenant
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# Adicionar o diretório raiz ao path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.utils import logger  # noqa: E402
+from src.utils.metrics_service import metrics_service  # noqa: E402
+
+
+async def run(tenants: list[str]) -> None:
+    """Reconstrói os rollups de cada tenant."""
+    for tenant_id in tenants:
+        report = await metrics_service.rollups.rebuild(metrics_service.db, tenant_id)
+        logger.info(
+            f"Tenant {tenant_id}: {report['snapshots']} snapshots, "
+            f"{sum(report['buckets'].values())} faixas gravadas"
+        )
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tenant", action="append", required=True)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.tenant))
+
+
+if __name__ == "__main__":
+    main()
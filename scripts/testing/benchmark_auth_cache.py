@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark da dependência de autenticação `get_current_user`.
+
+Mede requisições/segundo da dependência com tokens HS256 locais em dois modos:
+
+- sem cache: toda requisição decodifica o JWT e valida o `JWTPayload`
+- cache: a primeira requisição de cada token verifica; as seguintes usam o
+  payload em cache (chave: SHA-256 do token) até o `exp`
+
+As requisições são distribuídas entre `--users` tokens distintos, simulando
+vários clientes que chamam diversos endpoints com o mesmo token.
+
+Uso:
+    python scripts/testing/benchmark_auth_cache.py --requests 20000 --users 50
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+# A dependência retorna um usuário mock em modo de teste
+os.environ["TESTING_MODE"] = "false"
+os.environ.setdefault("ENVIRONMENT", "development")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+import jwt  # noqa: E402
+from fastapi.security import HTTPAuthorizationCredentials  # noqa: E402
+
+from src import auth  # noqa: E402
+from src.config import JWT_SECRET_KEY  # noqa: E402
+from src.utils.token_cache import VerifiedTokenCache  # noqa: E402
+
+
+def build_credentials(users: int) -> list[HTTPAuthorizationCredentials]:
+    """Gera um token HS256 válido por usuário."""
+    now = int(time.time())
+    return [
+        HTTPAuthorizationCredentials(
+            scheme="Bearer",
+            credentials=jwt.encode(
+                {
+                    "sub": f"STD_{i:05d}",
+                    "role": "student",
+                    "tenant": "knn-bench",
+                    "iat": now,
+                    "exp": now + 3600,
+                },
+                JWT_SECRET_KEY,
+                algorithm="HS256",
+            ),
+        )
+        for i in range(users)
+    ]
+
+
+async def measure(credentials: list, requests: int) -> float:
+    """Executa a dependência N vezes e retorna requisições/segundo."""
+    start = time.perf_counter()
+    for i in range(requests):
+        await auth.get_current_user(credentials[i % len(credentials)])
+    return requests / (time.perf_counter() - start)
+
+
+async def run(args: argparse.Namespace) -> None:
+    credentials = build_credentials(args.users)
+    print(
+        f"{args.requests} requisições, {args.users} tokens, ambiente={auth.ENVIRONMENT}"
+    )
+    print(f"{'modo':<10} {'req/s':>12} {'hit_rate (%)':>14}")
+
+    for mode, max_entries in (("sem cache", 0), ("cache", args.users * 2)):
+        auth.token_cache = VerifiedTokenCache(max_entries=max_entries)
+        rate = await measure(credentials, args.requests)
+        hit_rate = auth.token_cache.stats()["hit_rate"]
+        print(f"{mode:<10} {rate:>12.0f} {hit_rate:>14.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--users", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
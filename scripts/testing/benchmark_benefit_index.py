@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Benchmark do índice de benefícios em um tenant sintético.
+
+Compara o custo por requisição de `/student/benefits` em dois modos:
+
+- scan: comportamento anterior, percorre todos os campos BNF_* de todos os
+  documentos, reavalia status/público e converte cada benefício
+- index: TenantBenefitIndex construído uma vez; a requisição é uma busca no
+  grupo (público, categoria, status) seguida de fatiamento
+
+Uso:
+    python scripts/testing/benchmark_benefit_index.py --benefits 10000 --requests 200
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.models.benefit import BenefitDTO  # noqa: E402
+from src.utils.benefit_index import TenantBenefitIndex  # noqa: E402
+
+CATEGORIES = ["Educação", "Saúde", "Alimentação", "Tecnologia", "Lazer"]
+AUDIENCES = ["students", "employees", "all"]
+STATUSES = ["active", "active", "active", "inactive"]
+
+
+def build_tenant(benefits: int, per_partner: int, seed: int) -> list[dict]:
+    """Gera documentos da coleção 'benefits' com `benefits` benefícios."""
+    rng = random.Random(seed)
+    docs = []
+    for p in range(0, benefits, per_partner):
+        doc = {"id": f"PTN_{p:07d}_SYN", "tenant_id": "knn-bench"}
+        for b in range(min(per_partner, benefits - p)):
+            doc[f"BNF_SY_{p + b:05d}_DC"] = {
+                "title": f"Benefício {p + b}",
+                "description": "Benefício sintético",
+                "configuration": {"value": rng.randint(5, 100)},
+                "metadata": {"tags": ["desconto"]},
+                "dates": {
+                    "created_at": "2025-01-01T00:00:00+00:00",
+                    "updated_at": "2025-01-01T00:00:00+00:00",
+                    "valid_from": "2025-01-01T00:00:00+00:00",
+                    "valid_until": rng.choice([None, "2026-12-31T00:00:00+00:00"]),
+                },
+                "system": {
+                    "tenant_id": "knn-bench",
+                    "status": rng.choice(STATUSES),
+                    "type": "discount",
+                    "audience": rng.choice(AUDIENCES),
+                    "category": rng.choice(CATEGORIES),
+                },
+            }
+        docs.append(doc)
+    return docs
+
+
+def legacy_scan(docs: list[dict], active_ids: set[str], cat: str | None) -> list:
+    """Reproduz a varredura por requisição usada antes do índice."""
+    collected = []
+    for doc in docs:
+        partner_id = doc.get("id")
+        if partner_id not in active_ids:
+            continue
+        for key, benefit_data in doc.items():
+            if not key.startswith("BNF_"):
+                continue
+            system = benefit_data.get("system", {})
+            if system.get("status") != "active":
+                continue
+            audience = system.get("audience", "")
+            if not (audience == "all" or "student" in audience):
+                continue
+            dto = BenefitDTO(key=key, benefit_data=benefit_data, partner_id=partner_id)
+            if cat and dto.category.lower() != cat.lower():
+                continue
+            collected.append(dto.to_benefit())
+    return collected
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Percentil por ranking mais próximo."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def measure(func, requests: int) -> list[float]:
+    """Executa `func` N vezes e retorna as latências em ms."""
+    samples = []
+    for i in range(requests):
+        start = time.perf_counter()
+        func(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--benefits", type=int, default=10_000)
+    parser.add_argument("--per-partner", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    docs = build_tenant(args.benefits, args.per_partner, args.seed)
+    active_ids = {doc["id"] for doc in docs}
+    filters = [None, *CATEGORIES]
+    print(
+        f"Tenant sintético: {args.benefits} benefícios em {len(docs)} parceiros, "
+        f"{args.requests} requisições"
+    )
+
+    start = time.perf_counter()
+    index = TenantBenefitIndex.from_documents(docs)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"Construção do índice: {build_ms:.1f} ms ({len(index)} benefícios)")
+
+    def scan_request(i: int):
+        legacy_scan(docs, active_ids, filters[i % len(filters)])[0:50]
+
+    def index_request(i: int):
+        index.query(
+            "student", category=filters[i % len(filters)], partner_ids=active_ids
+        )[0:50]
+
+    print(f"{'modo':<8} {'p50 (ms)':>10} {'p99 (ms)':>10} {'média (ms)':>12}")
+    # A varredura é lenta; limita as amostras para manter o benchmark curto
+    for mode, func, requests in (
+        ("scan", scan_request, max(1, args.requests // 20)),
+        ("index", index_request, args.requests),
+    ):
+        samples = measure(func, requests)
+        print(
+            f"{mode:<8} {percentile(samples, 50):>10.2f} "
+            f"{percentile(samples, 99):>10.2f} {statistics.mean(samples):>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Benchmark de concorrência do FirestoreClient.
+
+Compara a latência (p50/p99) de N requisições concorrentes ao fluxo de
+`/student/partners` (PartnersService.list_partners_common) em três modos:
+
+- blocking: comportamento anterior, cliente síncrono chamado no event loop
+- executor: cliente síncrono despachado para threads (FIRESTORE_ASYNC_MODE=executor)
+- native: firestore.AsyncClient (FIRESTORE_ASYNC_MODE=native, padrão)
+
+O Firestore é substituído por um cliente falso com latência injetada, de modo
+que o benchmark mede apenas o efeito do modelo de execução.
+
+Uso:
+    python scripts/testing/benchmark_firestore_async.py --requests 50 --latency-ms 40
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.auth import JWTPayload  # noqa: E402
+from src.db import firestore as firestore_module  # noqa: E402
+from src.utils.partners_service import PartnersService  # noqa: E402
+
+
+class FakeSnapshot:
+    """Snapshot mínimo compatível com o FirestoreClient."""
+
+    def __init__(self, doc_id: str, data: dict):
+        self.id = doc_id
+        self.exists = True
+        self._data = data
+
+    def to_dict(self) -> dict:
+        return dict(self._data)
+
+
+class FakeAggregationResult:
+    """Resultado mínimo de uma agregação COUNT."""
+
+    def __init__(self, value: int):
+        self.alias = "total"
+        self.value = value
+
+
+def build_fake_client(docs: list[FakeSnapshot], latency: float, native: bool):
+    """Cria um cliente falso síncrono ou assíncrono com latência fixa."""
+
+    class FakeCount:
+        if native:
+
+            async def get(self):
+                await asyncio.sleep(latency)
+                return [[FakeAggregationResult(len(docs))]]
+
+        else:
+
+            def get(self):
+                time.sleep(latency)
+                return [[FakeAggregationResult(len(docs))]]
+
+    class FakeQuery:
+        def __init__(self, max_items: int | None = None):
+            self.max_items = max_items
+
+        def where(self, *args, **kwargs):
+            return self
+
+        def order_by(self, *args, **kwargs):
+            return self
+
+        def offset(self, count: int):
+            return self
+
+        def limit(self, count: int):
+            return FakeQuery(count)
+
+        def count(self, alias: str | None = None):
+            return FakeCount()
+
+        def _result(self):
+            return docs[: self.max_items] if self.max_items else list(docs)
+
+        if native:
+
+            async def get(self):
+                await asyncio.sleep(latency)
+                return self._result()
+
+        else:
+
+            def get(self):
+                time.sleep(latency)
+                return self._result()
+
+    class FakeClient:
+        def collection(self, name: str):
+            return FakeQuery()
+
+    return FakeClient()
+
+
+async def _blocking_run(func, *args, **kwargs):
+    """Reproduz o comportamento anterior: chamada síncrona no event loop."""
+    return func(*args, **kwargs)
+
+
+async def run_scenario(mode: str, requests: int, latency: float) -> list[float]:
+    """Executa N requisições concorrentes e retorna as latências em ms."""
+    docs = [
+        FakeSnapshot(
+            f"PTN_{i:06d}",
+            {
+                "trade_name": f"Parceiro {i}",
+                "category": "alimentacao",
+                "active": True,
+                "tenant_id": "knn-dev-tenant",
+            },
+        )
+        for i in range(20)
+    ]
+    native = mode == "native"
+    client = build_fake_client(docs, latency, native=native)
+    user = JWTPayload(
+        sub="bench-student",
+        role="student",
+        tenant="knn-dev-tenant",
+        exp=9999999999,
+        iat=1000000000,
+    )
+
+    async def one_request() -> float:
+        start = time.perf_counter()
+        await PartnersService.list_partners_common(
+            current_user=user,
+            limit=20,
+            offset=0,
+            use_circuit_breaker=False,
+            enable_ordering=False,
+        )
+        return (time.perf_counter() - start) * 1000
+
+    patches = [
+        patch.object(firestore_module, "db", None if native else client),
+        patch.object(firestore_module, "async_db", client if native else None),
+        patch.object(firestore_module, "FIRESTORE_ASYNC_MODE", mode),
+    ]
+    if mode == "blocking":
+        patches.append(patch.object(firestore_module, "_run", _blocking_run))
+
+    for p in patches:
+        p.start()
+    try:
+        return await asyncio.gather(*(one_request() for _ in range(requests)))
+    finally:
+        for p in reversed(patches):
+            p.stop()
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Percentil por ranking mais próximo."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    args = parser.parse_args()
+
+    latency = args.latency_ms / 1000
+    print(
+        f"{args.requests} requisições concorrentes, "
+        f"latência simulada do Firestore: {args.latency_ms:.0f} ms por chamada"
+    )
+    print(f"{'modo':<10} {'p50 (ms)':>10} {'p99 (ms)':>10} {'média (ms)':>12}")
+    for mode in ("blocking", "executor", "native"):
+        samples = asyncio.run(run_scenario(mode, args.requests, latency))
+        print(
+            f"{mode:<10} {percentile(samples, 50):>10.1f} "
+            f"{percentile(samples, 99):>10.1f} {statistics.mean(samples):>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
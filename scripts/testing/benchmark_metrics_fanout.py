@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Benchmark da coleta de métricas em tempo real do dashboard de admin.
+
+Compara dois fluxos de `MetricsService.collect_real_time_metrics`:
+
+- sequential: as cinco contagens (usuários ativos, novos usuários, códigos
+  gerados, códigos resgatados, parceiros ativos) aguardadas uma após a outra,
+  como no fluxo anterior
+- concurrent: fluxo atual, com as contagens em paralelo (limitadas pelo
+  semáforo do serviço) e prazo por submétrica
+
+O Firestore é substituído por um cliente falso com latência injetada por ida
+ao banco (contagem COUNT e leitura da página são duas idas). Com
+`--slow-ms`, a contagem de códigos resgatados (no fluxo atual, a leitura dos
+contadores de códigos) fica lenta para mostrar o resultado parcial: a
+submétrica volta null no prazo e as demais chegam.
+
+Uso:
+    python scripts/testing/benchmark_metrics_fanout.py --latency-ms 40 --slow-ms 5000
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.utils import code_counters as counters_module  # noqa: E402
+from src.utils import metrics_service as metrics_module  # noqa: E402
+from src.utils.metrics_service import MetricsService  # noqa: E402
+
+TENANT = "knn-dev-tenant"
+
+
+class FakeFirestore:
+    """Contagens fixas com latência por ida ao banco."""
+
+    def __init__(self, latency: float, slow: float | None = None):
+        self.latency = latency
+        self.slow = slow
+        self.round_trips = 0
+
+    async def _round_trip(self, latency: float):
+        self.round_trips += 1
+        await asyncio.sleep(latency)
+
+    async def query_documents(self, collection, *, tenant_id, filters=None, **kw):
+        latency = self.latency
+        if self.slow and collection == "validation_codes" and filters:
+            latency = self.slow
+        # COUNT no servidor e leitura da página
+        await self._round_trip(latency)
+        await self._round_trip(self.latency)
+        return {"items": [], "total": 10 * (len(filters or []) + 1)}
+
+    async def get_documents_many(self, collection, ids, tenant_id):
+        # Contadores de códigos (fluxo atual): uma leitura em lote
+        await self._round_trip(self.slow or self.latency)
+        return {ids[0]: {"generated": 10, "redeemed": 20}}
+
+
+class FakeSnapshots:
+    """Snapshots e lote dos rollups, com uma ida ao banco por gravação."""
+
+    def __init__(self, store: FakeFirestore):
+        self.store = store
+
+    def collection(self, name):
+        return self
+
+    def document(self, doc_id):
+        return doc_id
+
+    def batch(self):
+        return self
+
+    def set(self, doc_ref, data, merge=False):
+        pass
+
+    async def add(self, data):
+        await self.store._round_trip(self.store.latency)
+
+    async def commit(self):
+        await self.store._round_trip(self.store.latency)
+
+
+async def _primary_only(primary, fallback, *args, breaker=None, **kwargs):
+    return await primary(*args, **kwargs)
+
+
+class SequentialMetricsService(MetricsService):
+    """Fluxo anterior: cada contagem aguardada em sequência, sem prazo."""
+
+    async def _collect(self, name, func):
+        return await func()
+
+    async def collect_real_time_metrics(self, tenant_id):
+        metrics = {}
+        for key, collector in (
+            ("users", self._get_user_metrics),
+            ("codes", self._get_code_metrics),
+            ("partners", self._get_partner_metrics),
+            ("performance", self._get_performance_metrics),
+        ):
+            metrics[key] = await collector(tenant_id)
+        await self._save_metrics_snapshot(tenant_id, metrics)
+        return metrics
+
+    async def _get_user_metrics(self, tenant_id):
+        active = await self._count_documents("students", tenant_id, [("a", ">=", 1)])
+        new = await self._count_documents("students", tenant_id, [("c", ">=", 1)])
+        return {"active_users": active, "new_users_7d": new}
+
+    async def _get_code_metrics(self, tenant_id):
+        total = await self._count_documents("validation_codes", tenant_id)
+        redeemed = await self._count_documents(
+            "validation_codes", tenant_id, [("used_at", "!=", None)]
+        )
+        return {"total_codes": total, "redeemed_codes": redeemed}
+
+
+async def run_scenario(
+    mode: str, latency: float, slow: float | None, timeout: float
+) -> dict:
+    """Executa uma coleta e mede a duração."""
+    store = FakeFirestore(latency, slow)
+    service_class = SequentialMetricsService if mode == "sequential" else MetricsService
+    service = service_class(collect_timeout=timeout)
+    service.db = FakeSnapshots(store)
+
+    with (
+        patch.object(metrics_module, "firestore_client", store),
+        patch.object(metrics_module, "with_circuit_breaker", _primary_only),
+        patch.object(counters_module, "firestore_client", store),
+        patch.object(counters_module, "with_circuit_breaker", _primary_only),
+    ):
+        start = time.perf_counter()
+        metrics = await service.collect_real_time_metrics(TENANT)
+        elapsed = (time.perf_counter() - start) * 1000
+
+    missing = sorted(
+        f"{group}.{name}"
+        for group, values in metrics.items()
+        for name, value in values.items()
+        if value is None
+    )
+    return {"ms": elapsed, "round_trips": store.round_trips, "missing": missing}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--slow-ms", type=float, default=0.0)
+    parser.add_argument("--timeout-ms", type=float, default=500.0)
+    args = parser.parse_args()
+
+    latency = args.latency_ms / 1000
+    slow = args.slow_ms / 1000 or None
+    print(
+        f"Latência simulada do Firestore: {args.latency_ms:.0f} ms por chamada"
+        + (f", contagem lenta: {args.slow_ms:.0f} ms" if slow else "")
+        + f", prazo por submétrica: {args.timeout_ms:.0f} ms"
+    )
+    print(f"{'fluxo':<11} {'duração (ms)':>13} {'idas':>5}  nulos")
+    for mode in ("sequential", "concurrent"):
+        result = asyncio.run(run_scenario(mode, latency, slow, args.timeout_ms / 1000))
+        print(
+            f"{mode:<11} {result['ms']:>13.1f} {result['round_trips']:>5}  "
+            f"{', '.join(result['missing']) or '-'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
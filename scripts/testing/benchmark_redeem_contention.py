@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Benchmark de contenção do resgate de códigos de validação.
+
+Dispara N resgates concorrentes do mesmo código e compara dois fluxos:
+
+- legacy: leitura do parceiro, leitura do código, validação e atualização em
+  chamadas separadas (fluxo anterior de `/partner/redeem`)
+- engine: RedemptionEngine, com o parceiro vindo do cache, a verificação e
+  marcação do código em uma única transação e os resgates simultâneos do
+  processo compartilhando essa transação
+
+O Firestore é substituído por um armazenamento falso com latência injetada;
+a transação falsa serializa as escritas no mesmo documento, como os locks das
+transações do SDK de servidor. O relatório mostra quantos resgates tiveram
+sucesso (o correto é exatamente 1), a latência p50/p99 e as idas ao banco.
+
+Uso:
+    python scripts/testing/benchmark_redeem_contention.py --requests 50 --latency-ms 20
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.utils import redemption as redemption_module  # noqa: E402
+from src.utils.catalog_cache import CatalogCache  # noqa: E402
+from src.utils.redemption import (  # noqa: E402
+    RedemptionError,
+    check_redeemable,
+    redemption_engine,
+)
+
+TENANT = "knn-dev-tenant"
+PARTNER_ID = "PTN_BENCH"
+CNPJ = "12345678000190"
+CODE = "123456"
+CODE_ID = f"{TENANT}_{PARTNER_ID}_{CODE}"
+
+
+class FakeStore:
+    """Documentos em memória com latência fixa por ida ao banco."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.round_trips = 0
+        self.locks: dict[str, asyncio.Lock] = {}
+        self.docs = {
+            ("partners", PARTNER_ID): {"id": PARTNER_ID, "cnpj": CNPJ},
+            ("students", "STD_BENCH"): {"id": "STD_BENCH", "name": "Aluno Bench"},
+            ("validation_codes", CODE_ID): {
+                "tenant_id": TENANT,
+                "partner_id": PARTNER_ID,
+                "student_id": "STD_BENCH",
+                "expires": datetime.now(UTC) + timedelta(minutes=3),
+                "used_at": None,
+            },
+        }
+
+    async def _round_trip(self):
+        self.round_trips += 1
+        await asyncio.sleep(self.latency)
+
+    async def get_document(self, collection, doc_id, tenant_id, *, hedge=None):
+        await self._round_trip()
+        doc = self.docs.get((collection, doc_id))
+        return {**doc, "id": doc_id} if doc else None
+
+    async def update_document(self, collection, doc_id, data, tenant_id):
+        await self._round_trip()
+        self.docs[(collection, doc_id)].update(data)
+
+    async def claim_document(self, collection, doc_id, updates, check, tenant_id):
+        async with self.locks.setdefault(doc_id, asyncio.Lock()):
+            await self._round_trip()
+            doc = self.docs.get((collection, doc_id))
+            if doc is None:
+                return None, None
+            data = {**doc, "id": doc_id}
+            reason = check(data)
+            if reason is None:
+                doc.update(updates)
+                data.update(updates)
+            return data, reason
+
+
+async def legacy_redeem(store: FakeStore) -> bool:
+    """Fluxo anterior: leitura, validação e atualização separadas."""
+    partner = await store.get_document("partners", PARTNER_ID, TENANT)
+    if not partner or partner.get("cnpj") != CNPJ:
+        return False
+    code = await store.get_document("validation_codes", CODE_ID, TENANT)
+    now = datetime.now(UTC)
+    if not code or check_redeemable(code, PARTNER_ID, now):
+        return False
+    await store.update_document(
+        "validation_codes",
+        CODE_ID,
+        {"used_at": now, "redeemed_by_partner_id": PARTNER_ID},
+        TENANT,
+    )
+    await store.get_document("students", code["student_id"], TENANT)
+    return True
+
+
+async def engine_redeem(store: FakeStore) -> bool:
+    """Fluxo atual: RedemptionEngine."""
+    try:
+        await redemption_engine.redeem(TENANT, PARTNER_ID, CNPJ, CODE)
+    except RedemptionError:
+        return False
+    return True
+
+
+async def _primary_only(primary, fallback, *args, breaker=None, **kwargs):
+    return await primary(*args, **kwargs)
+
+
+async def run_scenario(mode: str, requests: int, latency: float) -> dict:
+    """Executa N resgates concorrentes do mesmo código."""
+    store = FakeStore(latency)
+    redeem = legacy_redeem if mode == "legacy" else engine_redeem
+
+    async def one_request() -> tuple[bool, float]:
+        start = time.perf_counter()
+        ok = await redeem(store)
+        return ok, (time.perf_counter() - start) * 1000
+
+    patches = [
+        patch.object(redemption_module, "firestore_client", store),
+        patch.object(redemption_module, "UnifiedDatabaseClient", store),
+        patch.object(redemption_module, "with_circuit_breaker", _primary_only),
+        patch.object(redemption_module, "catalog_cache", CatalogCache(300, 100)),
+    ]
+    for p in patches:
+        p.start()
+    try:
+        # Parceiro já em cache, como em um terminal que resgata com frequência
+        if mode == "engine":
+            await redemption_module.catalog_cache.get_or_load(
+                TENANT,
+                "partners",
+                ("redeem", PARTNER_ID),
+                lambda: store.get_document("partners", PARTNER_ID, TENANT),
+            )
+            store.round_trips = 0
+        results = await asyncio.gather(*(one_request() for _ in range(requests)))
+    finally:
+        for p in reversed(patches):
+            p.stop()
+
+    samples = [elapsed for _, elapsed in results]
+    return {
+        "successes": sum(ok for ok, _ in results),
+        "p50": percentile(samples, 50),
+        "p99": percentile(samples, 99),
+        "round_trips": store.round_trips / requests,
+    }
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Percentil por ranking mais próximo."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    latency = args.latency_ms / 1000
+    print(
+        f"{args.requests} resgates concorrentes do mesmo código, "
+        f"latência simulada do Firestore: {args.latency_ms:.0f} ms por chamada"
+    )
+    print(
+        f"{'fluxo':<8} {'sucessos':>9} {'p50 (ms)':>10} {'p99 (ms)':>10} "
+        f"{'idas/req':>9}"
+    )
+    for mode in ("legacy", "engine"):
+        result = asyncio.run(run_scenario(mode, args.requests, latency))
+        print(
+            f"{mode:<8} {result['successes']:>9} {result['p50']:>10.1f} "
+            f"{result['p99']:>10.1f} {result['round_trips']:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,7 @@ from fastapi import APIRouter, Body, Depends, HTTPException, Path, Query, status
 from src.auth import JWTPayload, validate_admin_role
 from src.db import firestore_client, postgres_client, with_circuit_breaker
 from src.db.firestore import db
+from src.db.pagination import InvalidCursorError
 from src.models import (
     BaseResponse,
     EntityListResponse,
@@ -35,6 +36,9 @@ from src.models.student import (
     StudentGuardian,
 )
 from src.utils import logger
+from src.utils.benefit_index import benefit_index
+from src.utils.catalog_cache import catalog_cache
+from src.utils.code_counters import GENERATED, REDEEMED, code_counters
 from src.utils.id_generators import IDGenerators
 from src.utils.metrics_service import metrics_service
 from src.utils.partners_service import PartnersService
@@ -55,6 +59,9 @@ async def list_partners(
         20, ge=1, le=100, description="Número máximo de itens por página"
     ),
     offset: int = Query(0, ge=0, description="Offset para paginação"),
+    cursor: str | None = Query(
+        None, description="Cursor da próxima página (campo next_cursor)"
+    ),
     current_user: JWTPayload = Depends(validate_admin_role),
 ):
     """
@@ -72,10 +79,16 @@ async def list_partners(
             ord=ord,
             limit=limit,
             offset=offset,
+            cursor=cursor,
             use_circuit_breaker=False,  # Desabilitado para usar apenas Firestore
             enable_ordering=True,  # Habilitado após criação do índice composto
         )
 
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": {"code": "INVALID_CURSOR", "msg": str(e)}},
+        ) from e
     except Exception as e:
         logger.error(f"Erro detalhado ao listar parceiros: {str(e)}", exc_info=True)
         logger.error(f"Tipo do erro: {type(e).__name__}")
@@ -110,7 +123,7 @@ async def get_partner_details(
             )
 
         partner_data = await with_circuit_breaker(
-            get_firestore_partner, get_postgres_partner
+            get_firestore_partner, get_postgres_partner, breaker=("partners", "read")
         )
 
         if not partner_data:
@@ -147,17 +160,35 @@ async def get_partner_details(
 
 @router.get("/students", response_model=EntityListResponse)
 async def list_students(
+    limit: int = Query(
+        1000, ge=1, le=1000, description="Número máximo de itens por página"
+    ),
+    cursor: str | None = Query(
+        None, description="Cursor da próxima página (campo next_cursor)"
+    ),
+    include_total: bool = Query(
+        True, description="Inclui o total de registros (agregação COUNT)"
+    ),
     current_user: JWTPayload = Depends(validate_admin_role),
 ):
     """
-    Lista todos os estudantes.
+    Lista os estudantes com paginação por cursor.
     """
     try:
         students = await firestore_client.query_documents(
-            "students", tenant_id=current_user.tenant, limit=1000
+            "students",
+            tenant_id=current_user.tenant,
+            limit=limit,
+            cursor=cursor,
+            count_total=include_total,
         )
         return {"data": students, "msg": "Estudantes listados com sucesso"}
 
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": {"code": "INVALID_CURSOR", "msg": str(e)}},
+        ) from e
     except Exception as e:
         logger.error(f"Erro ao listar estudantes: {str(e)}")
         raise HTTPException(
@@ -238,17 +269,35 @@ async def create_student(
 
 @router.get("/employees", response_model=EntityListResponse)
 async def list_employees(
+    limit: int = Query(
+        1000, ge=1, le=1000, description="Número máximo de itens por página"
+    ),
+    cursor: str | None = Query(
+        None, description="Cursor da próxima página (campo next_cursor)"
+    ),
+    include_total: bool = Query(
+        True, description="Inclui o total de registros (agregação COUNT)"
+    ),
     current_user: JWTPayload = Depends(validate_admin_role),
 ):
     """
-    Lista todos os funcionários.
+    Lista os funcionários com paginação por cursor.
     """
     try:
         employees = await firestore_client.query_documents(
-            "employees", tenant_id=current_user.tenant, limit=1000
+            "employees",
+            tenant_id=current_user.tenant,
+            limit=limit,
+            cursor=cursor,
+            count_total=include_total,
         )
         return {"data": employees, "msg": "Funcionários listados com sucesso"}
 
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": {"code": "INVALID_CURSOR", "msg": str(e)}},
+        ) from e
     except Exception as e:
         logger.error(f"Erro ao listar funcionários: {str(e)}")
         raise HTTPException(
@@ -414,6 +463,7 @@ async def create_partner(
 
         # Criar parceiro
         result = await firestore_client.create_document("partners", data, data["id"])
+        catalog_cache.invalidate(current_user.tenant, "partners")
         # Atualiza contadores agregados na coleção 'metadata'
         await metrics_service.update_metadata_on_crud(
             "partners", current_user.tenant, operation="add", delta=1
@@ -496,7 +546,9 @@ async def list_all_benefits(
 
         # Usar circuit breaker para operações do Firestore
         benefits_list = await with_circuit_breaker(
-            get_firestore_all_benefits, get_postgres_all_benefits
+            get_firestore_all_benefits,
+            get_postgres_all_benefits,
+            breaker=("benefits", "read"),
         )
 
         # Ordenar por data de criação (mais recente primeiro)
@@ -776,7 +828,9 @@ async def update_benefit(
 
         # Usar circuit breaker corretamente
         result = await with_circuit_breaker(
-            update_benefit_firestore, update_benefit_postgres
+            update_benefit_firestore,
+            update_benefit_postgres,
+            breaker=("benefits", "write"),
         )
 
         # Verificar se a atualização foi bem-sucedida
@@ -791,6 +845,13 @@ async def update_benefit(
                 },
             )
 
+        catalog_cache.invalidate(current_user.tenant, "benefits")
+        if result.get("updated_benefit"):
+            benefit_index.upsert_benefit(
+                current_user.tenant, partner_id, benefit_id, result["updated_benefit"]
+            )
+        else:
+            benefit_index.invalidate(current_user.tenant)
         logger.info(
             f"Benefício {benefit_id} atualizado com sucesso para parceiro {partner_id}"
         )
@@ -907,7 +968,9 @@ async def delete_benefit(
             )
 
         delete_type = await with_circuit_breaker(
-            delete_benefit_firestore, delete_benefit_postgres
+            delete_benefit_firestore,
+            delete_benefit_postgres,
+            breaker=("benefits", "write"),
         )
 
         # Verificar se o resultado é válido (não é dados vazios do circuit breaker)
@@ -922,6 +985,9 @@ async def delete_benefit(
                 },
             )
 
+        catalog_cache.invalidate(current_user.tenant, "benefits")
+        # Benefícios inativados ou removidos deixam de ser listados
+        benefit_index.remove_benefit(current_user.tenant, partner_id, benefit_id)
         action_msg = "inativado" if delete_type == "soft_deleted" else "removido"
         logger.info(
             f"Benefício {benefit_id} {action_msg} com sucesso para parceiro {partner_id}"
@@ -996,6 +1062,8 @@ async def create_benefit(
         await firestore_client.create_document(
             "benefits", deepcopy(the_benefit), benefit_id
         )
+        catalog_cache.invalidate(tenant_id, "benefits")
+        benefit_index.upsert_benefit(tenant_id, partner_id, benefit_id, the_benefit)
 
         # Atualiza contadores agregados na coleção 'metadata' (benefits)
         await metrics_service.update_metadata_on_crud(
@@ -1060,107 +1128,21 @@ async def get_metrics(current_user: JWTPayload = Depends(validate_admin_role)):
             return result.get("total", 0)
 
         active_students = await with_circuit_breaker(
-            count_firestore_active_students, count_postgres_active_students
-        )
-
-        # Contar códigos gerados
-        async def count_firestore_codes():
-            result = await firestore_client.query_documents(
-                "validation_codes", tenant_id=current_user.tenant
-            )
-            return result.get("total", 0)
-
-        async def count_postgres_codes():
-            result = await postgres_client.query_documents(
-                "validation_codes", tenant_id=current_user.tenant
-            )
-            return result.get("total", 0)
-
-        codes_generated = await with_circuit_breaker(
-            count_firestore_codes, count_postgres_codes
+            count_firestore_active_students,
+            count_postgres_active_students,
+            breaker=("students", "count"),
         )
 
-        # Contar códigos resgatados
-        async def count_firestore_redeemed_codes():
-            result = await firestore_client.query_documents(
-                "validation_codes",
-                tenant_id=current_user.tenant,
-                filters=[("used_at", "!=", None)],
-            )
-            return result.get("total", 0)
+        # Códigos gerados e resgatados (contadores incrementais)
+        code_totals = await code_counters.totals(current_user.tenant)
+        codes_generated = code_totals[GENERATED]
+        codes_redeemed = code_totals[REDEEMED]
 
-        async def count_postgres_redeemed_codes():
-            result = await postgres_client.query_documents(
-                "validation_codes",
-                tenant_id=current_user.tenant,
-                filters=[("used_at", "!=", None)],
-            )
-            return result.get("total", 0)
-
-        codes_redeemed = await with_circuit_breaker(
-            count_firestore_redeemed_codes, count_postgres_redeemed_codes
+        # Top parceiros: uma agregação sobre os contadores de resgates
+        top_partners = await metrics_service.get_top_partners(
+            current_user.tenant, limit=5
         )
 
-        # Obter top parceiros
-        # Simplificado: na implementação real, seria necessário agregar dados
-        top_partners = []
-
-        async def get_firestore_partners():
-            return await firestore_client.query_documents(
-                "partners",
-                tenant_id=current_user.tenant,
-                filters=[("active", "==", True)],
-                limit=5,
-            )
-
-        async def get_postgres_partners():
-            return await postgres_client.query_documents(
-                "partners", filters=[("active", "==", True)], limit=5
-            )
-
-        partners_result = await with_circuit_breaker(
-            get_firestore_partners, get_postgres_partners
-        )
-
-        for partner in partners_result.get("items", []):
-            # Contar resgates para este parceiro
-            partner_id = partner["id"]
-
-            async def count_firestore_partner_redemptions(pid=partner_id):
-                codes_result = await firestore_client.query_documents(
-                    "validation_codes",
-                    filters=[
-                        ("partner_id", "==", pid),
-                        ("used_at", "!=", None),
-                    ],
-                )
-                return codes_result.get("total", 0)
-
-            async def count_postgres_partner_redemptions(pid=partner_id):
-                codes_result = await postgres_client.query_documents(
-                    "validation_codes",
-                    filters=[
-                        ("partner_id", "==", pid),
-                        ("used_at", "!=", None),
-                    ],
-                )
-                return codes_result.get("total", 0)
-
-            redemptions = await with_circuit_breaker(
-                count_firestore_partner_redemptions, count_postgres_partner_redemptions
-            )
-
-            top_partners.append(
-                {
-                    "partner_id": partner_id,
-                    "trade_name": partner.get("trade_name", ""),
-                    "redemptions": redemptions,
-                }
-            )
-
-        # Ordenar por número de resgates (decrescente)
-        top_partners.sort(key=lambda x: x["redemptions"], reverse=True)
-
         return {
             "data": {
                 "active_students": active_students,
@@ -1230,7 +1212,9 @@ async def send_notifications(
             )
 
         recipients_result = await with_circuit_breaker(
-            get_firestore_recipients, get_postgres_recipients
+            get_firestore_recipients,
+            get_postgres_recipients,
+            breaker=(request.target, "read"),
         )
 
         recipients = recipients_result.get("items", [])
@@ -12,10 +12,23 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel, Field
 
 from src.auth import JWTPayload, validate_admin_role
-from src.models import BaseResponse
+from src.db import postgres_client
+from src.db.circuit_breaker import circuit_breakers, hedge_tracker
+from src.db.error_handler import retry_stats
+from src.models import BaseResponse, EntityResponse
 from src.utils import logger
+from src.utils.benefit_index import benefit_index
+from src.utils.catalog_cache import catalog_cache
+from src.utils.code_allocator import code_allocator
+from src.utils.code_counters import code_counters
 from src.utils.firebase_analytics import analytics_client
+from src.utils.jwks import firebase_jwks_store, jwks_store
 from src.utils.metrics_service import metrics_service
+from src.utils.profiling import request_profiler
+from src.utils.rate_limit import token_bucket_limiter
+from src.utils.redemption import redemption_engine
+from src.utils.sampling import trace_sampler
+from src.utils.token_cache import token_cache
 
 router = APIRouter(prefix="/admin/metrics", tags=["Admin Metrics"])
 
@@ -98,7 +111,7 @@ class AdminCountersResponse(BaseResponse):
 class HistoricalMetricsResponse(BaseResponse):
     """Resposta de métricas históricas."""
 
-    data: dict[str, list[dict[str, Any]]]
+    data: dict[str, Any]
 
 
 class CustomMetricRequest(BaseModel):
@@ -462,6 +475,241 @@ async def get_performance_metrics(
         )
 
 
+@router.get("/cache", response_model=EntityResponse)
+async def get_catalog_cache_stats(
+    current_user: JWTPayload = Depends(validate_admin_role),
+):
+    """
+    Retorna os contadores do cache em memória do catálogo e do índice de
+    benefícios.
+
+    Os contadores (hits, misses, hit_rate, evictions, invalidations) são da
+    instância que atendeu a requisição e reiniciam quando ela é reciclada.
+
+    Args:
+        current_user: Usuário autenticado (admin)
+
+    Returns:
+        EntityResponse: Estatísticas do cache do catálogo
+    """
+    return EntityResponse(
+        data={**catalog_cache.stats(), "benefit_index": benefit_index.stats()}
+    )
+
+
+@router.get("/auth-cache", response_model=EntityResponse)
+async def get_auth_cache_stats(
+    current_user: JWTPayload = Depends(validate_admin_role),
+):
+    """
+    Retorna os contadores do cache de tokens verificados da autenticação.
+
+    Inclui hit_rate, o número de verificações completas (e rejeições) por
+    verificador (jwks, firebase ou local) e o estado das chaves JWKS desta
+    instância.
+
+    Args:
+        current_user: Usuário autenticado (admin)
+
+    Returns:
+        EntityResponse: Estatísticas do cache de tokens e das chaves
+    """
+    return EntityResponse(
+        data={
+            **token_cache.stats(),
+            "jwks": {
+                jwks_store.name: jwks_store.stats(),
+                firebase_jwks_store.name: firebase_jwks_store.stats(),
+            },
+        }
+    )
+
+
+@router.get("/validation-codes", response_model=EntityResponse)
+async def get_validation_code_occupancy(
+    current_user: JWTPayload = Depends(validate_admin_role),
+):
+    """
+    Retorna a ocupação estimada do espaço de códigos de validação por
+    (tenant, parceiro), a partir da taxa de colisão das reservas recentes.
+
+    Partições com `alert` verdadeiro estão acima de
+    VALIDATION_CODE_OCCUPANCY_ALERT e indicam que o número de dígitos do
+    código deve ser revisto. `redemption` traz os resultados dos resgates
+    por motivo e quantos compartilharam a transação de outro terminal.
+    `counters` traz os incrementos e falhas dos contadores de códigos.
+
+    Args:
+        current_user: Usuário autenticado (admin)
+
+    Returns:
+        EntityResponse: Ocupação, colisões e reservas esgotadas por partição
+    """
+    return EntityResponse(
+        data={
+            **code_allocator.stats(),
+            "redemption": redemption_engine.stats(),
+            "counters": code_counters.stats(),
+        }
+    )
+
+
+@router.get("/analytics-pipeline", response_model=EntityResponse)
+async def get_analytics_pipeline_stats(
+    current_user: JWTPayload = Depends(validate_admin_role),
+):
+    """
+    Retorna a profundidade da fila de eventos de analytics e os contadores
+    de eventos enfileirados, descartados (fila cheia), gravados em lote e
+    com falha na gravação nesta instância, além das decisões de amostragem
+    das requisições (erro, lenta, amostrada ou descartada).
+
+    Args:
+        current_user: Usuário autenticado (admin)
+
+    Returns:
+        EntityResponse: Estado da fila, contadores de eventos e amostragem
+    """
+    return EntityResponse(
+        data={
+            **analytics_client.pipeline.stats(),
+            "sampling": trace_sampler.stats(),
+        }
+    )
+
+
+@router.get("/profiles", response_model=EntityResponse)
+async def list_request_profiles(
+    current_user: JWTPayload = Depends(validate_admin_role),
+):
+    """
+    Lista os perfis de requisição guardados nesta instância (mais recentes
+    primeiro) e os limites do profiling.
+
+    Um perfil é gerado enviando o cabeçalho `X-Profile: cprofile` ou
+    `X-Profile: sample` com um token de admin (ou por sorteio, com
+    PROFILING_SAMPLE_RATE); o ID volta no cabeçalho `X-Profile-ID`.
+
+    Args:
+        current_user: Usuário autenticado (admin)
+
+    Returns:
+        EntityResponse: Limites, contadores e resumo dos perfis
+    """
+    return EntityResponse(
+        data={
+            **request_profiler.stats(),
+            "profiles": request_profiler.summaries(),
+        }
+    )
+
+
+@router.get("/profiles/{profile_id}", response_model=EntityResponse)
+async def get_request_profile(
+    profile_id: str,
+    current_user: JWTPayload = Depends(validate_admin_role),
+):
+    """
+    Retorna um perfil de requisição: relatório do pstats (modo `cprofile`)
+    ou pilhas no formato collapsed (modo `sample`) em `output`.
+
+    Args:
+        profile_id: ID do perfil (cabeçalho X-Profile-ID da resposta)
+        current_user: Usuário autenticado (admin)
+
+    Returns:
+        EntityResponse: Perfil com o relatório
+
+    Raises:
+        HTTPException: Perfil inexistente ou já descartado
+    """
+    profile = request_profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={
+                "error": {
+                    "code": "PROFILE_NOT_FOUND",
+                    "msg": "Perfil não encontrado nesta instância",
+                }
+            },
+        )
+    return EntityResponse(data=profile)
+
+
+@router.get("/rate-limits", response_model=EntityResponse)
+async def get_rate_limit_stats(
+    current_user: JWTPayload = Depends(validate_admin_role),
+):
+    """
+    Retorna as decisões do rate limit por escopo (permitidas, limitadas e
+    falhas do armazenamento, que liberam a requisição) e a latência da
+    verificação nesta instância.
+
+    Args:
+        current_user: Usuário autenticado (admin)
+
+    Returns:
+        EntityResponse: Backend, decisões por escopo e latência p50/p99 (ms)
+    """
+    return EntityResponse(data=token_bucket_limiter.stats())
+
+
+@router.get("/postgres-pool", response_model=EntityResponse)
+async def get_postgres_pool_stats(
+    current_user: JWTPayload = Depends(validate_admin_role),
+):
+    """
+    Retorna a utilização do pool de conexões da contingência PostgreSQL.
+
+    Os valores são da instância que atendeu a requisição.
+
+    Args:
+        current_user: Usuário autenticado (admin)
+
+    Returns:
+        EntityResponse: Tamanho, conexões em uso e tempos de aquisição
+    """
+    return EntityResponse(data=postgres_client.pool_stats())
+
+
+@router.get("/circuit-breakers", response_model=EntityResponse)
+async def get_circuit_breaker_states(
+    current_user: JWTPayload = Depends(validate_admin_role),
+):
+    """
+    Lista os circuit breakers por (backend, coleção, classe de operação),
+    abertos primeiro, com as taxas de falha e lentidão da janela atual, e os
+    contadores de retry por backend (tentativas, orçamento esgotado, prazo).
+
+    Args:
+        current_user: Usuário autenticado (admin)
+
+    Returns:
+        EntityResponse: Estado de cada circuit breaker desta instância
+    """
+    return EntityResponse(
+        data={"breakers": circuit_breakers.states(), "retries": retry_stats.stats()}
+    )
+
+
+@router.get("/hedged-reads", response_model=EntityResponse)
+async def get_hedged_read_stats(
+    current_user: JWTPayload = Depends(validate_admin_role),
+):
+    """
+    Retorna, por operação, quantas leituras dispararam hedge no PostgreSQL e
+    quantas vezes o hedge respondeu antes do Firestore.
+
+    Args:
+        current_user: Usuário autenticado (admin)
+
+    Returns:
+        EntityResponse: Contadores, taxa de vitória do hedge e prazo atual
+    """
+    return EntityResponse(data=hedge_tracker.stats())
+
+
 @router.get("/alerts", response_model=BaseResponse)
 async def get_system_alerts(
     current_user: JWTPayload = Depends(validate_admin_role),
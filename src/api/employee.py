@@ -1,14 +1,17 @@
 """Implementação dos endpoints para o perfil de funcionário (employee)."""
 
-import random
-import string
 from datetime import datetime, timedelta
 
 from fastapi import APIRouter, Depends, HTTPException, Path, Query, status
 
 from src.auth import JWTPayload, validate_employee_role
+from src.config import RATE_LIMIT_VALIDATION_CODES
 from src.db import firestore_client, postgres_client, with_circuit_breaker
+from src.db.circuit_breaker import BackendUnavailableError
+from src.db.pagination import InvalidCursorError
 from src.models import (
+    BenefitAudience,
+    BenefitListResponse,
     FavoriteRequest,
     FavoriteResponse,
     FavoritesResponse,
@@ -20,7 +23,11 @@ from src.models import (
     ValidationCodeCreationRequest,
 )
 from src.utils import logger
+from src.utils.benefit_index import list_audience_benefits
+from src.utils.catalog_cache import catalog_cache
+from src.utils.code_allocator import CodeSpaceExhaustedError, code_allocator
 from src.utils.partners_service import PartnersService
+from src.utils.rate_limit import rate_limit
 
 # Criar router
 router = APIRouter(tags=["employee"])
@@ -35,6 +42,9 @@ async def list_partners(
     ord: str | None = Query("name", description="Ordenação (name, category)"),
     limit: int = Query(20, ge=1, le=100, description="Limite de resultados"),
     offset: int = Query(0, ge=0, description="Offset para paginação"),
+    cursor: str | None = Query(
+        None, description="Cursor da próxima página (campo next_cursor)"
+    ),
     current_user: JWTPayload = employee_dependency,
 ) -> PartnerListResponse:
     """
@@ -52,10 +62,28 @@ async def list_partners(
             ord=ord,
             limit=limit,
             offset=offset,
+            cursor=cursor,
             use_circuit_breaker=True,  # Habilitado para funcionários
             enable_ordering=True,  # Habilitado para funcionários
         )
 
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": {"code": "INVALID_CURSOR", "msg": str(e)}},
+        ) from e
+    except BackendUnavailableError as e:
+        logger.error(f"Página seguinte de parceiros indisponível: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={
+                "error": {
+                    "code": "PARTNERS_UNAVAILABLE",
+                    "msg": "Listagem de parceiros indisponível. "
+                    "Tente novamente em instantes.",
+                }
+            },
+        ) from e
     except Exception as e:
         logger.error(
             f"Erro ao listar parceiros para funcionário {current_user.sub}: {e}"
@@ -68,6 +96,40 @@ async def list_partners(
         ) from e
 
 
+@router.get("/benefits", response_model=BenefitListResponse)
+async def list_benefits(
+    cat: str | None = Query(None, description="Filtro por categoria do benefício"),
+    limit: int = Query(50, ge=1, le=200, description="Número máximo de benefícios"),
+    offset: int = Query(0, ge=0, description="Offset para paginação"),
+    current_user: JWTPayload = employee_dependency,
+) -> BenefitListResponse:
+    """
+    Lista benefícios disponíveis para funcionários no tenant atual.
+
+    Considera apenas benefícios ativos de parceiros ativos cujo público inclui
+    funcionários ("employees" ou "all"), servidos pelo índice de benefícios.
+    """
+    try:
+        collected = await list_audience_benefits(
+            current_user.tenant, BenefitAudience.EMPLOYEE.value, category=cat
+        )
+        return BenefitListResponse(msg="ok", data=collected[offset : offset + limit])
+
+    except Exception as e:
+        logger.error(
+            f"Erro ao listar benefícios para funcionário {current_user.sub}: {e}"
+        )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={
+                "error": {
+                    "code": "SERVER_ERROR",
+                    "msg": "Erro ao listar benefícios disponíveis",
+                }
+            },
+        ) from e
+
+
 @router.get("/me/fav", response_model=FavoritesResponse)
 async def get_employee_favorites(
     current_user: JWTPayload = employee_dependency,
@@ -88,7 +150,9 @@ async def get_employee_favorites(
             return await postgres_client.get_document("employees_fav", employee_id)
 
         favorites_doc = await with_circuit_breaker(
-            get_firestore_favorites, get_postgres_favorites
+            get_firestore_favorites,
+            get_postgres_favorites,
+            breaker=("employees_fav", "read"),
         )
 
         # Se não existe documento de favoritos, retornar lista vazia
@@ -98,23 +162,21 @@ async def get_employee_favorites(
         # Obter lista de IDs dos parceiros favoritos
         favorite_partner_ids = favorites_doc.get("favorites", [])
 
-        # Obter detalhes dos parceiros favoritos
-        favorite_partners = []
-
-        for partner_id in favorite_partner_ids:
-
-            async def get_firestore_partner(pid=partner_id):
-                return await firestore_client.get_document("partners", pid)
-
-            async def get_postgres_partner(pid=partner_id):
-                return await postgres_client.get_document("partners", pid)
-
-            partner = await with_circuit_breaker(
-                get_firestore_partner, get_postgres_partner
-            )
-
-            if partner and partner.get("active", False):
-                favorite_partners.append(Partner(**partner))
+        # Obter detalhes dos parceiros favoritos em uma única leitura em lote
+        partners = await with_circuit_breaker(
+            firestore_client.get_documents_many,
+            postgres_client.get_documents_many,
+            "partners",
+            favorite_partner_ids,
+            current_user.tenant,
+            breaker=("partners", "read"),
+        )
+        # Com o circuito aberto e sem PostgreSQL o retorno é um resultado vazio
+        favorite_partners = [
+            Partner(**partner)
+            for partner in partners.values()
+            if isinstance(partner, dict) and partner.get("active", False)
+        ]
 
         return {"data": favorite_partners, "msg": "ok"}
 
@@ -152,7 +214,7 @@ async def add_employee_favorite(
             return await postgres_client.get_document("partners", partner_id_value)
 
         partner = await with_circuit_breaker(
-            get_firestore_partner, get_postgres_partner
+            get_firestore_partner, get_postgres_partner, breaker=("partners", "read")
         )
 
         if not partner or not partner.get("active", False):
@@ -171,7 +233,9 @@ async def add_employee_favorite(
             return await postgres_client.get_document("employees_fav", employee_id)
 
         favorites_doc = await with_circuit_breaker(
-            get_firestore_favorites, get_postgres_favorites
+            get_firestore_favorites,
+            get_postgres_favorites,
+            breaker=("employees_fav", "read"),
         )
 
         current_favorites = []
@@ -233,7 +297,19 @@ async def add_employee_favorite(
         ) from e
 
 
-@router.post("/validation-codes", response_model=dict)
+@router.post(
+    "/validation-codes",
+    response_model=dict,
+    dependencies=[
+        Depends(
+            rate_limit(
+                "employee_validation_codes",
+                RATE_LIMIT_VALIDATION_CODES,
+                validate_employee_role,
+            )
+        )
+    ],
+)
 async def create_validation_code(
     request: ValidationCodeCreationRequest,
     current_user: JWTPayload = Depends(validate_employee_role),
@@ -242,8 +318,6 @@ async def create_validation_code(
     Gera um código de validação de 6 dígitos para um parceiro.
     """
     try:
-        # Gerar código de 6 dígitos
-        validation_code = "".join(random.choices(string.digits, k=6))
         expires_at = datetime.utcnow() + timedelta(minutes=10)
 
         # Criar objeto ValidationCode
@@ -251,15 +325,14 @@ async def create_validation_code(
             tenant_id=current_user.tenant,
             partner_id=request.partner_id,
             employee_id=current_user.entity_id,  # Usar entity_id
-
             expires=expires_at,
         )
 
-        # Salvar no Firestore, usando o código como ID do documento
-        await firestore_client.create_document(
-            "validation_codes",
+        # Reservar um código livre no espaço de códigos do parceiro
+        validation_code, _ = await code_allocator.reserve(
+            current_user.tenant,
+            request.partner_id,
             code_data.model_dump(mode="json"),
-            doc_id=validation_code,
         )
 
         return {
@@ -267,6 +340,29 @@ async def create_validation_code(
             "expires": expires_at.isoformat(),
         }
 
+    except CodeSpaceExhaustedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={
+                "error": {
+                    "code": "VALIDATION_CODE_SPACE_EXHAUSTED",
+                    "msg": "Não foi possível gerar o código de validação. "
+                    "Tente novamente.",
+                }
+            },
+        ) from e
+    except BackendUnavailableError as e:
+        logger.error(f"Código de validação não reservado: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={
+                "error": {
+                    "code": "VALIDATION_CODE_STORE_UNAVAILABLE",
+                    "msg": "Não foi possível gerar o código de validação. "
+                    "Tente novamente em instantes.",
+                }
+            },
+        ) from e
     except Exception as e:
         logger.error(
             f"Erro ao criar código de validação para o parceiro {request.partner_id}: {str(e)}",
@@ -331,7 +427,9 @@ async def remove_employee_favorite(
             return await postgres_client.get_document("employees_fav", employee_id)
 
         favorites_doc = await with_circuit_breaker(
-            get_firestore_favorites, get_postgres_favorites
+            get_firestore_favorites,
+            get_postgres_favorites,
+            breaker=("employees_fav", "read"),
         )
 
         if not favorites_doc:
@@ -420,33 +518,29 @@ async def get_employee_validation_history(
             )
 
         codes_result = await with_circuit_breaker(
-            get_firestore_codes, get_postgres_codes
+            get_firestore_codes,
+            get_postgres_codes,
+            breaker=("validation_codes", "read"),
         )
         codes = codes_result.get("items", [])
 
-        # Buscar informações dos parceiros para cada código
+        # Buscar os parceiros de todos os códigos em uma única leitura em lote
+        try:
+            partners = await with_circuit_breaker(
+                firestore_client.get_documents_many,
+                postgres_client.get_documents_many,
+                "partners",
+                [code.get("partner_id") for code in codes],
+                current_user.tenant,
+            )
+        except Exception as e:
+            logger.error(f"Erro ao buscar parceiros do histórico: {str(e)}")
+            partners = {}
+
         history = []
         for code in codes:
             partner_id = code.get("partner_id")
-
-            # Buscar dados do parceiro
-            async def get_firestore_partner(pid=partner_id):
-                return await firestore_client.get_document(
-                    "partners", pid, tenant_id=current_user.tenant
-                )
-
-            async def get_postgres_partner(pid=partner_id):
-                return await postgres_client.get_document(
-                    "partners", pid, tenant_id=current_user.tenant
-                )
-
-            try:
-                partner_result = await with_circuit_breaker(
-                    get_firestore_partner, get_postgres_partner
-                )
-                partner = partner_result.get("data", {})
-            except Exception:
-                partner = {"name": "Parceiro não encontrado"}
+            partner = partners.get(partner_id, {})
 
             history.append(
                 {
@@ -491,10 +585,15 @@ async def get_partner_details(
     try:
         now = datetime.now()
 
-        # Buscar parceiro
+        # Buscar parceiro (cache do catálogo)
         async def get_firestore_partner():
-            return await firestore_client.get_document(
-                "partners", id, tenant_id=current_user.tenant
+            return await catalog_cache.get_or_load(
+                current_user.tenant,
+                "partners",
+                ("doc", id),
+                lambda: firestore_client.get_document(
+                    "partners", id, tenant_id=current_user.tenant
+                ),
             )
 
         async def get_postgres_partner():
@@ -503,7 +602,7 @@ async def get_partner_details(
             )
 
         partner_result = await with_circuit_breaker(
-            get_firestore_partner, get_postgres_partner
+            get_firestore_partner, get_postgres_partner, breaker=("partners", "read")
         )
         partner = partner_result.get("data")
 
@@ -522,6 +621,7 @@ async def get_partner_details(
         async def get_firestore_promotions():
             return await firestore_client.query_documents(
                 "promotions",
+                tenant_id=current_user.tenant,
                 filters=[
                     ("partner_id", "==", id),
                     ("active", "==", True),
@@ -534,6 +634,7 @@ async def get_partner_details(
         async def get_postgres_promotions():
             return await postgres_client.query_documents(
                 "promotions",
+                tenant_id=current_user.tenant,
                 filters=[
                     ("partner_id", "==", id),
                     ("active", "==", True),
@@ -543,7 +644,9 @@ async def get_partner_details(
             )
 
         promotions_result = await with_circuit_breaker(
-            get_firestore_promotions, get_postgres_promotions
+            get_firestore_promotions,
+            get_postgres_promotions,
+            breaker=("promotions", "read"),
         )
 
         # Construir resposta
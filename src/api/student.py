@@ -2,8 +2,6 @@
 Implementação dos endpoints para o perfil de aluno (student).
 """
 
-import random
-import string
 from datetime import datetime, timedelta
 
 from fastapi import (
@@ -16,9 +14,12 @@ from fastapi import (
 )
 
 from src.auth import JWTPayload, validate_student_role
+from src.config import RATE_LIMIT_VALIDATION_CODES
 from src.db import firestore_client, postgres_client
+from src.db.circuit_breaker import BackendUnavailableError
+from src.db.pagination import InvalidCursorError
 from src.models import (
-    Benefit,
+    BenefitAudience,
     BenefitListResponse,
     FavoriteRequest,
     FavoriteResponse,
@@ -32,7 +33,11 @@ from src.models import (
 )
 from src.models.student import Student, StudentDTO
 from src.utils import logger
+from src.utils.benefit_index import benefit_index, list_audience_benefits
+from src.utils.catalog_cache import catalog_cache
+from src.utils.code_allocator import CodeSpaceExhaustedError, code_allocator
 from src.utils.partners_service import PartnersService
+from src.utils.rate_limit import rate_limit
 
 # Criar router
 router = APIRouter(tags=["student"])
@@ -50,6 +55,9 @@ async def list_partners(
         20, ge=1, le=100, description="Número máximo de itens por página"
     ),
     offset: int = Query(0, ge=0, description="Offset para paginação"),
+    cursor: str | None = Query(
+        None, description="Cursor da próxima página (campo next_cursor)"
+    ),
     current_user: JWTPayload = Depends(validate_student_role),
 ):
     """
@@ -67,10 +75,28 @@ async def list_partners(
             ord=ord,
             limit=limit,
             offset=offset,
+            cursor=cursor,
             use_circuit_breaker=True,  # Habilitado para estudantes
             enable_ordering=False,  # Desabilitado para evitar índices
         )
 
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": {"code": "INVALID_CURSOR", "msg": str(e)}},
+        ) from e
+    except BackendUnavailableError as e:
+        logger.error(f"Página seguinte de parceiros indisponível: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={
+                "error": {
+                    "code": "PARTNERS_UNAVAILABLE",
+                    "msg": "Listagem de parceiros indisponível. "
+                    "Tente novamente em instantes.",
+                }
+            },
+        ) from e
     except Exception as e:
         logger.error(f"Erro detalhado ao listar parceiros: {str(e)}", exc_info=True)
         logger.error(f"Tipo do erro: {type(e).__name__}")
@@ -109,121 +135,18 @@ async def list_benefits(
             f"[student/benefits] Início | tenant={current_user.tenant} | student_id={current_user.entity_id} | cat={cat} | limit={limit} | offset={offset}"
         )
 
-        # 1) Buscar parceiros ativos do tenant
-        partners_result = await firestore_client.query_documents(
-            "partners",
-            tenant_id=current_user.tenant,
-            filters=[("active", "==", True)],
-            limit=500,
-            offset=0,
-        )
-        active_partner_ids = {
-            p.get("id") for p in partners_result.get("items", []) if p.get("id")
-        }
-
-        logger.info(
-            f"[student/benefits] Parceiros ativos encontrados: {len(active_partner_ids)}"
-        )
-        if not active_partner_ids:
-            logger.warning(
-                "[student/benefits] Nenhum parceiro ativo encontrado para o tenant atual"
-            )
-
-        # 2) Buscar documentos de benefícios do tenant
-        benefits_docs = await firestore_client.query_documents(
-            "benefits",
-            tenant_id=current_user.tenant,
-            limit=1000,
-            offset=0,
-        )
-
-        doc_ids = [d.get("id") for d in benefits_docs.get("items", []) if d.get("id")]
-        logger.info(
-            f"[student/benefits] Documentos de benefícios consultados: {len(doc_ids)} | ids={doc_ids[:10]}"
+        # Benefícios ativos de parceiros ativos, servidos pelo índice do tenant
+        collected = await list_audience_benefits(
+            current_user.tenant, BenefitAudience.STUDENT.value, category=cat
         )
 
-        # 3) Extrair benefícios válidos para estudantes
-        from src.models.benefit import BenefitDTO
-
-        collected: list[Benefit] = []
-
-        for doc in benefits_docs.get("items", []):
-            partner_id = doc.get("id")
-            if not partner_id or partner_id not in active_partner_ids:
-                continue
-
-            # Cada documento possui múltiplos benefícios com chaves BNF_*
-            benefit_keys = [
-                k for k in doc.keys() if isinstance(k, str) and k.startswith("BNF_")
-            ]
-            logger.debug(
-                f"[student/benefits] Documento {partner_id} possui {len(benefit_keys)} benefícios (BNF_*)"
-            )
-
-            for key, benefit_data in doc.items():
-                if not isinstance(key, str) or not key.startswith("BNF_"):
-                    continue
-
-                system = (
-                    benefit_data.get("system", {})
-                    if isinstance(benefit_data, dict)
-                    else {}
-                )
-                status_value = system.get("status", "")
-                audience = system.get("audience", "")
-
-                # Filtrar apenas ativos
-                if status_value != "active":
-                    continue
-
-                # Verificar se o público inclui estudantes
-                audience_includes_students = False
-                if audience in ("all", "students", "student"):
-                    audience_includes_students = True
-                elif isinstance(audience, list):
-                    audience_includes_students = (
-                        "student" in audience
-                        or "students" in audience
-                        or "all" in audience
-                    )
-                elif isinstance(audience, str):
-                    audience_includes_students = (
-                        "student" in audience or audience == "all"
-                    )
-
-                if not audience_includes_students:
-                    continue
-
-                # Converter para modelo Benefit
-                try:
-                    dto = BenefitDTO(
-                        key=key, benefit_data=benefit_data, partner_id=partner_id
-                    )
-                    benefit_obj = dto.to_benefit()
-
-                    # Filtro por categoria, se fornecido
-                    if cat:
-                        try:
-                            if str(benefit_obj.category).lower() != str(cat).lower():
-                                continue
-                        except Exception:
-                            # Se category não for comparável diretamente, pular filtro
-                            pass
-
-                    collected.append(benefit_obj)
-                except Exception as e:
-                    logger.error(
-                        f"Erro ao converter benefício {key} do parceiro {partner_id}: {str(e)}"
-                    )
-
-        # 4) Paginação em memória dos benefícios coletados
+        # Paginação sobre o resultado do índice
         total = len(collected)
         paginated = collected[offset : offset + limit]
 
         # Logs finais do processamento
-        sample = [b.model_dump() for b in paginated[:3]] if paginated else []
         logger.info(
-            f"[student/benefits] Total coletado={total} | retornando={len(paginated)} | amostra={len(sample)}"
+            f"[student/benefits] Total coletado={total} | retornando={len(paginated)}"
         )
         if not paginated:
             logger.warning(
@@ -258,8 +181,13 @@ async def get_partner_details(
     try:
         # Obter parceiro com circuit breaker
         async def get_firestore_partner():
-            return await firestore_client.get_document(
-                "partners", id, tenant_id=current_user.tenant
+            return await catalog_cache.get_or_load(
+                current_user.tenant,
+                "partners",
+                ("doc", id),
+                lambda: firestore_client.get_document(
+                    "partners", id, tenant_id=current_user.tenant
+                ),
             )
 
         async def get_postgres_partner():
@@ -287,76 +215,15 @@ async def get_partner_details(
 
         # Obter benefícios ativos do parceiro para alunos
         async def get_firestore_benefits():
-            """Busca benefícios ativos do parceiro na coleção 'benefits'."""
+            """Busca benefícios ativos do parceiro para alunos no índice."""
             try:
-                # Buscar documento do parceiro na coleção 'benefits'
-                partner_doc = await firestore_client.get_document(
-                    "benefits", id, tenant_id=current_user.tenant
-                )
-
-                if not partner_doc:
-                    logger.warning(
-                        f"Documento do parceiro {id} não encontrado na coleção 'benefits'"
+                index = await benefit_index.get(current_user.tenant)
+                return [
+                    benefit.model_dump()
+                    for benefit in index.partner_benefits(
+                        id, BenefitAudience.STUDENT.value
                     )
-                    return []
-
-                # Extrair benefícios ativos para estudantes
-                benefits = []
-                benefit_keys = [key for key in partner_doc if key.startswith("BNF_")]
-
-                for benefit_key in benefit_keys:
-                    benefit_data = partner_doc[benefit_key]
-                    system = benefit_data.get("system", {})
-                    status = system.get("status", "")
-                    audience = system.get("audience", "")
-
-                    # Filtrar apenas benefícios ativos para estudantes
-                    if status == "active":
-                        # Verificar se audience inclui estudantes
-                        audience_includes_students = False
-
-                        # Converter audience para string se necessário para debug
-                        audience_str = str(audience) if audience else ""
-                        logger.debug(
-                            f"Processando audience para benefício {benefit_key}: {audience_str} (tipo: {type(audience)})"
-                        )
-
-                        if (
-                            audience == "all"
-                            or audience == "students"
-                            or audience == "student"
-                        ):
-                            audience_includes_students = True
-                        elif isinstance(audience, list):
-                            try:
-                                audience_includes_students = "student" in audience
-                            except TypeError as e:
-                                logger.error(
-                                    f"Erro ao verificar 'student' em audience {audience}: {e}"
-                                )
-                                audience_includes_students = False
-                        elif isinstance(audience, str) and "student" in audience_str:
-                            audience_includes_students = True
-
-                        if audience_includes_students:
-                            # Converter usando BenefitDTO
-                            from src.models.benefit import BenefitDTO
-
-                            try:
-                                benefit_dto = BenefitDTO(
-                                    key=benefit_key,
-                                    benefit_data=benefit_data,
-                                    partner_id=id,
-                                )
-                                benefit_obj = benefit_dto.to_benefit()
-                                benefits.append(benefit_obj.model_dump())
-                            except Exception as e:
-                                logger.error(
-                                    f"Erro ao converter benefício {benefit_key}: {str(e)}"
-                                )
-
-                return benefits
-
+                ]
             except Exception as e:
                 logger.error(f"Erro ao buscar benefícios do parceiro {id}: {str(e)}")
                 return []
@@ -396,7 +263,19 @@ async def get_partner_details(
         ) from e
 
 
-@router.post("/validation-codes", status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/validation-codes",
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[
+        Depends(
+            rate_limit(
+                "student_validation_codes",
+                RATE_LIMIT_VALIDATION_CODES,
+                validate_student_role,
+            )
+        )
+    ],
+)
 async def create_validation_code(
     request: ValidationCodeCreationRequest,
     current_user: JWTPayload = Depends(validate_student_role),
@@ -405,8 +284,6 @@ async def create_validation_code(
     Gera um código de validação de 6 dígitos para um parceiro.
     """
     try:
-        # Gerar código de 6 dígitos
-        validation_code = "".join(random.choices(string.digits, k=6))
         expires_at = datetime.utcnow() + timedelta(minutes=10)
 
         # Criar objeto ValidationCode
@@ -417,11 +294,11 @@ async def create_validation_code(
             expires=expires_at,
         )
 
-        # Salvar no Firestore, usando o código como ID do documento
-        await firestore_client.create_document(
-            "validation_codes",
+        # Reservar um código livre no espaço de códigos do parceiro
+        validation_code, _ = await code_allocator.reserve(
+            current_user.tenant,
+            request.partner_id,
             code_data.model_dump(mode="json"),
-            doc_id=validation_code,
         )
 
         return {
@@ -429,6 +306,29 @@ async def create_validation_code(
             "expires": expires_at.isoformat(),
         }
 
+    except CodeSpaceExhaustedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={
+                "error": {
+                    "code": "VALIDATION_CODE_SPACE_EXHAUSTED",
+                    "msg": "Não foi possível gerar o código de validação. "
+                    "Tente novamente.",
+                }
+            },
+        ) from e
+    except BackendUnavailableError as e:
+        logger.error(f"Código de validação não reservado: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={
+                "error": {
+                    "code": "VALIDATION_CODE_STORE_UNAVAILABLE",
+                    "msg": "Não foi possível gerar o código de validação. "
+                    "Tente novamente em instantes.",
+                }
+            },
+        ) from e
     except Exception as e:
         logger.error(
             f"Erro ao criar código de validação para o parceiro {request.partner_id}: {str(e)}",
@@ -535,15 +435,15 @@ async def list_student_favorites(
             item.get("partner_id") for item in fav_result.get("items", [])
         ]
 
-        favorite_partners: list[Partner] = []
-        for pid in favorite_partner_ids:
-            if not pid:
-                continue
-            partner = await firestore_client.get_document(
-                "partners", pid, tenant_id=current_user.tenant
-            )
-            if partner and partner.get("active", False):
-                favorite_partners.append(Partner(**partner))
+        # Uma única leitura em lote para todos os parceiros favoritos
+        partners = await firestore_client.get_documents_many(
+            "partners", favorite_partner_ids, tenant_id=current_user.tenant
+        )
+        favorite_partners: list[Partner] = [
+            Partner(**partner)
+            for partner in partners.values()
+            if partner.get("active", False)
+        ]
 
         return {"data": favorite_partners, "msg": "ok"}
 
@@ -4,6 +4,7 @@ Implementa verificação de JWT com JWKS e validação de roles.
 """
 
 # Importações Firebaseimport time
+import asyncio
 from datetime import datetime
 from typing import Any, Literal
 
@@ -16,15 +17,17 @@ from pydantic import BaseModel, model_validator
 from src.config import (
     ENVIRONMENT,
     FIRESTORE_PROJECT,
+    JWT_AUDIENCE,
+    JWT_ISSUER,
     TESTING_MODE,
 )
+from src.utils.jwks import firebase_jwks_store, jwks_store
+from src.utils.request_timing import timed_phase
+from src.utils.token_cache import token_cache
 
 # Segurança para autenticação via Bearer token
 security = HTTPBearer(auto_error=not TESTING_MODE)
 
-# Cache para JWKS
-jwks_cache = {"keys": None, "last_updated": 0}
-
 
 # Inicialização do Firebase
 def initialize_firebase():
@@ -123,12 +126,52 @@ class JWTPayload(BaseModel):
         return datetime.utcfromtimestamp(self.exp).isoformat() + "Z"
 
 
+def _decode_rs256(
+    token: str, store, audience: str | None, issuer: str | None
+) -> dict[str, Any]:
+    """
+    Verifica um JWT RS256 com a chave do `kid`, resolvida em memória.
+
+    Raises:
+        jwt.InvalidTokenError: Assinatura, claims ou `kid` inválidos
+    """
+    import jwt
+
+    kid = jwt.get_unverified_header(token).get("kid")
+    key = store.get_key(kid) if kid else None
+    if key is None:
+        raise jwt.InvalidKeyError(f"Chave de assinatura desconhecida: {kid}")
+
+    return jwt.decode(
+        token,
+        key,
+        algorithms=["RS256"],
+        audience=audience,
+        issuer=issuer,
+        options={"verify_aud": bool(audience)},
+    )
+
+
 async def extract_data_from_firebase_token(token: str) -> JWTPayload:
     """
     Verifica o token de ID do Firebase e retorna o payload padronizado.
+
+    Com FIREBASE_JWKS_URL configurada a verificação usa as chaves públicas
+    em memória; sem ela, o SDK é chamado fora do event loop.
     """
     try:
-        decoded_token = auth.verify_id_token(token)
+        if firebase_jwks_store.configured:
+            decoded_token = _decode_rs256(
+                token,
+                firebase_jwks_store,
+                audience=FIRESTORE_PROJECT,
+                issuer=f"https://securetoken.google.com/{FIRESTORE_PROJECT}",
+            )
+            if not decoded_token.get("sub"):
+                raise ValueError("Token do Firebase sem 'sub'")
+            decoded_token.setdefault("uid", decoded_token["sub"])
+        else:
+            decoded_token = await asyncio.to_thread(auth.verify_id_token, token)
         # Padroniza o payload para o modelo JWTPayload
         return JWTPayload(
             sub=decoded_token.get("uid", ""),
@@ -148,6 +191,27 @@ async def extract_data_from_firebase_token(token: str) -> JWTPayload:
         ) from e
 
 
+async def verify_jwks_jwt(token: str) -> JWTPayload:
+    """
+    Verifica um token RS256 do emissor próprio com as chaves do JWKS_URL.
+    """
+    import jwt
+
+    try:
+        payload_dict = _decode_rs256(
+            token,
+            jwks_store,
+            audience=JWT_AUDIENCE or None,
+            issuer=JWT_ISSUER or None,
+        )
+        return JWTPayload(**payload_dict)
+    except (jwt.PyJWTError, ValueError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail={"error": {"code": "INVALID_JWKS_JWT", "msg": str(e)}},
+        ) from e
+
+
 async def verify_local_jwt(token: str) -> JWTPayload:
     """
     Verifica um token JWT local (HS256) usado para desenvolvimento e testes.
@@ -171,6 +235,66 @@ async def verify_local_jwt(token: str) -> JWTPayload:
         ) from e
 
 
+def select_verifier(token: str) -> str:
+    """
+    Escolhe o verificador pelo cabeçalho do JWT, sem verificar a assinatura.
+
+    Tokens locais são HS256. Tokens RS256 trazem `kid`, que é procurado nas
+    chaves do emissor próprio (JWKS_URL) e do Firebase já carregadas em
+    memória. Assim nunca se tenta primeiro o verificador errado.
+
+    Args:
+        token: Bearer token recebido
+
+    Returns:
+        'jwks', 'firebase' ou 'local'
+
+    Raises:
+        HTTPException: Token malformado ou algoritmo não suportado
+    """
+    import jwt
+
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.InvalidTokenError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail={"error": {"code": "INVALID_TOKEN", "msg": str(e)}},
+        ) from e
+
+    alg = header.get("alg")
+    kid = header.get("kid")
+    if alg == "HS256":
+        return "local"
+    if alg == "RS256" and kid:
+        if jwks_store.has_key(kid):
+            return "jwks"
+        if firebase_jwks_store.has_key(kid) or not firebase_jwks_store.configured:
+            return "firebase"
+        # Possível rotação de chaves: agenda renovação sem aguardar a rede
+        jwks_store.get_key(kid)
+        firebase_jwks_store.get_key(kid)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail={
+                "error": {
+                    "code": "UNKNOWN_SIGNING_KEY",
+                    "msg": f"Chave de assinatura desconhecida: {kid}",
+                }
+            },
+        )
+
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail={
+            "error": {
+                "code": "INVALID_TOKEN",
+                "msg": f"Algoritmo de token não suportado: {alg}",
+            }
+        },
+    )
+
+
 async def get_current_user(
     authorization: HTTPAuthorizationCredentials | None = Security(security),
 ) -> JWTPayload:
@@ -178,8 +302,10 @@ async def get_current_user(
     Dependência FastAPI para obter o usuário atual.
 
     - Em modo de teste, retorna um usuário mock.
-    - Em produção, valida estritamente com o Firebase.
-    - Em desenvolvimento, tenta Firebase e, como fallback, valida JWT local.
+    - O verificador (JWKS, Firebase ou JWT local) é escolhido pelo cabeçalho
+      do token; em produção tokens do Firebase não são aceitos.
+
+    Payloads verificados ficam em cache (chave: SHA-256 do token) até o `exp`.
     """
     import logging
 
@@ -204,31 +330,41 @@ async def get_current_user(
             },
         )
 
-    token = authorization.credentials
-    logger.info(f"🔍 Token recebido: {token[:50]}...")
-    logger.info(f"🌍 Ambiente: {ENVIRONMENT}")
-
-    if ENVIRONMENT == "production":
-        logger.info("🏭 Modo produção - validando com JWT local")
-        return await verify_local_jwt(token)
+    # Verificação do token (registrada como fase "auth" no Server-Timing)
+    with timed_phase("auth"):
+        token = authorization.credentials
+        cached = token_cache.get(token)
+        if cached is not None:
+            return cached
+
+        verifier = select_verifier(token)
+        if verifier == "firebase" and ENVIRONMENT == "production":
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail={
+                    "error": {
+                        "code": "INVALID_TOKEN",
+                        "msg": "Tokens do Firebase não são aceitos em produção",
+                    }
+                },
+            )
 
-    # Em desenvolvimento, tentar Firebase primeiro, depois JWT local
-    logger.info("🔧 Modo desenvolvimento - tentando Firebase primeiro")
-    try:
-        result = await extract_data_from_firebase_token(token)
-        logger.info("✅ Token Firebase válido")
-        return result
-    except HTTPException as e:
-        logger.info(f"❌ Firebase falhou: {e.detail}")
-        logger.info("🔄 Tentando JWT local como fallback")
-        # Se a verificação do Firebase falhar, tente o JWT local
         try:
-            result = await verify_local_jwt(token)
-            logger.info("✅ Token JWT local válido")
-            return result
-        except HTTPException as local_e:
-            logger.error(f"❌ JWT local também falhou: {local_e.detail}")
-            raise local_e
+            if verifier == "jwks":
+                result = await verify_jwks_jwt(token)
+            elif verifier == "firebase":
+                result = await extract_data_from_firebase_token(token)
+            else:
+                result = await verify_local_jwt(token)
+        except HTTPException as e:
+            token_cache.record_verification(verifier, success=False)
+            logger.info(f"❌ Token rejeitado ({verifier}): {e.detail}")
+            raise
+
+        token_cache.record_verification(verifier, success=True)
+        token_cache.put(token, result, result.exp)
+        logger.debug(f"✅ Token válido ({verifier}) para {result.sub}")
+        return result
 
 
 async def validate_student_role(
@@ -27,9 +27,16 @@ if TEST_MODE:
     from .mock_db import (
         with_mock_circuit_breaker as with_circuit_breaker,
     )
+    from .mock_db import (
+        with_mock_hedged_read as with_hedged_read,
+    )
 else:
     # Importa clientes reais para produção
-    from .circuit_breaker import circuit_breaker, with_circuit_breaker
+    from .circuit_breaker import (
+        circuit_breaker,
+        with_circuit_breaker,
+        with_hedged_read,
+    )
     from .firestore import firestore_client
     from .postgres import postgres_client
     from .storage import storage_client
@@ -40,4 +47,5 @@ __all__ = [
     "storage_client",
     "circuit_breaker",
     "with_circuit_breaker",
+    "with_hedged_read",
 ]
@@ -2,43 +2,178 @@
 Implementação do circuit breaker para fallback entre Firestore e PostgreSQL.
 """
 
+import asyncio
 import time
+from collections import deque
 from collections.abc import Callable
+from functools import partial
 from typing import Any
 
-from src.config import CIRCUIT_BREAKER_THRESHOLD, CIRCUIT_BREAKER_TIMEOUT
+from src.config import (
+    CIRCUIT_BREAKER_FAILURE_RATE,
+    CIRCUIT_BREAKER_HALF_OPEN_PROBES,
+    CIRCUIT_BREAKER_MIN_REQUESTS,
+    CIRCUIT_BREAKER_SLOW_CALL_MS,
+    CIRCUIT_BREAKER_SLOW_CALL_RATE,
+    CIRCUIT_BREAKER_THRESHOLD,
+    CIRCUIT_BREAKER_TIMEOUT,
+    CIRCUIT_BREAKER_WINDOW_SECONDS,
+    HEDGE_DEADLINES_MS,
+    HEDGE_MAX_DELAY_MS,
+    HEDGE_MIN_DELAY_MS,
+    HEDGE_PERCENTILE,
+    HEDGED_READS_ENABLED,
+)
 from src.utils import logger
+from src.utils.histograms import breaker_transitions, db_latency
+from src.utils.request_timing import count_event
+
+
+class BackendUnavailableError(Exception):
+    """Operação recusada: Firestore indisponível e sem fallback possível."""
 
 
 class CircuitBreaker:
     """
-    Implementação de circuit breaker para fallback entre Firestore e PostgreSQL.
+    Circuit breaker para fallback entre Firestore e PostgreSQL.
+
+    Abre quando, na janela deslizante de `window_seconds`, a taxa de falhas ou
+    de chamadas lentas atinge o limite (com pelo menos `min_requests`
+    chamadas), ou após `threshold` falhas consecutivas. Depois de
+    `open_seconds` passa a half-open e libera no máximo `half_open_probes`
+    requisições simultâneas ao Firestore; o restante segue para o PostgreSQL.
+    Fecha quando `half_open_probes` sondas seguidas têm sucesso.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        name: str = "default",
+        threshold: int = CIRCUIT_BREAKER_THRESHOLD,
+        open_seconds: float = CIRCUIT_BREAKER_TIMEOUT,
+        window_seconds: float = CIRCUIT_BREAKER_WINDOW_SECONDS,
+        min_requests: int = CIRCUIT_BREAKER_MIN_REQUESTS,
+        failure_rate: float = CIRCUIT_BREAKER_FAILURE_RATE,
+        slow_call_ms: float = CIRCUIT_BREAKER_SLOW_CALL_MS,
+        slow_call_rate: float = CIRCUIT_BREAKER_SLOW_CALL_RATE,
+        half_open_probes: int = CIRCUIT_BREAKER_HALF_OPEN_PROBES,
+    ):
+        self.name = name
+        self.threshold = threshold
+        self.open_seconds = open_seconds
+        self.window_seconds = window_seconds
+        self.min_requests = min_requests
+        self.failure_rate = failure_rate
+        self.slow_call_ms = slow_call_ms
+        self.slow_call_rate = slow_call_rate
+        self.half_open_probes = half_open_probes
         self.failures = 0
         self.last_failure_time = 0
         self.state = "closed"  # closed, open, half-open
+        self._calls: deque[tuple[float, bool, bool]] = deque()
+        self._probes: list[float] = []
+        self._probe_successes = 0
+        self._rejected = 0
+
+    def _prune(self, now: float) -> None:
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+
+    def _rates(self) -> tuple[float, float]:
+        """Taxas (%) de falha e de lentidão na janela."""
+        total = len(self._calls)
+        if not total:
+            return 0.0, 0.0
+        failed = sum(1 for _, ok, _ in self._calls if not ok)
+        slow = sum(1 for _, _, is_slow in self._calls if is_slow)
+        return failed / total * 100, slow / total * 100
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            breaker_transitions.inc(
+                breaker=self.name, from_state=self.state, to_state=state
+            )
+            self.state = state
+
+    def _open(self, reason: str) -> None:
+        self._set_state("open")
+        self.last_failure_time = time.time()
+        self._probes.clear()
+        self._probe_successes = 0
+        logger.warning(f"Circuit breaker {self.name} aberto: {reason}")
+
+    def _close(self) -> None:
+        self._set_state("closed")
+        self.failures = 0
+        self._calls.clear()
+        self._probes.clear()
+        self._probe_successes = 0
+        logger.info(f"Circuit breaker {self.name} fechado")
+
+    def _evaluate(self) -> None:
+        """Abre o circuito se algum limite da janela foi atingido."""
+        if self.failures >= self.threshold:
+            self._open(f"{self.failures} falhas consecutivas")
+            return
+        if len(self._calls) < self.min_requests:
+            return
+        failure_rate, slow_rate = self._rates()
+        if failure_rate >= self.failure_rate:
+            self._open(f"taxa de falhas {failure_rate:.1f}%")
+        elif slow_rate >= self.slow_call_rate:
+            self._open(f"taxa de chamadas lentas {slow_rate:.1f}%")
+
+    def _release_probe(self) -> bool:
+        if self.state == "half-open" and self._probes:
+            self._probes.pop(0)
+            return True
+        return False
 
     def record_failure(self):
         """
         Registra uma falha no Firestore.
         """
+        now = time.time()
         self.failures += 1
-        self.last_failure_time = time.time()
+        self.last_failure_time = now
 
-        if self.failures >= CIRCUIT_BREAKER_THRESHOLD:
-            self.state = "open"
-            logger.warning(
-                f"Circuit breaker aberto após {self.failures} falhas consecutivas"
-            )
+        if self._release_probe():
+            self._open("falha na sonda half-open")
+            return
 
-    def record_success(self):
+        self._prune(now)
+        self._calls.append((now, False, False))
+        if self.state == "closed":
+            self._evaluate()
+
+    def record_success(self, latency_ms: float | None = None):
         """
         Registra um sucesso no Firestore.
+
+        Args:
+            latency_ms: Duração da chamada, usada no limite de chamadas lentas
         """
         self.failures = 0
-        self.state = "closed"
+        if self._release_probe():
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_probes:
+                self._close()
+            return
+
+        now = time.time()
+        self._prune(now)
+        slow = latency_ms is not None and latency_ms >= self.slow_call_ms
+        self._calls.append((now, True, slow))
+        if self.state == "closed" and slow:
+            self._evaluate()
+
+    def record_ignored(self):
+        """
+        Devolve a vaga de sonda half-open sem registrar sucesso nem falha.
+
+        Usado quando a chamada termina por erro do cliente (ex.: cursor
+        inválido), que não diz nada sobre a saúde do Firestore.
+        """
+        self._release_probe()
 
     def reset(self):
         """
@@ -46,36 +181,186 @@ class CircuitBreaker:
         """
         self.failures = 0
         self.last_failure_time = 0
-        self.state = "closed"
-        logger.info("Circuit breaker resetado para estado inicial")
+        self._set_state("closed")
+        self._calls.clear()
+        self._probes.clear()
+        self._probe_successes = 0
+        self._rejected = 0
+        logger.info(f"Circuit breaker {self.name} resetado para estado inicial")
 
     def can_execute(self):
         """
         Verifica se o Firestore pode ser acessado.
+
+        Em half-open, reserva uma das vagas de sonda; a vaga é devolvida por
+        `record_success`/`record_failure`.
         """
         if self.state == "closed":
             return True
 
+        now = time.time()
         if self.state == "open":
             # Verificar se já passou o tempo de timeout
-            if time.time() - self.last_failure_time > CIRCUIT_BREAKER_TIMEOUT:
-                self.state = "half-open"
-                logger.info(
-                    "Circuit breaker em estado half-open, tentando Firestore novamente"
-                )
-                return True
-            return False
+            if now - self.last_failure_time <= self.open_seconds:
+                self._rejected += 1
+                return False
+            self._set_state("half-open")
+            logger.info(
+                f"Circuit breaker {self.name} em estado half-open, "
+                "tentando Firestore novamente"
+            )
 
-        # Estado half-open
+        # Estado half-open: sondas sem resposta expiram após a janela
+        self._probes = [t for t in self._probes if now - t < self.window_seconds]
+        if len(self._probes) >= self.half_open_probes:
+            self._rejected += 1
+            return False
+        self._probes.append(now)
         return True
 
+    def snapshot(self) -> dict[str, Any]:
+        """Estado e taxas da janela atual, para monitoramento."""
+        self._prune(time.time())
+        failure_rate, slow_rate = self._rates()
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "window_calls": len(self._calls),
+            "failure_rate": round(failure_rate, 2),
+            "slow_call_rate": round(slow_rate, 2),
+            "probes_in_flight": len(self._probes),
+            "rejected": self._rejected,
+            "last_failure_time": self.last_failure_time or None,
+        }
+
+
+class CircuitBreakerRegistry:
+    """
+    Circuit breakers independentes por (backend, coleção, classe de operação).
+
+    Falhas em uma coleção (ex.: 'metrics_snapshots') não desviam para o
+    PostgreSQL as leituras de outras coleções.
+    """
+
+    def __init__(self):
+        self._breakers: dict[tuple[str, str, str], CircuitBreaker] = {}
+
+    def get(
+        self, collection: str, operation: str = "read", backend: str = "firestore"
+    ) -> CircuitBreaker:
+        """
+        Retorna (criando se necessário) o breaker da chave.
+
+        Args:
+            collection: Coleção acessada
+            operation: Classe de operação ('read', 'write', 'count')
+            backend: Backend primário protegido
+
+        Returns:
+            CircuitBreaker da chave
+        """
+        key = (backend, collection, operation)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(name=":".join(key))
+            self._breakers[key] = breaker
+        return breaker
+
+    def states(self) -> list[dict[str, Any]]:
+        """Estado de todos os breakers, abertos primeiro."""
+        order = {"open": 0, "half-open": 1, "closed": 2}
+        return sorted(
+            (breaker.snapshot() for breaker in self._breakers.values()),
+            key=lambda snapshot: (order[snapshot["state"]], snapshot["name"]),
+        )
+
+    def reset(self) -> None:
+        """Reseta todos os breakers."""
+        for breaker in self._breakers.values():
+            breaker.reset()
+
+
+# Registro global de circuit breakers
+circuit_breakers = CircuitBreakerRegistry()
+
+# Breaker usado pelas chamadas sem chave explícita
+circuit_breaker = circuit_breakers.get("default", "default")
+
+
+def _resolve_breaker(breaker: tuple[str, str] | None) -> CircuitBreaker:
+    return circuit_breakers.get(*breaker) if breaker else circuit_breaker
+
+
+async def _timed(
+    backend: str,
+    breaker: tuple[str, str] | None,
+    func: Callable,
+    /,
+    *args,
+    **kwargs,
+) -> Any:
+    """Executa a operação registrando a duração em `db_latency`."""
+    collection, operation = breaker or ("default", "default")
+    start = time.perf_counter()
+    cancelled = False
+    try:
+        return await func(*args, **kwargs)
+    except asyncio.CancelledError:
+        # Hedge perdedor cancelado: a duração não é da operação
+        cancelled = True
+        raise
+    finally:
+        if not cancelled:
+            db_latency.observe(
+                time.perf_counter() - start,
+                backend=backend,
+                collection=collection,
+                operation=operation,
+            )
+
+
+async def _postgres_fallback(
+    firestore_error: Exception | None,
+    breaker: tuple[str, str] | None,
+    postgres_func: Callable,
+    *args,
+    **kwargs,
+) -> Any:
+    """Executa o fallback no PostgreSQL (ou propaga/retorna vazio se desabilitado)."""
+    # Importar aqui para evitar circular imports
+    from src.config import POSTGRES_ENABLED
+
+    # Verificar se PostgreSQL está habilitado
+    if not POSTGRES_ENABLED:
+        logger.warning("PostgreSQL desabilitado, propagando erro do Firestore")
+        # Se temos um erro do Firestore, propagar ele
+        if firestore_error:
+            raise firestore_error
+        # Circuito aberto: uma escrita não pode "dar certo" sem ser gravada
+        if breaker and breaker[1] == "write":
+            raise BackendUnavailableError(
+                f"Firestore indisponível para escrita em {breaker[0]} "
+                "(circuito aberto) e PostgreSQL desabilitado"
+            )
+        # Leituras recebem uma listagem vazia
+        return {"data": [], "total": 0, "limit": 0, "offset": 0}
 
-# Instância global do circuit breaker
-circuit_breaker = CircuitBreaker()
+    # Fallback para PostgreSQL
+    count_event("fallbacks")
+    try:
+        return await postgres_func(*args, **kwargs)
+    except Exception as e:
+        logger.error(f"Erro no fallback para PostgreSQL: {str(e)}")
+        raise
 
 
 async def with_circuit_breaker(
-    firestore_func: Callable, postgres_func: Callable, *args, **kwargs
+    firestore_func: Callable,
+    postgres_func: Callable,
+    *args,
+    breaker: tuple[str, str] | None = None,
+    **kwargs,
 ) -> Any:
     """
     Executa uma função com circuit breaker, fazendo fallback para PostgreSQL se necessário.
@@ -84,44 +369,248 @@ async def with_circuit_breaker(
         firestore_func: Função do Firestore a ser executada
         postgres_func: Função do PostgreSQL a ser executada como fallback
         *args, **kwargs: Argumentos para as funções
+        breaker: Chave (coleção, classe de operação) do breaker em
+            `circuit_breakers`; None usa o breaker padrão
 
     Returns:
         Resultado da função
-    """
-    # Importar aqui para evitar circular imports
-    from src.config import POSTGRES_ENABLED
 
+    Raises:
+        ValueError: Erros do cliente (ex.: InvalidCursorError) são propagados
+            sem contar como falha e sem fallback
+    """
+    cb = _resolve_breaker(breaker)
     firestore_error = None
+    postgres_func = partial(_timed, "postgres", breaker, postgres_func)
 
-    if circuit_breaker.can_execute():
+    if cb.can_execute():
+        start = time.perf_counter()
         try:
             # Tentar Firestore
-            result = await firestore_func(*args, **kwargs)
-            circuit_breaker.record_success()
+            result = await _timed("firestore", breaker, firestore_func, *args, **kwargs)
+            cb.record_success((time.perf_counter() - start) * 1000)
             return result
+        except ValueError:
+            # Erro do cliente (ex.: InvalidCursorError): sem falha nem fallback
+            cb.record_ignored()
+            raise
         except Exception as e:
             # Registrar falha
-            circuit_breaker.record_failure()
+            cb.record_failure()
             firestore_error = e
             logger.error(
                 f"Erro no Firestore, fazendo fallback para PostgreSQL: {str(e)}"
             )
     else:
-        logger.info("Circuit breaker aberto, usando PostgreSQL diretamente")
+        logger.info(f"Circuit breaker {cb.name} aberto, usando PostgreSQL diretamente")
 
-    # Verificar se PostgreSQL está habilitado
-    if not POSTGRES_ENABLED:
-        logger.warning("PostgreSQL desabilitado, propagando erro do Firestore")
-        # Se temos um erro do Firestore, propagar ele
-        if firestore_error:
-            raise firestore_error
-        # Se não temos erro do Firestore (circuit breaker aberto), retornar dados vazios apenas para consultas
-        # Para operações de escrita/delete, isso deve ser tratado no endpoint
-        return {"data": [], "total": 0, "limit": 0, "offset": 0}
+    return await _postgres_fallback(
+        firestore_error, breaker, postgres_func, *args, **kwargs
+    )
+
+
+class HedgeTracker:
+    """
+    Latências do Firestore e contadores de hedge por operação.
+
+    O prazo de hedge de uma operação é o percentil HEDGE_PERCENTILE das
+    últimas `window` leituras concluídas no Firestore, limitado entre
+    HEDGE_MIN_DELAY_MS e HEDGE_MAX_DELAY_MS. Até reunir `min_samples`
+    amostras usa o limite máximo.
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._latencies: dict[str, deque] = {}
+        self._counters: dict[str, dict[str, int]] = {}
+
+    def _counter(self, operation: str) -> dict[str, int]:
+        return self._counters.setdefault(
+            operation,
+            {"requests": 0, "hedged": 0, "hedge_wins": 0, "primary_wins": 0},
+        )
+
+    def record_latency(self, operation: str, latency_ms: float) -> None:
+        """Registra a latência de uma leitura concluída no Firestore."""
+        samples = self._latencies.setdefault(operation, deque(maxlen=self.window))
+        samples.append(latency_ms)
+
+    def record(self, operation: str, event: str) -> None:
+        """Incrementa um contador (requests, hedged, hedge_wins, primary_wins)."""
+        self._counter(operation)[event] += 1
+
+    def percentile(self, operation: str) -> float | None:
+        """Percentil configurado das latências da operação (ms)."""
+        samples = self._latencies.get(operation)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        index = round(HEDGE_PERCENTILE / 100 * (len(ordered) - 1))
+        return ordered[index]
+
+    def deadline(self, operation: str) -> float:
+        """Prazo (segundos) antes de disparar a leitura no PostgreSQL."""
+        if operation in HEDGE_DEADLINES_MS:
+            return HEDGE_DEADLINES_MS[operation] / 1000
+
+        observed = self.percentile(operation)
+        if observed is None:
+            return HEDGE_MAX_DELAY_MS / 1000
+        return min(max(observed, HEDGE_MIN_DELAY_MS), HEDGE_MAX_DELAY_MS) / 1000
+
+    def reset(self) -> None:
+        """Descarta latências e contadores."""
+        self._latencies.clear()
+        self._counters.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Retorna os contadores de hedge por operação.
+
+        Returns:
+            Dict {operação: contadores, taxa de vitória do hedge e prazo atual}
+        """
+        result = {}
+        for operation, counters in self._counters.items():
+            observed = self.percentile(operation)
+            hedged = counters["hedged"]
+            result[operation] = {
+                **counters,
+                "hedge_rate": (
+                    round(hedged / counters["requests"] * 100, 2)
+                    if counters["requests"]
+                    else 0.0
+                ),
+                "hedge_win_rate": (
+                    round(counters["hedge_wins"] / hedged * 100, 2) if hedged else 0.0
+                ),
+                f"p{HEDGE_PERCENTILE:g}_ms": (
+                    round(observed, 2) if observed is not None else None
+                ),
+                "deadline_ms": round(self.deadline(operation) * 1000, 2),
+            }
+        return {"enabled": HEDGED_READS_ENABLED, "operations": result}
+
+
+# Instância global do rastreador de hedge
+hedge_tracker = HedgeTracker()
+
+
+async def with_hedged_read(
+    operation: str,
+    firestore_func: Callable,
+    postgres_func: Callable,
+    *args,
+    breaker: tuple[str, str] | None = None,
+    **kwargs,
+) -> Any:
+    """
+    Executa uma leitura com hedge entre Firestore e PostgreSQL.
+
+    Inicia a leitura no Firestore; se ela não terminar dentro do prazo da
+    operação (ver HedgeTracker), dispara a mesma leitura no PostgreSQL e
+    retorna a primeira resposta bem-sucedida, cancelando a outra. Usar
+    apenas em leituras: as duas funções podem executar.
+
+    Sem HEDGED_READS_ENABLED/POSTGRES_ENABLED, ou com o circuito aberto,
+    equivale a `with_circuit_breaker`.
+
+    Args:
+        operation: Nome da operação, usado para prazos e métricas
+        firestore_func: Leitura no Firestore
+        postgres_func: Mesma leitura no PostgreSQL
+        *args, **kwargs: Argumentos para as funções
+        breaker: Chave (coleção, classe de operação) do circuit breaker
+
+    Returns:
+        Resultado da primeira leitura bem-sucedida
+    """
+    from src.config import POSTGRES_ENABLED
+
+    if not (HEDGED_READS_ENABLED and POSTGRES_ENABLED):
+        return await with_circuit_breaker(
+            firestore_func, postgres_func, *args, breaker=breaker, **kwargs
+        )
+
+    cb = _resolve_breaker(breaker)
+    postgres_func = partial(_timed, "postgres", breaker, postgres_func)
+    if not cb.can_execute():
+        logger.info(f"Circuit breaker {cb.name} aberto, usando PostgreSQL diretamente")
+        return await _postgres_fallback(None, breaker, postgres_func, *args, **kwargs)
+
+    hedge_tracker.record(operation, "requests")
+    start = time.perf_counter()
+    primary = asyncio.ensure_future(
+        _timed("firestore", breaker, firestore_func, *args, **kwargs)
+    )
+    pending = {primary}
+
+    def primary_succeeded() -> Any:
+        latency_ms = (time.perf_counter() - start) * 1000
+        hedge_tracker.record_latency(operation, latency_ms)
+        cb.record_success(latency_ms)
+        return primary.result()
 
-    # Fallback para PostgreSQL
     try:
-        return await postgres_func(*args, **kwargs)
-    except Exception as e:
-        logger.error(f"Erro no fallback para PostgreSQL: {str(e)}")
-        raise
+        done, _ = await asyncio.wait(pending, timeout=hedge_tracker.deadline(operation))
+        if done:
+            pending.clear()
+            if primary.exception() is None:
+                return primary_succeeded()
+            if isinstance(primary.exception(), ValueError):
+                # Erro do cliente: sem falha nem fallback
+                cb.record_ignored()
+                raise primary.exception()
+            # Falhou antes do prazo: fallback convencional
+            cb.record_failure()
+            logger.error(
+                "Erro no Firestore, fazendo fallback para PostgreSQL: "
+                f"{primary.exception()}"
+            )
+            count_event("fallbacks")
+            return await postgres_func(*args, **kwargs)
+
+        hedge_tracker.record(operation, "hedged")
+        count_event("hedges")
+        logger.info(f"Firestore acima do prazo em {operation}, hedge no PostgreSQL")
+        hedge = asyncio.ensure_future(postgres_func(*args, **kwargs))
+        pending.add(hedge)
+
+        last_error = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            # Em empate, prefere o Firestore
+            for task in sorted(done, key=lambda t: t is not primary):
+                error = task.exception()
+                if error is None:
+                    if task is primary:
+                        hedge_tracker.record(operation, "primary_wins")
+                        return primary_succeeded()
+                    hedge_tracker.record(operation, "hedge_wins")
+                    return task.result()
+
+                if task is primary and isinstance(error, ValueError):
+                    cb.record_ignored()
+                    raise error
+                if task is primary:
+                    cb.record_failure()
+                    logger.error(f"Erro no Firestore em {operation}: {error}")
+                else:
+                    logger.error(f"Erro no hedge PostgreSQL em {operation}: {error}")
+                last_error = error
+
+        raise last_error
+    finally:
+        if primary in pending:
+            # Firestore cancelado (perdeu para o hedge): conta como amostra
+            # lenta, senão o percentil só veria as leituras rápidas e o prazo
+            # cairia a cada hedge; e devolve a vaga de sonda half-open
+            hedge_tracker.record_latency(
+                operation, (time.perf_counter() - start) * 1000
+            )
+            cb.record_ignored()
+        for task in pending:
+            task.cancel()
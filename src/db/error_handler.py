@@ -5,12 +5,17 @@ retry automático, logging e validações.
 """
 
 import asyncio
+import builtins
 import functools
+import random
 import time
 from collections.abc import Callable
 from typing import Any
 
+from src.config import RETRY_BUDGET_BURST, RETRY_BUDGET_PER_SECOND
 from src.utils import logger
+from src.utils.request_deadline import remaining_time
+from src.utils.request_timing import count_event
 
 
 class DatabaseError(Exception):
@@ -63,20 +68,146 @@ class RetryConfig:
         max_delay: float = 60.0,
         exponential_base: float = 2.0,
         jitter: bool = True,
+        backend: str = "firestore",
     ):
         self.max_attempts = max_attempts
         self.base_delay = base_delay
         self.max_delay = max_delay
         self.exponential_base = exponential_base
         self.jitter = jitter
+        self.backend = backend
 
 
+# Leituras idempotentes: poucas tentativas com backoff curto, dentro do
+# orçamento de retries do backend e do prazo da requisição
+READ_RETRY_CONFIG = RetryConfig(
+    max_attempts=3, base_delay=0.05, max_delay=0.5, exponential_base=2.0, jitter=True
+)
+
+# Escritas não são repetidas: uma tentativa com efeito parcial não é segura
+NO_RETRY_CONFIG = RetryConfig(max_attempts=1)
+
 # Configuração padrão de retry
-DEFAULT_RETRY_CONFIG = RetryConfig(
-    max_attempts=3, base_delay=1.0, max_delay=60.0, exponential_base=2.0, jitter=True
+DEFAULT_RETRY_CONFIG = READ_RETRY_CONFIG
+
+# Códigos gRPC transitórios (mesmos que o cliente do Firestore repete)
+TRANSIENT_GRPC_CODES = frozenset(
+    {"UNAVAILABLE", "DEADLINE_EXCEEDED", "RESOURCE_EXHAUSTED", "ABORTED", "INTERNAL"}
+)
+
+# Exceções do google.api_core equivalentes aos códigos acima
+_TRANSIENT_EXCEPTION_NAMES = frozenset(
+    {
+        "ServiceUnavailable",
+        "DeadlineExceeded",
+        "ResourceExhausted",
+        "TooManyRequests",
+        "Aborted",
+        "InternalServerError",
+    }
 )
 
 
+def is_transient_error(error: Exception) -> bool:
+    """Indica se o erro é transitório e a operação pode ser repetida.
+
+    Usa o código gRPC (`grpc_status_code`) das exceções do google.api_core
+    ou o tipo da exceção, em vez de procurar palavras na mensagem.
+
+    Args:
+        error: Exceção levantada pela operação
+
+    Returns:
+        True para indisponibilidade, timeout, limite de recursos e abort
+    """
+    if isinstance(error, DatabaseError):
+        return False
+
+    status_code = getattr(error, "grpc_status_code", None)
+    if status_code is not None:
+        return getattr(status_code, "name", str(status_code)) in TRANSIENT_GRPC_CODES
+
+    if any(cls.__name__ in _TRANSIENT_EXCEPTION_NAMES for cls in type(error).__mro__):
+        return True
+
+    return isinstance(error, builtins.ConnectionError | asyncio.TimeoutError)
+
+
+class RetryBudget:
+    """Token bucket de retries por segundo de um backend.
+
+    Cada nova tentativa consome um token; sem tokens a falha é propagada
+    imediatamente, limitando a carga extra sobre um backend degradado.
+    """
+
+    def __init__(self, rate_per_second: float, burst: int):
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def try_acquire(self) -> bool:
+        """Consome um token se houver saldo."""
+        now = time.monotonic()
+        self._tokens = min(
+            self.burst, self._tokens + (now - self._updated) * self.rate_per_second
+        )
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+
+class RetryStats:
+    """Orçamentos de retry por backend e contadores de tentativas."""
+
+    _EVENTS = (
+        "calls",
+        "attempts",
+        "retries",
+        "recovered",
+        "non_retryable",
+        "budget_exhausted",
+        "deadline_exceeded",
+        "failed",
+    )
+
+    def __init__(self, rate_per_second: float, burst: int):
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self._budgets: dict[str, RetryBudget] = {}
+        self._counters: dict[str, dict[str, int]] = {}
+
+    def budget(self, backend: str) -> RetryBudget:
+        """Orçamento de retries do backend (criado sob demanda)."""
+        if backend not in self._budgets:
+            self._budgets[backend] = RetryBudget(self.rate_per_second, self.burst)
+        return self._budgets[backend]
+
+    def record(self, backend: str, event: str) -> None:
+        """Incrementa um contador do backend."""
+        counters = self._counters.setdefault(backend, dict.fromkeys(self._EVENTS, 0))
+        counters[event] += 1
+
+    def reset(self) -> None:
+        """Descarta orçamentos e contadores."""
+        self._budgets.clear()
+        self._counters.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Contadores por backend e configuração do orçamento."""
+        return {
+            "budget_per_second": self.rate_per_second,
+            "budget_burst": self.burst,
+            "backends": {name: dict(c) for name, c in self._counters.items()},
+        }
+
+
+# Instância global de orçamentos e contadores de retry
+retry_stats = RetryStats(RETRY_BUDGET_PER_SECOND, RETRY_BUDGET_BURST)
+
+
 class ErrorHandler:
     """Classe principal para tratamento de erros."""
 
@@ -153,6 +284,11 @@ class ErrorHandler:
     ) -> Any:
         """Executa uma função com retry e backoff exponencial.
 
+        Só repete erros transitórios (`is_transient_error`), enquanto houver
+        orçamento de retries do backend e a espera couber no prazo da
+        requisição. Os demais erros são propagados sem espera. Com prazo
+        definido, cada tentativa assíncrona é cancelada quando ele se esgota.
+
         Args:
             func: Função a ser executada
             config: Configuração de retry
@@ -163,74 +299,89 @@ class ErrorHandler:
             Resultado da função
 
         Raises:
-            DatabaseError: Se todas as tentativas falharem
+            TimeoutError: Se uma tentativa for interrompida pelo prazo
+            DatabaseError: Se o erro for transitório e as tentativas acabarem;
+                erros não transitórios são propagados como foram levantados
         """
-        last_error = None
+        backend = config.backend
+        retry_stats.record(backend, "calls")
 
         for attempt in range(config.max_attempts):
+            retry_stats.record(backend, "attempts")
+            # Cada tentativa assíncrona também termina no prazo da requisição,
+            # em vez de esperar o timeout do SDK
+            scope = asyncio.timeout(remaining_time())
             try:
                 if asyncio.iscoroutinefunction(func):
-                    return await func(*args, **kwargs)
+                    async with scope:
+                        result = await func(*args, **kwargs)
                 else:
-                    return func(*args, **kwargs)
+                    result = func(*args, **kwargs)
+                if attempt:
+                    retry_stats.record(backend, "recovered")
+                return result
 
             except Exception as e:
-                last_error = e
-                classified_error = ErrorHandler.classify_error(e)
-
-                # Se é a última tentativa, não esperar
-                if attempt == config.max_attempts - 1:
+                if scope.expired():
+                    retry_stats.record(backend, "deadline_exceeded")
                     logger.warning(
-                        f"Tentativa {attempt + 1}/{config.max_attempts} falhou",
-                        extra={
-                            "error": str(e),
-                            "error_type": type(classified_error).__name__,
-                            "error_code": classified_error.error_code,
-                            "function": func.__name__,
-                            "attempt": attempt + 1,
-                        },
+                        f"Operação {func.__name__} interrompida no prazo da "
+                        f"requisição na tentativa {attempt + 1}",
+                        extra={"function": func.__name__},
                     )
-                    break
-
-                # Calcular delay com backoff exponencial
+                    raise TimeoutError(
+                        f"Prazo da requisição esgotado em {func.__name__}",
+                        error_code="DEADLINE_EXCEEDED",
+                        original_error=e,
+                    ) from e
+                if not is_transient_error(e):
+                    retry_stats.record(backend, "non_retryable")
+                    raise
+
+                stop_reason = None
                 delay = min(
                     config.base_delay * (config.exponential_base**attempt),
                     config.max_delay,
                 )
-
-                # Adicionar jitter se configurado
                 if config.jitter:
-                    import random
-
                     delay *= 0.5 + random.random() * 0.5
 
+                remaining = remaining_time()
+                if attempt == config.max_attempts - 1:
+                    stop_reason = "failed"
+                elif remaining is not None and remaining <= delay:
+                    stop_reason = "deadline_exceeded"
+                elif not retry_stats.budget(backend).try_acquire():
+                    stop_reason = "budget_exhausted"
+
+                if stop_reason:
+                    retry_stats.record(backend, stop_reason)
+                    final_error = ErrorHandler.classify_error(e)
+                    logger.warning(
+                        f"Operação {func.__name__} sem nova tentativa "
+                        f"({stop_reason}) após {attempt + 1} tentativa(s)",
+                        extra={
+                            "error": str(e),
+                            "error_code": final_error.error_code,
+                            "function": func.__name__,
+                        },
+                    )
+                    raise final_error from e
+
+                retry_stats.record(backend, "retries")
+                count_event("retries")
                 logger.warning(
-                    f"Tentativa {attempt + 1}/{config.max_attempts} falhou",
+                    f"Tentativa {attempt + 1}/{config.max_attempts} falhou, "
+                    f"nova tentativa em {delay:.3f}s",
                     extra={
                         "error": str(e),
-                        "error_type": type(classified_error).__name__,
-                        "error_code": classified_error.error_code,
                         "function": func.__name__,
                         "attempt": attempt + 1,
                         "delay": delay,
                     },
                 )
-
-                logger.info(f"Aguardando {delay:.2f}s antes da próxima tentativa")
                 await asyncio.sleep(delay)
 
-        # Se chegou aqui, todas as tentativas falharam
-        final_error = ErrorHandler.classify_error(last_error)
-        logger.error(
-            f"Todas as {config.max_attempts} tentativas falharam",
-            extra={
-                "error": str(last_error),
-                "error_code": final_error.error_code,
-                "function": func.__name__,
-            },
-        )
-        raise final_error
-
     @staticmethod
     def log_error(error: Exception, context: dict[str, Any] = None) -> None:
         """Registra um erro com contexto detalhado.
@@ -338,17 +489,18 @@ def with_error_handling(retry_config: RetryConfig = None, operation_name: str =
             op_name = operation_name or func.__name__
 
             try:
-                logger.debug(f"Iniciando operação: {op_name}")
-                start_time = time.time()
+                start_time = time.perf_counter()
 
                 result = await ErrorHandler.retry_with_backoff(
                     func, retry_config, *args, **kwargs
                 )
 
-                duration = time.time() - start_time
-                logger.info(
+                logger.debug(
                     f"Operação '{op_name}' concluída com sucesso",
-                    extra={"duration": duration, "operation": op_name},
+                    extra={
+                        "duration": time.perf_counter() - start_time,
+                        "operation": op_name,
+                    },
                 )
 
                 return result
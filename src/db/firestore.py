@@ -2,33 +2,55 @@
 Implementação da camada de acesso ao Firestore.
 """
 
+import asyncio
+import heapq
+import inspect
 import json
 import uuid
+from collections.abc import Callable
 from typing import Any
 
+from google.api_core.exceptions import Aborted, AlreadyExists
 from google.auth import default
 from google.cloud import firestore
-from google.cloud.firestore import Client
+from google.cloud.firestore import AsyncClient, Client
 from google.oauth2 import service_account
 
 from src.config import (
     CURRENT_FIRESTORE_DATABASE,
+    FIRESTORE_ASYNC_MODE,
     FIRESTORE_DATABASE,
     FIRESTORE_DATABASES_LIST,
     FIRESTORE_PROJECT,
     FIRESTORE_SERVICE_ACCOUNT_KEY,
     GOOGLE_APPLICATION_CREDENTIALS,
 )
+from src.db.pagination import (
+    FIRESTORE_BACKEND,
+    InvalidCursorError,
+    decode_document_cursor,
+    encode_cursor,
+)
 from src.utils import logger
+from src.utils.request_timing import db_call
 
 # Inicializar múltiplos bancos Firestore
 db = None
 databases = {}  # Dicionário para armazenar conexões com múltiplos bancos
 
+# Clientes assíncronos nativos (firestore.AsyncClient) espelhando `databases`
+async_db = None
+async_databases = {}
+
+# Limite de escritas por lote (WriteBatch) do Firestore
+_MAX_BATCH_WRITES = 500
+# Documentos por página nas agregações feitas no cliente (top_by_sum)
+_TOP_PAGE_SIZE = 1000
+
 
 def initialize_firestore_databases():
     """Inicializa conexões com múltiplos bancos Firestore."""
-    global db, databases
+    global db, databases, async_db, async_databases
 
     try:
         # Configurar credenciais baseado nas variáveis de ambiente
@@ -79,6 +101,9 @@ def initialize_firestore_databases():
                 if database_name == "(default)":
                     # Cliente para banco padrão
                     client = Client(project=project_id, credentials=credentials)
+                    async_client = AsyncClient(
+                        project=project_id, credentials=credentials
+                    )
                 else:
                     # Cliente para banco específico com suporte nativo
                     client = Client(
@@ -86,13 +111,20 @@ def initialize_firestore_databases():
                         credentials=credentials,
                         database=database_name,
                     )
+                    async_client = AsyncClient(
+                        project=project_id,
+                        credentials=credentials,
+                        database=database_name,
+                    )
 
                 databases[database_name] = client
+                async_databases[database_name] = async_client
                 logger.info(f"Conexão estabelecida com banco: {database_name}")
 
                 # Definir o banco principal baseado na configuração
                 if i == FIRESTORE_DATABASE:
                     db = client
+                    async_db = async_client
                     logger.info(f"Banco principal definido: {database_name}")
 
             except Exception as e:
@@ -100,12 +132,15 @@ def initialize_firestore_databases():
 
         # Se não conseguiu definir o banco principal, usar o primeiro disponível
         if db is None and databases:
-            db = list(databases.values())[0]
+            first_name = list(databases.keys())[0]
+            db = databases[first_name]
+            async_db = async_databases.get(first_name)
             logger.warning("Usando primeiro banco disponível como principal")
 
     except Exception as e:
         logger.error(f"Erro geral ao inicializar Firestore: {str(e)}")
         db = None
+        async_db = None
 
 
 # Inicializar os bancos
@@ -160,27 +195,93 @@ def fs_query(col: str, tenant: str):
     return db.collection(col).where("tenant_id", "==", tenant)
 
 
+# Execução não bloqueante
+
+
+def _active_client():
+    """Retorna o cliente usado pelo FirestoreClient.
+
+    Em modo 'native' prefere o AsyncClient; em modo 'executor' (ou se o
+    AsyncClient não estiver disponível) usa o cliente síncrono, cujas chamadas
+    são despachadas para threads por `_run`.
+    """
+    if FIRESTORE_ASYNC_MODE == "native" and async_db is not None:
+        return async_db
+    return db
+
+
+async def _run(func: Callable, *args, **kwargs) -> Any:
+    """Executa uma operação do Firestore sem bloquear o event loop.
+
+    Métodos do AsyncClient são aguardados diretamente; métodos do cliente
+    síncrono são executados em uma thread do executor padrão.
+    """
+    if asyncio.iscoroutinefunction(func):
+        return await func(*args, **kwargs)
+    return await asyncio.to_thread(func, *args, **kwargs)
+
+
+async def _count(query) -> int:
+    """Conta os documentos de uma query via agregação COUNT no servidor."""
+    results = await _run(query.count(alias="total").get)
+    for result_group in results:
+        for result in result_group:
+            if result.alias == "total":
+                return int(result.value)
+    return 0
+
+
+async def _resolve_cursor(client, collection: str, cursor: str):
+    """Converte um cursor opaco no snapshot usado em `start_after`."""
+    payload = decode_document_cursor(cursor, collection)
+    snapshot = await _run(client.collection(collection).document(payload["id"]).get)
+    if not snapshot.exists:
+        raise InvalidCursorError("Cursor de paginação expirado")
+    return snapshot
+
+
+async def _get_all(client, refs: list) -> list:
+    """Lê vários documentos em uma única chamada BatchGetDocuments."""
+    if inspect.isasyncgenfunction(client.get_all):
+        return [snapshot async for snapshot in client.get_all(refs)]
+    return await _run(lambda: list(client.get_all(refs)))
+
+
+def _document_tenant_id(doc_data: dict[str, Any]) -> str | None:
+    """Obtém o tenant do documento (system.tenant_id ou tenant_id)."""
+    return (doc_data.get("system") or {}).get("tenant_id") or doc_data.get(
+        "tenant_id"
+    )
+
+
+def _unique_ids(ids: list[str]) -> list[str]:
+    """Remove IDs vazios e repetidos preservando a ordem."""
+    return list(dict.fromkeys(doc_id for doc_id in ids if doc_id))
+
+
 class FirestoreClient:
     """Cliente para acesso ao Firestore."""
 
     @staticmethod
+    @db_call("firestore")
     async def get_document(
         collection: str, doc_id: str, tenant_id: str
     ) -> dict[str, Any] | None:
         """
         Obtém um documento do Firestore filtrando por tenant_id.
         """
-        if not db:
+        client = _active_client()
+        if not client:
             logger.error("Firestore não inicializado")
             return None
         try:
-            doc_ref = db.collection(collection).document(doc_id)
-            doc = doc_ref.get()
+            doc_ref = client.collection(collection).document(doc_id)
+            doc = await _run(doc_ref.get)
             if doc.exists:
                 # Verificar se o tenant_id do documento corresponde
                 doc_data = doc.to_dict()
                 # Verificar tenant_id em system.tenant_id primeiro, depois em tenant_id direto
-                doc_tenant_id = doc_data.get("system", {}).get("tenant_id") or doc_data.get("tenant_id")
+                doc_tenant_id = _document_tenant_id(doc_data)
                 if doc_tenant_id == tenant_id:
                     return {**doc_data, "id": doc.id}
                 else:
@@ -194,6 +295,58 @@ class FirestoreClient:
             raise
 
     @staticmethod
+    @db_call("firestore")
+    async def get_documents_many(
+        collection: str, ids: list[str], tenant_id: str
+    ) -> dict[str, dict[str, Any]]:
+        """
+        Obtém vários documentos do Firestore em uma única leitura (get_all).
+
+        IDs vazios e repetidos são ignorados. Documentos inexistentes ou de
+        outro tenant não aparecem no resultado.
+
+        Args:
+            collection: Nome da coleção
+            ids: IDs dos documentos
+            tenant_id: ID do tenant para validar os documentos
+
+        Returns:
+            Dict {id: documento} na ordem dos IDs informados
+        """
+        doc_ids = _unique_ids(ids)
+        client = _active_client()
+        if not client:
+            logger.error("Firestore não inicializado")
+            return {}
+        if not doc_ids:
+            return {}
+
+        try:
+            collection_ref = client.collection(collection)
+            refs = [collection_ref.document(doc_id) for doc_id in doc_ids]
+            found = {}
+            for snapshot in await _get_all(client, refs):
+                if not snapshot.exists:
+                    continue
+                doc_data = snapshot.to_dict()
+                if _document_tenant_id(doc_data) != tenant_id:
+                    logger.warning(
+                        f"Acesso negado: documento {collection}/{snapshot.id} "
+                        f"não pertence ao tenant {tenant_id}"
+                    )
+                    continue
+                found[snapshot.id] = {**doc_data, "id": snapshot.id}
+
+            # get_all não garante a ordem dos IDs solicitados
+            return {doc_id: found[doc_id] for doc_id in doc_ids if doc_id in found}
+        except Exception as e:
+            logger.error(
+                f"Erro ao obter {len(doc_ids)} documentos de {collection}: {str(e)}"
+            )
+            raise
+
+    @staticmethod
+    @db_call("firestore")
     async def query_documents(
         collection: str,
         *,
@@ -202,37 +355,55 @@ class FirestoreClient:
         order_by: list[tuple] | None = None,
         limit: int = 20,
         offset: int = 0,
+        cursor: str | None = None,
+        count_total: bool = True,
     ) -> dict[str, Any]:
         """
         Consulta documentos no Firestore com filtros e ordenação.
 
+        O total é obtido por uma agregação COUNT no servidor, sem baixar os
+        documentos. Para páginas profundas prefira `cursor` (retornado em
+        `next_cursor`), que custa O(limit) leituras; `offset` é aplicado no
+        servidor mas o Firestore ainda cobra os documentos pulados.
+
         Args:
             collection: Nome da coleção
             tenant_id: ID do tenant para filtrar os documentos
             filters: Lista de tuplas (campo, operador, valor)
             order_by: Lista de tuplas (campo, direção)
             limit: Limite de documentos
-            offset: Offset para paginação
+            offset: Offset para paginação (ignorado quando há cursor)
+            cursor: Cursor opaco retornado em `next_cursor` da página anterior
+            count_total: Se False, não executa a contagem e retorna total None
 
         Returns:
-            Dict com items, total, limit e offset
+            Dict com items, total, limit, offset e next_cursor
+
+        Raises:
+            InvalidCursorError: Se o cursor for inválido ou expirado
         """
-        if not db:
+        client = _active_client()
+        if not client:
             logger.error("Firestore não inicializado")
-            return {"items": [], "total": 0, "limit": limit, "offset": offset}
+            return {
+                "items": [],
+                "total": 0,
+                "limit": limit,
+                "offset": offset,
+                "next_cursor": None,
+            }
 
         try:
             # Iniciar query com filtro de tenant_id obrigatório
-            query = db.collection(collection).where("tenant_id", "==", tenant_id)
+            query = client.collection(collection).where("tenant_id", "==", tenant_id)
 
             # Aplicar filtros adicionais
             if filters:
                 for field, op, value in filters:
                     query = query.where(field, op, value)
 
-            # Contar total (antes de aplicar limit/offset)
-            total_query = query
-            total_docs = len(list(total_query.stream()))
+            # Contar total no servidor (antes de aplicar limit/offset)
+            total_docs = await _count(query) if count_total else None
 
             # Aplicar ordenação
             if order_by:
@@ -240,35 +411,106 @@ class FirestoreClient:
                     query = query.order_by(field, direction=direction)
 
             # Aplicar paginação
-            if offset > 0:
-                # No Firestore, precisamos usar cursor para offset
-                # Simplificação: obtemos todos e aplicamos slice
-                all_docs = list(query.limit(offset + limit).stream())
-                docs = all_docs[offset : offset + limit]
-            else:
-                docs = list(query.limit(limit).stream())
+            if cursor:
+                start_after = await _resolve_cursor(client, collection, cursor)
+                query = query.start_after(start_after)
+            elif offset > 0:
+                query = query.offset(offset)
+
+            docs = list(await _run(query.limit(limit).get))
 
             # Converter para dicionários
             items = [{**doc.to_dict(), "id": doc.id} for doc in docs]
 
+            next_cursor = None
+            if docs and len(docs) == limit:
+                next_cursor = encode_cursor(
+                    {"b": FIRESTORE_BACKEND, "c": collection, "id": docs[-1].id}
+                )
+
             return {
                 "items": items,
                 "total": total_docs,
                 "limit": limit,
                 "offset": offset,
+                "next_cursor": next_cursor,
             }
         except Exception as e:
             logger.error(f"Erro ao consultar documentos em {collection}: {str(e)}")
             raise
 
     @staticmethod
+    @db_call("firestore")
+    async def top_by_sum(
+        collection: str,
+        *,
+        tenant_id: str,
+        group_by: str,
+        value: str,
+        filters: list[tuple] | None = None,
+        limit: int = 10,
+    ) -> list[tuple[Any, int | float]]:
+        """
+        Retorna os `limit` grupos com maior soma de `value`.
+
+        O Firestore não agrupa no servidor: os documentos filtrados são lidos
+        em páginas (apenas os campos necessários) e somados por grupo, e os
+        maiores são escolhidos com um heap. A memória é proporcional ao número
+        de grupos, mas as leituras são proporcionais ao número de documentos
+        filtrados (ex.: parceiro × dia × shard de um período).
+
+        Um filtro de intervalo ordena implicitamente pelo campo filtrado, e o
+        cursor de cada página (`start_after`) precisa dele: por isso os campos
+        de intervalo também entram na projeção.
+
+        Returns:
+            Lista de tuplas (valor de group_by, soma), maiores primeiro
+        """
+        client = _active_client()
+        if not client:
+            logger.error("Firestore não inicializado")
+            return []
+
+        try:
+            query = client.collection(collection).where("tenant_id", "==", tenant_id)
+            fields = [group_by, value]
+            for field, op, filter_value in filters or []:
+                query = query.where(field, op, filter_value)
+                if op not in ("==", "in", "array-contains", "array-contains-any"):
+                    fields.append(field)
+            query = query.select(list(dict.fromkeys(fields)))
+
+            totals: dict[Any, int | float] = {}
+            last = None
+            while True:
+                page = query.start_after(last) if last is not None else query
+                docs = list(await _run(page.limit(_TOP_PAGE_SIZE).get))
+                for doc in docs:
+                    data = doc.to_dict() or {}
+                    key = data.get(group_by)
+                    if key is not None:
+                        totals[key] = totals.get(key, 0) + (data.get(value) or 0)
+                if len(docs) < _TOP_PAGE_SIZE:
+                    break
+                last = docs[-1]
+
+            return heapq.nlargest(limit, totals.items(), key=lambda item: item[1])
+        except Exception as e:
+            logger.error(
+                f"Erro ao agregar {value} por {group_by} em {collection}: {str(e)}"
+            )
+            raise
+
+    @staticmethod
+    @db_call("firestore", "write")
     async def create_document(
         collection: str, data: dict[str, Any], doc_id: str | None = None
     ) -> dict[str, Any]:
         """
         Cria um documento no Firestore.
         """
-        if not db:
+        client = _active_client()
+        if not client:
             logger.error("Firestore não inicializado")
             return None
 
@@ -281,24 +523,121 @@ class FirestoreClient:
             data["created_at"] = firestore.SERVER_TIMESTAMP
 
             # Criar documento
-            doc_ref = db.collection(collection).document(doc_id)
-            doc_ref.set(data)
+            doc_ref = client.collection(collection).document(doc_id)
+            await _run(doc_ref.set, data)
 
             # Obter documento criado
-            doc = doc_ref.get()
+            doc = await _run(doc_ref.get)
             return {**doc.to_dict(), "id": doc.id}
         except Exception as e:
             logger.error(f"Erro ao criar documento em {collection}: {str(e)}")
             raise
 
     @staticmethod
+    @db_call("firestore", "write")
+    async def create_document_if_absent(
+        collection: str, data: dict[str, Any], doc_id: str
+    ) -> bool:
+        """
+        Cria um documento somente se o ID ainda não existir.
+
+        Usa `DocumentReference.create`, que falha no servidor quando o
+        documento já existe (ao contrário de `set`, que sobrescreveria).
+
+        Returns:
+            True se o documento foi criado, False se o ID já estava em uso
+        """
+        client = _active_client()
+        if not client:
+            raise RuntimeError("Firestore não inicializado")
+
+        data["created_at"] = firestore.SERVER_TIMESTAMP
+        doc_ref = client.collection(collection).document(doc_id)
+        try:
+            await _run(doc_ref.create, data)
+        except AlreadyExists:
+            return False
+        return True
+
+    @staticmethod
+    @db_call("firestore", "write")
+    async def claim_document(
+        collection: str,
+        doc_id: str,
+        updates: dict[str, Any],
+        check: Callable[[dict[str, Any]], str | None],
+        tenant_id: str,
+    ) -> tuple[dict[str, Any] | None, str | None]:
+        """
+        Lê, valida e atualiza um documento em uma única transação.
+
+        `check` recebe o documento lido na transação e retorna o motivo da
+        recusa (ou None para aplicar `updates`). Pode ser chamado mais de uma
+        vez se a transação for repetida por contenção.
+
+        Args:
+            collection: Nome da coleção
+            doc_id: ID do documento
+            updates: Campos gravados quando `check` aprova
+            check: Validação do estado atual do documento
+            tenant_id: Tenant esperado (outro tenant conta como inexistente)
+
+        Returns:
+            Tupla (documento, motivo). Documento None se não existe; motivo
+            None se a atualização foi aplicada, o retorno de `check` se foi
+            recusada ou "contended" se a transação esgotou as tentativas.
+        """
+        client = _active_client()
+        if not client:
+            raise RuntimeError("Firestore não inicializado")
+
+        doc_ref = client.collection(collection).document(doc_id)
+
+        def apply(transaction, snapshot):
+            if not snapshot.exists:
+                return None, None
+            data = {**snapshot.to_dict(), "id": snapshot.id}
+            if _document_tenant_id(data) != tenant_id:
+                return None, None
+            reason = check(data)
+            if reason is None:
+                transaction.update(doc_ref, updates)
+                data.update(updates)
+            return data, reason
+
+        try:
+            if client is async_db:
+
+                @firestore.async_transactional
+                async def run_async(transaction):
+                    snapshot = await doc_ref.get(transaction=transaction)
+                    return apply(transaction, snapshot)
+
+                return await run_async(client.transaction())
+
+            @firestore.transactional
+            def run(transaction):
+                snapshot = doc_ref.get(transaction=transaction)
+                return apply(transaction, snapshot)
+
+            return await asyncio.to_thread(run, client.transaction())
+        except (Aborted, ValueError) as e:
+            # Ao esgotar as tentativas o SDK levanta ValueError a partir do Aborted
+            if not isinstance(e, Aborted) and not isinstance(e.__cause__, Aborted):
+                raise
+            logger.warning(f"Transação em {collection}/{doc_id} esgotou tentativas")
+            return None, "contended"
+
+    @staticmethod
+    @db_call("firestore", "write")
     async def update_document(
         collection: str, doc_id: str, data: dict[str, Any]
     ) -> dict[str, Any]:
         """
         Atualiza um documento no Firestore.
         """
-        if not db:
+        client = _active_client()
+        if not client:
             logger.error("Firestore não inicializado")
             return None
 
@@ -307,33 +646,36 @@ class FirestoreClient:
             data["updated_at"] = firestore.SERVER_TIMESTAMP
 
             # Atualizar documento
-            doc_ref = db.collection(collection).document(doc_id)
-            doc_ref.update(data)
+            doc_ref = client.collection(collection).document(doc_id)
+            await _run(doc_ref.update, data)
 
             # Obter documento atualizado
-            doc = doc_ref.get()
+            doc = await _run(doc_ref.get)
             return {**doc.to_dict(), "id": doc.id}
         except Exception as e:
             logger.error(f"Erro ao atualizar documento {collection}/{doc_id}: {str(e)}")
             raise
 
     @staticmethod
+    @db_call("firestore", "write")
     async def delete_document(collection: str, doc_id: str) -> bool:
         """
         Remove um documento do Firestore.
         """
-        if not db:
+        client = _active_client()
+        if not client:
             logger.error("Firestore não inicializado")
             return False
 
         try:
-            db.collection(collection).document(doc_id).delete()
+            await _run(client.collection(collection).document(doc_id).delete)
             return True
         except Exception as e:
             logger.error(f"Erro ao remover documento {collection}/{doc_id}: {str(e)}")
             raise
 
     @staticmethod
+    @db_call("firestore", "write")
     async def delete_field(collection: str, doc_id: str, field_name: str) -> bool:
         """
         Remove um campo específico de um documento no Firestore.
@@ -346,13 +688,14 @@ class FirestoreClient:
         Returns:
             bool: True se a operação foi bem-sucedida
         """
-        if not db:
+        client = _active_client()
+        if not client:
             logger.error("Firestore não inicializado")
             return False
 
         try:
-            doc_ref = db.collection(collection).document(doc_id)
-            doc_ref.update({field_name: firestore.DELETE_FIELD})
+            doc_ref = client.collection(collection).document(doc_id)
+            await _run(doc_ref.update, {field_name: firestore.DELETE_FIELD})
             return True
         except Exception as e:
             logger.error(
@@ -361,6 +704,7 @@ class FirestoreClient:
             raise
 
     @staticmethod
+    @db_call("firestore", "write")
     async def batch_operation(operations: list[dict[str, Any]]) -> bool:
         """
         Executa operações em lote no Firestore.
@@ -374,12 +718,13 @@ class FirestoreClient:
                     "data": {...}  # Apenas para create/update
                 }
         """
-        if not db:
+        client = _active_client()
+        if not client:
             logger.error("Firestore não inicializado")
             return False
 
         try:
-            batch = db.batch()
+            batch = client.batch()
 
             for op in operations:
                 operation = op.get("operation")
@@ -387,7 +732,7 @@ class FirestoreClient:
                 doc_id = op.get("doc_id")
                 data = op.get("data", {})
 
-                doc_ref = db.collection(collection).document(doc_id)
+                doc_ref = client.collection(collection).document(doc_id)
 
                 if operation == "create":
                     data["created_at"] = firestore.SERVER_TIMESTAMP
@@ -398,12 +743,62 @@ class FirestoreClient:
                 elif operation == "delete":
                     batch.delete(doc_ref)
 
-            batch.commit()
+            await _run(batch.commit)
             return True
         except Exception as e:
             logger.error(f"Erro ao executar operações em lote: {str(e)}")
             raise
 
+    @staticmethod
+    @db_call("firestore", "write")
+    async def upsert_counters(
+        collection: str,
+        rows: dict[str, dict[str, Any]],
+        counters: tuple[str, ...],
+        *,
+        increment: bool = True,
+    ) -> bool:
+        """
+        Incrementa (ou define) campos contadores em vários documentos.
+
+        Os documentos são gravados com `set(merge=True)` e os campos de
+        `counters` com `firestore.Increment`, que cria o documento se ele não
+        existir; as escritas vão em lotes atômicos de até 500 documentos.
+
+        Args:
+            collection: Nome da coleção
+            rows: Dict {id: campos}; os campos de `counters` são os valores
+                a somar (ou os valores finais, se increment=False)
+            counters: Nomes dos campos contadores
+            increment: Se False, sobrescreve os documentos com os valores
+        """
+        client = _active_client()
+        if not client:
+            logger.error("Firestore não inicializado")
+            return False
+
+        try:
+            items = list(rows.items())
+            for start in range(0, len(items), _MAX_BATCH_WRITES):
+                batch = client.batch()
+                for doc_id, row in items[start : start + _MAX_BATCH_WRITES]:
+                    data = {
+                        field: (
+                            firestore.Increment(value)
+                            if increment and field in counters
+                            else value
+                        )
+                        for field, value in row.items()
+                    }
+                    data["updated_at"] = firestore.SERVER_TIMESTAMP
+                    doc_ref = client.collection(collection).document(doc_id)
+                    batch.set(doc_ref, data, merge=increment)
+                await _run(batch.commit)
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao gravar contadores em {collection}: {str(e)}")
+            raise
+
 
 # Instância do cliente Firestore
 firestore_client = FirestoreClient()
@@ -3,17 +3,35 @@ Script para simular o comportamento do Firestore e PostgreSQL para testes locais
 """
 
 import json
+import operator
 import os
 import time
+from collections.abc import Callable
 from datetime import datetime
 from typing import Any
 
+from src.db.pagination import (
+    FIRESTORE_BACKEND,
+    InvalidCursorError,
+    decode_cursor,
+    encode_cursor,
+)
+
 # Diretório para armazenar dados simulados
 DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_data")
 
 # Configuração do circuit breaker simulado
 FIRESTORE_FAILURE_MODE = False  # Altere para True para simular falhas no Firestore
 
+_COMPARISONS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
 
 class MockFirestore:
     """
@@ -73,6 +91,29 @@ class MockFirestore:
 
         return None
 
+    @staticmethod
+    async def get_documents_many(
+        collection: str, ids: list[str], tenant_id: str | None = None
+    ) -> dict[str, dict[str, Any]]:
+        """
+        Obtém vários documentos do Firestore simulado em uma única leitura.
+        """
+        # Simular falha se o modo de falha estiver ativado
+        if FIRESTORE_FAILURE_MODE:
+            raise Exception("Falha simulada no Firestore")
+
+        doc_ids = list(dict.fromkeys(doc_id for doc_id in ids if doc_id))
+        wanted = set(doc_ids)
+        found = {}
+        for item in MockFirestore.get_collection_data(collection):
+            if item.get("id") not in wanted:
+                continue
+            if tenant_id and item.get("tenant_id") != tenant_id:
+                continue
+            found[item["id"]] = item
+
+        return {doc_id: found[doc_id] for doc_id in doc_ids if doc_id in found}
+
     @staticmethod
     async def query_documents(
         collection: str,
@@ -81,6 +122,8 @@ class MockFirestore:
         limit: int = 20,
         offset: int = 0,
         tenant_id: str | None = None,
+        cursor: str | None = None,
+        count_total: bool = True,
     ) -> dict[str, Any]:
         """
         Consulta documentos no Firestore simulado.
@@ -133,12 +176,32 @@ class MockFirestore:
                 items = sorted(items, key=lambda x: x.get(field, ""), reverse=reverse)
 
         # Contar total
-        total = len(items)
-
-        # Aplicar paginação
-        items = items[offset : offset + limit]
-
-        return {"items": items, "total": total, "limit": limit, "offset": offset}
+        total = len(items) if count_total else None
+
+        # Aplicar paginação (cursor tem precedência sobre offset)
+        if cursor:
+            payload = decode_cursor(cursor)
+            ids = [item.get("id") for item in items]
+            if payload.get("c") != collection or payload.get("id") not in ids:
+                raise InvalidCursorError(
+                    "Cursor de paginação inválido para esta coleção"
+                )
+            offset = ids.index(payload["id"]) + 1
+        page = items[offset : offset + limit]
+
+        next_cursor = None
+        if page and len(page) == limit:
+            next_cursor = encode_cursor(
+                {"b": FIRESTORE_BACKEND, "c": collection, "id": page[-1].get("id")}
+            )
+
+        return {
+            "items": page,
+            "total": total,
+            "limit": limit,
+            "offset": offset,
+            "next_cursor": next_cursor,
+        }
 
     @staticmethod
     async def create_document(
@@ -172,6 +235,39 @@ class MockFirestore:
 
         return data
 
+    @staticmethod
+    async def create_document_if_absent(
+        collection: str, data: dict[str, Any], doc_id: str
+    ) -> bool:
+        """
+        Cria um documento no Firestore simulado somente se o ID não existir.
+        """
+        if await MockFirestore.get_document(collection, doc_id) is not None:
+            return False
+        await MockFirestore.create_document(collection, {**data, "id": doc_id}, doc_id)
+        return True
+
+    @staticmethod
+    async def claim_document(
+        collection: str,
+        doc_id: str,
+        updates: dict[str, Any],
+        check: Callable[[dict[str, Any]], str | None],
+        tenant_id: str,
+    ) -> tuple[dict[str, Any] | None, str | None]:
+        """
+        Lê, valida e atualiza um documento no Firestore simulado.
+        """
+        doc = await MockFirestore.get_document(collection, doc_id, tenant_id)
+        if doc is None:
+            return None, None
+        reason = check(doc)
+        if reason is None:
+            doc = await MockFirestore.update_document(
+                collection, doc_id, updates, tenant_id
+            )
+        return doc, reason
+
     @staticmethod
     async def update_document(
         collection: str,
@@ -306,6 +402,16 @@ class MockPostgres:
         # Usar a mesma implementação do Firestore simulado
         return await MockFirestore.get_document(table, doc_id, tenant_id)
 
+    @staticmethod
+    async def get_documents_many(
+        table: str, ids: list[str], tenant_id: str | None = None
+    ) -> dict[str, dict[str, Any]]:
+        """
+        Obtém vários documentos do PostgreSQL simulado.
+        """
+        # Usar a mesma implementação do Firestore simulado
+        return await MockFirestore.get_documents_many(table, ids, tenant_id)
+
     @staticmethod
     async def query_documents(
         table: str,
@@ -314,13 +420,15 @@ class MockPostgres:
         limit: int = 20,
         offset: int = 0,
         tenant_id: str | None = None,
+        cursor: str | None = None,
+        count_total: bool = True,
     ) -> dict[str, Any]:
         """
         Consulta documentos no PostgreSQL simulado.
         """
         # Usar a mesma implementação do Firestore simulado
         return await MockFirestore.query_documents(
-            table, filters, order_by, limit, offset, tenant_id
+            table, filters, order_by, limit, offset, tenant_id, cursor, count_total
         )
 
     @staticmethod
@@ -335,6 +443,15 @@ class MockPostgres:
             table, data, data.get("id"), tenant_id
         )
 
+    @staticmethod
+    async def insert_if_absent(
+        table: str, data: dict[str, Any], conflict_columns: tuple[str, ...] = ("id",)
+    ) -> bool:
+        """
+        Insere um documento no PostgreSQL simulado somente se o ID não existir.
+        """
+        return await MockFirestore.create_document_if_absent(table, data, data["id"])
+
     @staticmethod
     async def update_document(
         table: str,
@@ -348,6 +465,34 @@ class MockPostgres:
         # Usar a mesma implementação do Firestore simulado
         return await MockFirestore.update_document(table, doc_id, data, tenant_id)
 
+    @staticmethod
+    async def update_if(
+        table: str,
+        doc_id: str,
+        data: dict[str, Any],
+        *,
+        tenant_id: str,
+        filters: list[tuple[str, str, Any]] | None = None,
+    ) -> dict[str, Any] | None:
+        """
+        Atualiza um documento no PostgreSQL simulado se ele satisfaz os filtros.
+        """
+        doc = await MockFirestore.get_document(table, doc_id, tenant_id)
+        if doc is None:
+            return None
+        for field, op, value in filters or []:
+            current = doc.get(field)
+            # Datas são armazenadas como ISO 8601 nos arquivos simulados
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            if op in ("==", "!="):
+                matched = _COMPARISONS[op](current, value)
+            else:
+                matched = current is not None and _COMPARISONS[op](current, value)
+            if not matched:
+                return None
+        return await MockFirestore.update_document(table, doc_id, data, tenant_id)
+
     @staticmethod
     async def delete_document(table: str, doc_id: str) -> bool:
         """
@@ -368,6 +513,19 @@ class MockPostgres:
         # Usar a mesma implementação do Firestore simulado
         return await MockFirestore.count_documents(table, filters, tenant_id)
 
+    @staticmethod
+    async def warmup() -> None:
+        """Não há pool a aquecer no PostgreSQL simulado."""
+
+    @staticmethod
+    async def close_pool() -> None:
+        """Não há pool a fechar no PostgreSQL simulado."""
+
+    @staticmethod
+    def pool_stats() -> dict[str, Any]:
+        """Estatísticas vazias do pool (PostgreSQL simulado)."""
+        return {"initialized": False, "size": 0, "idle": 0, "in_use": 0}
+
 
 class MockCircuitBreaker:
     """
@@ -425,10 +583,10 @@ mock_circuit_breaker = MockCircuitBreaker()
 
 
 async def with_mock_circuit_breaker(
-    firestore_func, postgres_func, *args, **kwargs
+    firestore_func, postgres_func, *args, breaker=None, **kwargs
 ) -> Any:
     """
-    Executa uma função com circuit breaker simulado.
+    Executa uma função com circuit breaker simulado (único para todas as chaves).
     """
     if mock_circuit_breaker.can_execute():
         try:
@@ -451,6 +609,17 @@ async def with_mock_circuit_breaker(
         raise
 
 
+async def with_mock_hedged_read(
+    operation: str, firestore_func, postgres_func, *args, breaker=None, **kwargs
+) -> Any:
+    """
+    Leitura com hedge simulada (sem hedge, apenas o circuit breaker).
+    """
+    return await with_mock_circuit_breaker(
+        firestore_func, postgres_func, *args, **kwargs
+    )
+
+
 # Função para ativar/desativar modo de falha do Firestore
 def toggle_firestore_failure_mode():
     """
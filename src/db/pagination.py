@@ -0,0 +1,105 @@
+"""
+Cursores opacos de paginação compartilhados pelos clientes de banco de dados.
+
+O cursor é um JSON compacto codificado em base64 url-safe. O conteúdo é
+definido por cada cliente (ID do último documento no Firestore, valores das
+colunas de ordenação no PostgreSQL) e não deve ser interpretado pelo front-end.
+A marca `b` indica o backend que gerou o cursor: a página seguinte de uma
+listagem servida pelo fallback (ou pelo hedge) continua no PostgreSQL.
+"""
+
+import base64
+import json
+from typing import Any
+
+# Backends que geram cursores (marca `b` do payload)
+FIRESTORE_BACKEND = "firestore"
+POSTGRES_BACKEND = "postgres"
+
+
+class InvalidCursorError(ValueError):
+    """Cursor de paginação malformado, expirado ou de outra coleção."""
+
+
+def encode_cursor(payload: dict[str, Any]) -> str:
+    """Codifica o payload de paginação em um cursor opaco.
+
+    Args:
+        payload: Dados necessários para retomar a consulta
+
+    Returns:
+        Cursor opaco (base64 url-safe, sem padding)
+    """
+    raw = json.dumps(payload, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict[str, Any]:
+    """Decodifica um cursor gerado por `encode_cursor`.
+
+    Args:
+        cursor: Cursor opaco recebido do cliente
+
+    Returns:
+        Payload de paginação
+
+    Raises:
+        InvalidCursorError: Se o cursor estiver malformado
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception as e:
+        raise InvalidCursorError("Cursor de paginação inválido") from e
+
+    if not isinstance(payload, dict):
+        raise InvalidCursorError("Cursor de paginação inválido")
+    return payload
+
+
+def decode_document_cursor(cursor: str, collection: str) -> dict[str, Any]:
+    """Decodifica um cursor de documento (Firestore e mock) sem acessar o banco.
+
+    Args:
+        cursor: Cursor opaco recebido do cliente
+        collection: Coleção da consulta
+
+    Returns:
+        Payload com a coleção (`c`) e o ID do último documento (`id`)
+
+    Raises:
+        InvalidCursorError: Se o cursor estiver malformado, for de outra
+            coleção ou do PostgreSQL
+    """
+    payload = decode_cursor(cursor)
+    if (
+        payload.get("b", FIRESTORE_BACKEND) != FIRESTORE_BACKEND
+        or payload.get("c") != collection
+        or not payload.get("id")
+    ):
+        raise InvalidCursorError("Cursor de paginação inválido para esta coleção")
+    return payload
+
+
+def cursor_backend(cursor: str) -> str:
+    """Identifica o backend que gerou o cursor, sem acessar o banco.
+
+    Cursores sem a marca `b` (emitidos antes dela) são reconhecidos pelo
+    formato: o keyset do PostgreSQL traz a tabela em `t`.
+
+    Args:
+        cursor: Cursor opaco recebido do cliente
+
+    Returns:
+        FIRESTORE_BACKEND ou POSTGRES_BACKEND
+
+    Raises:
+        InvalidCursorError: Se o cursor estiver malformado
+    """
+    payload = decode_cursor(cursor)
+    backend = payload.get("b") or (
+        POSTGRES_BACKEND if "t" in payload else FIRESTORE_BACKEND
+    )
+    if backend not in (FIRESTORE_BACKEND, POSTGRES_BACKEND):
+        raise InvalidCursorError("Cursor de paginação inválido")
+    return backend
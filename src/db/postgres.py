@@ -2,19 +2,44 @@
 Implementação da camada de acesso ao PostgreSQL.
 """
 
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import Any
 
 import asyncpg
 
-from src.config import POSTGRES_CONNECTION_STRING
+from src.config import (
+    POSTGRES_COMMAND_TIMEOUT,
+    POSTGRES_CONNECTION_STRING,
+    POSTGRES_POOL_MAX_SIZE,
+    POSTGRES_POOL_MIN_SIZE,
+    POSTGRES_STATEMENT_CACHE_SIZE,
+)
+from src.db.pagination import InvalidCursorError
+from src.db.query_compiler import (
+    TOTAL_COLUMN,
+    QueryCompileError,
+    compile_conditional_update,
+    compile_count,
+    compile_query,
+    compile_top,
+    encode_keyset,
+    order_columns,
+)
 from src.utils import logger
+from src.utils.request_timing import db_call
 
 
 class PostgresClient:
     """Cliente para acesso ao PostgreSQL."""
 
     _pool = None
+    _acquisitions = 0
+    _acquire_errors = 0
+    _acquire_wait_total_ms = 0.0
+    _acquire_wait_max_ms = 0.0
 
     @classmethod
     async def get_pool(cls):
@@ -22,13 +47,15 @@ class PostgresClient:
         if cls._pool is None:
             try:
                 logger.info(
-                    f"Criando pool de conexões PostgreSQL: {POSTGRES_CONNECTION_STRING}"
+                    "Criando pool de conexões PostgreSQL "
+                    f"(min={POSTGRES_POOL_MIN_SIZE}, max={POSTGRES_POOL_MAX_SIZE})"
                 )
                 cls._pool = await asyncpg.create_pool(
                     POSTGRES_CONNECTION_STRING,
-                    min_size=1,
-                    max_size=10,
-                    command_timeout=30,
+                    min_size=POSTGRES_POOL_MIN_SIZE,
+                    max_size=POSTGRES_POOL_MAX_SIZE,
+                    statement_cache_size=POSTGRES_STATEMENT_CACHE_SIZE,
+                    command_timeout=POSTGRES_COMMAND_TIMEOUT,
                 )
                 logger.info("Pool de conexões PostgreSQL criado com sucesso")
             except Exception as e:
@@ -36,10 +63,68 @@ class PostgresClient:
                 raise
         return cls._pool
 
+    @classmethod
+    async def warmup(cls) -> None:
+        """
+        Cria o pool e abre as `min_size` conexões antes da primeira requisição.
+
+        Chamado no startup da aplicação para que a contingência não pague o
+        custo de conexão no momento em que o Firestore falha.
+        """
+        pool = await cls.get_pool()
+        # Valida uma conexão do pool (o create_pool já abriu as min_size)
+        async with cls.connection() as conn:
+            await conn.fetchval("SELECT 1")
+        logger.info(f"Pool PostgreSQL aquecido: {pool.get_size()} conexões abertas")
+
+    @classmethod
+    async def close_pool(cls) -> None:
+        """Fecha o pool de conexões (shutdown da aplicação)."""
+        if cls._pool is not None:
+            pool, cls._pool = cls._pool, None
+            await pool.close()
+            logger.info("Pool de conexões PostgreSQL fechado")
+
+    @classmethod
+    @asynccontextmanager
+    async def connection(cls) -> AsyncIterator[Any]:
+        """
+        Empresta uma conexão do pool e a devolve ao final do bloco.
+
+        A conexão é sempre liberada para o pool, inclusive quando o bloco
+        levanta exceção. Uso:
+
+            async with PostgresClient.connection() as conn:
+                row = await conn.fetchrow(query, *params)
+        """
+        pool = await cls.get_pool()
+        start = time.perf_counter()
+        try:
+            conn = await pool.acquire()
+        except Exception as e:
+            cls._acquire_errors += 1
+            logger.error(f"Erro ao conectar ao PostgreSQL: {str(e)}", exc_info=True)
+            raise
+
+        wait_ms = (time.perf_counter() - start) * 1000
+        cls._acquisitions += 1
+        cls._acquire_wait_total_ms += wait_ms
+        cls._acquire_wait_max_ms = max(cls._acquire_wait_max_ms, wait_ms)
+        try:
+            yield conn
+        finally:
+            try:
+                await pool.release(conn)
+            except Exception as e:
+                logger.error(f"Erro ao liberar conexão PostgreSQL: {str(e)}")
+
     @staticmethod
     async def get_connection():
         """
         Obtém uma conexão com o PostgreSQL.
+
+        O chamador deve devolvê-la com `release_connection`; prefira
+        `PostgresClient.connection()`, que libera a conexão automaticamente.
         """
         try:
             pool = await PostgresClient.get_pool()
@@ -58,7 +143,46 @@ class PostgresClient:
         except Exception as e:
             logger.error(f"Erro ao liberar conexão PostgreSQL: {str(e)}")
 
+    @classmethod
+    def pool_stats(cls) -> dict[str, Any]:
+        """
+        Retorna a utilização do pool para monitoramento.
+
+        Returns:
+            Dict com tamanho, conexões ociosas/em uso, limites e tempos de
+            espera na aquisição
+        """
+        stats: dict[str, Any] = {
+            "initialized": cls._pool is not None,
+            "min_size": POSTGRES_POOL_MIN_SIZE,
+            "max_size": POSTGRES_POOL_MAX_SIZE,
+            "statement_cache_size": POSTGRES_STATEMENT_CACHE_SIZE,
+            "size": 0,
+            "idle": 0,
+            "in_use": 0,
+            "utilization": 0.0,
+            "acquisitions": cls._acquisitions,
+            "acquire_errors": cls._acquire_errors,
+            "acquire_wait_avg_ms": (
+                round(cls._acquire_wait_total_ms / cls._acquisitions, 3)
+                if cls._acquisitions
+                else 0.0
+            ),
+            "acquire_wait_max_ms": round(cls._acquire_wait_max_ms, 3),
+        }
+        if cls._pool is not None:
+            size = cls._pool.get_size()
+            idle = cls._pool.get_idle_size()
+            stats.update(
+                size=size,
+                idle=idle,
+                in_use=size - idle,
+                utilization=round((size - idle) / POSTGRES_POOL_MAX_SIZE * 100, 2),
+            )
+        return stats
+
     @staticmethod
+    @db_call("postgres")
     async def get_document(
         table: str, doc_id: str, tenant_id: str
     ) -> dict[str, Any] | None:
@@ -66,21 +190,46 @@ class PostgresClient:
         Obtém um documento do PostgreSQL filtrando por tenant_id.
         """
         try:
-            conn = await PostgresClient.get_connection()
-            try:
+            async with PostgresClient.connection() as conn:
                 # Query com chave composta
                 query = f"SELECT * FROM {table} WHERE id = $1 AND tenant_id = $2"
                 row = await conn.fetchrow(query, doc_id, tenant_id)
                 if row:
                     return dict(row)
                 return None
-            finally:
-                await conn.close()
         except Exception as e:
             logger.error(f"Erro ao obter documento {table}/{doc_id}: {str(e)}")
             raise
 
     @staticmethod
+    @db_call("postgres")
+    async def get_documents_many(
+        table: str, ids: list[str], tenant_id: str
+    ) -> dict[str, dict[str, Any]]:
+        """
+        Obtém vários documentos do PostgreSQL em uma única query (id = ANY).
+
+        Returns:
+            Dict {id: documento} na ordem dos IDs informados
+        """
+        doc_ids = list(dict.fromkeys(doc_id for doc_id in ids if doc_id))
+        if not doc_ids:
+            return {}
+
+        try:
+            async with PostgresClient.connection() as conn:
+                query = f"SELECT * FROM {table} WHERE id = ANY($1) AND tenant_id = $2"
+                rows = await conn.fetch(query, doc_ids, tenant_id)
+            found = {row["id"]: dict(row) for row in rows}
+            return {doc_id: found[doc_id] for doc_id in doc_ids if doc_id in found}
+        except Exception as e:
+            logger.error(
+                f"Erro ao obter {len(doc_ids)} documentos de {table}: {str(e)}"
+            )
+            raise
+
+    @staticmethod
+    @db_call("postgres")
     async def query_documents(
         table: str,
         *,
@@ -89,90 +238,178 @@ class PostgresClient:
         order_by: list[tuple[str, str]] | None = None,
         limit: int = 20,
         offset: int = 0,
+        cursor: str | None = None,
+        count_total: bool = True,
     ) -> dict[str, Any]:
         """
         Consulta documentos no PostgreSQL filtrando por tenant_id.
-        """
-        conn = None
-        try:
-            conn = await PostgresClient.get_connection()
 
-            query = f"SELECT * FROM {table} WHERE tenant_id = $1"
-            params = [tenant_id]
-            param_idx = 2
+        A consulta é compilada por `src.db.query_compiler` (tabelas e colunas
+        validadas, valores sempre parametrizados) e o total vem da própria
+        consulta (o conjunto filtrado, também nas páginas por cursor). Para
+        páginas profundas prefira `cursor` (keyset) a `offset`.
 
-            if filters:
-                for f in filters:
-                    query += f" AND {f[0]} {f[1]} ${param_idx}"
-                    params.append(f[2])
-                    param_idx += 1
-
-            if order_by:
-                order_str = ", ".join([f"{o[0]} {o[1]}" for o in order_by])
-                query += f" ORDER BY {order_str}"
-
-            # Aplicar limit e offset na query principal
-            query += f" LIMIT {limit} OFFSET {offset}"
-
-            logger.info(f"Executando query PostgreSQL: {query} com params: {params}")
-            rows = await conn.fetch(query, *params)
-            logger.info(
-                f"Query executada com sucesso, {len(rows)} registros retornados"
+        Args:
+            table: Nome da tabela
+            tenant_id: ID do tenant para filtrar os registros
+            filters: Lista de tuplas (campo, operador, valor) no formato Firestore
+            order_by: Lista de tuplas (campo, direção)
+            limit: Limite de registros
+            offset: Offset para paginação (ignorado quando há cursor)
+            cursor: Cursor opaco retornado em `next_cursor` da página anterior
+            count_total: Se False, não calcula o total e retorna total None
+
+        Returns:
+            Dict com items, total, limit, offset e next_cursor
+
+        Raises:
+            QueryCompileError: Se tabela, coluna ou operador não forem permitidos
+            InvalidCursorError: Se o cursor for inválido
+        """
+        try:
+            query, params = compile_query(
+                table, tenant_id, filters, order_by, limit, offset, cursor, count_total
             )
+            logger.debug(f"Executando query PostgreSQL: {query}")
+
+            async with PostgresClient.connection() as conn:
+                rows = await conn.fetch(query, *params)
+
+                total = None
+                if count_total:
+                    if rows:
+                        total = rows[0][TOTAL_COLUMN]
+                    elif offset > 0 or cursor:
+                        # Página vazia além do fim: a window function não
+                        # retornou linha, então conta separadamente
+                        count_query, count_params = compile_count(
+                            table, tenant_id, filters
+                        )
+                        total = await conn.fetchval(count_query, *count_params)
+                    else:
+                        total = 0
+
+            items = []
+            for row in rows:
+                item = dict(row)
+                item.pop(TOTAL_COLUMN, None)
+                items.append(item)
+
+            next_cursor = None
+            if items and len(items) == limit:
+                next_cursor = encode_keyset(table, order_columns(order_by), items[-1])
 
             return {
-                "items": [dict(r) for r in rows],
-                "total": len(rows),  # Temporário: usar len dos resultados
+                "items": items,
+                "total": total,
                 "limit": limit,
                 "offset": offset,
+                "next_cursor": next_cursor,
             }
 
+        except (QueryCompileError, InvalidCursorError):
+            raise
         except Exception as e:
             logger.error(
                 f"Erro ao consultar documentos {table}: {str(e)}", exc_info=True
             )
             raise
-        finally:
-            if conn:
-                try:
-                    await PostgresClient.release_connection(conn)
-                    logger.info("Conexão PostgreSQL liberada com sucesso")
-                except Exception as e:
-                    logger.error(f"Erro ao liberar conexão PostgreSQL: {str(e)}")
 
     @staticmethod
+    @db_call("postgres")
+    async def top_by_sum(
+        table: str,
+        *,
+        tenant_id: str,
+        group_by: str,
+        value: str,
+        filters: list[tuple[str, str, Any]] | None = None,
+        limit: int = 10,
+    ) -> list[tuple[Any, int | float]]:
+        """
+        Retorna os `limit` grupos com maior soma de `value` (GROUP BY).
+
+        Returns:
+            Lista de tuplas (valor de group_by, soma), maiores primeiro
+        """
+        query, params = compile_top(table, tenant_id, group_by, value, filters, limit)
+        try:
+            async with PostgresClient.connection() as conn:
+                rows = await conn.fetch(query, *params)
+        except Exception as e:
+            logger.error(f"Erro ao agregar {value} por {group_by} em {table}: {str(e)}")
+            raise
+        return [(row["key"], row["total"]) for row in rows]
+
+    @staticmethod
+    @db_call("postgres", "write")
     async def create_document(table: str, data: dict[str, Any]) -> dict[str, Any]:
         """
         Cria um documento no PostgreSQL.
         """
         try:
-            conn = await PostgresClient.get_connection()
-            try:
-                # Adicionar timestamp de criação
-                data["created_at"] = datetime.now()
+            # Adicionar timestamp de criação
+            data["created_at"] = datetime.now()
 
-                # Construir query
-                fields = list(data.keys())
-                placeholders = [f"${i+1}" for i in range(len(fields))]
+            # Construir query
+            fields = list(data.keys())
+            placeholders = [f"${i+1}" for i in range(len(fields))]
 
-                query = f"""
-                INSERT INTO {table} ({', '.join(fields)})
-                VALUES ({', '.join(placeholders)})
-                RETURNING *
-                """
+            query = f"""
+            INSERT INTO {table} ({', '.join(fields)})
+            VALUES ({', '.join(placeholders)})
+            RETURNING *
+            """
 
-                # Executar query
+            # Executar query
+            async with PostgresClient.connection() as conn:
                 row = await conn.fetchrow(query, *[data[field] for field in fields])
 
-                # Converter para dicionário
-                return dict(row)
-            finally:
-                await conn.close()
+            # Converter para dicionário
+            return dict(row)
         except Exception as e:
             logger.error(f"Erro ao criar documento em {table}: {str(e)}")
             raise
 
     @staticmethod
+    @db_call("postgres", "write")
+    async def insert_if_absent(
+        table: str, data: dict[str, Any], conflict_columns: tuple[str, ...] = ("id",)
+    ) -> bool:
+        """
+        Insere um registro somente se a chave ainda não existir.
+
+        Usa `INSERT ... ON CONFLICT DO NOTHING`, atômico no servidor.
+
+        Args:
+            table: Nome da tabela
+            data: Colunas e valores
+            conflict_columns: Colunas da restrição única que define a chave
+
+        Returns:
+            True se o registro foi inserido, False se a chave já estava em uso
+        """
+        data["created_at"] = datetime.now()
+        fields = list(data.keys())
+        placeholders = [f"${i + 1}" for i in range(len(fields))]
+
+        query = (
+            f"INSERT INTO {table} ({', '.join(fields)}) "
+            f"VALUES ({', '.join(placeholders)}) "
+            f"ON CONFLICT ({', '.join(conflict_columns)}) DO NOTHING "
+            "RETURNING id"
+        )
+
+        try:
+            async with PostgresClient.connection() as conn:
+                row = await conn.fetchrow(query, *[data[field] for field in fields])
+        except Exception as e:
+            logger.error(f"Erro ao inserir documento em {table}: {str(e)}")
+            raise
+        return row is not None
+
+    @staticmethod
+    @db_call("postgres", "write")
     async def update_document(
         table: str, doc_id: str, data: dict[str, Any]
     ) -> dict[str, Any]:
@@ -180,56 +417,138 @@ class PostgresClient:
         Atualiza um documento no PostgreSQL.
         """
         try:
-            conn = await PostgresClient.get_connection()
-            try:
-                # Adicionar timestamp de atualização
-                data["updated_at"] = datetime.now()
-
-                # Construir query
-                set_clauses = [
-                    f"{field} = ${i+2}" for i, field in enumerate(data.keys())
-                ]
-
-                query = f"""
-                UPDATE {table}
-                SET {', '.join(set_clauses)}
-                WHERE id = $1
-                RETURNING *
-                """
-
-                # Executar query
+            # Adicionar timestamp de atualização
+            data["updated_at"] = datetime.now()
+
+            # Construir query
+            set_clauses = [f"{field} = ${i+2}" for i, field in enumerate(data.keys())]
+
+            query = f"""
+            UPDATE {table}
+            SET {", ".join(set_clauses)}
+            WHERE id = $1
+            RETURNING *
+            """
+
+            # Executar query
+            async with PostgresClient.connection() as conn:
                 row = await conn.fetchrow(query, doc_id, *data.values())
 
-                # Converter para dicionário
-                return dict(row)
-            finally:
-                await conn.close()
+            # Converter para dicionário
+            return dict(row)
         except Exception as e:
             logger.error(f"Erro ao atualizar documento {table}/{doc_id}: {str(e)}")
             raise
 
     @staticmethod
+    @db_call("postgres", "write")
+    async def update_if(
+        table: str,
+        doc_id: str,
+        data: dict[str, Any],
+        *,
+        tenant_id: str,
+        filters: list[tuple[str, str, Any]] | None = None,
+    ) -> dict[str, Any] | None:
+        """
+        Atualiza uma linha somente se ela ainda satisfaz os filtros.
+
+        Executa um único `UPDATE ... WHERE ... RETURNING *`, de modo que duas
+        chamadas concorrentes não aplicam a mesma transição.
+
+        Args:
+            table: Nome da tabela
+            doc_id: ID da linha
+            data: Colunas atualizadas
+            tenant_id: ID do tenant
+            filters: Condições no formato Firestore (campo, operador, valor)
+
+        Returns:
+            Linha atualizada ou None se não existe ou não satisfaz os filtros
+        """
+        query, params = compile_conditional_update(
+            table, tenant_id, doc_id, {**data, "updated_at": datetime.now()}, filters
+        )
+        try:
+            async with PostgresClient.connection() as conn:
+                row = await conn.fetchrow(query, *params)
+        except Exception as e:
+            logger.error(f"Erro ao atualizar documento {table}/{doc_id}: {str(e)}")
+            raise
+        return dict(row) if row else None
+
+    @staticmethod
+    @db_call("postgres", "write")
     async def delete_document(table: str, doc_id: str) -> bool:
         """
         Remove um documento do PostgreSQL.
         """
         try:
-            conn = await PostgresClient.get_connection()
-            try:
-                # Construir query
-                query = f"DELETE FROM {table} WHERE id = $1"
+            # Construir query
+            query = f"DELETE FROM {table} WHERE id = $1"
 
-                # Executar query
+            # Executar query
+            async with PostgresClient.connection() as conn:
                 await conn.execute(query, doc_id)
 
-                return True
-            finally:
-                await conn.close()
+            return True
         except Exception as e:
             logger.error(f"Erro ao remover documento {table}/{doc_id}: {str(e)}")
             raise
 
     @staticmethod
+    @db_call("postgres", "write")
+    async def upsert_counters(
+        table: str,
+        rows: dict[str, dict[str, Any]],
+        counters: tuple[str, ...],
+        *,
+        increment: bool = True,
+    ) -> bool:
+        """
+        Incrementa (ou define) colunas contadoras em várias linhas.
+
+        Executa `INSERT ... ON CONFLICT (id) DO UPDATE` em uma transação,
+        somando os valores às colunas de `counters` (ou substituindo-os, se
+        increment=False). Todas as linhas devem ter as mesmas colunas.
+
+        Args:
+            table: Nome da tabela
+            rows: Dict {id: colunas}
+            counters: Nomes das colunas contadoras
+            increment: Se False, sobrescreve os contadores com os valores
+        """
+        if not rows:
+            return True
+        fields = ["id", *next(iter(rows.values())).keys(), "updated_at"]
+        placeholders = [f"${i + 1}" for i in range(len(fields))]
+        updates = [
+            (
+                f"{field} = {table}.{field} + EXCLUDED.{field}"
+                if increment
+                else f"{field} = EXCLUDED.{field}"
+            )
+            for field in counters
+        ]
+        query = (
+            f"INSERT INTO {table} ({', '.join(fields)}) "
+            f"VALUES ({', '.join(placeholders)}) "
+            f"ON CONFLICT (id) DO UPDATE SET {', '.join(updates)}, "
+            "updated_at = EXCLUDED.updated_at"
+        )
+        now = datetime.now()
+        args = [(doc_id, *row.values(), now) for doc_id, row in rows.items()]
+
+        try:
+            async with PostgresClient.connection() as conn, conn.transaction():
+                await conn.executemany(query, args)
+        except Exception as e:
+            logger.error(f"Erro ao gravar contadores em {table}: {str(e)}")
+            raise
+        return True
+
+    @staticmethod
+    @db_call("postgres", "write")
     async def execute_transaction(queries: list[dict[str, Any]]) -> bool:
         """
         Executa uma transação no PostgreSQL.
@@ -242,18 +561,14 @@ class PostgresClient:
                 }
         """
         try:
-            conn = await PostgresClient.get_connection()
-            try:
-                async with conn.transaction():
-                    for query_data in queries:
-                        query = query_data.get("query")
-                        params = query_data.get("params", [])
+            async with PostgresClient.connection() as conn, conn.transaction():
+                for query_data in queries:
+                    query = query_data.get("query")
+                    params = query_data.get("params", [])
 
-                        await conn.execute(query, *params)
+                    await conn.execute(query, *params)
 
-                return True
-            finally:
-                await conn.close()
+            return True
         except Exception as e:
             logger.error(f"Erro ao executar transação: {str(e)}")
             raise
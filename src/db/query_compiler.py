@@ -0,0 +1,421 @@
+"""
+Compilador de consultas do PostgreSQL (contingência).
+
+Converte (tabela, filtros, ordenação) no mesmo formato usado pelo Firestore
+em SQL parametrizado. Todos os valores, inclusive LIMIT e OFFSET, são
+enviados como parâmetros, de modo que consultas com o mesmo formato geram
+o mesmo texto SQL e reaproveitam o prepared statement em cache em cada
+conexão do asyncpg (POSTGRES_STATEMENT_CACHE_SIZE).
+
+Tabelas e colunas são validadas contra uma allowlist antes de entrarem no
+texto SQL. O total é obtido na própria consulta com `count(*) OVER ()` ou,
+em páginas por cursor, com uma subconsulta sem o predicado do keyset (o total
+é sempre o do conjunto filtrado). A paginação por cursor (keyset) usa os
+valores das colunas de ordenação da última linha, com `id` como desempate.
+"""
+
+import re
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any
+
+from src.db.pagination import (
+    POSTGRES_BACKEND,
+    InvalidCursorError,
+    decode_cursor,
+    encode_cursor,
+)
+
+# Coluna auxiliar com o total calculado pela window function
+TOTAL_COLUMN = "__total"
+
+# Colunas presentes em todas as tabelas
+_COMMON_COLUMNS = frozenset({"id", "tenant_id", "created_at", "updated_at"})
+
+# Tabelas consultáveis na contingência. Para as tabelas do schema em
+# data/seed_postgres.sql as colunas são restritas ao schema e aos campos
+# filtrados pela API; as demais (espelhos de coleções sem schema versionado)
+# aceitam qualquer identificador SQL simples.
+ALLOWED_TABLES: dict[str, frozenset[str] | None] = {
+    "students": _COMMON_COLUMNS
+    | {
+        "cpf_hash",
+        "nome_aluno",
+        "curso",
+        "ocupacao_aluno",
+        "email_aluno",
+        "celular_aluno",
+        "cep_aluno",
+        "bairro",
+        "complemento_aluno",
+        "nome_responsavel",
+        "email_responsavel",
+        "active_until",
+    },
+    "partners": _COMMON_COLUMNS
+    | {"cnpj_hash", "trade_name", "category", "address", "active"},
+    "promotions": _COMMON_COLUMNS
+    | {
+        "partner_id",
+        "title",
+        "type",
+        "valid_from",
+        "valid_to",
+        "active",
+        "target_profile",
+    },
+    "validation_codes": _COMMON_COLUMNS
+    | {
+        "student_id",
+        "employee_id",
+        "partner_id",
+        "code_hash",
+        "expires",
+        "used_at",
+        "redeemed_by_partner_id",
+    },
+    "redemptions": _COMMON_COLUMNS
+    | {"validation_code_id", "value", "used_at", "redeemed_at"},
+    "code_counters": _COMMON_COLUMNS
+    | {"partner_id", "day", "shard", "generated", "redeemed"},
+    "employees": None,
+    "benefits": None,
+    "students_fav": None,
+    "employees_fav": None,
+}
+
+_IDENTIFIER = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+# Operadores do formato Firestore -> SQL
+_OPERATORS = {
+    "==": "=",
+    "!=": "<>",
+    "<": "<",
+    "<=": "<=",
+    ">": ">",
+    ">=": ">=",
+}
+
+
+class QueryCompileError(ValueError):
+    """Tabela, coluna, operador ou direção não permitidos."""
+
+
+def _check_table(table: str) -> None:
+    if table not in ALLOWED_TABLES:
+        raise QueryCompileError(f"Tabela não permitida: {table}")
+
+
+def _check_column(table: str, column: str) -> None:
+    columns = ALLOWED_TABLES[table]
+    allowed = column in columns if columns is not None else True
+    if not allowed or not _IDENTIFIER.match(column):
+        raise QueryCompileError(f"Coluna não permitida em {table}: {column}")
+
+
+def _direction(direction: Any) -> str:
+    value = str(direction).upper()
+    if value in ("ASC", "ASCENDING"):
+        return "ASC"
+    if value in ("DESC", "DESCENDING"):
+        return "DESC"
+    raise QueryCompileError(f"Direção de ordenação inválida: {direction}")
+
+
+def _filter_shape(filters: list[tuple[str, str, Any]] | None) -> tuple:
+    """Reduz os filtros ao que determina o texto SQL (sem os valores)."""
+    return tuple((field, op, value is None) for field, op, value in filters or [])
+
+
+def _order_shape(order_by: list[tuple[str, Any]] | None) -> tuple:
+    return tuple((field, _direction(direction)) for field, direction in order_by or [])
+
+
+def _compile_where(table: str, filter_shape: tuple) -> tuple[list[str], int]:
+    """Gera as cláusulas WHERE e o próximo índice de parâmetro livre."""
+    _check_table(table)
+    where = ["tenant_id = $1"]
+    idx = 2
+
+    for field, op, is_null in filter_shape:
+        _check_column(table, field)
+        if is_null and op in ("==", "!="):
+            where.append(f"{field} IS {'NOT ' if op == '!=' else ''}NULL")
+        elif op == "in":
+            where.append(f"{field} = ANY(${idx})")
+            idx += 1
+        elif op == "not-in":
+            where.append(f"{field} <> ALL(${idx})")
+            idx += 1
+        elif op in _OPERATORS:
+            where.append(f"{field} {_OPERATORS[op]} ${idx}")
+            idx += 1
+        else:
+            raise QueryCompileError(f"Operador não suportado: {op}")
+
+    return where, idx
+
+
+@lru_cache(maxsize=256)
+def _compile(
+    table: str,
+    filter_shape: tuple,
+    order_shape: tuple,
+    keyset: bool,
+    count_total: bool,
+) -> str:
+    """Gera o texto SQL de um formato de consulta (resultado em cache)."""
+    where, idx = _compile_where(table, filter_shape)
+    filtered = " AND ".join(where)
+
+    order = list(order_shape)
+    for field, _ in order:
+        _check_column(table, field)
+    if not any(field == "id" for field, _ in order):
+        # Desempate estável, necessário para a paginação por cursor
+        order.append(("id", order[-1][1] if order else "ASC"))
+
+    if keyset:
+        # (a, b, id) > (x, y, z) expandido para aceitar direções mistas
+        branches = []
+        for position, (field, direction) in enumerate(order):
+            terms = [
+                f"{previous} = ${idx + i}"
+                for i, (previous, _) in enumerate(order[:position])
+            ]
+            comparison = ">" if direction == "ASC" else "<"
+            terms.append(f"{field} {comparison} ${idx + position}")
+            branches.append(f"({' AND '.join(terms)})")
+        where.append(f"({' OR '.join(branches)})")
+        idx += len(order)
+
+    if not count_total:
+        columns = "*"
+    elif keyset:
+        # A window function contaria só as linhas após o cursor; a subconsulta
+        # reaproveita os parâmetros dos filtros e roda uma vez (InitPlan)
+        columns = (
+            f"*, (SELECT count(*) FROM {table} WHERE {filtered}) AS {TOTAL_COLUMN}"
+        )
+    else:
+        columns = f"*, count(*) OVER () AS {TOTAL_COLUMN}"
+    order_sql = ", ".join(f"{field} {direction}" for field, direction in order)
+    return (
+        f"SELECT {columns} FROM {table} WHERE {' AND '.join(where)} "
+        f"ORDER BY {order_sql} LIMIT ${idx} OFFSET ${idx + 1}"
+    )
+
+
+@lru_cache(maxsize=256)
+def _compile_count(table: str, filter_shape: tuple) -> str:
+    where, _ = _compile_where(table, filter_shape)
+    return f"SELECT count(*) FROM {table} WHERE {' AND '.join(where)}"
+
+
+@lru_cache(maxsize=256)
+def _compile_top(table: str, group_by: str, value: str, filter_shape: tuple) -> str:
+    where, idx = _compile_where(table, filter_shape)
+    _check_column(table, group_by)
+    _check_column(table, value)
+    return (
+        f"SELECT {group_by} AS key, sum({value}) AS total FROM {table} "
+        f"WHERE {' AND '.join(where)} GROUP BY {group_by} "
+        f"ORDER BY total DESC, {group_by} LIMIT ${idx}"
+    )
+
+
+def _filter_params(
+    tenant_id: str, filters: list[tuple[str, str, Any]] | None
+) -> list[Any]:
+    params: list[Any] = [tenant_id]
+    for _field, op, value in filters or []:
+        if value is None and op in ("==", "!="):
+            continue
+        params.append(list(value) if op in ("in", "not-in") else value)
+    return params
+
+
+def compile_count(
+    table: str, tenant_id: str, filters: list[tuple[str, str, Any]] | None
+) -> tuple[str, list[Any]]:
+    """
+    Compila um `SELECT count(*)` com os mesmos filtros de `compile_query`.
+
+    Usado quando a página veio vazia e a window function não trouxe o total.
+
+    Returns:
+        Tupla (sql, params)
+    """
+    sql = _compile_count(table, _filter_shape(filters))
+    return sql, _filter_params(tenant_id, filters)
+
+
+def compile_top(
+    table: str,
+    tenant_id: str,
+    group_by: str,
+    value: str,
+    filters: list[tuple[str, str, Any]] | None,
+    limit: int,
+) -> tuple[str, list[Any]]:
+    """
+    Compila um top-K: `sum(value)` agrupado por `group_by`, maiores primeiro.
+
+    Returns:
+        Tupla (sql, params); as linhas têm as colunas `key` e `total`
+    """
+    sql = _compile_top(table, group_by, value, _filter_shape(filters))
+    return sql, [*_filter_params(tenant_id, filters), limit]
+
+
+def order_columns(order_by: list[tuple[str, Any]] | None) -> list[str]:
+    """Colunas efetivas da ordenação, incluindo o desempate por id."""
+    columns = [field for field, _ in order_by or []]
+    if "id" not in columns:
+        columns.append("id")
+    return columns
+
+
+def compile_query(
+    table: str,
+    tenant_id: str,
+    filters: list[tuple[str, str, Any]] | None,
+    order_by: list[tuple[str, Any]] | None,
+    limit: int,
+    offset: int,
+    cursor: str | None,
+    count_total: bool,
+) -> tuple[str, list[Any]]:
+    """
+    Compila uma consulta de listagem.
+
+    Args:
+        table: Tabela (deve estar em ALLOWED_TABLES)
+        tenant_id: Tenant obrigatório ($1)
+        filters: Lista de tuplas (campo, operador, valor) no formato Firestore
+        order_by: Lista de tuplas (campo, direção)
+        limit: Limite de linhas
+        offset: Offset (ignorado quando há cursor)
+        cursor: Cursor opaco retornado em `next_cursor`
+        count_total: Inclui a coluna `__total` com o total dos filtros
+            (sem o predicado do cursor)
+
+    Returns:
+        Tupla (sql, params)
+
+    Raises:
+        QueryCompileError: Se tabela, coluna, operador ou direção não forem
+            permitidos
+        InvalidCursorError: Se o cursor for inválido ou de outra consulta
+    """
+    sql = _compile(
+        table,
+        _filter_shape(filters),
+        _order_shape(order_by),
+        cursor is not None,
+        count_total,
+    )
+
+    params = _filter_params(tenant_id, filters)
+    if cursor is not None:
+        params.extend(decode_keyset(cursor, table, order_columns(order_by)))
+        offset = 0
+
+    params.extend([limit, offset])
+    return sql, params
+
+
+@lru_cache(maxsize=64)
+def _compile_update(table: str, columns: tuple[str, ...], filter_shape: tuple) -> str:
+    where, idx = _compile_where(table, filter_shape)
+    for column in columns:
+        _check_column(table, column)
+    assignments = [f"{column} = ${idx + i}" for i, column in enumerate(columns)]
+    idx += len(columns)
+    where.append(f"id = ${idx}")
+    return (
+        f"UPDATE {table} SET {', '.join(assignments)} "
+        f"WHERE {' AND '.join(where)} RETURNING *"
+    )
+
+
+def compile_conditional_update(
+    table: str,
+    tenant_id: str,
+    doc_id: str,
+    data: dict[str, Any],
+    filters: list[tuple[str, str, Any]] | None,
+) -> tuple[str, list[Any]]:
+    """
+    Compila um `UPDATE ... WHERE <filtros> RETURNING *` de uma linha.
+
+    A atualização só ocorre se a linha ainda satisfaz os filtros no momento
+    da escrita (check-and-set atômico em um único comando).
+
+    Returns:
+        Tupla (sql, params)
+
+    Raises:
+        QueryCompileError: Se tabela, coluna ou operador não forem permitidos
+    """
+    columns = tuple(data)
+    sql = _compile_update(table, columns, _filter_shape(filters))
+    params = _filter_params(tenant_id, filters)
+    params.extend(data[column] for column in columns)
+    params.append(doc_id)
+    return sql, params
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"$d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"$dec": str(value)}
+    if isinstance(value, int | float | str | bool) or value is None:
+        return value
+    return str(value)
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "$dt" in value:
+            return datetime.fromisoformat(value["$dt"])
+        if "$d" in value:
+            return date.fromisoformat(value["$d"])
+        if "$dec" in value:
+            return Decimal(value["$dec"])
+    return value
+
+
+def encode_keyset(table: str, columns: list[str], row: dict[str, Any]) -> str:
+    """Gera o cursor a partir da última linha da página."""
+    return encode_cursor(
+        {
+            "b": POSTGRES_BACKEND,
+            "t": table,
+            "c": columns,
+            "v": [_encode_value(row.get(c)) for c in columns],
+        }
+    )
+
+
+def decode_keyset(cursor: str, table: str, columns: list[str]) -> list[Any]:
+    """
+    Recupera os valores de ordenação de um cursor.
+
+    Raises:
+        InvalidCursorError: Se o cursor for de outra tabela ou ordenação
+    """
+    payload = decode_cursor(cursor)
+    values = payload.get("v")
+    if (
+        payload.get("t") != table
+        or payload.get("c") != columns
+        or not isinstance(values, list)
+        or len(values) != len(columns)
+    ):
+        raise InvalidCursorError("Cursor de paginação inválido para esta consulta")
+    return [_decode_value(value) for value in values]
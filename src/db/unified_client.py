@@ -6,9 +6,10 @@ que funciona com Firestore (primário) e PostgreSQL (fallback).
 
 from typing import Any
 
-from src.db.circuit_breaker import with_circuit_breaker
+from src.db.circuit_breaker import with_circuit_breaker, with_hedged_read
 from src.db.error_handler import (
-    DEFAULT_RETRY_CONFIG,
+    NO_RETRY_CONFIG,
+    READ_RETRY_CONFIG,
     validate_required_fields,
     with_error_handling,
 )
@@ -20,9 +21,9 @@ class UnifiedDatabaseClient:
     """Cliente unificado que combina Firestore e PostgreSQL com circuit breaker."""
 
     @staticmethod
-    @with_error_handling(DEFAULT_RETRY_CONFIG, "get_document")
+    @with_error_handling(READ_RETRY_CONFIG, "get_document")
     async def get_document(
-        collection: str, doc_id: str, tenant_id: str
+        collection: str, doc_id: str, tenant_id: str, *, hedge: str | None = None
     ) -> dict[str, Any] | None:
         """Obtém um documento por ID.
 
@@ -30,6 +31,8 @@ class UnifiedDatabaseClient:
             collection: Nome da coleção/tabela
             doc_id: ID do documento
             tenant_id: ID do tenant
+            hedge: Nome da operação para leitura com hedge (ver
+                `with_hedged_read`); None usa apenas o circuit breaker
 
         Returns:
             Documento encontrado ou None
@@ -40,16 +43,57 @@ class UnifiedDatabaseClient:
             ["collection", "doc_id", "tenant_id"],
         )
 
+        if hedge:
+            return await with_hedged_read(
+                hedge,
+                firestore_client.get_document,
+                postgres_client.get_document,
+                collection,
+                doc_id,
+                tenant_id,
+                breaker=(collection, "read"),
+            )
+
         return await with_circuit_breaker(
             firestore_client.get_document,
             postgres_client.get_document,
             collection,
             doc_id,
             tenant_id,
+            breaker=(collection, "read"),
         )
 
     @staticmethod
-    @with_error_handling(DEFAULT_RETRY_CONFIG, "create_document")
+    @with_error_handling(READ_RETRY_CONFIG, "get_documents_many")
+    async def get_documents_many(
+        collection: str, ids: list[str], tenant_id: str
+    ) -> dict[str, dict[str, Any]]:
+        """Obtém vários documentos por ID em uma única leitura.
+
+        Args:
+            collection: Nome da coleção/tabela
+            ids: IDs dos documentos (vazios e repetidos são ignorados)
+            tenant_id: ID do tenant
+
+        Returns:
+            Dict {id: documento} apenas com os documentos encontrados
+        """
+        validate_required_fields(
+            {"collection": collection, "tenant_id": tenant_id},
+            ["collection", "tenant_id"],
+        )
+
+        return await with_circuit_breaker(
+            firestore_client.get_documents_many,
+            postgres_client.get_documents_many,
+            collection,
+            ids,
+            tenant_id,
+            breaker=(collection, "read"),
+        )
+
+    @staticmethod
+    @with_error_handling(NO_RETRY_CONFIG, "create_document")
     async def create_document(
         collection: str, data: dict[str, Any], tenant_id: str
     ) -> dict[str, Any]:
@@ -78,10 +122,12 @@ class UnifiedDatabaseClient:
         async def postgres_create():
             return await postgres_client.create_document(collection, data_with_tenant)
 
-        return await with_circuit_breaker(firestore_create, postgres_create)
+        return await with_circuit_breaker(
+            firestore_create, postgres_create, breaker=(collection, "write")
+        )
 
     @staticmethod
-    @with_error_handling(DEFAULT_RETRY_CONFIG, "update_document")
+    @with_error_handling(NO_RETRY_CONFIG, "update_document")
     async def update_document(
         collection: str, doc_id: str, data: dict[str, Any], tenant_id: str
     ) -> dict[str, Any]:
@@ -120,10 +166,12 @@ class UnifiedDatabaseClient:
                 collection, doc_id, data_with_tenant
             )
 
-        return await with_circuit_breaker(firestore_update, postgres_update)
+        return await with_circuit_breaker(
+            firestore_update, postgres_update, breaker=(collection, "write")
+        )
 
     @staticmethod
-    @with_error_handling(DEFAULT_RETRY_CONFIG, "delete_document")
+    @with_error_handling(NO_RETRY_CONFIG, "delete_document")
     async def delete_document(collection: str, doc_id: str, tenant_id: str) -> bool:
         """Remove um documento.
 
@@ -147,10 +195,12 @@ class UnifiedDatabaseClient:
         async def postgres_delete():
             return await postgres_client.delete_document(collection, doc_id)
 
-        return await with_circuit_breaker(firestore_delete, postgres_delete)
+        return await with_circuit_breaker(
+            firestore_delete, postgres_delete, breaker=(collection, "write")
+        )
 
     @staticmethod
-    @with_error_handling(DEFAULT_RETRY_CONFIG, "query_documents")
+    @with_error_handling(READ_RETRY_CONFIG, "query_documents")
     async def query_documents(
         collection: str,
         *,
@@ -159,6 +209,8 @@ class UnifiedDatabaseClient:
         order_by: list[tuple[str, str]] | None = None,
         limit: int = 20,
         offset: int = 0,
+        cursor: str | None = None,
+        count_total: bool = True,
     ) -> dict[str, Any]:
         """Consulta documentos com filtros.
 
@@ -169,6 +221,8 @@ class UnifiedDatabaseClient:
             order_by: Lista de ordenação [(campo, direção)]
             limit: Limite de resultados
             offset: Offset para paginação
+            cursor: Cursor opaco (`next_cursor` da página anterior)
+            count_total: Se False, pula a contagem do total
 
         Returns:
             Resultado da consulta com dados e metadados
@@ -187,22 +241,28 @@ class UnifiedDatabaseClient:
                 order_by=order_by,
                 limit=limit,
                 offset=offset,
+                cursor=cursor,
+                count_total=count_total,
             )
 
         async def postgres_query():
             return await postgres_client.query_documents(
-                collection=collection,
+                collection,
                 tenant_id=tenant_id,
                 filters=filters,
                 order_by=order_by,
                 limit=limit,
                 offset=offset,
+                cursor=cursor,
+                count_total=count_total,
             )
 
-        return await with_circuit_breaker(firestore_query, postgres_query)
+        return await with_circuit_breaker(
+            firestore_query, postgres_query, breaker=(collection, "read")
+        )
 
     @staticmethod
-    @with_error_handling(DEFAULT_RETRY_CONFIG, "batch_operation")
+    @with_error_handling(NO_RETRY_CONFIG, "batch_operation")
     async def batch_operation(operations: list[dict[str, Any]], tenant_id: str) -> bool:
         """Executa operações em lote.
 
@@ -270,7 +330,9 @@ class UnifiedDatabaseClient:
 
             return await postgres_client.execute_transaction(queries)
 
-        return await with_circuit_breaker(firestore_batch, postgres_batch)
+        return await with_circuit_breaker(
+            firestore_batch, postgres_batch, breaker=("batch", "write")
+        )
 
 
 # Instância do cliente unificado
@@ -7,26 +7,45 @@ de parceiros comerciais através de um sistema de autenticação seguro.
 
 import logging
 import os
-from contextlib import asynccontextmanager
+import secrets
+from contextlib import asynccontextmanager, suppress
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 
 from src.api import admin, admin_metrics, employee, logos, partner, student, sync, users
 from src.config import (
+    ANALYTICS_DRAIN_TIMEOUT,
     API_DESCRIPTION,
     API_TITLE,
     API_VERSION,
     CORS_ORIGINS,
     DEBUG,
     ENVIRONMENT,
+    METRICS_ENDPOINT_ENABLED,
+    METRICS_ENDPOINT_TOKEN,
+    PERFORMANCE_METRICS_ENABLED,
+    POSTGRES_ENABLED,
+    PROFILING_ENABLED,
+    REQUEST_DB_READ_BUDGETS,
+    REQUEST_DEADLINE_SECONDS,
+    REQUEST_TIMING_ENABLED,
+    TESTING_MODE,
 )
+from src.db import postgres_client
 from src.db.firestore import initialize_firestore_databases
 from src.db.storage import initialize_storage_client
-from src.utils.rate_limit import limiter
+from src.middleware.performance_middleware import PerformanceMiddleware
+from src.middleware.profiling_middleware import ProfilingMiddleware
+from src.middleware.request_timing_middleware import RequestTimingMiddleware
+from src.utils.firebase_analytics import analytics_client
+from src.utils.histograms import registry
+from src.utils.jwks import firebase_jwks_store, jwks_store
+from src.utils.rate_limit import limiter, token_bucket_limiter
+from src.utils.request_deadline import reset_request_deadline, set_request_deadline
 
 # Configurar logging
 logging.basicConfig(
@@ -51,12 +70,37 @@ async def lifespan(app: FastAPI):
     # Inicializar Storage
     initialize_storage_client()
 
+    # Aquecer o pool da contingência PostgreSQL
+    if POSTGRES_ENABLED:
+        try:
+            await postgres_client.warmup()
+        except Exception as e:
+            # A API continua no Firestore; o pool é recriado no primeiro uso
+            logger.error(f"❌ Falha ao aquecer pool PostgreSQL: {e}")
+
+    # Carregar chaves públicas (JWKS) e iniciar renovação em segundo plano
+    if not TESTING_MODE:
+        await jwks_store.start()
+        await firebase_jwks_store.start()
+
+    # Gravação em lote dos eventos de analytics (em todos os ambientes: os
+    # middlewares enfileiram eventos também fora de produção)
+    await analytics_client.pipeline.start()
+
     logger.info("✅ Aplicação iniciada com sucesso")
 
     yield
 
     # Shutdown
     logger.info("🛑 Encerrando aplicação")
+    await jwks_store.stop()
+    await firebase_jwks_store.stop()
+    await token_bucket_limiter.store.close()
+    # Grava os eventos de analytics ainda na fila
+    await analytics_client.pipeline.stop(ANALYTICS_DRAIN_TIMEOUT)
+    await analytics_client.close()
+    if POSTGRES_ENABLED:
+        await postgres_client.close_pool()
 
 
 app = FastAPI(
@@ -78,6 +122,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+# Métricas de performance (eventos enfileirados, gravados em segundo plano)
+if PERFORMANCE_METRICS_ENABLED:
+    app.add_middleware(PerformanceMiddleware)
+
+# Server-Timing, histograma de latência e orçamento de leituras no banco por rota
+if REQUEST_TIMING_ENABLED:
+    app.add_middleware(RequestTimingMiddleware, read_budgets=REQUEST_DB_READ_BUDGETS)
+
+# Profiling sob demanda (sem custo quando desabilitado: não é registrado)
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+
+# Prazo da requisição (limita retries no banco)
+@app.middleware("http")
+async def request_deadline_middleware(request: Request, call_next):
+    """Define o prazo da requisição usado para limitar retries no banco.
+
+    O cliente pode reduzir o prazo com o cabeçalho `X-Request-Timeout-Ms`;
+    o máximo é REQUEST_DEADLINE_SECONDS.
+    """
+    timeout = REQUEST_DEADLINE_SECONDS
+    header = request.headers.get("x-request-timeout-ms")
+    if header:
+        with suppress(ValueError):
+            timeout = min(timeout, max(float(header), 0) / 1000)
+
+    token = set_request_deadline(timeout)
+    try:
+        return await call_next(request)
+    finally:
+        reset_request_deadline(token)
+
+
 # Configurar rate limiter
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
@@ -114,6 +193,33 @@ async def health_check():
     return {"status": "healthy", "environment": ENVIRONMENT}
 
 
+if METRICS_ENDPOINT_ENABLED and not METRICS_ENDPOINT_TOKEN:
+    logger.warning("METRICS_ENDPOINT_TOKEN não definido: /metrics desativado")
+elif METRICS_ENDPOINT_ENABLED:
+
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics(request: Request):
+        """Latências e transições de circuit breaker no formato Prometheus.
+
+        Exige `Authorization: Bearer <METRICS_ENDPOINT_TOKEN>`.
+        """
+        expected = f"Bearer {METRICS_ENDPOINT_TOKEN}"
+        received = request.headers.get("authorization", "")
+        if not secrets.compare_digest(received.encode(), expected.encode()):
+            return JSONResponse(
+                status_code=401,
+                content={
+                    "error": {
+                        "code": "UNAUTHORIZED",
+                        "msg": "Token de métricas inválido",
+                    }
+                },
+            )
+        return PlainTextResponse(
+            registry.render(), media_type="text/plain; version=0.0.4"
+        )
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Handler global para exceções não tratadas."""
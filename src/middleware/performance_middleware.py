@@ -3,6 +3,10 @@ Middleware para coleta automática de métricas de performance.
 
 Este middleware intercepta todas as requisições HTTP e coleta métricas
 de performance, incluindo tempo de resposta, status codes e erros.
+
+As requisições gravadas no analytics são escolhidas por `TraceSampler`
+(`src.utils.sampling`); os spans de banco registrados durante a requisição
+seguem a mesma decisão.
 """
 
 import time
@@ -12,8 +16,16 @@ from datetime import datetime
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 
+from src.utils import logger
 from src.utils.firebase_analytics import analytics_client
-from src.utils.logger import logger
+from src.utils.sampling import (
+    TraceSampler,
+    current_trace,
+    end_trace,
+    extract_trace_id,
+    start_trace,
+    trace_sampler,
+)
 
 
 class PerformanceMiddleware(BaseHTTPMiddleware):
@@ -28,17 +40,16 @@ class PerformanceMiddleware(BaseHTTPMiddleware):
     - Métricas por tenant
     """
 
-    def __init__(self, app, sample_rate: float = 1.0):
+    def __init__(self, app, sampler: TraceSampler = trace_sampler):
         """
         Inicializa o middleware de performance.
 
         Args:
             app: Aplicação FastAPI
-            sample_rate: Taxa de amostragem (0.0 a 1.0)
+            sampler: Decisão de amostragem por rota, erro e lentidão
         """
         super().__init__(app)
-        self.sample_rate = sample_rate
-        self.request_count = 0
+        self.sampler = sampler
 
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         """
@@ -51,11 +62,9 @@ class PerformanceMiddleware(BaseHTTPMiddleware):
         Returns:
             Response: Resposta HTTP
         """
-        # Incrementar contador de requisições
-        self.request_count += 1
-
-        # Aplicar sampling
-        should_track = (self.request_count % int(1 / self.sample_rate)) == 0
+        # Trace da requisição: guarda os spans até a decisão de amostragem
+        trace_id = extract_trace_id(request.headers)
+        trace_token = start_trace(trace_id)
 
         # Dados básicos da requisição
         start_time = time.time()
@@ -86,27 +95,49 @@ class PerformanceMiddleware(BaseHTTPMiddleware):
             # Calcular tempo de resposta
             process_time = time.time() - start_time
             response_time_ms = round(process_time * 1000, 2)
-
-            # Coletar métricas se deve rastrear
-            if should_track:
-                await self._track_performance_metrics(
+            status_code = response.status_code if response else 500
+            route = self._route_template(request)
+            trace = current_trace()
+            end_trace(trace_token)
+
+            # Erros e requisições lentas são sempre gravados
+            sampling_reason = self.sampler.decide(
+                trace_id, route, status_code, response_time_ms, error_occurred
+            )
+            if sampling_reason:
+                self._track_performance_metrics(
                     endpoint=endpoint,
                     method=method,
                     response_time_ms=response_time_ms,
-                    status_code=response.status_code if response else 500,
+                    status_code=status_code,
                     error_occurred=error_occurred,
                     error_type=error_type,
                     user_agent=user_agent,
-                    tenant_id=tenant_id
+                    tenant_id=tenant_id,
+                    trace_id=trace_id,
+                    sampling_reason=sampling_reason,
+                    sample_rate=self.sampler.rate_for(route),
                 )
+                self._flush_trace(trace)
 
         # Adicionar headers de performance
         if response:
             response.headers["X-Response-Time"] = str(response_time_ms)
-            response.headers["X-Request-ID"] = str(self.request_count)
+            response.headers["X-Request-ID"] = trace_id
 
         return response
 
+    @staticmethod
+    def _route_template(request: Request) -> str:
+        """
+        Retorna o template da rota (ex.: /v1/partner/{id}) atendida.
+
+        Caminhos sem rota correspondente são agrupados para não criar uma
+        série de métricas por URL inexistente.
+        """
+        route = request.scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+
     async def _extract_tenant_id(self, request: Request) -> str | None:
         """
         Extrai o tenant_id da requisição.
@@ -142,7 +173,7 @@ class PerformanceMiddleware(BaseHTTPMiddleware):
             logger.warning(f"Erro ao extrair tenant_id: {str(e)}")
             return None
 
-    async def _track_performance_metrics(
+    def _track_performance_metrics(
         self,
         endpoint: str,
         method: str,
@@ -151,10 +182,17 @@ class PerformanceMiddleware(BaseHTTPMiddleware):
         error_occurred: bool,
         error_type: str | None,
         user_agent: str,
-        tenant_id: str | None
+        tenant_id: str | None,
+        trace_id: str | None = None,
+        sampling_reason: str | None = None,
+        sample_rate: float | None = None,
     ):
         """
-        Rastreia métricas de performance no Firebase Analytics.
+        Enfileira as métricas de performance para o Firebase Analytics.
+
+        Não faz I/O: os eventos são gravados em lote em segundo plano.
+        `sample_rate` permite reponderar as contagens das requisições
+        amostradas (`sampling_reason` "sampled").
 
         Args:
             endpoint: Endpoint da requisição
@@ -165,8 +203,17 @@ class PerformanceMiddleware(BaseHTTPMiddleware):
             error_type: Tipo do erro (se houver)
             user_agent: User agent do cliente
             tenant_id: ID do tenant
+            trace_id: ID do trace da requisição
+            sampling_reason: Motivo da gravação (error, slow ou sampled)
+            sample_rate: Taxa de amostragem da rota
         """
         try:
+            sampling = {
+                "trace_id": trace_id,
+                "sampling_reason": sampling_reason,
+                "sample_rate": sample_rate,
+            }
+
             # Classificar endpoint (público, admin, student, etc.)
             endpoint_category = self._classify_endpoint(endpoint)
 
@@ -174,7 +221,7 @@ class PerformanceMiddleware(BaseHTTPMiddleware):
             performance_category = self._classify_performance(response_time_ms)
 
             # Evento de performance básico
-            await analytics_client.track_event(
+            analytics_client.enqueue_event(
                 "endpoint_performance",
                 {
                     "endpoint": endpoint,
@@ -184,14 +231,15 @@ class PerformanceMiddleware(BaseHTTPMiddleware):
                     "endpoint_category": endpoint_category,
                     "performance_category": performance_category,
                     "user_agent_type": self._classify_user_agent(user_agent),
-                    "timestamp": datetime.utcnow().isoformat()
+                    "timestamp": datetime.utcnow().isoformat(),
+                    **sampling,
                 },
                 tenant_id=tenant_id
             )
 
             # Evento de erro (se houver)
             if error_occurred:
-                await analytics_client.track_event(
+                analytics_client.enqueue_event(
                     "endpoint_error",
                     {
                         "endpoint": endpoint,
@@ -200,23 +248,25 @@ class PerformanceMiddleware(BaseHTTPMiddleware):
                         "status_code": status_code,
                         "response_time": response_time_ms,
                         "endpoint_category": endpoint_category,
-                        "timestamp": datetime.utcnow().isoformat()
+                        "timestamp": datetime.utcnow().isoformat(),
+                        **sampling,
                     },
                     tenant_id=tenant_id
                 )
 
             # Métricas específicas para endpoints críticos
             if endpoint_category in ["admin", "student_auth", "code_redemption"]:
-                await analytics_client.track_event(
+                analytics_client.enqueue_event(
                     "critical_endpoint_performance",
                     {
                         "endpoint": endpoint,
                         "method": method,
                         "response_time": response_time_ms,
                         "status_code": status_code,
-                        "is_slow": response_time_ms > 1000,  # > 1 segundo
+                        "is_slow": response_time_ms >= self.sampler.slow_ms,
                         "is_error": error_occurred,
-                        "timestamp": datetime.utcnow().isoformat()
+                        "timestamp": datetime.utcnow().isoformat(),
+                        **sampling,
                     },
                     tenant_id=tenant_id
                 )
@@ -225,6 +275,18 @@ class PerformanceMiddleware(BaseHTTPMiddleware):
             # Não falhar a requisição por erro no tracking
             logger.warning(f"Erro ao rastrear métricas de performance: {str(e)}")
 
+    @staticmethod
+    def _flush_trace(trace) -> None:
+        """Enfileira os spans guardados no trace de uma requisição mantida."""
+        if trace is None:
+            return
+        for event_name, parameters, tenant_id in trace.spans:
+            analytics_client.enqueue_event(event_name, parameters, tenant_id=tenant_id)
+        if trace.dropped_spans:
+            logger.debug(
+                f"Trace {trace.trace_id}: {trace.dropped_spans} spans descartados"
+            )
+
     def _classify_endpoint(self, endpoint: str) -> str:
         """
         Classifica o endpoint por categoria.
@@ -299,6 +361,22 @@ class PerformanceMiddleware(BaseHTTPMiddleware):
             return "unknown"
 
 
+def _record_span(
+    event_name: str, parameters: dict, tenant_id: str | None = None
+) -> None:
+    """
+    Registra um span de operação (banco, cache, API externa).
+
+    Dentro de uma requisição, o span fica no trace e é gravado apenas se a
+    requisição for mantida pela amostragem; fora dela, é enfileirado direto.
+    """
+    trace = current_trace()
+    if trace is not None:
+        trace.add_span(event_name, parameters, tenant_id)
+    else:
+        analytics_client.enqueue_event(event_name, parameters, tenant_id=tenant_id)
+
+
 class DatabasePerformanceTracker:
     """
     Tracker para métricas de performance de banco de dados.
@@ -336,7 +414,7 @@ class DatabasePerformanceTracker:
         duration_ms = round((time.time() - self.start_time) * 1000, 2)
 
         try:
-            await analytics_client.track_event(
+            _record_span(
                 "database_operation",
                 {
                     "operation": self.operation,
@@ -374,7 +452,7 @@ async def track_database_operation(
         tenant_id: ID do tenant
     """
     try:
-        await analytics_client.track_event(
+        _record_span(
             "database_operation",
             {
                 "operation": operation,
@@ -408,7 +486,7 @@ async def track_cache_operation(
         tenant_id: ID do tenant
     """
     try:
-        await analytics_client.track_event(
+        _record_span(
             "cache_operation",
             {
                 "operation": operation,
@@ -445,7 +523,7 @@ async def track_external_api_call(
         tenant_id: ID do tenant
     """
     try:
-        await analytics_client.track_event(
+        _record_span(
             "external_api_call",
             {
                 "api_name": api_name,
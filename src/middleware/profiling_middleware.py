@@ -0,0 +1,96 @@
+"""
+Middleware de profiling sob demanda.
+
+Uma requisição é perfilada quando traz o cabeçalho `X-Profile` (valor
+`cprofile` ou `sample`) com um token de admin, ou quando é sorteada por
+PROFILING_SAMPLE_RATE (modo `sample`). O ID do perfil volta no cabeçalho
+`X-Profile-ID` e o relatório é lido em `/admin/metrics/profiles/{id}`.
+Com PROFILING_ENABLED desligado o middleware não é registrado.
+"""
+
+import random
+from collections.abc import Callable
+
+from fastapi import HTTPException, Request, Response
+from fastapi.security import HTTPAuthorizationCredentials
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from src.auth import get_current_user
+from src.config import PROFILING_SAMPLE_RATE
+from src.utils import logger
+from src.utils.profiling import MODES, RequestProfiler, request_profiler
+from src.utils.sampling import extract_trace_id
+
+
+class ProfilingMiddleware(BaseHTTPMiddleware):
+    """Perfila requisições pedidas por admins ou sorteadas."""
+
+    def __init__(
+        self,
+        app,
+        profiler: RequestProfiler = request_profiler,
+        sample_rate: float = PROFILING_SAMPLE_RATE,
+    ):
+        """
+        Inicializa o middleware de profiling.
+
+        Args:
+            app: Aplicação FastAPI
+            profiler: Controle de perfis ativos e guardados
+            sample_rate: Fração (0 a 1) das requisições perfiladas sem pedido
+        """
+        super().__init__(app)
+        self.profiler = profiler
+        self.sample_rate = sample_rate
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        """
+        Processa a requisição, perfilando-a quando pedida ou sorteada.
+
+        Args:
+            request: Requisição HTTP
+            call_next: Próximo middleware/handler
+
+        Returns:
+            Response: Resposta HTTP (com X-Profile-ID se perfilada)
+        """
+        requested = request.headers.get("x-profile")
+        if requested is not None:
+            # Pedido de não-admin é ignorado sem indicar o motivo
+            if not await self._is_admin(request):
+                return await call_next(request)
+            mode = requested if requested in MODES else "cprofile"
+        elif self.sample_rate and random.random() < self.sample_rate:
+            mode = "sample"
+        else:
+            return await call_next(request)
+
+        session = self.profiler.start(extract_trace_id(request.headers), mode)
+        if session is None:
+            logger.info("Profiling ignorado: limite de perfis simultâneos atingido")
+            return await call_next(request)
+
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+        finally:
+            route = getattr(request.scope.get("route"), "path", None) or "unmatched"
+            session.finish(route, request.method, status_code)
+
+        response.headers["X-Profile-ID"] = session.profile_id
+        return response
+
+    @staticmethod
+    async def _is_admin(request: Request) -> bool:
+        """Verifica se o token da requisição é de um admin."""
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return False
+        try:
+            user = await get_current_user(
+                HTTPAuthorizationCredentials(scheme=scheme, credentials=token)
+            )
+        except HTTPException:
+            return False
+        return user.role == "admin"
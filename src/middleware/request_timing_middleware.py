@@ -0,0 +1,104 @@
+"""
+Middleware de tempos por fase (Server-Timing) e orçamento de leituras.
+
+Abre o registro de `src.utils.request_timing` em cada requisição e, no fim,
+devolve o resumo no cabeçalho `Server-Timing`, registra uma linha de log com
+as fases, leituras/escritas, retries e fallbacks, e avisa quando a rota passa
+do orçamento de leituras no banco (regressões N+1). A duração de cada
+requisição entra no histograma `request_latency` (em memória, sem escrita no
+Firestore, independente do PerformanceMiddleware).
+"""
+
+import time
+from collections.abc import Callable
+
+from fastapi import Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from src.utils import logger
+from src.utils.histograms import db_budget_exceeded, request_latency
+from src.utils.request_timing import (
+    current_timing,
+    end_request_timing,
+    start_request_timing,
+)
+
+
+class RequestTimingMiddleware(BaseHTTPMiddleware):
+    """Server-Timing, log de tempos, latência e orçamento de leituras por rota."""
+
+    def __init__(self, app, read_budgets: dict[str, int] | None = None):
+        """
+        Inicializa o middleware.
+
+        Args:
+            app: Aplicação FastAPI
+            read_budgets: Máximo de leituras no banco por template de rota
+        """
+        super().__init__(app)
+        self.read_budgets = read_budgets or {}
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        """
+        Processa a requisição registrando os tempos por fase.
+
+        Args:
+            request: Requisição HTTP
+            call_next: Próximo middleware/handler
+
+        Returns:
+            Response: Resposta com o cabeçalho Server-Timing
+        """
+        start = time.perf_counter()
+        token = start_request_timing()
+        timing = current_timing()
+        try:
+            response = await call_next(request)
+        except Exception:
+            self._observe(request, start, 500)
+            raise
+        finally:
+            end_request_timing(token)
+
+        route = self._observe(request, start, response.status_code)
+        summary = timing.summary()
+        response.headers["Server-Timing"] = timing.server_timing()
+        logger.info(
+            f"Tempos da requisição {request.method} {route}",
+            extra={
+                "route": route,
+                "method": request.method,
+                "status_code": response.status_code,
+                **summary,
+            },
+        )
+
+        budget = self.read_budgets.get(route)
+        if budget is not None and timing.db_reads > budget:
+            db_budget_exceeded.inc(route=route)
+            logger.warning(
+                f"Rota {route} excedeu o orçamento de leituras: "
+                f"{timing.db_reads} > {budget}",
+                extra={"route": route, "db_reads": timing.db_reads, "budget": budget},
+            )
+        return response
+
+    @staticmethod
+    def _observe(request: Request, start: float, status_code: int) -> str:
+        """
+        Registra a duração da requisição no histograma de latência.
+
+        Caminhos sem rota correspondente são agrupados em "unmatched" para
+        não criar uma série por URL inexistente.
+
+        Returns:
+            Template da rota atendida
+        """
+        route = getattr(request.scope.get("route"), "path", None) or "unmatched"
+        request_latency.observe(
+            time.perf_counter() - start,
+            route=route,
+            method=request.method,
+            status_class=f"{status_code // 100}xx",
+        )
+        return route
@@ -16,6 +16,7 @@ from .benefit import (
     Benefit,
     BenefitAudience,
     BenefitCreationDTO,
+    BenefitDTO,
     BenefitFirestoreDTO,
     BenefitListResponse,
     BenefitResponse,
@@ -179,6 +180,7 @@ class PartnerListResponse(BaseResponse):
     """Modelo para resposta de listagem de parceiros."""
 
     data: list[Partner]
+    next_cursor: str | None = None
 
 
 class PartnerDetailResponse(BaseResponse):
@@ -255,6 +257,7 @@ __all__ = [
     "PartnerCategory",
     "Benefit",
     "BenefitCreationDTO",
+    "BenefitDTO",
     "BenefitFirestoreDTO",
     "BenefitType",
     "BenefitValueType",
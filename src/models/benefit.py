@@ -4,6 +4,7 @@ Modelos Pydantic para Benefícios do sistema KNN Benefits.
 
 from datetime import datetime
 from enum import Enum
+from typing import Any
 
 from pydantic import BaseModel, Field, field_validator, model_validator
 from pytz import UTC
@@ -221,3 +222,131 @@ class BenefitFirestoreDTO(BaseModel):
             created_at=self.created_at,
             updated_at=self.updated_at,
         )
+
+
+# Data usada quando o benefício não tem data de término ('valid_until' nulo)
+OPEN_ENDED_VALID_TO = datetime(9999, 12, 31, tzinfo=UTC)
+
+
+def normalize_audience(audience: Any) -> list[BenefitAudience]:
+    """
+    Normaliza o público-alvo gravado no Firestore.
+
+    Aceita os formatos existentes: 'students', 'employees', 'all', valores
+    no singular, listas e strings separadas por vírgula.
+
+    Args:
+        audience: Valor de `system.audience` (ou `audience`) do documento
+
+    Returns:
+        Lista de públicos sem repetição, na ordem student, employee
+    """
+    if isinstance(audience, str):
+        values = audience.split(",")
+    elif isinstance(audience, list | tuple | set | frozenset):
+        values = audience
+    else:
+        values = []
+
+    result: set[BenefitAudience] = set()
+    for value in values:
+        raw = value.value if isinstance(value, Enum) else value
+        text = str(raw).strip().lower()
+        if text == "all":
+            result.update((BenefitAudience.STUDENT, BenefitAudience.EMPLOYEE))
+        elif "student" in text:
+            result.add(BenefitAudience.STUDENT)
+        elif "employee" in text:
+            result.add(BenefitAudience.EMPLOYEE)
+
+    return [
+        a for a in (BenefitAudience.STUDENT, BenefitAudience.EMPLOYEE) if a in result
+    ]
+
+
+def _parse_datetime(value: Any) -> datetime | None:
+    """Converte datas do Firestore (datetime, ISO string ou export) em datetime."""
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    elif isinstance(value, dict) and "_seconds" in value:
+        parsed = datetime.fromtimestamp(value["_seconds"], tz=UTC)
+    else:
+        return None
+
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=UTC)
+    return parsed
+
+
+class BenefitDTO(BaseModel):
+    """
+    Benefício armazenado como campo BNF_* do documento do parceiro.
+
+    Na coleção 'benefits', cada documento pertence a um parceiro e contém um
+    mapa por benefício com os subdocumentos `system`, `configuration`,
+    `dates` e `metadata`.
+    """
+
+    key: str
+    benefit_data: dict[str, Any]
+    partner_id: str
+
+    @property
+    def system(self) -> dict[str, Any]:
+        """Subdocumento `system` (status, público, categoria)."""
+        system = self.benefit_data.get("system")
+        return system if isinstance(system, dict) else {}
+
+    @property
+    def status(self) -> str:
+        """Status do benefício ('active', 'inactive', ...)."""
+        return str(self.system.get("status", ""))
+
+    @property
+    def category(self) -> str:
+        """Categoria do benefício definida em `system.category`."""
+        return str(self.system.get("category") or "")
+
+    @property
+    def audience(self) -> list[BenefitAudience]:
+        """Público-alvo normalizado."""
+        return normalize_audience(self.system.get("audience"))
+
+    def to_benefit(self) -> Benefit:
+        """
+        Converte o mapa do Firestore para o modelo de domínio Benefit.
+
+        Returns:
+            Uma instância do modelo Benefit.
+        """
+        data = self.benefit_data
+        configuration = data.get("configuration") or {}
+        dates = data.get("dates") or {}
+        metadata = data.get("metadata") or {}
+
+        now = datetime.now(UTC)
+        created_at = _parse_datetime(dates.get("created_at")) or now
+        valid_from = _parse_datetime(dates.get("valid_from")) or created_at
+
+        return Benefit(
+            id=self.key,
+            tenant_id=self.system.get("tenant_id", ""),
+            partner_id=self.partner_id,
+            title=data.get("title", ""),
+            description=data.get("description", ""),
+            value=configuration.get("value", 0),
+            value_type=configuration.get("value_type", BenefitValueType.PERCENTAGE),
+            tags=metadata.get("tags") or [],
+            type=self.system.get("type", BenefitType.DISCOUNT),
+            valid_from=valid_from,
+            valid_to=_parse_datetime(dates.get("valid_until")) or OPEN_ENDED_VALID_TO,
+            active=self.status == BenefitStatus.ACTIVE,
+            audience=self.audience,
+            created_at=created_at,
+            updated_at=_parse_datetime(dates.get("updated_at")) or created_at,
+        )
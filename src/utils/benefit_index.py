@@ -0,0 +1,348 @@
+"""
+Índice materializado de benefícios por tenant.
+
+Os benefícios ficam na coleção 'benefits' como campos BNF_* do documento de
+cada parceiro. Em vez de percorrer todos os campos e reavaliar status e
+público em cada requisição, o índice converte cada benefício uma única vez
+e o distribui em grupos (público, categoria, status). As listagens passam a
+ser uma busca no grupo seguida de fatiamento.
+
+O índice é construído na primeira leitura do tenant, reconstruído após
+CATALOG_CACHE_TTL segundos (para refletir escritas de outras instâncias) e
+atualizado incrementalmente pelos endpoints administrativos de benefícios.
+"""
+
+import asyncio
+import time
+from typing import Any
+
+from src.config import CATALOG_CACHE_TTL
+from src.db import firestore_client
+from src.models.benefit import (
+    Benefit,
+    BenefitAudience,
+    BenefitDTO,
+    BenefitFirestoreDTO,
+    normalize_audience,
+)
+from src.utils.catalog_cache import catalog_cache
+from src.utils.logging import logger
+
+# Limite de documentos da coleção 'benefits' lidos por tenant
+MAX_BENEFIT_DOCUMENTS = 1000
+
+# Chave de categoria usada para consultas sem filtro de categoria
+ANY_CATEGORY = "*"
+
+
+class IndexedBenefit:
+    """Benefício já convertido, com os atributos usados pelo índice."""
+
+    __slots__ = ("partner_id", "key", "status", "category", "audience", "benefit")
+
+    def __init__(
+        self,
+        partner_id: str,
+        key: str,
+        status: str,
+        category: str,
+        audience: list[BenefitAudience],
+        benefit: Benefit,
+    ):
+        self.partner_id = partner_id
+        self.key = key
+        self.status = status
+        self.category = category
+        self.audience = audience
+        self.benefit = benefit
+
+    def buckets(self) -> list[tuple[str, str, str]]:
+        """Grupos (público, categoria, status) em que o benefício aparece."""
+        result = []
+        for audience in self.audience:
+            result.append((audience.value, ANY_CATEGORY, self.status))
+            if self.category:
+                result.append((audience.value, self.category, self.status))
+        return result
+
+
+def _to_indexed(
+    partner_id: str, key: str, benefit_data: dict[str, Any]
+) -> IndexedBenefit | None:
+    """
+    Converte um benefício do Firestore para entrada do índice.
+
+    Aceita o formato aninhado (campo BNF_* com `system`) e o formato plano
+    gravado por `POST /admin/benefits` (BenefitFirestoreDTO).
+    """
+    try:
+        if isinstance(benefit_data.get("system"), dict):
+            dto = BenefitDTO(key=key, benefit_data=benefit_data, partner_id=partner_id)
+            return IndexedBenefit(
+                partner_id=partner_id,
+                key=key,
+                status=dto.status,
+                category=dto.category.lower(),
+                audience=dto.audience,
+                benefit=dto.to_benefit(),
+            )
+
+        flat = BenefitFirestoreDTO(**benefit_data)
+        return IndexedBenefit(
+            partner_id=flat.partner_id,
+            key=key,
+            status=flat.status.value,
+            category=str(benefit_data.get("category") or "").lower(),
+            audience=normalize_audience(flat.audience),
+            benefit=flat.to_benefit(key),
+        )
+    except Exception as e:
+        logger.error(f"Erro ao indexar benefício {key} do parceiro {partner_id}: {e}")
+        return None
+
+
+def _iter_benefits(doc: dict[str, Any]):
+    """Itera (partner_id, chave, dados) dos benefícios de um documento."""
+    doc_id = doc.get("id", "")
+    if doc_id.startswith("BNF_") and "partner_id" in doc:
+        # Benefício gravado como documento próprio (formato plano)
+        yield doc["partner_id"], doc_id, doc
+        return
+
+    for key, benefit_data in doc.items():
+        is_benefit = isinstance(key, str) and key.startswith("BNF_")
+        if is_benefit and isinstance(benefit_data, dict):
+            yield doc_id, key, benefit_data
+
+
+class TenantBenefitIndex:
+    """Índice de benefícios de um tenant."""
+
+    def __init__(self):
+        self.built_at = time.monotonic()
+        self._by_partner: dict[str, dict[str, IndexedBenefit]] = {}
+        self._buckets: dict[tuple[str, str, str], dict[tuple[str, str], Benefit]] = {}
+
+    @classmethod
+    def from_documents(cls, docs: list[dict[str, Any]]) -> "TenantBenefitIndex":
+        """
+        Constrói o índice a partir dos documentos da coleção 'benefits'.
+
+        Args:
+            docs: Documentos (com 'id') retornados pelo Firestore
+
+        Returns:
+            Índice preenchido
+        """
+        index = cls()
+        for doc in docs:
+            for partner_id, key, benefit_data in _iter_benefits(doc):
+                index.upsert(partner_id, key, benefit_data)
+        return index
+
+    def __len__(self) -> int:
+        return sum(len(benefits) for benefits in self._by_partner.values())
+
+    def upsert(self, partner_id: str, key: str, benefit_data: dict[str, Any]) -> bool:
+        """
+        Insere ou substitui um benefício no índice.
+
+        Returns:
+            True se o benefício foi indexado, False se a conversão falhou
+        """
+        self.remove(partner_id, key)
+        entry = _to_indexed(partner_id, key, benefit_data)
+        if entry is None:
+            return False
+
+        self._by_partner.setdefault(entry.partner_id, {})[key] = entry
+        for bucket in entry.buckets():
+            self._buckets.setdefault(bucket, {})[(entry.partner_id, key)] = (
+                entry.benefit
+            )
+        return True
+
+    def remove(self, partner_id: str, key: str) -> bool:
+        """
+        Remove um benefício do índice.
+
+        Returns:
+            True se o benefício existia
+        """
+        entry = self._by_partner.get(partner_id, {}).pop(key, None)
+        if entry is None:
+            return False
+
+        for bucket in entry.buckets():
+            members = self._buckets.get(bucket)
+            if members is not None:
+                members.pop((partner_id, key), None)
+                if not members:
+                    del self._buckets[bucket]
+        if not self._by_partner[partner_id]:
+            del self._by_partner[partner_id]
+        return True
+
+    def query(
+        self,
+        audience: str,
+        category: str | None = None,
+        status: str = "active",
+        partner_ids: set[str] | None = None,
+    ) -> list[Benefit]:
+        """
+        Lista benefícios de um público.
+
+        Args:
+            audience: 'student' ou 'employee'
+            category: Categoria (sem diferenciar maiúsculas) ou None para todas
+            status: Status do benefício
+            partner_ids: Restringe a estes parceiros (ex.: apenas ativos)
+
+        Returns:
+            Benefícios na ordem de indexação
+        """
+        bucket = (audience, category.lower() if category else ANY_CATEGORY, status)
+        members = self._buckets.get(bucket, {})
+        if partner_ids is None:
+            return list(members.values())
+        return [
+            benefit
+            for (partner_id, _key), benefit in members.items()
+            if partner_id in partner_ids
+        ]
+
+    def partner_benefits(
+        self, partner_id: str, audience: str, status: str = "active"
+    ) -> list[Benefit]:
+        """Lista os benefícios de um parceiro para um público."""
+        return [
+            entry.benefit
+            for entry in self._by_partner.get(partner_id, {}).values()
+            if entry.status == status
+            and any(a.value == audience for a in entry.audience)
+        ]
+
+
+class BenefitIndexRegistry:
+    """Mantém um índice de benefícios por tenant."""
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._indexes: dict[str, TenantBenefitIndex] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._builds = 0
+        self._incremental_updates = 0
+
+    async def get(self, tenant_id: str) -> TenantBenefitIndex:
+        """
+        Retorna o índice do tenant, construindo-o quando ausente ou expirado.
+
+        Args:
+            tenant_id: ID do tenant
+
+        Returns:
+            Índice de benefícios do tenant
+        """
+        index = self._indexes.get(tenant_id)
+        if index is not None and not self._expired(index):
+            return index
+
+        lock = self._locks.setdefault(tenant_id, asyncio.Lock())
+        async with lock:
+            index = self._indexes.get(tenant_id)
+            if index is not None and not self._expired(index):
+                return index
+
+            result = await firestore_client.query_documents(
+                "benefits",
+                tenant_id=tenant_id,
+                limit=MAX_BENEFIT_DOCUMENTS,
+                count_total=False,
+            )
+            index = TenantBenefitIndex.from_documents(result.get("items", []))
+            if self.ttl_seconds > 0:
+                self._indexes[tenant_id] = index
+            self._builds += 1
+            logger.info(
+                f"Índice de benefícios construído: tenant={tenant_id} "
+                f"benefícios={len(index)}"
+            )
+            return index
+
+    def _expired(self, index: TenantBenefitIndex) -> bool:
+        return time.monotonic() - index.built_at >= self.ttl_seconds
+
+    def upsert_benefit(
+        self, tenant_id: str, partner_id: str, key: str, benefit_data: dict[str, Any]
+    ) -> None:
+        """Aplica a criação/atualização de um benefício ao índice do tenant."""
+        index = self._indexes.get(tenant_id)
+        if index is not None:
+            index.upsert(partner_id, key, benefit_data)
+            self._incremental_updates += 1
+
+    def remove_benefit(self, tenant_id: str, partner_id: str, key: str) -> None:
+        """Aplica a remoção de um benefício ao índice do tenant."""
+        index = self._indexes.get(tenant_id)
+        if index is not None:
+            index.remove(partner_id, key)
+            self._incremental_updates += 1
+
+    def invalidate(self, tenant_id: str | None = None) -> None:
+        """Descarta o índice do tenant (ou de todos) para reconstrução."""
+        if tenant_id is None:
+            self._indexes.clear()
+        else:
+            self._indexes.pop(tenant_id, None)
+
+    def stats(self) -> dict[str, Any]:
+        """Retorna contadores do índice para monitoramento."""
+        return {
+            "tenants": len(self._indexes),
+            "benefits": sum(len(index) for index in self._indexes.values()),
+            "builds": self._builds,
+            "incremental_updates": self._incremental_updates,
+        }
+
+
+# Instância global do índice de benefícios
+benefit_index = BenefitIndexRegistry(ttl_seconds=CATALOG_CACHE_TTL)
+
+
+async def list_audience_benefits(
+    tenant_id: str, audience: str, category: str | None = None
+) -> list[Benefit]:
+    """
+    Lista os benefícios ativos de parceiros ativos para um público.
+
+    Função compartilhada pelos endpoints de student e employee.
+
+    Args:
+        tenant_id: ID do tenant
+        audience: 'student' ou 'employee'
+        category: Filtro opcional por categoria do benefício
+
+    Returns:
+        Benefícios na ordem de indexação
+    """
+
+    async def load_active_partners():
+        return await firestore_client.query_documents(
+            "partners",
+            tenant_id=tenant_id,
+            filters=[("active", "==", True)],
+            limit=500,
+            offset=0,
+            count_total=False,
+        )
+
+    partners_result = await catalog_cache.get_or_load(
+        tenant_id, "partners", "active_ids", load_active_partners
+    )
+    active_partner_ids = {
+        p.get("id") for p in partners_result.get("items", []) if p.get("id")
+    }
+
+    index = await benefit_index.get(tenant_id)
+    return index.query(audience, category=category, partner_ids=active_partner_ids)
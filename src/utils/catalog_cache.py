@@ -0,0 +1,175 @@
+"""
+Cache em memória do catálogo (parceiros e benefícios) por tenant.
+
+O catálogo muda apenas quando administradores escrevem nas coleções
+`partners` e `benefits`, mas é lido em quase toda requisição de alunos e
+funcionários. Este cache read-through mantém os resultados do Firestore em
+memória por um TTL curto, com limite de entradas (LRU) e invalidação
+explícita chamada pelos endpoints de escrita e pelo serviço de sincronização.
+
+Os valores retornados são compartilhados entre requisições e não devem ser
+modificados pelo chamador.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+from src.config import CATALOG_CACHE_MAX_ENTRIES, CATALOG_CACHE_TTL
+from src.utils.logging import logger
+
+
+class CatalogCache:
+    """Cache read-through com TTL, limite de tamanho e invalidação por tenant."""
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        self._pending: dict[tuple, asyncio.Future] = {}
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Indica se o cache está ativo (TTL e tamanho positivos)."""
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    async def get_or_load(
+        self,
+        tenant_id: str,
+        collection: str,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """
+        Retorna o valor em cache ou executa o loader e armazena o resultado.
+
+        Requisições concorrentes para a mesma chave aguardam uma única
+        execução do loader. Exceções do loader não são armazenadas.
+
+        Args:
+            tenant_id: ID do tenant dono dos dados
+            collection: Coleção de origem ('partners' ou 'benefits'), usada
+                na invalidação
+            key: Identificador da consulta dentro da coleção
+            loader: Corrotina sem argumentos que busca os dados na origem
+
+        Returns:
+            Valor carregado ou em cache
+        """
+        if not self.enabled:
+            return await loader()
+
+        cache_key = (tenant_id, collection, key)
+        entry = self._entries.get(cache_key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(cache_key)
+            self._hits += 1
+            return entry[1]
+
+        self._misses += 1
+        pending = self._pending.get(cache_key)
+        if pending is not None:
+            self._coalesced += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[cache_key] = future
+        generation = self._generation
+        try:
+            value = await loader()
+        except BaseException as e:
+            future.set_exception(e)
+            # Evita o aviso "exception was never retrieved" sem aguardadores
+            future.exception()
+            raise
+        finally:
+            self._pending.pop(cache_key, None)
+
+        future.set_result(value)
+        # Uma invalidação durante o carregamento torna o valor obsoleto
+        if generation == self._generation:
+            self._store(cache_key, value)
+        return value
+
+    def _store(self, cache_key: tuple, value: Any) -> None:
+        """Armazena um valor respeitando o limite de entradas (LRU)."""
+        self._entries[cache_key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def invalidate(
+        self, tenant_id: str | None = None, collection: str | None = None
+    ) -> int:
+        """
+        Remove entradas do cache.
+
+        Args:
+            tenant_id: Tenant afetado (None para todos)
+            collection: Coleção afetada (None para todas)
+
+        Returns:
+            Número de entradas removidas
+        """
+        self._generation += 1
+        self._invalidations += 1
+        keys = [
+            cache_key
+            for cache_key in self._entries
+            if (tenant_id is None or cache_key[0] == tenant_id)
+            and (collection is None or cache_key[1] == collection)
+        ]
+        for cache_key in keys:
+            del self._entries[cache_key]
+
+        logger.info(
+            f"Cache do catálogo invalidado: tenant={tenant_id or '*'} "
+            f"coleção={collection or '*'} entradas={len(keys)}"
+        )
+        return len(keys)
+
+    def clear(self) -> None:
+        """Remove todas as entradas e zera os contadores."""
+        self._entries.clear()
+        self._generation += 1
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Retorna contadores do cache para monitoramento.
+
+        Returns:
+            Dict com hits, misses, hit_rate, tamanho e configuração
+        """
+        lookups = self._hits + self._misses
+        return {
+            "enabled": self.enabled,
+            "ttl_seconds": self.ttl_seconds,
+            "max_entries": self.max_entries,
+            "entries": len(self._entries),
+            "hits": self._hits,
+            "misses": self._misses,
+            "coalesced": self._coalesced,
+            "evictions": self._evictions,
+            "invalidations": self._invalidations,
+            "hit_rate": round(self._hits / lookups * 100, 2) if lookups else 0.0,
+        }
+
+
+# Instância global do cache do catálogo
+catalog_cache = CatalogCache(
+    ttl_seconds=CATALOG_CACHE_TTL, max_entries=CATALOG_CACHE_MAX_ENTRIES
+)
@@ -0,0 +1,214 @@
+"""
+Alocação de códigos de validação sem colisões.
+
+Cada código é reservado de forma atômica (criação condicional no Firestore,
+`INSERT ... ON CONFLICT DO NOTHING` na contingência PostgreSQL): se o código
+sorteado já existe, outro é sorteado, até um número limitado de tentativas.
+Nenhuma reserva sobrescreve o código de outro usuário.
+
+O espaço de códigos é particionado por tenant e parceiro: o ID do documento
+combina os dois com o código, e o resgate resolve o mesmo ID a partir do
+parceiro autenticado. Como os sorteios são uniformes, a taxa de colisão
+recente de uma partição estima a fração ocupada do seu espaço de códigos.
+
+Cada reserva incrementa o contador de códigos gerados do parceiro no dia
+(`src.utils.code_counters`).
+"""
+
+import secrets
+from collections import OrderedDict, deque
+from typing import Any
+
+from src.config import (
+    VALIDATION_CODE_DIGITS,
+    VALIDATION_CODE_MAX_ATTEMPTS,
+    VALIDATION_CODE_OCCUPANCY_ALERT,
+)
+from src.db import firestore_client, postgres_client, with_circuit_breaker
+from src.db.circuit_breaker import BackendUnavailableError
+from src.utils.code_counters import code_counters
+from src.utils.logging import logger
+
+COLLECTION = "validation_codes"
+
+
+class CodeSpaceExhaustedError(Exception):
+    """Todas as tentativas de reserva colidiram com códigos existentes."""
+
+
+class ValidationCodeAllocator:
+    """Reserva códigos numéricos únicos por (tenant, parceiro)."""
+
+    def __init__(
+        self,
+        digits: int,
+        max_attempts: int,
+        occupancy_alert: float,
+        window: int = 1000,
+        max_shards: int = 1000,
+    ):
+        self.digits = digits
+        self.max_attempts = max_attempts
+        self.occupancy_alert = occupancy_alert
+        self.window = window
+        self.max_shards = max_shards
+        self._shards: OrderedDict[str, dict[str, Any]] = OrderedDict()
+
+    @property
+    def keyspace(self) -> int:
+        """Quantidade de códigos possíveis por partição."""
+        return 10**self.digits
+
+    @staticmethod
+    def doc_id(tenant_id: str, partner_id: str, code: str) -> str:
+        """ID do documento do código na partição (tenant, parceiro)."""
+        return f"{tenant_id}_{partner_id}_{code}"
+
+    def generate_code(self) -> str:
+        """Sorteia um código com `digits` dígitos (gerador criptográfico)."""
+        return f"{secrets.randbelow(self.keyspace):0{self.digits}d}"
+
+    async def reserve(
+        self, tenant_id: str, partner_id: str, data: dict[str, Any]
+    ) -> tuple[str, str]:
+        """
+        Reserva um código livre e grava o documento do código.
+
+        Args:
+            tenant_id: Tenant do usuário
+            partner_id: Parceiro para o qual o código vale
+            data: Campos do documento (sem o ID)
+
+        Returns:
+            Tupla (código, ID do documento)
+
+        Raises:
+            CodeSpaceExhaustedError: Todas as tentativas colidiram
+            BackendUnavailableError: A gravação não pôde ser confirmada
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            code = self.generate_code()
+            doc_id = self.doc_id(tenant_id, partner_id, code)
+
+            async def create_firestore(doc_id=doc_id):
+                return await firestore_client.create_document_if_absent(
+                    COLLECTION, dict(data), doc_id
+                )
+
+            async def create_postgres(doc_id=doc_id):
+                return await postgres_client.insert_if_absent(
+                    COLLECTION, {**data, "id": doc_id}
+                )
+
+            created = await with_circuit_breaker(
+                create_firestore, create_postgres, breaker=(COLLECTION, "write")
+            )
+            if created is not True and created is not False:
+                # Só True confirma a gravação; qualquer outro retorno não
+                # garante que o código exista para ser resgatado
+                raise BackendUnavailableError(
+                    "Reserva de código de validação não confirmada pelo banco"
+                )
+            self._record(tenant_id, partner_id, collided=not created)
+            if created:
+                if attempt > 1:
+                    logger.info(
+                        f"Código de validação reservado após {attempt} tentativas "
+                        f"(tenant={tenant_id}, parceiro={partner_id})"
+                    )
+                await code_counters.record_generated(
+                    tenant_id, partner_id, data.get("created_at")
+                )
+                return code, doc_id
+
+        self._shard(tenant_id, partner_id)["exhausted"] += 1
+        logger.error(
+            f"Espaço de códigos esgotado após {self.max_attempts} tentativas "
+            f"(tenant={tenant_id}, parceiro={partner_id})"
+        )
+        raise CodeSpaceExhaustedError(
+            f"Nenhum código livre após {self.max_attempts} tentativas"
+        )
+
+    def _shard(self, tenant_id: str, partner_id: str) -> dict[str, Any]:
+        """Contadores da partição, com limite de partições acompanhadas (LRU)."""
+        key = f"{tenant_id}/{partner_id}"
+        shard = self._shards.get(key)
+        if shard is None:
+            shard = {
+                "tenant_id": tenant_id,
+                "partner_id": partner_id,
+                "samples": deque(maxlen=self.window),
+                "reserved": 0,
+                "collisions": 0,
+                "exhausted": 0,
+            }
+            self._shards[key] = shard
+            while len(self._shards) > self.max_shards:
+                self._shards.popitem(last=False)
+        self._shards.move_to_end(key)
+        return shard
+
+    def _record(self, tenant_id: str, partner_id: str, collided: bool) -> None:
+        shard = self._shard(tenant_id, partner_id)
+        shard["samples"].append(collided)
+        if collided:
+            shard["collisions"] += 1
+        else:
+            shard["reserved"] += 1
+
+    def clear(self) -> None:
+        """Remove os contadores de todas as partições."""
+        self._shards.clear()
+
+    def stats(self, limit: int = 20) -> dict[str, Any]:
+        """
+        Retorna a ocupação estimada das partições mais cheias.
+
+        A ocupação é a fração de colisões nas últimas `window` tentativas da
+        partição; `expected_attempts` é o número médio de sorteios por reserva
+        nessa ocupação.
+
+        Args:
+            limit: Máximo de partições listadas
+
+        Returns:
+            Dict com a configuração e as partições ordenadas por ocupação
+        """
+        shards = []
+        for shard in self._shards.values():
+            samples = shard["samples"]
+            occupancy = sum(samples) / len(samples) if samples else 0.0
+            shards.append(
+                {
+                    "tenant_id": shard["tenant_id"],
+                    "partner_id": shard["partner_id"],
+                    "reserved": shard["reserved"],
+                    "collisions": shard["collisions"],
+                    "exhausted": shard["exhausted"],
+                    "samples": len(samples),
+                    "estimated_occupancy": round(occupancy * 100, 2),
+                    "estimated_codes_in_use": round(occupancy * self.keyspace),
+                    "expected_attempts": (
+                        round(1 / (1 - occupancy), 2) if occupancy < 1 else None
+                    ),
+                    "alert": occupancy * 100 >= self.occupancy_alert,
+                }
+            )
+        shards.sort(key=lambda s: s["estimated_occupancy"], reverse=True)
+        return {
+            "digits": self.digits,
+            "keyspace": self.keyspace,
+            "max_attempts": self.max_attempts,
+            "occupancy_alert": self.occupancy_alert,
+            "shards_tracked": len(shards),
+            "shards": shards[:limit],
+        }
+
+
+# Instância global do alocador de códigos de validação
+code_allocator = ValidationCodeAllocator(
+    digits=VALIDATION_CODE_DIGITS,
+    max_attempts=VALIDATION_CODE_MAX_ATTEMPTS,
+    occupancy_alert=VALIDATION_CODE_OCCUPANCY_ALERT,
+)
@@ -0,0 +1,463 @@
+"""
+Contadores de códigos de validação gerados e resgatados.
+
+Cada código reservado e cada resgate incrementam contadores por (tenant,
+parceiro, dia UTC) na coleção `code_counters` (tabela homônima na
+contingência PostgreSQL), além dos agregados do parceiro em todo o período
+(`day="total"`) e do tenant inteiro (`partner_id="_all"`). Assim, as métricas
+leem alguns documentos por ID em vez de varrer `validation_codes`.
+
+Cada contador é dividido em `shards` documentos e cada escrita sorteia um
+deles, para não esbarrar no limite de escritas por documento do Firestore; a
+leitura soma os shards. Os incrementos são best-effort: uma falha é
+registrada em log e nas estatísticas, mas não desfaz a reserva nem o resgate.
+
+`rebuild` reconstrói os contadores de um tenant a partir de
+`validation_codes` (backfill) e `check` compara os contadores com a varredura
+(verificação de consistência); ambos são usados por
+`scripts/maintenance/rebuild_code_counters.py`. Incrementos feitos durante um
+`rebuild` podem se perder: rode-o com pouco tráfego e confira com `check`.
+"""
+
+import random
+from calendar import monthrange
+from collections import Counter
+from datetime import UTC, date, datetime
+from typing import Any
+
+from src.config import CODE_COUNTER_SHARDS
+from src.db import firestore_client, postgres_client, with_circuit_breaker
+from src.utils.logging import logger
+
+COLLECTION = "code_counters"
+CODES_COLLECTION = "validation_codes"
+
+# Escopos agregados
+ALL_PARTNERS = "_all"
+ALL_DAYS = "total"
+
+# Campos contadores
+GENERATED = "generated"
+REDEEMED = "redeemed"
+FIELDS = (GENERATED, REDEEMED)
+
+_SCAN_PAGE_SIZE = 500
+
+
+def day_key(value: Any = None) -> str | None:
+    """
+    Dia UTC (YYYY-MM-DD) de um datetime, date ou ISO 8601.
+
+    Returns:
+        O dia atual se `value` for None, ou None se o valor for inválido
+    """
+    if value is None:
+        return datetime.now(UTC).date().isoformat()
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if isinstance(value, datetime):
+        if value.tzinfo:
+            value = value.astimezone(UTC)
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return None
+
+
+def month_days(year: int, month: int) -> list[str]:
+    """Dias (YYYY-MM-DD) de um mês."""
+    return [
+        date(year, month, day).isoformat()
+        for day in range(1, monthrange(year, month)[1] + 1)
+    ]
+
+
+def _scopes(partner_id: str | None, day: str | None) -> list[tuple[str, str]]:
+    """Chaves (parceiro, dia) afetadas por um evento."""
+    scopes = [(ALL_PARTNERS, ALL_DAYS)]
+    if day:
+        scopes.append((ALL_PARTNERS, day))
+    if partner_id:
+        scopes.append((partner_id, ALL_DAYS))
+        if day:
+            scopes.append((partner_id, day))
+    return scopes
+
+
+def _empty() -> dict[str, int]:
+    return dict.fromkeys(FIELDS, 0)
+
+
+class CodeCounters:
+    """Contadores fragmentados (sharded) de códigos por tenant, parceiro e dia."""
+
+    def __init__(self, shards: int = CODE_COUNTER_SHARDS):
+        self.shards = max(shards, 1)
+        self._stats: Counter[str] = Counter()
+
+    @staticmethod
+    def doc_id(tenant_id: str, partner_id: str, day: str, shard: int) -> str:
+        """ID do documento de um shard do contador."""
+        return f"{tenant_id}_{partner_id}_{day}_{shard}"
+
+    def _row(
+        self, tenant_id: str, partner_id: str, day: str, shard: int, values: dict
+    ) -> dict[str, Any]:
+        return {
+            "tenant_id": tenant_id,
+            "partner_id": partner_id,
+            "day": day,
+            "shard": shard,
+            **{field: values.get(field, 0) for field in FIELDS},
+        }
+
+    async def _write(
+        self, rows: dict[str, dict[str, Any]], client=None, increment: bool = True
+    ) -> None:
+        if client is not None:
+            await client.upsert_counters(COLLECTION, rows, FIELDS, increment=increment)
+            return
+
+        async def write_firestore():
+            return await firestore_client.upsert_counters(
+                COLLECTION, rows, FIELDS, increment=increment
+            )
+
+        async def write_postgres():
+            return await postgres_client.upsert_counters(
+                COLLECTION, rows, FIELDS, increment=increment
+            )
+
+        await with_circuit_breaker(
+            write_firestore, write_postgres, breaker=(COLLECTION, "write")
+        )
+
+    async def record(
+        self,
+        tenant_id: str,
+        partner_id: str | None,
+        field: str,
+        when: Any = None,
+        amount: int = 1,
+    ) -> None:
+        """
+        Incrementa um contador em todos os escopos do evento.
+
+        Args:
+            tenant_id: Tenant do código
+            partner_id: Parceiro do código
+            field: GENERATED ou REDEEMED
+            when: Momento do evento (padrão: agora)
+            amount: Valor a somar
+        """
+        shard = random.randrange(self.shards)
+        rows = {
+            self.doc_id(tenant_id, partner, day, shard): self._row(
+                tenant_id, partner, day, shard, {field: amount}
+            )
+            for partner, day in _scopes(partner_id, day_key(when))
+        }
+        try:
+            await self._write(rows)
+        except Exception as e:
+            self._stats["failed"] += 1
+            logger.error(
+                f"Falha ao incrementar contador {field} "
+                f"(tenant={tenant_id}, parceiro={partner_id}): {str(e)}"
+            )
+            return
+        self._stats[field] += amount
+
+    async def record_generated(
+        self, tenant_id: str, partner_id: str, when: Any = None
+    ) -> None:
+        """Conta um código gerado."""
+        await self.record(tenant_id, partner_id, GENERATED, when)
+
+    async def record_redeemed(
+        self, tenant_id: str, partner_id: str, when: Any = None
+    ) -> None:
+        """Conta um código resgatado."""
+        await self.record(tenant_id, partner_id, REDEEMED, when)
+
+    async def read(
+        self, tenant_id: str, keys: list[tuple[str, str]]
+    ) -> dict[tuple[str, str], dict[str, int]]:
+        """
+        Lê contadores por chave (parceiro, dia) em uma única leitura em lote.
+
+        Returns:
+            Dict {(parceiro, dia): {generated, redeemed}} com todas as chaves
+            pedidas (zeradas se ainda não houver contador)
+        """
+        ids = {
+            self.doc_id(tenant_id, partner, day, shard): (partner, day)
+            for partner, day in keys
+            for shard in range(self.shards)
+        }
+
+        async def read_firestore():
+            return await firestore_client.get_documents_many(
+                COLLECTION, list(ids), tenant_id
+            )
+
+        async def read_postgres():
+            return await postgres_client.get_documents_many(
+                COLLECTION, list(ids), tenant_id
+            )
+
+        docs = await with_circuit_breaker(
+            read_firestore, read_postgres, breaker=(COLLECTION, "read")
+        )
+        self._stats["reads"] += 1
+        totals = {key: _empty() for key in keys}
+        for doc_id, doc in docs.items():
+            entry = totals[ids[doc_id]]
+            for field in FIELDS:
+                entry[field] += int(doc.get(field) or 0)
+        return totals
+
+    async def totals(
+        self,
+        tenant_id: str,
+        partner_id: str = ALL_PARTNERS,
+        days: list[str] | None = None,
+    ) -> dict[str, int]:
+        """
+        Códigos gerados e resgatados de um parceiro (ou do tenant).
+
+        Args:
+            tenant_id: ID do tenant
+            partner_id: ID do parceiro (padrão: todos)
+            days: Dias somados (padrão: todo o período)
+
+        Returns:
+            Dict com generated e redeemed
+        """
+        keys = [(partner_id, day) for day in days or [ALL_DAYS]]
+        result = _empty()
+        for entry in (await self.read(tenant_id, keys)).values():
+            for field in FIELDS:
+                result[field] += entry[field]
+        return result
+
+    async def top_partners(
+        self,
+        tenant_id: str,
+        limit: int,
+        start_day: str | None = None,
+        end_day: str | None = None,
+        field: str = REDEEMED,
+    ) -> list[tuple[str, int]]:
+        """
+        Parceiros com mais códigos resgatados (ou gerados) no período.
+
+        Uma única agregação sobre os contadores: GROUP BY no PostgreSQL e
+        soma por parceiro com heap no Firestore. Sem período, usa os totais
+        de todo o período de cada parceiro (um documento por parceiro e
+        shard). Com período, o Firestore lê todos os documentos parceiro ×
+        dia × shard do intervalo: o custo cresce com a duração do período.
+
+        Args:
+            tenant_id: ID do tenant
+            limit: Número de parceiros
+            start_day: Primeiro dia (YYYY-MM-DD), inclusive
+            end_day: Último dia (YYYY-MM-DD), inclusive
+            field: REDEEMED ou GENERATED
+
+        Returns:
+            Lista de tuplas (parceiro, contagem), maiores primeiro
+        """
+        if start_day or end_day:
+            filters = [
+                ("day", ">=", start_day or "0000-01-01"),
+                ("day", "<=", end_day or "9999-12-31"),
+            ]
+        else:
+            filters = [("day", "==", ALL_DAYS)]
+
+        # +1: o agregado do tenant (ALL_PARTNERS) é sempre o maior e é descartado
+        async def top_firestore():
+            return await firestore_client.top_by_sum(
+                COLLECTION,
+                tenant_id=tenant_id,
+                group_by="partner_id",
+                value=field,
+                filters=filters,
+                limit=limit + 1,
+            )
+
+        async def top_postgres():
+            return await postgres_client.top_by_sum(
+                COLLECTION,
+                tenant_id=tenant_id,
+                group_by="partner_id",
+                value=field,
+                filters=filters,
+                limit=limit + 1,
+            )
+
+        ranking = await with_circuit_breaker(
+            top_firestore, top_postgres, breaker=(COLLECTION, "read")
+        )
+        self._stats["reads"] += 1
+        return [
+            (partner_id, int(total))
+            for partner_id, total in ranking
+            if partner_id != ALL_PARTNERS
+        ][:limit]
+
+    async def scan(
+        self, tenant_id: str, client=None
+    ) -> dict[tuple[str, str], dict[str, int]]:
+        """
+        Recalcula os contadores varrendo `validation_codes` do tenant.
+
+        Gerados contam no dia de `created_at` e resgatados no dia de
+        `used_at`; sem data, o código conta só nos totais do período.
+
+        Args:
+            tenant_id: ID do tenant
+            client: firestore_client (padrão) ou postgres_client
+
+        Returns:
+            Dict {(parceiro, dia): {generated, redeemed}}
+        """
+        client = client or firestore_client
+        expected: dict[tuple[str, str], dict[str, int]] = {}
+        async for code in self._iter_documents(client, CODES_COLLECTION, tenant_id):
+            partner_id = code.get("partner_id")
+            events = [(GENERATED, code.get("created_at"))]
+            if code.get("used_at"):
+                events.append((REDEEMED, code["used_at"]))
+            for field, when in events:
+                day = day_key(when) if when else None
+                for key in _scopes(partner_id, day):
+                    expected.setdefault(key, _empty())[field] += 1
+        return expected
+
+    async def stored(
+        self, tenant_id: str, client=None
+    ) -> dict[tuple[str, str], dict[str, int]]:
+        """Contadores gravados do tenant, somando os shards."""
+        client = client or firestore_client
+        stored: dict[tuple[str, str], dict[str, int]] = {}
+        async for doc in self._iter_documents(client, COLLECTION, tenant_id):
+            entry = stored.setdefault((doc["partner_id"], doc["day"]), _empty())
+            for field in FIELDS:
+                entry[field] += int(doc.get(field) or 0)
+        return stored
+
+    async def rebuild(
+        self, tenant_id: str, client=None, exact: bool = False
+    ) -> dict[str, Any]:
+        """
+        Reconstrói os contadores do tenant a partir de `validation_codes`.
+
+        O total de cada chave vai para o shard 0 e os demais shards são
+        zerados. Como a limpeza de códigos expirados remove documentos de
+        `validation_codes`, por padrão cada contador fica com o maior valor
+        entre o gravado e a varredura (só repõe incrementos perdidos); com
+        `exact=True` os contadores passam a ser exatamente a varredura.
+
+        Returns:
+            Dict com o número de chaves e de documentos gravados
+        """
+        client = client or firestore_client
+        expected = await self.scan(tenant_id, client)
+        stored = await self.stored(tenant_id, client)
+        totals = {}
+        for key in set(expected) | set(stored):
+            want = expected.get(key, _empty())
+            have = stored.get(key, _empty())
+            totals[key] = {
+                field: want[field] if exact else max(want[field], have[field])
+                for field in FIELDS
+            }
+        rows = {
+            self.doc_id(tenant_id, partner, day, shard): self._row(
+                tenant_id, partner, day, shard, values if shard == 0 else {}
+            )
+            for (partner, day), values in totals.items()
+            for shard in range(self.shards)
+        }
+        await self._write(rows, client, increment=False)
+        logger.info(
+            f"Contadores de códigos reconstruídos (tenant={tenant_id}): "
+            f"{len(totals)} chaves, {len(rows)} documentos"
+        )
+        return {"tenant_id": tenant_id, "keys": len(totals), "documents": len(rows)}
+
+    async def check(self, tenant_id: str, client=None) -> dict[str, Any]:
+        """
+        Compara os contadores gravados com a varredura de `validation_codes`.
+
+        Contadores abaixo da varredura (`missing`) indicam incrementos
+        perdidos; acima dela (`surplus`) é o esperado para códigos já
+        removidos pela limpeza de expirados.
+
+        Returns:
+            Dict com o número de chaves verificadas e as divergências
+            (parceiro, dia, campo, esperado e gravado)
+        """
+        client = client or firestore_client
+        expected = await self.scan(tenant_id, client)
+        stored = await self.stored(tenant_id, client)
+        keys = sorted(set(expected) | set(stored))
+        missing, surplus = [], []
+        for partner, day in keys:
+            want = expected.get((partner, day), _empty())
+            have = stored.get((partner, day), _empty())
+            for field in FIELDS:
+                if want[field] == have[field]:
+                    continue
+                (missing if have[field] < want[field] else surplus).append(
+                    {
+                        "partner_id": partner,
+                        "day": day,
+                        "field": field,
+                        "expected": want[field],
+                        "stored": have[field],
+                    }
+                )
+        return {
+            "tenant_id": tenant_id,
+            "keys_checked": len(keys),
+            "consistent": not missing,
+            "missing": missing,
+            "surplus": surplus,
+        }
+
+    @staticmethod
+    async def _iter_documents(client, collection: str, tenant_id: str):
+        cursor = None
+        while True:
+            page = await client.query_documents(
+                collection,
+                tenant_id=tenant_id,
+                limit=_SCAN_PAGE_SIZE,
+                cursor=cursor,
+                count_total=False,
+            )
+            for item in page.get("items", []):
+                yield item
+            cursor = page.get("next_cursor")
+            if not cursor:
+                return
+
+    def stats(self) -> dict[str, Any]:
+        """Shards e contadores de incrementos, falhas e leituras."""
+        return {
+            "shards": self.shards,
+            GENERATED: self._stats[GENERATED],
+            REDEEMED: self._stats[REDEEMED],
+            "failed": self._stats["failed"],
+            "reads": self._stats["reads"],
+        }
+
+
+# Instância global dos contadores de códigos
+code_counters = CodeCounters()
@@ -0,0 +1,174 @@
+"""
+Fila de eventos com gravação em lote em segundo plano.
+
+Quem gera o evento só o coloca em uma fila em memória limitada, sem esperar
+I/O; uma tarefa em segundo plano grava os eventos em lotes quando a fila
+acumula um lote cheio ou quando passa o intervalo de gravação. Com a fila
+cheia, a política decide qual evento é descartado (`drop_newest` ou
+`drop_oldest`) ou, em `block`, por quanto tempo `put` aguarda espaço.
+No encerramento, os eventos pendentes são gravados dentro de um prazo.
+"""
+
+import asyncio
+import contextlib
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from src.utils.logging import logger
+
+POLICIES = ("drop_newest", "drop_oldest", "block")
+
+
+class EventPipeline:
+    """Fila limitada com gravação em lote por tamanho ou tempo."""
+
+    def __init__(
+        self,
+        name: str,
+        writer: Callable[[list[dict[str, Any]]], Awaitable[None]],
+        max_size: int,
+        batch_size: int,
+        flush_interval: float,
+        policy: str = "drop_newest",
+        put_timeout: float = 0.05,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Política de fila desconhecida: {policy}")
+        self.name = name
+        self.writer = writer
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.put_timeout = put_timeout
+        self._queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(max_size)
+        self._batch_ready = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._closing = False
+        self._enqueued = 0
+        self._dropped = 0
+        self._flushed = 0
+        self._batches = 0
+        self._failed = 0
+        self._last_flush: float | None = None
+
+    def enqueue(self, event: dict[str, Any]) -> bool:
+        """
+        Coloca o evento na fila sem aguardar.
+
+        Com a fila cheia, `drop_oldest` descarta o evento mais antigo; as
+        demais políticas descartam o evento recebido.
+
+        Returns:
+            True se o evento entrou na fila
+        """
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            if self.policy != "drop_oldest":
+                self._dropped += 1
+                return False
+            self._queue.get_nowait()
+            self._queue.put_nowait(event)
+            self._dropped += 1
+        self._enqueued += 1
+        if self._queue.qsize() >= self.batch_size:
+            self._batch_ready.set()
+        return True
+
+    async def put(self, event: dict[str, Any]) -> bool:
+        """
+        Coloca o evento na fila; em `block`, aguarda até `put_timeout` por espaço.
+
+        Returns:
+            True se o evento entrou na fila
+        """
+        if self.policy != "block" or not self._queue.full():
+            return self.enqueue(event)
+        try:
+            await asyncio.wait_for(self._queue.put(event), self.put_timeout)
+        except TimeoutError:
+            self._dropped += 1
+            return False
+        self._enqueued += 1
+        return True
+
+    async def start(self) -> None:
+        """Inicia a gravação em segundo plano."""
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float) -> None:
+        """
+        Grava os eventos pendentes e encerra a tarefa de gravação.
+
+        Args:
+            timeout: Prazo em segundos para esvaziar a fila
+        """
+        if self._task is None:
+            return
+        self._closing = True
+        self._batch_ready.set()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except TimeoutError:
+            logger.warning(
+                f"Fila de eventos {self.name} encerrada com "
+                f"{self._queue.qsize()} eventos não gravados"
+            )
+        finally:
+            self._task = None
+
+    async def flush(self) -> None:
+        """Grava todos os eventos na fila, em lotes de até `batch_size`."""
+        while not self._queue.empty():
+            batch = [
+                self._queue.get_nowait()
+                for _ in range(min(self.batch_size, self._queue.qsize()))
+            ]
+            try:
+                await self.writer(batch)
+            except Exception as e:
+                self._failed += len(batch)
+                logger.error(
+                    f"Erro ao gravar {len(batch)} eventos da fila {self.name}: {e}"
+                )
+            else:
+                self._flushed += len(batch)
+                self._batches += 1
+                self._last_flush = time.time()
+
+    async def _run(self) -> None:
+        while True:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+            self._batch_ready.clear()
+            await self.flush()
+            if self._closing:
+                return
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Retorna a profundidade da fila e os contadores de eventos.
+
+        Returns:
+            Dict com configuração, profundidade e eventos enfileirados,
+            descartados, gravados e com falha na gravação
+        """
+        return {
+            "name": self.name,
+            "running": self._task is not None,
+            "policy": self.policy,
+            "queue_depth": self._queue.qsize(),
+            "max_size": self.max_size,
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "enqueued": self._enqueued,
+            "dropped": self._dropped,
+            "flushed": self._flushed,
+            "batches": self._batches,
+            "failed": self._failed,
+            "last_flush": self._last_flush,
+        }
@@ -3,6 +3,10 @@ Módulo para integração com Firebase Analytics.
 
 Este módulo fornece funcionalidades para rastrear eventos de negócio
 e métricas de performance usando Firebase Analytics.
+
+Os eventos entram em uma fila em memória e são gravados no Firestore em
+lotes por uma tarefa em segundo plano (ver `src.utils.event_pipeline`), fora
+do caminho de resposta das requisições.
 """
 
 import logging
@@ -12,7 +16,15 @@ from typing import Any
 import httpx
 from google.cloud import firestore
 
-from src.config import FIRESTORE_PROJECT
+from src.config import (
+    ANALYTICS_BATCH_SIZE,
+    ANALYTICS_FLUSH_INTERVAL,
+    ANALYTICS_PUT_TIMEOUT,
+    ANALYTICS_QUEUE_MAX_SIZE,
+    ANALYTICS_QUEUE_POLICY,
+    FIRESTORE_PROJECT,
+)
+from src.utils.event_pipeline import EventPipeline
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +47,15 @@ class FirebaseAnalytics:
         self.project_id = project_id
         self.db = firestore.AsyncClient(project=project_id)
         self._http_client = httpx.AsyncClient()
+        self.pipeline = EventPipeline(
+            "analytics_events",
+            self._write_events,
+            max_size=ANALYTICS_QUEUE_MAX_SIZE,
+            batch_size=ANALYTICS_BATCH_SIZE,
+            flush_interval=ANALYTICS_FLUSH_INTERVAL,
+            policy=ANALYTICS_QUEUE_POLICY,
+            put_timeout=ANALYTICS_PUT_TIMEOUT,
+        )
 
     async def track_event(
         self,
@@ -46,6 +67,9 @@ class FirebaseAnalytics:
         """
         Rastreia um evento customizado.
 
+        O evento é gravado em segundo plano; com a política `block`, aguarda
+        espaço na fila por até ANALYTICS_PUT_TIMEOUT segundos.
+
         Args:
             event_name: Nome do evento (ex: 'code_redeemed', 'partner_viewed')
             parameters: Parâmetros do evento
@@ -53,29 +77,47 @@ class FirebaseAnalytics:
             tenant_id: ID do tenant (opcional)
 
         Returns:
-            True se o evento foi rastreado com sucesso
+            True se o evento entrou na fila de gravação
         """
-        try:
-            event_data = {
-                "event_name": event_name,
-                "timestamp": datetime.utcnow().isoformat(),
-                "parameters": parameters,
-                "user_id": user_id,
-                "tenant_id": tenant_id,
-                "source": "backend_api",
-            }
+        return await self.pipeline.put(
+            self._build_event(event_name, parameters, user_id, tenant_id)
+        )
 
-            # Salvar no Firestore para análise posterior
-            await self._save_event_to_firestore(event_data)
+    def enqueue_event(
+        self,
+        event_name: str,
+        parameters: dict[str, Any],
+        user_id: str | None = None,
+        tenant_id: str | None = None,
+    ) -> bool:
+        """
+        Rastreia um evento sem aguardar, para uso no caminho da requisição.
 
-            # Enviar para Firebase Analytics (se configurado)
-            await self._send_to_firebase_analytics(event_data)
+        Com a fila cheia o evento é descartado (ou substitui o mais antigo,
+        com a política `drop_oldest`).
 
-            return True
+        Returns:
+            True se o evento entrou na fila de gravação
+        """
+        return self.pipeline.enqueue(
+            self._build_event(event_name, parameters, user_id, tenant_id)
+        )
 
-        except Exception as e:
-            logger.error(f"Erro ao rastrear evento {event_name}: {str(e)}")
-            return False
+    @staticmethod
+    def _build_event(
+        event_name: str,
+        parameters: dict[str, Any],
+        user_id: str | None,
+        tenant_id: str | None,
+    ) -> dict[str, Any]:
+        return {
+            "event_name": event_name,
+            "timestamp": datetime.utcnow().isoformat(),
+            "parameters": parameters,
+            "user_id": user_id,
+            "tenant_id": tenant_id,
+            "source": "backend_api",
+        }
 
     async def track_business_metric(
         self,
@@ -154,13 +196,17 @@ class FirebaseAnalytics:
             logger.error(f"Erro ao obter resumo de analytics: {str(e)}")
             return {}
 
-    async def _save_event_to_firestore(self, event_data: dict[str, Any]) -> None:
-        """Salva evento no Firestore para análise posterior."""
-        try:
-            collection_ref = self.db.collection("analytics_events")
-            await collection_ref.add(event_data)
-        except Exception as e:
-            logger.error(f"Erro ao salvar evento no Firestore: {str(e)}")
+    async def _write_events(self, events: list[dict[str, Any]]) -> None:
+        """Grava um lote de eventos no Firestore em um único commit."""
+        collection_ref = self.db.collection("analytics_events")
+        batch = self.db.batch()
+        for event_data in events:
+            batch.set(collection_ref.document(), event_data)
+        await batch.commit()
+
+        # Enviar para Firebase Analytics (se configurado)
+        for event_data in events:
+            await self._send_to_firebase_analytics(event_data)
 
     async def _send_to_firebase_analytics(self, event_data: dict[str, Any]) -> None:
         """
@@ -170,7 +216,7 @@ class FirebaseAnalytics:
         """
         # Implementação futura do Measurement Protocol
         # Por enquanto, apenas log do evento
-        logger.info(f"Evento Analytics: {event_data['event_name']}")
+        logger.debug(f"Evento Analytics: {event_data['event_name']}")
 
     async def _process_events_summary(
         self, events: list[dict[str, Any]]
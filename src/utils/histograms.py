@@ -0,0 +1,251 @@
+"""
+Histogramas de latência em memória e exposição no formato texto do Prometheus.
+
+Cada histograma usa baldes log-lineares (estilo HDR): 32 baldes lineares por
+potência de 2 de microssegundos, com erro relativo máximo de ~3% nos
+percentis, memória proporcional aos baldes ocupados e registro em O(1).
+As atualizações acontecem no event loop, sem `await` entre leitura e escrita,
+então não há locks.
+
+Os dados são por processo. Na exposição, cada histograma vira um `histogram`
+do Prometheus com baldes cumulativos (`_bucket{le=...}`) em limites fixos, que
+podem ser somados entre instâncias (`histogram_quantile` sobre `sum by (le)`).
+Os percentis finos (p50/p95/p99) ficam disponíveis apenas por processo, via
+`LatencyHistogram.quantile`.
+"""
+
+import math
+from typing import Any
+
+_SUB_BUCKETS = 32
+_SUB_BUCKET_BITS = 5
+# Limites (s) dos baldes expostos ao Prometheus, iguais em todas as instâncias
+_EXPORT_BOUNDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _bucket_index(micros: int) -> int:
+    if micros < _SUB_BUCKETS:
+        return micros
+    shift = micros.bit_length() - _SUB_BUCKET_BITS - 1
+    return _SUB_BUCKETS + shift * _SUB_BUCKETS + (micros >> shift) - _SUB_BUCKETS
+
+
+def _bucket_upper(index: int) -> int:
+    """Maior valor (µs) contido no balde."""
+    if index < _SUB_BUCKETS:
+        return index
+    shift, offset = divmod(index - _SUB_BUCKETS, _SUB_BUCKETS)
+    return ((_SUB_BUCKETS + offset + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """Histograma log-linear de durações."""
+
+    def __init__(self):
+        self._counts: dict[int, int] = {}
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """Registra uma duração em segundos."""
+        index = _bucket_index(max(0, int(seconds * 1_000_000)))
+        self._counts[index] = self._counts.get(index, 0) + 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float | None:
+        """
+        Retorna o percentil `q` (0 a 1) em segundos.
+
+        Returns:
+            Limite superior do balde do percentil (no máximo a maior duração
+            registrada) ou None sem amostras
+        """
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= rank:
+                return min(_bucket_upper(index) / 1_000_000, self.max)
+        return self.max
+
+    def cumulative(self, bounds: tuple[float, ...]) -> list[int]:
+        """
+        Contagens cumulativas até cada limite (em segundos).
+
+        Um balde interno entra no limite se o seu maior valor couber nele; o
+        erro é o do balde (~3%) perto de cada limite.
+        """
+        counts = [0] * len(bounds)
+        for index, count in self._counts.items():
+            upper = _bucket_upper(index) / 1_000_000
+            for position, bound in enumerate(bounds):
+                if upper <= bound:
+                    counts[position] += count
+                    break
+        total = 0
+        for position, count in enumerate(counts):
+            total += count
+            counts[position] = total
+        return counts
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple, **extra: Any) -> str:
+    pairs = [*zip(names, values, strict=True), *extra.items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(v)}"' for name, v in pairs) + "}"
+
+
+class _Family:
+    """Métrica com séries por combinação de labels, com limite de séries."""
+
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...], limit: int):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.limit = limit
+        self._series: dict[tuple, Any] = {}
+
+    def _key(self, labels: dict[str, Any]) -> tuple:
+        key = tuple(labels.get(name, "") for name in self.labels)
+        # Acima do limite, novas combinações são agregadas em "other"
+        if key not in self._series and len(self._series) >= self.limit:
+            key = ("other",) * len(self.labels)
+        return key
+
+    def clear(self) -> None:
+        self._series.clear()
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for key in sorted(self._series):
+            lines.extend(self._render_series(key, self._series[key]))
+        return lines
+
+    def _render_series(self, key: tuple, series: Any) -> list[str]:
+        raise NotImplementedError
+
+
+class HistogramFamily(_Family):
+    """Durações por labels, expostas como histogram (baldes, soma, total)."""
+
+    kind = "histogram"
+
+    def observe(self, seconds: float, **labels: Any) -> None:
+        """Registra uma duração em segundos na série dos labels."""
+        key = self._key(labels)
+        histogram = self._series.get(key)
+        if histogram is None:
+            histogram = self._series[key] = LatencyHistogram()
+        histogram.observe(seconds)
+
+    def get(self, **labels: Any) -> LatencyHistogram | None:
+        """Histograma da série dos labels, se existir."""
+        return self._series.get(tuple(labels.get(n, "") for n in self.labels))
+
+    def _render_series(self, key: tuple, series: LatencyHistogram) -> list[str]:
+        cumulative = series.cumulative(_EXPORT_BOUNDS)
+        lines = [
+            f"{self.name}_bucket{_labels(self.labels, key, le=bound)} {count}"
+            for bound, count in zip(_EXPORT_BOUNDS, cumulative, strict=True)
+        ]
+        lines.append(
+            f"{self.name}_bucket{_labels(self.labels, key, le='+Inf')} {series.count}"
+        )
+        lines.append(f"{self.name}_sum{_labels(self.labels, key)} {series.sum:.6f}")
+        lines.append(f"{self.name}_count{_labels(self.labels, key)} {series.count}")
+        return lines
+
+
+class CounterFamily(_Family):
+    """Contadores monotônicos por labels."""
+
+    kind = "counter"
+
+    def inc(self, amount: int = 1, **labels: Any) -> None:
+        """Incrementa o contador da série dos labels."""
+        key = self._key(labels)
+        self._series[key] = self._series.get(key, 0) + amount
+
+    def get(self, **labels: Any) -> int:
+        """Valor do contador da série dos labels."""
+        return self._series.get(tuple(labels.get(n, "") for n in self.labels), 0)
+
+    def _render_series(self, key: tuple, series: int) -> list[str]:
+        return [f"{self.name}{_labels(self.labels, key)} {series}"]
+
+
+class MetricsRegistry:
+    """Conjunto de métricas do processo."""
+
+    def __init__(self, series_limit: int = 1000):
+        self.series_limit = series_limit
+        self._families: list[_Family] = []
+
+    def histogram(
+        self, name: str, help_text: str, labels: tuple[str, ...]
+    ) -> HistogramFamily:
+        """Registra um histograma de durações."""
+        family = HistogramFamily(name, help_text, labels, self.series_limit)
+        self._families.append(family)
+        return family
+
+    def counter(
+        self, name: str, help_text: str, labels: tuple[str, ...]
+    ) -> CounterFamily:
+        """Registra um contador."""
+        family = CounterFamily(name, help_text, labels, self.series_limit)
+        self._families.append(family)
+        return family
+
+    def clear(self) -> None:
+        """Remove as séries de todas as métricas."""
+        for family in self._families:
+            family.clear()
+
+    def render(self) -> str:
+        """Métricas no formato texto de exposição do Prometheus (0.0.4)."""
+        lines = []
+        for family in self._families:
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+# Registro global e métricas do processo
+registry = MetricsRegistry()
+
+request_latency = registry.histogram(
+    "http_request_duration_seconds",
+    "Duração das requisições HTTP por rota e classe de status",
+    ("route", "method", "status_class"),
+)
+db_latency = registry.histogram(
+    "db_operation_duration_seconds",
+    "Duração das operações de banco por backend, coleção e operação",
+    ("backend", "collection", "operation"),
+)
+breaker_transitions = registry.counter(
+    "circuit_breaker_transitions_total",
+    "Mudanças de estado dos circuit breakers",
+    ("breaker", "from_state", "to_state"),
+)
+db_budget_exceeded = registry.counter(
+    "request_db_budget_exceeded_total",
+    "Requisições acima do orçamento de leituras no banco da rota",
+    ("route",),
+)
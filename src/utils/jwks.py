@@ -0,0 +1,282 @@
+"""
+Armazenamento em memória de chaves públicas JWKS para verificação RS256.
+
+As chaves são buscadas na inicialização da aplicação e renovadas por uma
+tarefa em segundo plano antes de expirarem, respeitando o `max-age` do
+cabeçalho Cache-Control do emissor. No caminho da requisição a chave é
+resolvida pelo `kid` apenas em memória: um `kid` desconhecido agenda uma
+renovação fora de banda (com intervalo mínimo) e a requisição é rejeitada
+sem aguardar a rede.
+
+Se a renovação falhar, as chaves anteriores continuam válidas até a próxima
+tentativa. Um arquivo JWKS estático pode substituir a URL (testes e
+desenvolvimento offline); nesse caso não há renovação.
+"""
+
+import asyncio
+import json
+import re
+import time
+from contextlib import suppress
+from pathlib import Path
+from typing import Any
+
+import httpx
+import jwt
+
+from src.config import (
+    FIREBASE_JWKS_URL,
+    JWKS_CACHE_TTL,
+    JWKS_REFRESH_MIN_INTERVAL,
+    JWKS_STATIC_FILE,
+    JWKS_URL,
+)
+from src.utils.logging import logger
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+# Fração do max-age após a qual a renovação é disparada
+_REFRESH_AT = 0.8
+
+
+def parse_max_age(cache_control: str | None, default: int) -> int:
+    """
+    Extrai o max-age (segundos) de um cabeçalho Cache-Control.
+
+    Args:
+        cache_control: Valor do cabeçalho (pode ser None)
+        default: Valor usado se não houver max-age
+
+    Returns:
+        TTL em segundos (0 para no-store/no-cache)
+    """
+    if not cache_control:
+        return default
+    directives = cache_control.lower()
+    if "no-store" in directives or "no-cache" in directives:
+        return 0
+    match = _MAX_AGE.search(directives)
+    return int(match.group(1)) if match else default
+
+
+class JWKSKeyStore:
+    """Chaves públicas de um emissor, indexadas por `kid`."""
+
+    def __init__(
+        self,
+        name: str,
+        url: str | None,
+        default_ttl: int,
+        static_file: str | None = None,
+        min_refresh_interval: int = 60,
+        timeout: float = 5.0,
+    ):
+        self.name = name
+        self.url = url
+        self.default_ttl = default_ttl
+        self.static_file = static_file
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self._keys: dict[str, Any] = {}
+        self._fetched_at = 0.0
+        self._expires_at = 0.0
+        self._last_attempt = 0.0
+        self._task: asyncio.Task | None = None
+        self._pending_refresh: asyncio.Task | None = None
+        self._refreshes = 0
+        self._refresh_errors = 0
+        self._consecutive_errors = 0
+        self._unknown_kid = 0
+
+    @property
+    def configured(self) -> bool:
+        """Indica se há uma origem (URL ou arquivo) para as chaves."""
+        return bool(self.static_file or self.url)
+
+    def get_key(self, kid: str) -> Any | None:
+        """
+        Resolve a chave pública pelo `kid`, somente em memória.
+
+        Um `kid` desconhecido agenda uma renovação em segundo plano (rotação
+        de chaves no emissor) e retorna None imediatamente.
+
+        Args:
+            kid: Identificador da chave no cabeçalho do JWT
+
+        Returns:
+            Chave pública ou None
+        """
+        key = self._keys.get(kid)
+        if key is None:
+            self._unknown_kid += 1
+            self._schedule_refresh()
+        return key
+
+    def has_key(self, kid: str) -> bool:
+        """Indica se o `kid` está carregado (sem efeitos colaterais)."""
+        return kid in self._keys
+
+    def load_static(self, path: str) -> int:
+        """
+        Carrega as chaves de um arquivo JWKS local.
+
+        Args:
+            path: Caminho do arquivo JSON ({"keys": [...]})
+
+        Returns:
+            Número de chaves carregadas
+        """
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        self._install(data, ttl=None)
+        return len(self._keys)
+
+    async def refresh(self) -> bool:
+        """
+        Busca as chaves do emissor e substitui o conjunto em memória.
+
+        Falhas são registradas e mantêm as chaves anteriores.
+
+        Returns:
+            True se as chaves foram renovadas
+        """
+        self._last_attempt = time.monotonic()
+        if self.static_file:
+            self.load_static(self.static_file)
+            return True
+        if not self.url:
+            return False
+
+        try:
+            async with httpx.AsyncClient(timeout=self.timeout) as client:
+                response = await client.get(self.url)
+                response.raise_for_status()
+            ttl = parse_max_age(response.headers.get("cache-control"), self.default_ttl)
+            self._install(response.json(), ttl=ttl)
+        except Exception as e:
+            self._refresh_errors += 1
+            self._consecutive_errors += 1
+            logger.warning(f"Falha ao renovar JWKS {self.name}: {e}")
+            return False
+
+        logger.info(f"JWKS {self.name} renovado: {len(self._keys)} chaves, ttl={ttl}s")
+        return True
+
+    def _install(self, data: dict[str, Any], ttl: int | None) -> None:
+        """Converte o JWKS em chaves e troca o conjunto atual."""
+        keys = {}
+        for jwk in data.get("keys", []):
+            kid = jwk.get("kid")
+            if not kid:
+                continue
+            try:
+                keys[kid] = jwt.PyJWK(jwk).key
+            except jwt.PyJWTError as e:
+                logger.warning(f"Chave JWKS {self.name}/{kid} ignorada: {e}")
+        if not keys:
+            raise ValueError(f"JWKS {self.name} sem chaves utilizáveis")
+
+        now = time.monotonic()
+        self._keys = keys
+        self._fetched_at = now
+        self._expires_at = float("inf") if ttl is None else now + ttl
+        self._refreshes += 1
+        self._consecutive_errors = 0
+
+    def _schedule_refresh(self) -> None:
+        """Agenda uma renovação fora de banda, respeitando o intervalo mínimo."""
+        if self.static_file or not self.url:
+            return
+        if self._pending_refresh is not None and not self._pending_refresh.done():
+            return
+        if time.monotonic() - self._last_attempt < self.min_refresh_interval:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._pending_refresh = loop.create_task(self.refresh())
+
+    def _next_refresh_delay(self) -> float:
+        """Segundos até a próxima renovação planejada."""
+        if self._consecutive_errors:
+            # Backoff exponencial limitado ao TTL padrão
+            backoff = self.min_refresh_interval * 2 ** (self._consecutive_errors - 1)
+            return min(backoff, max(self.default_ttl, self.min_refresh_interval))
+        ttl = self._expires_at - self._fetched_at
+        if not self._keys or ttl <= 0:
+            return self.min_refresh_interval
+        refresh_at = self._fetched_at + ttl * _REFRESH_AT
+        return max(self.min_refresh_interval, refresh_at - time.monotonic())
+
+    async def _refresh_loop(self) -> None:
+        """Renova as chaves antes de expirarem até ser cancelada."""
+        while True:
+            await asyncio.sleep(self._next_refresh_delay())
+            await self.refresh()
+
+    async def start(self) -> None:
+        """
+        Busca as chaves na inicialização e inicia a renovação em segundo plano.
+
+        Uma falha na primeira busca não impede a inicialização: a tarefa de
+        renovação tenta novamente no intervalo mínimo.
+        """
+        if not self.configured:
+            return
+        try:
+            await self.refresh()
+        except Exception as e:
+            self._refresh_errors += 1
+            self._consecutive_errors += 1
+            logger.error(f"Falha ao carregar JWKS {self.name}: {e}")
+
+        if not self.static_file and self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        """Cancela as tarefas de renovação."""
+        for task in (self._task, self._pending_refresh):
+            if task is not None and not task.done():
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+        self._task = None
+        self._pending_refresh = None
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Retorna o estado das chaves para monitoramento.
+
+        Returns:
+            Dict com origem, kids carregados, idade e contadores de renovação
+        """
+        now = time.monotonic()
+        return {
+            "source": "file" if self.static_file else self.url,
+            "kids": sorted(self._keys),
+            "age_seconds": round(now - self._fetched_at, 1) if self._keys else None,
+            "expires_in_seconds": (
+                round(self._expires_at - now, 1)
+                if self._keys and self._expires_at != float("inf")
+                else None
+            ),
+            "refreshes": self._refreshes,
+            "refresh_errors": self._refresh_errors,
+            "unknown_kid": self._unknown_kid,
+        }
+
+
+# Emissor próprio (JWKS_URL) e chaves públicas do Firebase Auth
+jwks_store = JWKSKeyStore(
+    "knn",
+    JWKS_URL,
+    JWKS_CACHE_TTL,
+    static_file=JWKS_STATIC_FILE or None,
+    min_refresh_interval=JWKS_REFRESH_MIN_INTERVAL,
+)
+firebase_jwks_store = JWKSKeyStore(
+    "firebase",
+    FIREBASE_JWKS_URL,
+    JWKS_CACHE_TTL,
+    min_refresh_interval=JWKS_REFRESH_MIN_INTERVAL,
+)
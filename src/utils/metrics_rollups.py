@@ -0,0 +1,315 @@
+"""
+Rollups por faixa de tempo das métricas históricas.
+
+Cada snapshot salvo pelo MetricsService também atualiza um documento por
+nível (hora, dia, semana ISO e mês, em UTC) na coleção `metrics_rollups`,
+com soma, mínimo, máximo e contagem de cada métrica numérica do snapshot
+(`users.total_students`, `codes.codes_used`...). As atualizações usam as
+transformações `Increment`, `Minimum` e `Maximum` do Firestore, sem leitura
+prévia.
+
+A consulta histórica lê os rollups do nível pedido em vez de baixar todos os
+snapshots do período. Se o período tiver mais faixas que `max_points`, usa o
+nível mais grosso que caiba e, se ainda assim passar do limite, junta faixas
+consecutivas no servidor: a resposta tem no máximo `max_points` pontos
+qualquer que seja o período.
+"""
+
+import math
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from google.cloud import firestore
+
+from src.config import METRICS_HISTORY_MAX_POINTS
+
+COLLECTION = "metrics_rollups"
+SNAPSHOTS_COLLECTION = "metrics_snapshots"
+
+# Níveis do mais fino para o mais grosso, com a duração (aproximada no mês)
+LEVELS = {
+    "hourly": timedelta(hours=1),
+    "daily": timedelta(days=1),
+    "weekly": timedelta(weeks=1),
+    "monthly": timedelta(days=31),
+}
+
+
+def _utc(value: datetime) -> datetime:
+    """Converte para UTC sem fuso (como os timestamps dos snapshots)."""
+    if value.tzinfo is not None:
+        value = value.astimezone(UTC).replace(tzinfo=None)
+    return value
+
+
+def bucket_start(value: datetime, level: str) -> datetime:
+    """Início da faixa do nível que contém `value` (UTC)."""
+    value = _utc(value).replace(minute=0, second=0, microsecond=0)
+    if level == "hourly":
+        return value
+    value = value.replace(hour=0)
+    if level == "weekly":
+        return value - timedelta(days=value.weekday())
+    if level == "monthly":
+        return value.replace(day=1)
+    return value
+
+
+def bucket_end(start: datetime, level: str) -> datetime:
+    """Início da faixa seguinte à que começa em `start`."""
+    if level == "monthly":
+        if start.month == 12:
+            return start.replace(year=start.year + 1, month=1)
+        return start.replace(month=start.month + 1)
+    return start + LEVELS[level]
+
+
+def choose_level(
+    start: datetime, end: datetime, granularity: str, max_points: int
+) -> str:
+    """
+    Escolhe o nível dos rollups para o período.
+
+    Parte da granularidade pedida e sobe para níveis mais grossos enquanto o
+    período tiver mais faixas que `max_points`.
+    """
+    levels = list(LEVELS)
+    index = levels.index(granularity) if granularity in LEVELS else 1
+    while index < len(levels) - 1:
+        level = levels[index]
+        if (_utc(end) - bucket_start(start, level)) / LEVELS[level] <= max_points:
+            break
+        index += 1
+    return levels[index]
+
+
+def numeric_fields(metrics: dict[str, Any], prefix: str = "") -> dict[str, float]:
+    """
+    Achata as métricas numéricas de um snapshot em nomes com ponto.
+
+    Valores None (submétricas que falharam) e booleanos são ignorados.
+    """
+    fields: dict[str, float] = {}
+    for key, value in metrics.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            fields.update(numeric_fields(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            fields[name] = value
+    return fields
+
+
+def _merge(
+    target: dict[str, dict[str, float]], source: dict[str, dict[str, float]]
+) -> None:
+    """Soma as estatísticas de `source` em `target` (por métrica)."""
+    for name, stats in source.items():
+        current = target.get(name)
+        if current is None:
+            target[name] = dict(stats)
+            continue
+        current["sum"] += stats["sum"]
+        current["count"] += stats["count"]
+        current["min"] = min(current["min"], stats["min"])
+        current["max"] = max(current["max"], stats["max"])
+
+
+class MetricsRollups:
+    """Atualização e leitura dos rollups de `metrics_snapshots`."""
+
+    def __init__(self, max_points: int = METRICS_HISTORY_MAX_POINTS):
+        self.max_points = max(max_points, 1)
+
+    @staticmethod
+    def doc_id(tenant_id: str, level: str, start: datetime) -> str:
+        """ID do documento de uma faixa: tenant, nível e início."""
+        return f"{tenant_id}_{level}_{start:%Y%m%d%H}"
+
+    async def record(
+        self, db, tenant_id: str, timestamp: datetime, metrics: dict[str, Any]
+    ) -> None:
+        """
+        Acrescenta um snapshot às faixas de todos os níveis.
+
+        Args:
+            db: Cliente assíncrono do Firestore
+            tenant_id: ID do tenant
+            timestamp: Momento do snapshot
+            metrics: Métricas do snapshot (dicionários aninhados)
+        """
+        values = numeric_fields(metrics)
+        batch = db.batch()
+        for level in LEVELS:
+            start = bucket_start(timestamp, level)
+            doc_ref = db.collection(COLLECTION).document(
+                self.doc_id(tenant_id, level, start)
+            )
+            # Em set(merge=True) as chaves são nomes literais: o ponto dos
+            # nomes das métricas não vira caminho aninhado
+            batch.set(
+                doc_ref,
+                {
+                    "tenant_id": tenant_id,
+                    "level": level,
+                    "bucket_start": start,
+                    "updated_at": _utc(timestamp),
+                    "count": firestore.Increment(1),
+                    "metrics": {
+                        name: {
+                            "sum": firestore.Increment(value),
+                            "min": firestore.Minimum(value),
+                            "max": firestore.Maximum(value),
+                            "count": firestore.Increment(1),
+                        }
+                        for name, value in values.items()
+                    },
+                },
+                merge=True,
+            )
+        await batch.commit()
+
+    async def timeline(
+        self,
+        db,
+        tenant_id: str,
+        start_date: datetime,
+        end_date: datetime,
+        granularity: str = "daily",
+    ) -> dict[str, Any]:
+        """
+        Série histórica do período a partir dos rollups.
+
+        Returns:
+            Dicionário com `timeline` (no máximo `max_points` pontos com
+            início, fim, contagem e soma/mínimo/máximo/média por métrica), o
+            nível lido e se houve junção de faixas
+        """
+        level = choose_level(start_date, end_date, granularity, self.max_points)
+        query = (
+            db.collection(COLLECTION)
+            .where("tenant_id", "==", tenant_id)
+            .where("level", "==", level)
+            .where("bucket_start", ">=", bucket_start(start_date, level))
+            .where("bucket_start", "<=", _utc(end_date))
+            .order_by("bucket_start")
+        )
+        buckets = []
+        async for doc in query.stream():
+            data = doc.to_dict()
+            start = _utc(data["bucket_start"])
+            buckets.append(
+                {
+                    "start": start,
+                    "end": bucket_end(start, level),
+                    "count": data.get("count", 0),
+                    "metrics": {
+                        name: dict(stats)
+                        for name, stats in (data.get("metrics") or {}).items()
+                    },
+                }
+            )
+
+        points = self._downsample(buckets)
+        return {
+            "granularity": granularity,
+            "level": level,
+            "downsampled": len(points) < len(buckets),
+            "total_snapshots": sum(bucket["count"] for bucket in buckets),
+            "timeline": [self._point(bucket) for bucket in points],
+        }
+
+    def _downsample(self, buckets: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Junta faixas consecutivas até caber em `max_points`."""
+        if len(buckets) <= self.max_points:
+            return buckets
+        size = math.ceil(len(buckets) / self.max_points)
+        points = []
+        for index in range(0, len(buckets), size):
+            group = buckets[index : index + size]
+            merged = {
+                "start": group[0]["start"],
+                "end": group[-1]["end"],
+                "count": 0,
+                "metrics": {},
+            }
+            for bucket in group:
+                merged["count"] += bucket["count"]
+                _merge(merged["metrics"], bucket["metrics"])
+            points.append(merged)
+        return points
+
+    @staticmethod
+    def _point(bucket: dict[str, Any]) -> dict[str, Any]:
+        """Ponto da resposta, com a média de cada métrica."""
+        return {
+            "start": bucket["start"].isoformat(),
+            "end": bucket["end"].isoformat(),
+            "count": bucket["count"],
+            "metrics": {
+                name: {
+                    **stats,
+                    "avg": stats["sum"] / stats["count"] if stats["count"] else None,
+                }
+                for name, stats in sorted(bucket["metrics"].items())
+            },
+        }
+
+    async def rebuild(self, db, tenant_id: str) -> dict[str, Any]:
+        """
+        Recalcula os rollups de um tenant a partir de `metrics_snapshots`.
+
+        Sobrescreve as faixas encontradas; usado no backfill dos snapshots
+        anteriores aos rollups.
+
+        Returns:
+            Quantidade de snapshots lidos e de faixas gravadas por nível
+        """
+        buckets: dict[tuple[str, datetime], dict[str, Any]] = {}
+        snapshots = 0
+        query = db.collection(SNAPSHOTS_COLLECTION).where("tenant_id", "==", tenant_id)
+        async for doc in query.stream():
+            data = doc.to_dict()
+            if not data.get("timestamp"):
+                continue
+            snapshots += 1
+            timestamp = _utc(data["timestamp"])
+            stats = {
+                name: {"sum": value, "min": value, "max": value, "count": 1}
+                for name, value in numeric_fields(data.get("metrics") or {}).items()
+            }
+            for level in LEVELS:
+                start = bucket_start(timestamp, level)
+                bucket = buckets.setdefault(
+                    (level, start),
+                    {
+                        "tenant_id": tenant_id,
+                        "level": level,
+                        "bucket_start": start,
+                        "updated_at": timestamp,
+                        "count": 0,
+                        "metrics": {},
+                    },
+                )
+                bucket["count"] += 1
+                bucket["updated_at"] = max(bucket["updated_at"], timestamp)
+                _merge(bucket["metrics"], stats)
+
+        # Lotes do Firestore aceitam até 500 escritas
+        items = list(buckets.items())
+        for index in range(0, len(items), 500):
+            batch = db.batch()
+            for (level, start), bucket in items[index : index + 500]:
+                doc_ref = db.collection(COLLECTION).document(
+                    self.doc_id(tenant_id, level, start)
+                )
+                batch.set(doc_ref, bucket)
+            await batch.commit()
+
+        written = dict.fromkeys(LEVELS, 0)
+        for level, _ in buckets:
+            written[level] += 1
+        return {"tenant_id": tenant_id, "snapshots": snapshots, "buckets": written}
+
+
+# Instância global
+metrics_rollups = MetricsRollups()
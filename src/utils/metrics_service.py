@@ -5,20 +5,37 @@ Este módulo fornece funcionalidades para coleta, armazenamento e análise
 de métricas de negócio e performance do sistema.
 """
 
+import asyncio
 import logging
+from collections.abc import Awaitable, Callable
 from datetime import datetime, timedelta
 from typing import Any
 from zoneinfo import ZoneInfo
 
 from google.cloud import firestore
 
-from src.config import FIRESTORE_PROJECT
+from src.config import (
+    FIRESTORE_PROJECT,
+    METRICS_COLLECT_CONCURRENCY,
+    METRICS_COLLECT_TIMEOUT,
+)
 from src.db.firestore import firestore_client
 from src.db.postgres import postgres_client
 from src.db.unified_client import with_circuit_breaker
+from src.utils.code_counters import GENERATED, REDEEMED, code_counters
+from src.utils.metrics_rollups import MetricsRollups
+from src.utils.sharded_counter import ShardedCounter
 
 logger = logging.getLogger(__name__)
 
+# Documento de 'metadata' com o contador de cada coleção
+_METADATA_DOCS = {
+    "students": "student_info",
+    "employees": "employee_info",
+    "partners": "partner_info",
+    "benefits": "benefit_info",
+}
+
 
 class MetricsService:
     """
@@ -31,20 +48,36 @@ class MetricsService:
     - Alertas baseados em métricas
     """
 
-    def __init__(self, project_id: str = FIRESTORE_PROJECT):
+    def __init__(
+        self,
+        project_id: str = FIRESTORE_PROJECT,
+        max_concurrency: int = METRICS_COLLECT_CONCURRENCY,
+        collect_timeout: float = METRICS_COLLECT_TIMEOUT,
+    ):
         """
         Inicializa o serviço de métricas.
 
         Args:
             project_id: ID do projeto Firebase
+            max_concurrency: Consultas de métricas simultâneas (no serviço todo)
+            collect_timeout: Prazo em segundos de cada submétrica
         """
         self.project_id = project_id
         self.db = firestore.AsyncClient(project=project_id)
+        self.collect_timeout = collect_timeout
+        self._limiter = asyncio.Semaphore(max_concurrency)
+        self.metadata_counter = ShardedCounter()
+        self.rollups = MetricsRollups()
 
     async def collect_real_time_metrics(self, tenant_id: str) -> dict[str, Any]:
         """
         Coleta métricas em tempo real para um tenant.
 
+        As contagens rodam em paralelo, limitadas pelo semáforo do serviço, e
+        cada uma tem prazo próprio: uma submétrica que falha ou estoura o
+        prazo vem como None (assim como os valores derivados dela), sem
+        atrasar as demais.
+
         Args:
             tenant_id: ID do tenant
 
@@ -52,19 +85,18 @@ class MetricsService:
             Dicionário com métricas atuais
         """
         try:
-            metrics = {}
-
-            # Métricas de usuários
-            metrics["users"] = await self._get_user_metrics(tenant_id)
-
-            # Métricas de códigos
-            metrics["codes"] = await self._get_code_metrics(tenant_id)
-
-            # Métricas de parceiros
-            metrics["partners"] = await self._get_partner_metrics(tenant_id)
-
-            # Métricas de performance
-            metrics["performance"] = await self._get_performance_metrics(tenant_id)
+            users, codes, partners, performance = await asyncio.gather(
+                self._get_user_metrics(tenant_id),
+                self._get_code_metrics(tenant_id),
+                self._get_partner_metrics(tenant_id),
+                self._get_performance_metrics(tenant_id),
+            )
+            metrics = {
+                "users": users,
+                "codes": codes,
+                "partners": partners,
+                "performance": performance,
+            }
 
             # Salvar snapshot das métricas
             await self._save_metrics_snapshot(tenant_id, metrics)
@@ -85,6 +117,10 @@ class MetricsService:
         """
         Obtém métricas históricas para um período.
 
+        Lê os rollups por faixa de tempo (ver `metrics_rollups`) em vez dos
+        snapshots: a série tem no máximo METRICS_HISTORY_MAX_POINTS pontos,
+        com nível mais grosso que o pedido em períodos longos.
+
         Args:
             tenant_id: ID do tenant
             start_date: Data de início
@@ -95,23 +131,10 @@ class MetricsService:
             Dicionário com métricas históricas
         """
         try:
-            collection_ref = self.db.collection("metrics_snapshots")
-            query = (
-                collection_ref.where("tenant_id", "==", tenant_id)
-                .where("timestamp", ">=", start_date)
-                .where("timestamp", "<=", end_date)
-                .order_by("timestamp")
+            return await self.rollups.timeline(
+                self.db, tenant_id, start_date, end_date, granularity
             )
 
-            snapshots = []
-            async for doc in query.stream():
-                snapshots.append(doc.to_dict())
-
-            # Agregar dados conforme granularidade
-            aggregated = await self._aggregate_metrics(snapshots, granularity)
-
-            return aggregated
-
         except Exception as e:
             logger.error(f"Erro ao obter métricas históricas: {str(e)}")
             return {}
@@ -127,22 +150,17 @@ class MetricsService:
             Dados formatados para dashboard
         """
         try:
-            # Métricas atuais
-            current_metrics = await self.collect_real_time_metrics(tenant_id)
-
-            # Métricas dos últimos 30 dias
+            # Métricas atuais, últimos 30 dias, top parceiros e tendências
+            # são independentes: coletadas em paralelo
             end_date = datetime.utcnow()
             start_date = end_date - timedelta(days=30)
-            historical = await self.get_historical_metrics(
-                tenant_id, start_date, end_date, "daily"
+            current_metrics, historical, top_partners, trends = await asyncio.gather(
+                self.collect_real_time_metrics(tenant_id),
+                self.get_historical_metrics(tenant_id, start_date, end_date, "daily"),
+                self._get_top_partners(tenant_id, limit=10),
+                self._calculate_trends(tenant_id),
             )
 
-            # Top parceiros por resgates
-            top_partners = await self._get_top_partners(tenant_id, limit=10)
-
-            # Tendências
-            trends = await self._calculate_trends(tenant_id)
-
             dashboard_data = {
                 "current_metrics": current_metrics,
                 "historical_data": historical,
@@ -214,38 +232,27 @@ class MetricsService:
         try:
             meta_collection = self.db.collection("metadata")
 
-            def _safe_doc_data(
-                doc: firestore.DocumentSnapshot | None,
-            ) -> dict[str, Any]:
-                if doc and doc.exists:
-                    return doc.to_dict() or {}
-                return {}
-
             async def _read_meta(doc_name: str) -> dict[str, Any]:
                 # Preferência por documento por-tenant: <tenant_id>_<doc_name>
-                tenant_doc_ref = meta_collection.document(f"{tenant_id}_{doc_name}")
-                tenant_doc = await tenant_doc_ref.get()
-                data = _safe_doc_data(tenant_doc)
+                data = await self.metadata_counter.read(
+                    meta_collection.document(f"{tenant_id}_{doc_name}")
+                )
                 if data:
                     return data
                 # Fallback para documento global sem prefixo
                 global_doc_ref = meta_collection.document(doc_name)
-                global_doc = await global_doc_ref.get()
-                return _safe_doc_data(global_doc)
-
-            mapping = {
-                "students": "student_info",
-                "employees": "employee_info",
-                "partners": "partner_info",
-                "benefits": "benefit_info",
-            }
+                return await self.metadata_counter.read(global_doc_ref) or {}
+
+            # Leituras dos quatro contadores em paralelo
+            docs = await asyncio.gather(
+                *(_read_meta(doc_name) for doc_name in _METADATA_DOCS.values())
+            )
 
             counters: dict[str, Any] = {}
             latest_updates: list[str] = []
 
-            for key, doc_name in mapping.items():
-                doc_data = await _read_meta(doc_name)
-                # Estrutura suportada: campo simples "total"
+            for key, doc_data in zip(_METADATA_DOCS, docs, strict=True):
+                # Estrutura suportada: campo simples "total" (somado aos shards)
                 total = doc_data.get("total")
                 last_updated = doc_data.get("last_updated")
                 if last_updated:
@@ -287,25 +294,21 @@ class MetricsService:
         set_total: int | None = None,
     ) -> None:
         """
-        Atualiza os campos 'last_updated' e 'total' do documento correspondente
+        Atualiza os campos 'last_updated' e 'total' do contador correspondente
         em 'metadata' após operações CRUD nas coleções informadas.
 
-        Agora suporta atualizações eficientes via operação incremental:
+        O contador é distribuído em shards (`src.utils.sharded_counter`):
         - operation: "add" (incrementa), "sub" (decrementa) ou "set" (define valor);
         - delta: quantidade a incrementar/decrementar (default: 1);
         - set_total: quando informado, força o total explicitamente.
 
+        Incrementos vão para um shard sorteado, sem leitura prévia, de modo
+        que importações em lote não disputam o mesmo documento.
+
         Suporta: students, employees, partners, benefits.
         """
         try:
-            names_map = {
-                "students": "student_info",
-                "employees": "employee_info",
-                "partners": "partner_info",
-                "benefits": "benefit_info",
-            }
-
-            doc_name = names_map.get(collection_name)
+            doc_name = _METADATA_DOCS.get(collection_name)
             if not doc_name:
                 logger.warning(
                     f"Coleção '{collection_name}' não suportada para atualização de metadata"
@@ -330,13 +333,10 @@ class MetricsService:
             # Se for 'set' ou set_total fornecido, definir valor explicitamente
             if op == "set" or set_total is not None:
                 total_val = set_total if set_total is not None else int(delta)
-                await doc_ref.set(
-                    {
-                        "tenant_id": tenant_id,
-                        "last_updated": brt_now_iso,
-                        "total": int(total_val),
-                    },
-                    merge=True,
+                await self.metadata_counter.set(
+                    doc_ref,
+                    int(total_val),
+                    {"tenant_id": tenant_id, "last_updated": brt_now_iso},
                 )
                 logger.info(
                     f"Metadata '{doc_id}' atualizada via SET: total={total_val}, last_updated={brt_now_iso}"
@@ -346,17 +346,8 @@ class MetricsService:
             # Operação incremental: add/sub
             increment_value = abs(int(delta)) if op == "add" else -abs(int(delta))
 
-            # Garantir existência do documento para permitir update com Increment
-            doc_snapshot = await doc_ref.get()
-            if not doc_snapshot.exists:
-                # Inicializa com 0
-                await doc_ref.set({"tenant_id": tenant_id, "total": 0}, merge=True)
-
-            await doc_ref.update(
-                {
-                    "last_updated": brt_now_iso,
-                    "total": firestore.Increment(increment_value),
-                }
+            await self.metadata_counter.increment(
+                doc_ref, increment_value, {"last_updated": brt_now_iso}
             )
 
             logger.info(
@@ -368,153 +359,107 @@ class MetricsService:
                 f"Erro ao atualizar metadata para coleção '{collection_name}' (tenant {tenant_id}): {str(e)}"
             )
 
-    async def _get_user_metrics(self, tenant_id: str) -> dict[str, Any]:
-        """Obtém métricas de usuários."""
-        try:
-            # Contar usuários ativos
-            async def count_firestore_active_users():
-                today = datetime.utcnow().date().isoformat()
-                result = await firestore_client.query_documents(
-                    "students",
-                    tenant_id=tenant_id,
-                    filters=[("active_until", ">=", today)],
-                )
-                return result.get("total", 0)
-
-            async def count_postgres_active_users():
-                today = datetime.utcnow().date().isoformat()
-                result = await postgres_client.query_documents(
-                    "students",
-                    tenant_id=tenant_id,
-                    filters=[("active_until", ">=", today)],
-                )
-                return result.get("total", 0)
-
-            active_users = await with_circuit_breaker(
-                count_firestore_active_users, count_postgres_active_users
-            )
-
-            # Contar novos usuários (últimos 7 dias)
-            week_ago = (datetime.utcnow() - timedelta(days=7)).isoformat()
-
-            async def count_firestore_new_users():
-                result = await firestore_client.query_documents(
-                    "students",
-                    tenant_id=tenant_id,
-                    filters=[("created_at", ">=", week_ago)],
-                )
-                return result.get("total", 0)
+    async def _collect(self, name: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Executa uma submétrica com limite de concorrência e prazo.
 
-            async def count_postgres_new_users():
-                result = await postgres_client.query_documents(
-                    "students",
-                    tenant_id=tenant_id,
-                    filters=[("created_at", ">=", week_ago)],
+        Returns:
+            Resultado da submétrica ou None se falhar ou estourar o prazo
+        """
+        async with self._limiter:
+            try:
+                return await asyncio.wait_for(func(), self.collect_timeout)
+            except TimeoutError:
+                logger.warning(
+                    f"Métrica {name} excedeu o prazo de {self.collect_timeout}s"
                 )
-                return result.get("total", 0)
-
-            new_users = await with_circuit_breaker(
-                count_firestore_new_users, count_postgres_new_users
+            except Exception as e:
+                logger.error(f"Erro ao coletar métrica {name}: {str(e)}")
+        return None
+
+    async def _count_documents(
+        self, collection: str, tenant_id: str, filters: list[tuple] | None = None
+    ) -> int:
+        """Conta documentos no Firestore, com fallback para o PostgreSQL."""
+
+        # limit=1: apenas o total interessa
+        async def count_firestore():
+            result = await firestore_client.query_documents(
+                collection, tenant_id=tenant_id, filters=filters, limit=1
             )
+            return result.get("total", 0)
 
-            return {
-                "active_users": active_users,
-                "new_users_7d": new_users,
-                "growth_rate": self._calculate_growth_rate(active_users, new_users),
-            }
-
-        except Exception as e:
-            logger.error(f"Erro ao obter métricas de usuários: {str(e)}")
-            return {}
-
-    async def _get_code_metrics(self, tenant_id: str) -> dict[str, Any]:
-        """Obtém métricas de códigos de validação."""
-        try:
-            # Códigos gerados
-            async def count_firestore_codes():
-                result = await firestore_client.query_documents(
-                    "validation_codes", tenant_id=tenant_id
-                )
-                return result.get("total", 0)
-
-            async def count_postgres_codes():
-                result = await postgres_client.query_documents(
-                    "validation_codes", tenant_id=tenant_id
-                )
-                return result.get("total", 0)
-
-            total_codes = await with_circuit_breaker(
-                count_firestore_codes, count_postgres_codes
+        async def count_postgres():
+            result = await postgres_client.query_documents(
+                collection, tenant_id=tenant_id, filters=filters, limit=1
             )
+            return result.get("total", 0)
 
-            # Códigos resgatados
-            async def count_firestore_redeemed():
-                result = await firestore_client.query_documents(
-                    "validation_codes",
-                    tenant_id=tenant_id,
-                    filters=[("used_at", "!=", None)],
-                )
-                return result.get("total", 0)
-
-            async def count_postgres_redeemed():
-                result = await postgres_client.query_documents(
-                    "validation_codes",
-                    tenant_id=tenant_id,
-                    filters=[("used_at", "!=", None)],
-                )
-                return result.get("total", 0)
+        return await with_circuit_breaker(
+            count_firestore, count_postgres, breaker=(collection, "count")
+        )
 
-            redeemed_codes = await with_circuit_breaker(
-                count_firestore_redeemed, count_postgres_redeemed
-            )
+    async def _get_user_metrics(self, tenant_id: str) -> dict[str, Any]:
+        """Obtém métricas de usuários."""
+        today = datetime.utcnow().date().isoformat()
+        week_ago = (datetime.utcnow() - timedelta(days=7)).isoformat()
+
+        # Usuários ativos e novos usuários (últimos 7 dias)
+        active_users, new_users = await asyncio.gather(
+            self._collect(
+                "users.active_users",
+                lambda: self._count_documents(
+                    "students", tenant_id, [("active_until", ">=", today)]
+                ),
+            ),
+            self._collect(
+                "users.new_users_7d",
+                lambda: self._count_documents(
+                    "students", tenant_id, [("created_at", ">=", week_ago)]
+                ),
+            ),
+        )
+
+        growth_rate = None
+        if active_users is not None and new_users is not None:
+            growth_rate = self._calculate_growth_rate(active_users, new_users)
+        return {
+            "active_users": active_users,
+            "new_users_7d": new_users,
+            "growth_rate": growth_rate,
+        }
 
-            redemption_rate = (
-                (redeemed_codes / total_codes * 100) if total_codes > 0 else 0
+    async def _get_code_metrics(self, tenant_id: str) -> dict[str, Any]:
+        """Obtém métricas de códigos de validação (contadores incrementais)."""
+        counts = await self._collect("codes", lambda: code_counters.totals(tenant_id))
+
+        total_codes = redeemed_codes = pending_codes = redemption_rate = None
+        if counts is not None:
+            total_codes = counts[GENERATED]
+            redeemed_codes = counts[REDEEMED]
+            pending_codes = total_codes - redeemed_codes
+            redemption_rate = round(
+                (redeemed_codes / total_codes * 100) if total_codes > 0 else 0, 2
             )
-
-            return {
-                "total_codes": total_codes,
-                "redeemed_codes": redeemed_codes,
-                "pending_codes": total_codes - redeemed_codes,
-                "redemption_rate": round(redemption_rate, 2),
-            }
-
-        except Exception as e:
-            logger.error(f"Erro ao obter métricas de códigos: {str(e)}")
-            return {}
+        return {
+            "total_codes": total_codes,
+            "redeemed_codes": redeemed_codes,
+            "pending_codes": pending_codes,
+            "redemption_rate": redemption_rate,
+        }
 
     async def _get_partner_metrics(self, tenant_id: str) -> dict[str, Any]:
         """Obtém métricas de parceiros."""
-        try:
-            # Parceiros ativos
-            async def count_firestore_partners():
-                result = await firestore_client.query_documents(
-                    "partners",
-                    tenant_id=tenant_id,
-                    filters=[("active", "==", True)],
-                )
-                return result.get("total", 0)
-
-            async def count_postgres_partners():
-                result = await postgres_client.query_documents(
-                    "partners",
-                    tenant_id=tenant_id,
-                    filters=[("active", "==", True)],
-                )
-                return result.get("total", 0)
-
-            active_partners = await with_circuit_breaker(
-                count_firestore_partners, count_postgres_partners
-            )
-
-            return {
-                "active_partners": active_partners,
-                "avg_redemptions_per_partner": 0,  # Calcular posteriormente
-            }
-
-        except Exception as e:
-            logger.error(f"Erro ao obter métricas de parceiros: {str(e)}")
-            return {}
+        active_partners = await self._collect(
+            "partners.active_partners",
+            lambda: self._count_documents(
+                "partners", tenant_id, [("active", "==", True)]
+            ),
+        )
+        return {
+            "active_partners": active_partners,
+            "avg_redemptions_per_partner": 0,  # Calcular posteriormente
+        }
 
     async def _get_performance_metrics(self, tenant_id: str) -> dict[str, Any]:
         """Obtém métricas de performance do sistema."""
@@ -546,51 +491,77 @@ class MetricsService:
 
             collection_ref = self.db.collection("metrics_snapshots")
             await collection_ref.add(snapshot_data)
+            await self.rollups.record(
+                self.db, tenant_id, snapshot_data["timestamp"], metrics
+            )
 
         except Exception as e:
             logger.error(f"Erro ao salvar snapshot de métricas: {str(e)}")
 
-    async def _get_top_partners(
-        self, tenant_id: str, limit: int = 10
+    async def get_top_partners(
+        self,
+        tenant_id: str,
+        limit: int = 10,
+        start_day: str | None = None,
+        end_day: str | None = None,
     ) -> list[dict[str, Any]]:
-        """Obtém top parceiros por número de resgates."""
-        try:
-            # Implementação simplificada
-            # Em produção, seria necessário agregar dados de resgates
-            async def get_firestore_partners():
-                result = await firestore_client.query_documents(
-                    "partners",
-                    tenant_id=tenant_id,
-                    filters=[("active", "==", True)],
-                    limit=limit,
-                )
-                return result.get("items", [])
-
-            async def get_postgres_partners():
-                result = await postgres_client.query_documents(
-                    "partners",
-                    tenant_id=tenant_id,
-                    filters=[("active", "==", True)],
-                    limit=limit,
-                )
-                return result.get("items", [])
+        """
+        Obtém os parceiros ativos com mais resgates no período.
+
+        O ranking vem de uma única agregação sobre os contadores de códigos
+        (`code_counters.top_partners`) e os parceiros são lidos em lote; são
+        pedidos o dobro de candidatos para descartar parceiros inativos.
 
-            partners = await with_circuit_breaker(
-                get_firestore_partners, get_postgres_partners
+        Args:
+            tenant_id: ID do tenant
+            limit: Número de parceiros
+            start_day: Primeiro dia do período (YYYY-MM-DD), inclusive
+            end_day: Último dia do período (YYYY-MM-DD), inclusive
+
+        Returns:
+            Lista com partner_id, trade_name e redemptions, maiores primeiro
+        """
+        ranking = await code_counters.top_partners(
+            tenant_id, limit * 2, start_day, end_day
+        )
+        partner_ids = [partner_id for partner_id, _ in ranking]
+
+        async def get_firestore_partners():
+            return await firestore_client.get_documents_many(
+                "partners", partner_ids, tenant_id
             )
 
-            # Adicionar contagem de resgates (simulado)
-            top_partners = []
-            for partner in partners:
-                partner_data = {
-                    "partner_id": partner.get("id"),
+        async def get_postgres_partners():
+            return await postgres_client.get_documents_many(
+                "partners", partner_ids, tenant_id
+            )
+
+        partners = await with_circuit_breaker(
+            get_firestore_partners,
+            get_postgres_partners,
+            breaker=("partners", "read"),
+        )
+
+        top_partners = []
+        for partner_id, redemptions in ranking:
+            partner = partners.get(partner_id)
+            if not partner or partner.get("active") is not True:
+                continue
+            top_partners.append(
+                {
+                    "partner_id": partner_id,
                     "trade_name": partner.get("trade_name", ""),
-                    "redemptions": 0,  # Calcular resgates reais
+                    "redemptions": redemptions,
                 }
-                top_partners.append(partner_data)
-
-            return top_partners
+            )
+        return top_partners[:limit]
 
+    async def _get_top_partners(
+        self, tenant_id: str, limit: int = 10
+    ) -> list[dict[str, Any]]:
+        """Obtém top parceiros por número de resgates."""
+        try:
+            return await self.get_top_partners(tenant_id, limit)
         except Exception as e:
             logger.error(f"Erro ao obter top parceiros: {str(e)}")
             return []
@@ -609,17 +580,6 @@ class MetricsService:
             logger.error(f"Erro ao calcular tendências: {str(e)}")
             return {}
 
-    async def _aggregate_metrics(
-        self, snapshots: list[dict[str, Any]], granularity: str
-    ) -> dict[str, Any]:
-        """Agrega métricas conforme granularidade especificada."""
-        # Implementação simplificada
-        return {
-            "aggregated_data": snapshots,
-            "granularity": granularity,
-            "total_snapshots": len(snapshots),
-        }
-
     def _calculate_growth_rate(self, current: int, new: int) -> float:
         """Calcula taxa de crescimento."""
         if current == 0:
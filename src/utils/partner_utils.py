@@ -36,7 +36,7 @@ async def get_partner_name_by_entity_id(entity_id: str, tenant_id: str) -> str |
 
         # Executar consulta com circuit breaker
         partner_result = await with_circuit_breaker(
-            get_firestore_partner, get_postgres_partner
+            get_firestore_partner, get_postgres_partner, breaker=("partners", "read")
         )
 
         # Extrair dados do parceiro
@@ -10,9 +10,21 @@ import os
 from typing import Any
 
 from src.auth import JWTPayload
-from src.db import firestore_client, postgres_client, with_circuit_breaker
+from src.db import (
+    firestore_client,
+    postgres_client,
+    with_circuit_breaker,
+    with_hedged_read,
+)
+from src.db.circuit_breaker import BackendUnavailableError
+from src.db.pagination import (
+    POSTGRES_BACKEND,
+    cursor_backend,
+    decode_document_cursor,
+)
 from src.models import Partner, PartnerListResponse
 from src.utils import logger
+from src.utils.catalog_cache import catalog_cache
 
 
 class PartnersService:
@@ -25,6 +37,7 @@ class PartnersService:
         ord: str | None = None,
         limit: int = 20,
         offset: int = 0,
+        cursor: str | None = None,
         use_circuit_breaker: bool = True,
         enable_ordering: bool = True,
     ) -> PartnerListResponse:
@@ -39,6 +52,7 @@ class PartnersService:
             ord: Ordenação dos resultados (opcional)
             limit: Número máximo de itens por página
             offset: Offset para paginação
+            cursor: Cursor opaco da página anterior (tem precedência sobre offset)
             use_circuit_breaker: Se deve usar circuit breaker (padrão: True)
             enable_ordering: Se deve aplicar ordenação (padrão: True)
 
@@ -46,6 +60,7 @@ class PartnersService:
             PartnerListResponse: Lista de parceiros formatada
 
         Raises:
+            InvalidCursorError: Se o cursor for inválido ou expirado
             HTTPException: Em caso de erro na consulta
         """
         try:
@@ -82,6 +97,7 @@ class PartnersService:
                     order_by=order_by,
                     limit=limit,
                     offset=offset,
+                    cursor=cursor,
                 )
             else:
                 result = await PartnersService._query_firestore_only(
@@ -90,6 +106,7 @@ class PartnersService:
                     order_by=order_by,
                     limit=limit,
                     offset=offset,
+                    cursor=cursor,
                 )
 
             # Extrair dados dos parceiros
@@ -109,7 +126,9 @@ class PartnersService:
                 f"{current_user.role} (tenant: {current_user.tenant})"
             )
 
-            return PartnerListResponse(data=partner_objects)
+            return PartnerListResponse(
+                data=partner_objects, next_cursor=result.get("next_cursor")
+            )
 
         except Exception as e:
             logger.error(
@@ -125,29 +144,40 @@ class PartnersService:
         order_by: list[tuple[str, str]],
         limit: int,
         offset: int,
+        cursor: str | None = None,
     ) -> dict[str, Any]:
         """
         Executa consulta com circuit breaker (Firestore + fallback PostgreSQL).
 
+        A página seguinte vai para o backend que gerou o cursor: cursores do
+        PostgreSQL (fallback ou hedge) continuam nele e cursores do Firestore
+        não têm fallback, pois o PostgreSQL não consegue retomá-los.
+
         Args:
             current_user: Dados do usuário autenticado
             filters: Lista de filtros para aplicar
             order_by: Lista de ordenações para aplicar
             limit: Limite de resultados
             offset: Offset para paginação
+            cursor: Cursor opaco da página anterior
 
         Returns:
             dict: Resultado da consulta
+
+        Raises:
+            InvalidCursorError: Se o cursor for inválido
+            BackendUnavailableError: Cursor do Firestore com o Firestore
+                indisponível
         """
 
         async def firestore_query():
-            return await firestore_client.query_documents(
-                "partners",
-                tenant_id=current_user.tenant,
+            return await PartnersService._query_firestore_only(
+                current_user=current_user,
                 filters=filters,
                 order_by=order_by,
                 limit=limit,
                 offset=offset,
+                cursor=cursor,
             )
 
         async def postgres_query():
@@ -157,10 +187,32 @@ class PartnersService:
                 order_by=order_by,
                 limit=limit,
                 offset=offset,
+                cursor=cursor,
                 tenant_id=current_user.tenant,
             )
 
-        return await with_circuit_breaker(firestore_query, postgres_query)
+        async def no_fallback():
+            raise BackendUnavailableError(
+                "Firestore indisponível e cursor do Firestore não pode ser "
+                "retomado no PostgreSQL"
+            )
+
+        if cursor:
+            # Cursor malformado é erro do cliente: recusar antes do breaker
+            if cursor_backend(cursor) == POSTGRES_BACKEND:
+                return await postgres_query()
+            decode_document_cursor(cursor, "partners")
+            return await with_circuit_breaker(
+                firestore_query, no_fallback, breaker=("partners", "read")
+            )
+        # Se o hedge vencer, o next_cursor é do PostgreSQL e a marca do backend
+        # leva a página seguinte a ele (ver acima)
+        return await with_hedged_read(
+            "partners_list",
+            firestore_query,
+            postgres_query,
+            breaker=("partners", "read"),
+        )
 
     @staticmethod
     async def _query_firestore_only(
@@ -169,25 +221,46 @@ class PartnersService:
         order_by: list[tuple[str, str]] | None,
         limit: int,
         offset: int,
+        cursor: str | None = None,
     ) -> dict[str, Any]:
         """
         Executa consulta apenas no Firestore (sem circuit breaker).
 
+        O resultado é servido pelo cache do catálogo do tenant; apenas
+        respostas do Firestore são armazenadas, nunca o fallback.
+
         Args:
             current_user: Dados do usuário autenticado
             filters: Lista de filtros para aplicar
             order_by: Lista de ordenações para aplicar (pode ser None)
             limit: Limite de resultados
             offset: Offset para paginação
+            cursor: Cursor opaco da página anterior
 
         Returns:
             dict: Resultado da consulta
         """
-        return await firestore_client.query_documents(
-            "partners",
-            tenant_id=current_user.tenant,
-            filters=filters,
-            order_by=order_by,
-            limit=limit,
-            offset=offset,
+
+        async def load():
+            return await firestore_client.query_documents(
+                "partners",
+                tenant_id=current_user.tenant,
+                filters=filters,
+                order_by=order_by,
+                limit=limit,
+                offset=offset,
+                cursor=cursor,
+                count_total=False,
+            )
+
+        cache_key = (
+            "list",
+            tuple(filters),
+            tuple(order_by or ()),
+            limit,
+            offset,
+            cursor,
+        )
+        return await catalog_cache.get_or_load(
+            current_user.tenant, "partners", cache_key, load
         )
@@ -9,6 +9,7 @@ from datetime import datetime, timedelta
 from typing import Any
 
 from src.db import firestore_client
+from src.utils.catalog_cache import catalog_cache
 from src.utils.logging import logger
 from src.utils.logos_service import logos_service
 
@@ -156,6 +157,7 @@ class PartnersSyncService:
                 }
 
                 partner_ref.update(update_data)
+                catalog_cache.invalidate(partner_data.get("tenant_id"), "partners")
 
                 logger.info(
                     "sync_partner_updated",
@@ -285,6 +287,7 @@ class PartnersSyncService:
             Estatísticas do processamento do lote
         """
         stats = {"processed": 0, "updated": 0, "errors": 0, "skipped": 0}
+        updated_tenants: set[str | None] = set()
 
         for doc in batch:
             try:
@@ -326,6 +329,7 @@ class PartnersSyncService:
 
                     doc.reference.update(update_data)
                     stats["updated"] += 1
+                    updated_tenants.add(partner_data.get("tenant_id"))
 
                     logger.debug(
                         "partner_logo_updated",
@@ -347,6 +351,10 @@ class PartnersSyncService:
                     error=str(e),
                 )
 
+        # Parceiros sem tenant_id invalidam o cache de todos os tenants
+        for tenant_id in updated_tenants:
+            catalog_cache.invalidate(tenant_id, "partners")
+
         return stats
 
     def _update_stats(self, main_stats: dict, batch_stats: dict) -> None:
@@ -0,0 +1,198 @@
+"""
+Profiling sob demanda de requisições.
+
+Dois modos:
+
+- `cprofile`: profiler determinístico (cProfile); guarda o relatório do
+  pstats ordenado por tempo cumulativo. O hook de profiling é por thread,
+  então há no máximo um perfil cProfile ativo por processo.
+- `sample`: uma thread lê a pilha da thread do event loop a cada
+  PROFILING_SAMPLE_INTERVAL_MS e guarda as pilhas no formato "collapsed"
+  (`a;b;c N`), aceito por flamegraph.pl e speedscope.
+
+Os dois modos observam a thread do event loop inteira: corrotinas de outras
+requisições que rodarem no mesmo intervalo também aparecem no perfil, e
+código executado no threadpool (endpoints e dependências `def`) não aparece.
+
+Os perfis ficam em memória nesta instância, limitados a PROFILING_MAX_STORED
+(os mais antigos são descartados), e são lidos pelos endpoints de admin em
+`src.api.admin_metrics`.
+"""
+
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any
+
+from src.config import (
+    PROFILING_MAX_CONCURRENT,
+    PROFILING_MAX_STORED,
+    PROFILING_SAMPLE_INTERVAL_MS,
+)
+
+MODES = ("cprofile", "sample")
+_PSTATS_LINES = 60
+_MAX_STACK_DEPTH = 128
+
+
+class _StackSampler:
+    """Amostra periodicamente a pilha de uma thread em formato collapsed."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="request-profiler", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < _MAX_STACK_DEPTH:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {n}" for stack, n in self.stacks.most_common())
+
+
+class ProfileSession:
+    """Perfil de uma requisição em andamento."""
+
+    def __init__(self, profiler: "RequestProfiler", profile_id: str, mode: str):
+        self.profiler = profiler
+        self.profile_id = profile_id
+        self.mode = mode
+        self.started = time.perf_counter()
+        self._cprofile: cProfile.Profile | None = None
+        self._sampler: _StackSampler | None = None
+        if mode == "cprofile":
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        else:
+            self._sampler = _StackSampler(
+                threading.get_ident(), profiler.sample_interval
+            )
+            self._sampler.start()
+
+    def finish(self, route: str, method: str, status_code: int) -> dict[str, Any]:
+        """
+        Encerra o perfil e o guarda no profiler.
+
+        Returns:
+            Resumo do perfil guardado (sem o relatório)
+        """
+        duration_ms = (time.perf_counter() - self.started) * 1000
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            buffer = io.StringIO()
+            stats = pstats.Stats(self._cprofile, stream=buffer)
+            stats.sort_stats("cumulative").print_stats(_PSTATS_LINES)
+            output = buffer.getvalue()
+        else:
+            self._sampler.stop()
+            output = self._sampler.collapsed()
+        return self.profiler._store(
+            self,
+            {
+                "id": self.profile_id,
+                "mode": self.mode,
+                "route": route,
+                "method": method,
+                "status_code": status_code,
+                "duration_ms": round(duration_ms, 2),
+                "created_at": time.time(),
+                "output": output,
+            },
+        )
+
+
+class RequestProfiler:
+    """Controla os perfis ativos (com limite) e guarda os concluídos."""
+
+    def __init__(
+        self,
+        max_concurrent: int = PROFILING_MAX_CONCURRENT,
+        max_stored: int = PROFILING_MAX_STORED,
+        sample_interval_ms: float = PROFILING_SAMPLE_INTERVAL_MS,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_stored = max_stored
+        self.sample_interval = sample_interval_ms / 1000
+        self._active: set[ProfileSession] = set()
+        self._profiles: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._counters = {"started": 0, "rejected": 0, "evicted": 0}
+
+    def start(self, profile_id: str, mode: str = "cprofile") -> ProfileSession | None:
+        """
+        Inicia o perfil de uma requisição.
+
+        Returns:
+            Sessão do perfil ou None se o limite de perfis simultâneos foi
+            atingido (ou já há um perfil cProfile ativo)
+        """
+        if mode not in MODES:
+            raise ValueError(f"Modo de profiling desconhecido: {mode}")
+        busy = len(self._active) >= self.max_concurrent or (
+            mode == "cprofile" and any(s.mode == "cprofile" for s in self._active)
+        )
+        if busy:
+            self._counters["rejected"] += 1
+            return None
+        session = ProfileSession(self, profile_id, mode)
+        self._active.add(session)
+        self._counters["started"] += 1
+        return session
+
+    def _store(
+        self, session: ProfileSession, profile: dict[str, Any]
+    ) -> dict[str, Any]:
+        self._active.discard(session)
+        self._profiles[profile["id"]] = profile
+        self._profiles.move_to_end(profile["id"])
+        while len(self._profiles) > self.max_stored:
+            self._profiles.popitem(last=False)
+            self._counters["evicted"] += 1
+        return {k: v for k, v in profile.items() if k != "output"}
+
+    def get(self, profile_id: str) -> dict[str, Any] | None:
+        """Perfil guardado (com o relatório) ou None."""
+        return self._profiles.get(profile_id)
+
+    def summaries(self) -> list[dict[str, Any]]:
+        """Resumo dos perfis guardados, mais recentes primeiro."""
+        return [
+            {k: v for k, v in profile.items() if k != "output"}
+            for profile in reversed(self._profiles.values())
+        ]
+
+    def stats(self) -> dict[str, Any]:
+        """Limites, perfis ativos/guardados e contadores."""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_stored": self.max_stored,
+            "active": len(self._active),
+            "stored": len(self._profiles),
+            **self._counters,
+        }
+
+
+# Instância global usada pelo ProfilingMiddleware e pelos endpoints de admin
+request_profiler = RequestProfiler()
@@ -1,9 +1,278 @@
 """
 Utilitários para rate limiting.
+
+Endpoints autenticados usam token buckets por (tenant, entidade do JWT), de
+modo que parceiros atrás do mesmo NAT não dividem o limite. Os buckets ficam
+em memória (por instância) ou em um servidor compatível com o protocolo Redis,
+onde um script Lua faz a leitura, a recarga e o consumo de forma atômica e
+com o relógio do servidor, compartilhando o limite entre instâncias.
+
+Endpoints públicos continuam no `limiter` do slowapi, por endereço IP.
 """
 
+import math
+import time
+from collections import OrderedDict, defaultdict, deque
+from collections.abc import Callable
+from typing import Any
+
+from fastapi import Depends, HTTPException, status
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
+from src.config import (
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_MAX_KEYS,
+    RATE_LIMIT_REDIS_TIMEOUT,
+    RATE_LIMIT_REDIS_URL,
+)
+from src.utils.logging import logger
+
 # Configuração do rate limiter baseado no endereço IP
-limiter = Limiter(key_func=get_remote_address)
+limiter = Limiter(
+    key_func=get_remote_address,
+    storage_uri=RATE_LIMIT_REDIS_URL if RATE_LIMIT_BACKEND == "redis" else None,
+)
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_rate(limit: str) -> tuple[int, int]:
+    """
+    Converte um limite no formato "N/período" em (capacidade, segundos).
+
+    Raises:
+        ValueError: Formato ou período desconhecido
+    """
+    count, _, period = limit.partition("/")
+    seconds = _PERIODS.get(period.strip().rstrip("s"))
+    if seconds is None or not count.strip().isdigit() or int(count) <= 0:
+        raise ValueError(f"Limite inválido: {limit!r}")
+    return int(count), seconds
+
+
+class MemoryBucketStore:
+    """Token buckets em memória, com limite de chaves acompanhadas (LRU)."""
+
+    name = "memory"
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def consume(
+        self, key: str, capacity: int, rate: float, cost: int = 1
+    ) -> tuple[bool, float]:
+        """
+        Recarrega o bucket e consome `cost` fichas se houver saldo.
+
+        Returns:
+            Tupla (permitido, segundos até haver saldo)
+        """
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+    def clear(self) -> None:
+        """Remove todos os buckets."""
+        self._buckets.clear()
+
+    async def close(self) -> None:
+        """Nada a liberar no armazenamento em memória."""
+
+
+# Recarga, consumo e expiração atômicos; o tempo vem do servidor (TIME), então
+# instâncias com relógios diferentes compartilham o mesmo bucket.
+_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+local wait = (cost - tokens) / rate
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+    wait = 0
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring(wait)}
+"""
+
+
+class RedisBucketStore:
+    """Token buckets compartilhados em um servidor com protocolo Redis."""
+
+    name = "redis"
+
+    def __init__(self, url: str, timeout: float):
+        import redis.asyncio as redis
+
+        self.url = url
+        self._client = redis.from_url(
+            url, socket_timeout=timeout, socket_connect_timeout=timeout
+        )
+        self._script = self._client.register_script(_TOKEN_BUCKET_SCRIPT)
+
+    async def consume(
+        self, key: str, capacity: int, rate: float, cost: int = 1
+    ) -> tuple[bool, float]:
+        """
+        Recarrega o bucket e consome `cost` fichas se houver saldo.
+
+        Returns:
+            Tupla (permitido, segundos até haver saldo)
+        """
+        allowed, wait = await self._script(
+            keys=[f"ratelimit:{key}"], args=[capacity, rate, cost]
+        )
+        return bool(allowed), float(wait)
+
+    def clear(self) -> None:
+        """Os buckets expiram sozinhos no servidor."""
+
+    async def close(self) -> None:
+        """Fecha as conexões com o servidor."""
+        await self._client.aclose()
+
+
+def _build_store(backend: str) -> MemoryBucketStore | RedisBucketStore:
+    if backend == "redis":
+        try:
+            return RedisBucketStore(RATE_LIMIT_REDIS_URL, RATE_LIMIT_REDIS_TIMEOUT)
+        except ImportError:
+            logger.error(
+                "RATE_LIMIT_BACKEND=redis requer o pacote 'redis'; "
+                "usando buckets em memória"
+            )
+    elif backend != "memory":
+        logger.error(f"RATE_LIMIT_BACKEND desconhecido: {backend}; usando memória")
+    return MemoryBucketStore(RATE_LIMIT_MAX_KEYS)
+
+
+class TokenBucketLimiter:
+    """Aplica limites por escopo e registra as decisões."""
+
+    def __init__(self, store: MemoryBucketStore | RedisBucketStore, window: int = 1000):
+        self.store = store
+        self._decisions: defaultdict[str, dict[str, int]] = defaultdict(
+            lambda: {"allowed": 0, "limited": 0, "errors": 0}
+        )
+        self._latencies: deque[float] = deque(maxlen=window)
+
+    async def hit(
+        self, scope: str, tenant_id: str, entity_id: str, capacity: int, period: int
+    ) -> tuple[bool, float]:
+        """
+        Consome uma ficha do bucket de (escopo, tenant, entidade).
+
+        O bucket comporta `capacity` fichas e recarrega `capacity` a cada
+        `period` segundos. Falhas do armazenamento não bloqueiam a requisição
+        (fail-open).
+
+        Returns:
+            Tupla (permitido, segundos até haver saldo)
+        """
+        key = f"{scope}:{tenant_id}:{entity_id}"
+        start = time.perf_counter()
+        try:
+            allowed, wait = await self.store.consume(key, capacity, capacity / period)
+        except Exception as e:
+            self._decisions[scope]["errors"] += 1
+            logger.warning(f"Rate limit indisponível para {scope}: {e}")
+            return True, 0.0
+        finally:
+            self._latencies.append(time.perf_counter() - start)
+        self._decisions[scope]["allowed" if allowed else "limited"] += 1
+        return allowed, wait
+
+    def clear(self) -> None:
+        """Zera os buckets locais e as métricas."""
+        self.store.clear()
+        self._decisions.clear()
+        self._latencies.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Retorna as decisões por escopo e a latência da verificação.
+
+        Returns:
+            Dict com backend, decisões por escopo e latência p50/p99 (ms)
+        """
+        ordered = sorted(self._latencies)
+
+        def percentile(pct: float) -> float | None:
+            if not ordered:
+                return None
+            index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+            return round(ordered[index] * 1000, 3)
+
+        return {
+            "backend": self.store.name,
+            "decisions": {scope: dict(d) for scope, d in self._decisions.items()},
+            "latency_ms": {
+                "p50": percentile(50),
+                "p99": percentile(99),
+                "samples": len(ordered),
+            },
+        }
+
+
+# Instância global do limitador por entidade
+token_bucket_limiter = TokenBucketLimiter(_build_store(RATE_LIMIT_BACKEND))
+
+
+def rate_limit(scope: str, limit: str, user_dependency: Callable) -> Callable:
+    """
+    Cria uma dependência que limita as requisições do usuário autenticado.
+
+    A chave do bucket é (escopo, tenant, entity_id do JWT, ou sub na falta
+    dele). `user_dependency` deve ser a mesma dependência de papel do
+    endpoint, para que o FastAPI reutilize o usuário já validado.
+
+    Args:
+        scope: Nome do limite (chave das métricas)
+        limit: Limite no formato "N/período", ex.: "5/minute"
+        user_dependency: Dependência que retorna o JWTPayload
+
+    Returns:
+        Dependência para `dependencies=[Depends(...)]`
+    """
+    capacity, period = parse_rate(limit)
+
+    async def dependency(current_user=Depends(user_dependency)):
+        allowed, wait = await token_bucket_limiter.hit(
+            scope,
+            current_user.tenant,
+            current_user.entity_id or current_user.sub,
+            capacity,
+            period,
+        )
+        if not allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail={
+                    "error": {
+                        "code": "RATE_LIMIT_EXCEEDED",
+                        "msg": f"Limite de {limit} excedido, tente novamente "
+                        "em instantes",
+                    }
+                },
+                headers={"Retry-After": str(max(1, math.ceil(wait)))},
+            )
+
+    return dependency
@@ -0,0 +1,261 @@
+"""
+Resgate de códigos de validação pelos parceiros.
+
+A verificação do código e a marcação como usado acontecem em uma única
+operação atômica: uma transação no Firestore ou um
+`UPDATE ... WHERE used_at IS NULL RETURNING *` na contingência PostgreSQL.
+Assim, dois terminais que resgatam o mesmo código ao mesmo tempo nunca
+obtêm sucesso os dois.
+
+Resgates simultâneos do mesmo código no mesmo processo compartilham uma
+única transação: em vez de aguardarem na fila de locks do documento, os
+demais recebem o resultado dela (o código é de uso único).
+
+O documento do parceiro (verificação do CNPJ) vem do cache do catálogo,
+invalidado nas escritas de parceiros; o nome do aluno é a única leitura
+feita depois da transação. Cada resgate incrementa o contador de códigos
+resgatados do parceiro no dia (`src.utils.code_counters`).
+"""
+
+import asyncio
+from collections import Counter
+from datetime import UTC, datetime
+from typing import Any
+
+from src.db import firestore_client, postgres_client, with_circuit_breaker
+from src.db.unified_client import UnifiedDatabaseClient
+from src.utils.catalog_cache import catalog_cache
+from src.utils.code_allocator import code_allocator
+from src.utils.code_counters import code_counters
+from src.utils.logging import logger
+
+COLLECTION = "validation_codes"
+
+# Motivos de recusa do resgate
+CNPJ_MISMATCH = "cnpj_mismatch"
+NOT_FOUND = "not_found"
+ALREADY_USED = "already_used"
+EXPIRED = "expired"
+CONTENDED = "contended"
+
+
+class RedemptionError(Exception):
+    """Resgate recusado; `reason` é um dos motivos definidos neste módulo."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def _as_utc(value: Any) -> datetime | None:
+    """Converte datetime ou ISO 8601 em datetime com fuso (UTC se ingênuo)."""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=UTC)
+
+
+def check_redeemable(
+    code_doc: dict[str, Any], partner_id: str, now: datetime
+) -> str | None:
+    """
+    Verifica se o código pode ser resgatado pelo parceiro.
+
+    Returns:
+        Motivo da recusa ou None se o código pode ser resgatado
+    """
+    # Código de outro parceiro é tratado como inexistente (não vaza existência)
+    if code_doc.get("partner_id") != partner_id:
+        return NOT_FOUND
+    if code_doc.get("used_at"):
+        return ALREADY_USED
+    expires = _as_utc(code_doc.get("expires") or code_doc.get("expires_at"))
+    if expires and now > expires:
+        return EXPIRED
+    return None
+
+
+class RedemptionEngine:
+    """Resgate atômico de códigos de validação."""
+
+    def __init__(self):
+        self._pending: dict[tuple[str, str, str], asyncio.Future] = {}
+        self._coalesced = 0
+        self._outcomes: Counter[str] = Counter()
+
+    async def redeem(
+        self, tenant_id: str, partner_id: str, cnpj: str, code: str
+    ) -> dict[str, Any]:
+        """
+        Resgata um código de validação.
+
+        Args:
+            tenant_id: Tenant do parceiro autenticado
+            partner_id: ID do parceiro autenticado
+            cnpj: CNPJ informado no terminal
+            code: Código apresentado pelo aluno
+
+        Returns:
+            Dict com code_id, student_id, user_name e redeemed_at
+
+        Raises:
+            RedemptionError: Resgate recusado
+        """
+        try:
+            result = await self._redeem(tenant_id, partner_id, cnpj, code)
+        except RedemptionError as e:
+            self._outcomes[e.reason] += 1
+            raise
+        self._outcomes["redeemed"] += 1
+        await code_counters.record_redeemed(
+            tenant_id, partner_id, result["redeemed_at"]
+        )
+        return result
+
+    async def _redeem(
+        self, tenant_id: str, partner_id: str, cnpj: str, code: str
+    ) -> dict[str, Any]:
+        partner = await self._get_partner(tenant_id, partner_id)
+        if not partner or partner.get("cnpj") != cnpj:
+            raise RedemptionError(CNPJ_MISMATCH)
+
+        now = datetime.now(UTC)
+        # Códigos gerados antes da partição usam o próprio código como ID
+        for doc_id in (code_allocator.doc_id(tenant_id, partner_id, code), code):
+            code_doc, reason = await self._claim(tenant_id, partner_id, doc_id, now)
+            if reason is not None:
+                raise RedemptionError(reason)
+            if code_doc is not None:
+                break
+        else:
+            raise RedemptionError(NOT_FOUND)
+
+        student_id = code_doc.get("student_id")
+        return {
+            "code_id": code_doc["id"],
+            "student_id": student_id,
+            "user_name": await self._get_student_name(tenant_id, student_id),
+            "redeemed_at": now,
+        }
+
+    @staticmethod
+    async def _get_partner(tenant_id: str, partner_id: str) -> dict[str, Any] | None:
+        async def load():
+            return await UnifiedDatabaseClient.get_document(
+                "partners", partner_id, tenant_id, hedge="partner_redeem"
+            )
+
+        return await catalog_cache.get_or_load(
+            tenant_id, "partners", ("redeem", partner_id), load
+        )
+
+    async def _claim(
+        self, tenant_id: str, partner_id: str, doc_id: str, now: datetime
+    ) -> tuple[dict[str, Any] | None, str | None]:
+        """Reivindica o código, compartilhando transações simultâneas."""
+        key = (tenant_id, partner_id, doc_id)
+        pending = self._pending.get(key)
+        if pending is not None:
+            self._coalesced += 1
+            code_doc, reason = await asyncio.shield(pending)
+            if code_doc is not None and reason is None:
+                # Quem iniciou a transação já resgatou o código
+                reason = ALREADY_USED
+            return code_doc, reason
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            result = await self._claim_once(tenant_id, partner_id, doc_id, now)
+        except BaseException as e:
+            future.set_exception(e)
+            # Evita o aviso "exception was never retrieved" sem aguardadores
+            future.exception()
+            raise
+        finally:
+            self._pending.pop(key, None)
+
+        future.set_result(result)
+        return result
+
+    @staticmethod
+    async def _claim_once(
+        tenant_id: str, partner_id: str, doc_id: str, now: datetime
+    ) -> tuple[dict[str, Any] | None, str | None]:
+        """Verifica e marca o código como usado em uma operação atômica."""
+
+        def check(code_doc: dict[str, Any]) -> str | None:
+            return check_redeemable(code_doc, partner_id, now)
+
+        async def claim_firestore():
+            return await firestore_client.claim_document(
+                COLLECTION,
+                doc_id,
+                {"used_at": now, "redeemed_by_partner_id": partner_id},
+                check,
+                tenant_id,
+            )
+
+        async def claim_postgres():
+            # Colunas TIMESTAMP sem fuso no schema da contingência
+            pg_now = now.replace(tzinfo=None)
+            row = await postgres_client.update_if(
+                COLLECTION,
+                doc_id,
+                {"used_at": pg_now, "redeemed_by_partner_id": partner_id},
+                tenant_id=tenant_id,
+                filters=[
+                    ("partner_id", "==", partner_id),
+                    ("used_at", "==", None),
+                    ("expires", ">", pg_now),
+                ],
+            )
+            if row is not None:
+                return row, None
+            # Sem linha atualizada: descobre o motivo para a resposta
+            current = await postgres_client.get_document(COLLECTION, doc_id, tenant_id)
+            if current is None:
+                return None, None
+            return current, check(current) or ALREADY_USED
+
+        return await with_circuit_breaker(
+            claim_firestore, claim_postgres, breaker=(COLLECTION, "write")
+        )
+
+    @staticmethod
+    async def _get_student_name(tenant_id: str, student_id: str | None) -> str:
+        if not student_id:
+            return "Aluno não encontrado"
+        try:
+            student = await UnifiedDatabaseClient.get_document(
+                "students", student_id, tenant_id, hedge="partner_redeem"
+            )
+        except Exception as e:
+            # O código já foi resgatado; o nome é apenas informativo
+            logger.warning(f"Erro ao buscar aluno {student_id} do resgate: {e}")
+            return "Nome não disponível"
+        if not student:
+            return "Aluno não encontrado"
+        return student.get("name", "Nome não disponível")
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Retorna os resultados dos resgates desde o início do processo.
+
+        Returns:
+            Dict com a contagem por resultado ('redeemed' ou motivo da recusa)
+            e o número de resgates que compartilharam uma transação em curso
+        """
+        return {
+            "outcomes": dict(self._outcomes),
+            "coalesced_claims": self._coalesced,
+            "claims_in_flight": len(self._pending),
+        }
+
+
+# Instância global do mecanismo de resgate
+redemption_engine = RedemptionEngine()
@@ -0,0 +1,43 @@
+"""
+Prazo (deadline) da requisição HTTP em andamento.
+
+O middleware em `src.main` define o prazo no início de cada requisição; as
+camadas de banco o consultam para não iniciar novas tentativas que não
+terminariam a tempo. Fora de uma requisição não há prazo.
+"""
+
+import time
+from contextvars import ContextVar, Token
+
+_deadline: ContextVar[float | None] = ContextVar("request_deadline", default=None)
+
+
+def set_request_deadline(timeout_seconds: float) -> Token:
+    """
+    Define o prazo da requisição atual.
+
+    Args:
+        timeout_seconds: Tempo disponível a partir de agora
+
+    Returns:
+        Token para restaurar o valor anterior com `reset_request_deadline`
+    """
+    return _deadline.set(time.monotonic() + timeout_seconds)
+
+
+def reset_request_deadline(token: Token) -> None:
+    """Restaura o prazo anterior (fim da requisição)."""
+    _deadline.reset(token)
+
+
+def remaining_time() -> float | None:
+    """
+    Segundos restantes até o prazo da requisição.
+
+    Returns:
+        Tempo restante (pode ser negativo) ou None fora de uma requisição
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
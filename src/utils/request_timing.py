@@ -0,0 +1,163 @@
+"""
+Tempo gasto por fase na requisição HTTP em andamento.
+
+O middleware em `src.main` abre um `RequestTiming` no início de cada
+requisição; a autenticação, os clientes do Firestore e do PostgreSQL, o
+circuit breaker e o tratamento de erros registram nele a duração das fases e
+os retries e fallbacks. No fim da requisição o resumo vira o cabeçalho
+`Server-Timing` e uma linha de log, e o número de leituras é comparado com o
+orçamento da rota. Fora de uma requisição o registro é ignorado.
+
+Os tempos de banco são cumulativos: chamadas concorrentes (gather) somam a
+duração de cada uma.
+"""
+
+import functools
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any
+
+
+class RequestTiming:
+    """Durações por fase e contadores de banco de uma requisição."""
+
+    __slots__ = ("started", "phases", "db_reads", "db_writes", "events")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: dict[str, list[float]] = {}
+        self.db_reads = 0
+        self.db_writes = 0
+        self.events: dict[str, int] = {}
+
+    def record(self, phase: str, seconds: float) -> None:
+        """Soma uma chamada de `seconds` à fase."""
+        entry = self.phases.setdefault(phase, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def count(self, event: str) -> None:
+        """Incrementa um contador (retries, fallbacks, hedges)."""
+        self.events[event] = self.events.get(event, 0) + 1
+
+    def summary(self) -> dict[str, Any]:
+        """
+        Resumo da requisição até agora.
+
+        Returns:
+            Dict com duração total, duração e chamadas por fase (ms),
+            leituras/escritas no banco e contadores de eventos
+        """
+        total_ms = (time.perf_counter() - self.started) * 1000
+        phases = {
+            name: {"calls": calls, "ms": round(seconds * 1000, 2)}
+            for name, (calls, seconds) in self.phases.items()
+        }
+        return {
+            "total_ms": round(total_ms, 2),
+            "phases": phases,
+            "db_reads": self.db_reads,
+            "db_writes": self.db_writes,
+            **self.events,
+        }
+
+    def server_timing(self) -> str:
+        """
+        Valor do cabeçalho `Server-Timing`.
+
+        Uma métrica por fase (com o número de chamadas em `desc`), os
+        contadores de eventos e `total`. `app` é o tempo fora das fases
+        registradas (handler, conversão Pydantic e serialização).
+        """
+        total_ms = (time.perf_counter() - self.started) * 1000
+        metrics = []
+        measured_ms = 0.0
+        for name, (calls, seconds) in self.phases.items():
+            measured_ms += seconds * 1000
+            metrics.append(f'{name};dur={seconds * 1000:.2f};desc="{calls} calls"')
+        metrics.extend(f'{event};desc="{n}"' for event, n in self.events.items())
+        metrics.append(f"app;dur={max(total_ms - measured_ms, 0):.2f}")
+        metrics.append(f"total;dur={total_ms:.2f}")
+        return ", ".join(metrics)
+
+
+_current_timing: ContextVar[RequestTiming | None] = ContextVar(
+    "request_timing", default=None
+)
+# Evita contar duas vezes um método de cliente chamado por outro
+_in_db_call: ContextVar[bool] = ContextVar("in_db_call", default=False)
+
+
+def start_request_timing() -> Token:
+    """
+    Abre o registro de tempos da requisição atual.
+
+    Returns:
+        Token para restaurar o valor anterior com `end_request_timing`
+    """
+    return _current_timing.set(RequestTiming())
+
+
+def end_request_timing(token: Token) -> None:
+    """Fecha o registro de tempos (fim da requisição)."""
+    _current_timing.reset(token)
+
+
+def current_timing() -> RequestTiming | None:
+    """Registro da requisição em andamento ou None fora de uma requisição."""
+    return _current_timing.get()
+
+
+def count_event(event: str) -> None:
+    """Incrementa um contador da requisição atual (retries, fallbacks...)."""
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.count(event)
+
+
+@contextmanager
+def timed_phase(phase: str) -> Iterator[None]:
+    """Soma a duração do bloco à fase da requisição atual."""
+    timing = _current_timing.get()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.record(phase, time.perf_counter() - start)
+
+
+def db_call(backend: str, kind: str = "read") -> Callable:
+    """
+    Decorator para métodos assíncronos dos clientes de banco.
+
+    Registra a duração na fase `backend` e conta uma leitura ou escrita
+    (`kind`) na requisição atual. Chamadas aninhadas de outro método
+    decorado não são contadas de novo.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            timing = _current_timing.get()
+            if timing is None or _in_db_call.get():
+                return await func(*args, **kwargs)
+            token = _in_db_call.set(True)
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _in_db_call.reset(token)
+                timing.record(backend, time.perf_counter() - start)
+                if kind == "write":
+                    timing.db_writes += 1
+                else:
+                    timing.db_reads += 1
+
+        return wrapper
+
+    return decorator
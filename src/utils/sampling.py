@@ -0,0 +1,173 @@
+"""
+Amostragem das requisições rastreadas no analytics.
+
+A decisão é tomada no fim da requisição (tail-based): erros (5xx ou exceção)
+e requisições acima do limite de lentidão são sempre mantidos; as demais são
+mantidas conforme a taxa do template da rota (ou a taxa padrão). A parte
+aleatória vem do hash do trace id, então a decisão é a mesma em qualquer
+worker ou instância para o mesmo trace.
+
+Durante a requisição, os spans (operações de banco etc.) ficam guardados no
+trace corrente (contextvar) e são gravados ou descartados junto com o
+registro da requisição.
+"""
+
+import hashlib
+import uuid
+from collections.abc import Mapping
+from contextvars import ContextVar, Token
+from typing import Any
+
+from src.config import (
+    PERFORMANCE_ROUTE_SAMPLE_RATES,
+    PERFORMANCE_SAMPLE_RATE,
+    PERFORMANCE_SLOW_REQUEST_MS,
+    PERFORMANCE_TRACE_MAX_SPANS,
+)
+
+_HASH_SCALE = float(1 << 64)
+
+
+class RequestTrace:
+    """Spans de uma requisição aguardando a decisão de amostragem."""
+
+    __slots__ = ("trace_id", "spans", "dropped_spans", "max_spans")
+
+    def __init__(self, trace_id: str, max_spans: int = PERFORMANCE_TRACE_MAX_SPANS):
+        self.trace_id = trace_id
+        self.spans: list[tuple[str, dict[str, Any], str | None]] = []
+        self.dropped_spans = 0
+        self.max_spans = max_spans
+
+    def add_span(
+        self, event_name: str, parameters: dict[str, Any], tenant_id: str | None
+    ) -> None:
+        """Guarda um span; acima de `max_spans` apenas conta o descarte."""
+        if len(self.spans) >= self.max_spans:
+            self.dropped_spans += 1
+            return
+        self.spans.append(
+            (event_name, {**parameters, "trace_id": self.trace_id}, tenant_id)
+        )
+
+
+_current_trace: ContextVar[RequestTrace | None] = ContextVar(
+    "request_trace", default=None
+)
+
+
+def start_trace(trace_id: str) -> Token:
+    """
+    Abre o trace da requisição atual.
+
+    Returns:
+        Token para restaurar o valor anterior com `end_trace`
+    """
+    return _current_trace.set(RequestTrace(trace_id))
+
+
+def end_trace(token: Token) -> None:
+    """Fecha o trace da requisição atual."""
+    _current_trace.reset(token)
+
+
+def current_trace() -> RequestTrace | None:
+    """Trace da requisição em andamento ou None fora de uma requisição."""
+    return _current_trace.get()
+
+
+def extract_trace_id(headers: Mapping[str, str]) -> str:
+    """
+    Obtém o trace id propagado pelo cliente ou pelo balanceador.
+
+    Aceita `traceparent` (W3C), `X-Cloud-Trace-Context` (Google Cloud) e
+    `X-Request-ID`; sem nenhum deles, gera um novo id.
+    """
+    traceparent = headers.get("traceparent")
+    if traceparent:
+        parts = traceparent.split("-")
+        if len(parts) >= 2 and len(parts[1]) == 32:
+            return parts[1]
+    cloud_trace = headers.get("x-cloud-trace-context")
+    if cloud_trace:
+        trace_id = cloud_trace.split("/", 1)[0]
+        if trace_id:
+            return trace_id
+    request_id = headers.get("x-request-id")
+    if request_id:
+        return request_id[:128]
+    return uuid.uuid4().hex
+
+
+def trace_fraction(trace_id: str) -> float:
+    """Posição determinística do trace em [0, 1)."""
+    digest = hashlib.blake2b(trace_id.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / _HASH_SCALE
+
+
+class TraceSampler:
+    """Decide quais requisições (e seus spans) são gravadas no analytics."""
+
+    def __init__(
+        self,
+        default_rate: float = PERFORMANCE_SAMPLE_RATE,
+        route_rates: dict[str, float] | None = None,
+        slow_ms: float = PERFORMANCE_SLOW_REQUEST_MS,
+    ):
+        for rate in (default_rate, *(route_rates or {}).values()):
+            if not 0 <= rate <= 1:
+                raise ValueError(f"Taxa de amostragem fora de [0, 1]: {rate}")
+        self.default_rate = default_rate
+        self.route_rates = dict(route_rates or {})
+        self.slow_ms = slow_ms
+        self._decisions = {"error": 0, "slow": 0, "sampled": 0, "dropped": 0}
+
+    def rate_for(self, route: str) -> float:
+        """Taxa de amostragem do template da rota."""
+        return self.route_rates.get(route, self.default_rate)
+
+    def decide(
+        self,
+        trace_id: str,
+        route: str,
+        status_code: int,
+        duration_ms: float,
+        error: bool = False,
+    ) -> str | None:
+        """
+        Decide se a requisição é gravada.
+
+        Returns:
+            Motivo ("error", "slow" ou "sampled") ou None se descartada
+        """
+        if error or status_code >= 500:
+            reason = "error"
+        elif duration_ms >= self.slow_ms:
+            reason = "slow"
+        elif trace_fraction(trace_id) < self.rate_for(route):
+            reason = "sampled"
+        else:
+            reason = None
+        self._decisions[reason or "dropped"] += 1
+        return reason
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Retorna a configuração e as decisões de amostragem desta instância.
+
+        Returns:
+            Dict com taxas, limite de lentidão e contagem por motivo
+        """
+        decided = sum(self._decisions.values())
+        kept = decided - self._decisions["dropped"]
+        return {
+            "default_rate": self.default_rate,
+            "route_rates": self.route_rates,
+            "slow_ms": self.slow_ms,
+            "decisions": dict(self._decisions),
+            "kept_ratio": round(kept / decided, 4) if decided else None,
+        }
+
+
+# Instância global usada pelo PerformanceMiddleware
+trace_sampler = TraceSampler(route_rates=PERFORMANCE_ROUTE_SAMPLE_RATES)
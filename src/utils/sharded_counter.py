@@ -0,0 +1,133 @@
+"""
+Contadores distribuídos (sharded) em documentos do Firestore.
+
+Um documento do Firestore aceita cerca de uma escrita por segundo; em
+importações em lote, incrementar sempre o mesmo documento serializa as
+escritas. Aqui o valor de um contador é a soma do campo `total` do documento
+principal (valor-base, definido por `set`) com os `total` dos documentos da
+subcoleção `shards`. Cada incremento sorteia um dos `shards` documentos e a
+leitura soma todos eles, com cache em memória por um TTL curto (o valor lido
+pode estar atrasado em até `cache_ttl` segundos em outras instâncias; as
+escritas desta instância invalidam o cache local).
+
+Documentos gravados antes dos shards continuam válidos: o `total` deles é o
+valor-base.
+"""
+
+import asyncio
+import random
+import time
+from typing import Any
+
+from google.cloud import firestore
+
+from src.config import METADATA_COUNTER_CACHE_TTL, METADATA_COUNTER_SHARDS
+
+SHARDS_COLLECTION = "shards"
+
+
+class ShardedCounter:
+    """Incrementos em shards aleatórios e leitura somada com cache."""
+
+    def __init__(
+        self,
+        shards: int = METADATA_COUNTER_SHARDS,
+        cache_ttl: float = METADATA_COUNTER_CACHE_TTL,
+    ):
+        self.shards = max(shards, 1)
+        self.cache_ttl = cache_ttl
+        self._cache: dict[str, tuple[float, dict[str, Any]]] = {}
+        self._hits = 0
+        self._misses = 0
+
+    async def increment(
+        self, doc_ref, amount: int, fields: dict[str, Any] | None = None
+    ) -> None:
+        """
+        Soma `amount` a um shard sorteado do contador.
+
+        Args:
+            doc_ref: Documento principal do contador (AsyncDocumentReference)
+            amount: Valor a somar (negativo para decrementar)
+            fields: Campos extras gravados no shard (ex.: last_updated)
+        """
+        shard = random.randrange(self.shards)
+        shard_ref = doc_ref.collection(SHARDS_COLLECTION).document(str(shard))
+        await shard_ref.set(
+            {**(fields or {}), "total": firestore.Increment(amount)}, merge=True
+        )
+        self._cache.pop(doc_ref.path, None)
+
+    async def set(
+        self, doc_ref, total: int, fields: dict[str, Any] | None = None
+    ) -> None:
+        """
+        Define o valor do contador: grava o valor-base e zera os shards.
+
+        Incrementos concorrentes com o `set` podem ser descartados.
+
+        Args:
+            doc_ref: Documento principal do contador (AsyncDocumentReference)
+            total: Novo valor
+            fields: Campos extras gravados no documento principal
+        """
+        shards_ref = doc_ref.collection(SHARDS_COLLECTION)
+        await asyncio.gather(
+            doc_ref.set({**(fields or {}), "total": total}, merge=True),
+            *(
+                shards_ref.document(str(shard)).set({"total": 0}, merge=True)
+                for shard in range(self.shards)
+            ),
+        )
+        self._cache.pop(doc_ref.path, None)
+
+    async def read(self, doc_ref) -> dict[str, Any] | None:
+        """
+        Lê o contador somando o valor-base e os shards.
+
+        Returns:
+            Campos do documento principal com `total` somado e `last_updated`
+            mais recente entre documento e shards, ou None se o contador não
+            existir
+        """
+        cached = self._cache.get(doc_ref.path)
+        if cached is not None and cached[0] > time.monotonic():
+            self._hits += 1
+            return cached[1]
+        self._misses += 1
+
+        async def read_shards():
+            return [
+                shard.to_dict() or {}
+                async for shard in doc_ref.collection(SHARDS_COLLECTION).stream()
+            ]
+
+        snapshot, shards = await asyncio.gather(doc_ref.get(), read_shards())
+        if not snapshot.exists and not shards:
+            value = None
+        else:
+            value = dict(snapshot.to_dict() or {}) if snapshot.exists else {}
+            total = value.get("total")
+            total = total if isinstance(total, (int, float)) else 0
+            updates = [value.get("last_updated")]
+            for shard in shards:
+                shard_total = shard.get("total")
+                if isinstance(shard_total, (int, float)):
+                    total += shard_total
+                updates.append(shard.get("last_updated"))
+            value["total"] = total
+            value["last_updated"] = max(filter(None, updates), default=None)
+
+        if self.cache_ttl > 0:
+            self._cache[doc_ref.path] = (time.monotonic() + self.cache_ttl, value)
+        return value
+
+    def stats(self) -> dict[str, Any]:
+        """Shards, TTL e acertos do cache de leitura."""
+        return {
+            "shards": self.shards,
+            "cache_ttl": self.cache_ttl,
+            "cache_entries": len(self._cache),
+            "cache_hits": self._hits,
+            "cache_misses": self._misses,
+        }
@@ -0,0 +1,132 @@
+"""
+Cache em memória de tokens já verificados pela dependência de autenticação.
+
+Os aplicativos chamam vários endpoints por tela com o mesmo bearer token, e
+cada chamada refazia a verificação completa (assinatura, claims e validação
+do `JWTPayload`). Este cache guarda o payload verificado indexado pelo
+SHA-256 do token — o token em si nunca fica em memória — até o `exp` do
+próprio token, com limite de entradas (LRU).
+
+Apenas tokens válidos são armazenados; falhas de verificação sempre refazem
+a verificação na próxima requisição. Os payloads são compartilhados entre
+requisições e não devem ser modificados pelo chamador.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any
+
+from src.config import AUTH_TOKEN_CACHE_MAX_ENTRIES
+
+
+def token_digest(token: str) -> str:
+    """Retorna o SHA-256 (hex) do token, usado como chave do cache."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class VerifiedTokenCache:
+    """Cache LRU de payloads verificados, com expiração no `exp` do token."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[int, Any]] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evictions = 0
+        self._verifications: dict[str, int] = {}
+        self._rejections: dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        """Indica se o cache está ativo (limite de entradas positivo)."""
+        return self.max_entries > 0
+
+    def get(self, token: str) -> Any | None:
+        """
+        Retorna o payload em cache para o token, se ainda não expirou.
+
+        Args:
+            token: Bearer token recebido
+
+        Returns:
+            Payload verificado ou None
+        """
+        if not self.enabled:
+            return None
+
+        key = token_digest(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+
+        if entry[0] <= time.time():
+            del self._entries[key]
+            self._expired += 1
+            self._misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return entry[1]
+
+    def put(self, token: str, payload: Any, exp: int) -> None:
+        """
+        Armazena um payload verificado até o timestamp Unix `exp`.
+
+        Args:
+            token: Bearer token verificado
+            payload: Payload resultante da verificação
+            exp: Expiração do token (segundos desde a época)
+        """
+        if not self.enabled or exp <= time.time():
+            return
+
+        key = token_digest(token)
+        self._entries[key] = (exp, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def record_verification(self, verifier: str, success: bool) -> None:
+        """Contabiliza uma verificação completa (cache miss) por verificador."""
+        counters = self._verifications if success else self._rejections
+        counters[verifier] = counters.get(verifier, 0) + 1
+
+    def clear(self) -> None:
+        """Remove todas as entradas e zera os contadores."""
+        self._entries.clear()
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evictions = 0
+        self._verifications = {}
+        self._rejections = {}
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Retorna contadores do cache para monitoramento.
+
+        Returns:
+            Dict com hits, misses, hit_rate, tamanho e verificações por emissor
+        """
+        lookups = self._hits + self._misses
+        return {
+            "enabled": self.enabled,
+            "max_entries": self.max_entries,
+            "entries": len(self._entries),
+            "hits": self._hits,
+            "misses": self._misses,
+            "expired": self._expired,
+            "evictions": self._evictions,
+            "hit_rate": round(self._hits / lookups * 100, 2) if lookups else 0.0,
+            "verifications": dict(self._verifications),
+            "rejections": dict(self._rejections),
+        }
+
+
+# Instância global do cache de tokens verificados
+token_cache = VerifiedTokenCache(max_entries=AUTH_TOKEN_CACHE_MAX_ENTRIES)
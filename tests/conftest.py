@@ -49,3 +49,19 @@ def mock_firestore_for_all_tests():
         mock_firestore.collection.return_value.stream.return_value = []
         mock_firestore.collection.return_value.document.return_value.get.return_value.exists = False
         yield mock_firestore
+
+
+@pytest.fixture(autouse=True)
+def clear_catalog_cache():
+    """
+    Garante que o cache do catálogo e o índice de benefícios não vazem dados
+    entre testes.
+    """
+    from src.utils.benefit_index import benefit_index
+    from src.utils.catalog_cache import catalog_cache
+
+    catalog_cache.clear()
+    benefit_index.invalidate()
+    yield
+    catalog_cache.clear()
+    benefit_index.invalidate()
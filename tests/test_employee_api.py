@@ -137,6 +137,7 @@ class TestEmployeePartnersEndpoints:
                 ord="category",
                 limit=10,
                 offset=0,
+                cursor=None,
                 current_user=mock_employee_user,
             )
 
@@ -148,6 +149,7 @@ class TestEmployeePartnersEndpoints:
                 ord="category",
                 limit=10,
                 offset=0,
+                cursor=None,
                 use_circuit_breaker=True,
                 enable_ordering=True,  # Habilitado para funcionários
             )
@@ -143,6 +143,7 @@ class TestStudentPartnersEndpoints:
                 ord="name_asc",
                 limit=10,
                 offset=0,
+                cursor=None,
                 current_user=mock_student_user,
             )
 
@@ -154,6 +155,7 @@ class TestStudentPartnersEndpoints:
                 ord="name_asc",
                 limit=10,
                 offset=0,
+                cursor=None,
                 use_circuit_breaker=True,
                 enable_ordering=False,
             )
@@ -0,0 +1,114 @@
+"""
+Testes unitários para o índice materializado de benefícios.
+"""
+
+from src.models.benefit import BenefitAudience, normalize_audience
+from src.utils.benefit_index import TenantBenefitIndex
+
+
+def _benefit(audience, status="active", category="Educação", title="Desconto"):
+    return {
+        "title": title,
+        "description": "Descrição",
+        "configuration": {"value": 10, "value_type": "percentage"},
+        "metadata": {"tags": ["desconto"]},
+        "dates": {
+            "created_at": "2025-09-21 21:13:20.177145+00:00",
+            "updated_at": "2025-09-21 21:13:20+00:00",
+            "valid_from": "2025-09-21 21:13:20+00:00",
+            "valid_until": None,
+        },
+        "system": {
+            "tenant_id": "knn",
+            "status": status,
+            "type": "discount",
+            "audience": audience,
+            "category": category,
+        },
+    }
+
+
+def _docs():
+    return [
+        {
+            "id": "PTN_A",
+            "tenant_id": "knn",
+            "BNF_A_01_DC": _benefit("students"),
+            "BNF_A_02_DC": _benefit("employees", category="Saúde"),
+            "BNF_A_03_DC": _benefit("all", status="inactive"),
+        },
+        {
+            "id": "PTN_B",
+            "tenant_id": "knn",
+            "BNF_B_01_DC": _benefit(["student", "employee"], category="Saúde"),
+        },
+    ]
+
+
+class TestNormalizeAudience:
+    """Testes da normalização do público-alvo."""
+
+    def test_firestore_formats(self):
+        both = [BenefitAudience.STUDENT, BenefitAudience.EMPLOYEE]
+        assert normalize_audience("students") == [BenefitAudience.STUDENT]
+        assert normalize_audience("employees") == [BenefitAudience.EMPLOYEE]
+        assert normalize_audience("all") == both
+        assert normalize_audience(["employee", "student"]) == both
+        assert normalize_audience("students,employees") == both
+        assert normalize_audience(None) == []
+
+
+class TestTenantBenefitIndex:
+    """Testes de construção, consulta e atualização incremental."""
+
+    def test_query_by_audience_and_status(self):
+        index = TenantBenefitIndex.from_documents(_docs())
+
+        student_ids = [b.id for b in index.query("student")]
+        employee_ids = [b.id for b in index.query("employee")]
+
+        assert student_ids == ["BNF_A_01_DC", "BNF_B_01_DC"]
+        assert employee_ids == ["BNF_A_02_DC", "BNF_B_01_DC"]
+        assert len(index) == 4
+
+    def test_query_by_category_is_case_insensitive(self):
+        index = TenantBenefitIndex.from_documents(_docs())
+
+        result = index.query("employee", category="SAÚDE")
+
+        assert [b.id for b in result] == ["BNF_A_02_DC", "BNF_B_01_DC"]
+
+    def test_query_restricted_to_partners(self):
+        index = TenantBenefitIndex.from_documents(_docs())
+
+        result = index.query("student", partner_ids={"PTN_B"})
+
+        assert [b.partner_id for b in result] == ["PTN_B"]
+
+    def test_open_ended_benefit_is_converted(self):
+        index = TenantBenefitIndex.from_documents(_docs())
+
+        benefit = index.partner_benefits("PTN_A", "student")[0]
+
+        assert benefit.valid_to.year == 9999
+        assert benefit.value == 10
+
+    def test_incremental_upsert_and_remove(self):
+        index = TenantBenefitIndex.from_documents(_docs())
+
+        index.upsert("PTN_A", "BNF_A_01_DC", _benefit("students", status="inactive"))
+        assert [b.id for b in index.query("student")] == ["BNF_B_01_DC"]
+
+        index.upsert("PTN_C", "BNF_C_01_DC", _benefit("all", title="Novo"))
+        assert "BNF_C_01_DC" in [b.id for b in index.query("employee")]
+
+        assert index.remove("PTN_B", "BNF_B_01_DC") is True
+        assert index.remove("PTN_B", "BNF_B_01_DC") is False
+        assert [b.id for b in index.query("student")] == ["BNF_C_01_DC"]
+
+    def test_invalid_benefit_is_skipped(self):
+        index = TenantBenefitIndex.from_documents(
+            [{"id": "PTN_X", "BNF_X_01_DC": {"title": "sem system"}}]
+        )
+
+        assert len(index) == 0
@@ -0,0 +1,109 @@
+"""
+Testes unitários para o cache em memória do catálogo.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.utils.catalog_cache import CatalogCache
+
+
+@pytest.mark.asyncio
+class TestCatalogCache:
+    """Testes de leitura, expiração e invalidação do cache."""
+
+    async def test_read_through_counts_hits_and_misses(self):
+        cache = CatalogCache(ttl_seconds=60, max_entries=10)
+        loader = AsyncMock(return_value={"items": [{"id": "PTN_1"}]})
+
+        first = await cache.get_or_load("knn", "partners", "active_ids", loader)
+        second = await cache.get_or_load("knn", "partners", "active_ids", loader)
+
+        assert first == second == {"items": [{"id": "PTN_1"}]}
+        loader.assert_awaited_once()
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 50.0
+
+    async def test_entries_are_scoped_by_tenant(self):
+        cache = CatalogCache(ttl_seconds=60, max_entries=10)
+        loader = AsyncMock(side_effect=[{"tenant": "a"}, {"tenant": "b"}])
+
+        a = await cache.get_or_load("tenant-a", "partners", "k", loader)
+        b = await cache.get_or_load("tenant-b", "partners", "k", loader)
+
+        assert a == {"tenant": "a"}
+        assert b == {"tenant": "b"}
+
+    async def test_expired_entry_is_reloaded(self):
+        cache = CatalogCache(ttl_seconds=60, max_entries=10)
+        loader = AsyncMock(side_effect=["old", "new"])
+
+        with patch("src.utils.catalog_cache.time.monotonic", return_value=1000.0):
+            assert await cache.get_or_load("knn", "benefits", "k", loader) == "old"
+        with patch("src.utils.catalog_cache.time.monotonic", return_value=1061.0):
+            assert await cache.get_or_load("knn", "benefits", "k", loader) == "new"
+
+    async def test_invalidate_only_affects_tenant_and_collection(self):
+        cache = CatalogCache(ttl_seconds=60, max_entries=10)
+        for tenant in ("tenant-a", "tenant-b"):
+            for collection in ("partners", "benefits"):
+                await cache.get_or_load(
+                    tenant, collection, "k", AsyncMock(return_value=collection)
+                )
+
+        removed = cache.invalidate("tenant-a", "benefits")
+
+        assert removed == 1
+        assert cache.stats()["entries"] == 3
+
+    async def test_size_bound_evicts_least_recently_used(self):
+        cache = CatalogCache(ttl_seconds=60, max_entries=2)
+        for key in ("a", "b"):
+            await cache.get_or_load("knn", "partners", key, AsyncMock(return_value=key))
+        # "a" passa a ser o mais recente
+        await cache.get_or_load("knn", "partners", "a", AsyncMock())
+        await cache.get_or_load("knn", "partners", "c", AsyncMock(return_value="c"))
+
+        loader = AsyncMock(return_value="b2")
+        assert await cache.get_or_load("knn", "partners", "b", loader) == "b2"
+        assert cache.stats()["evictions"] >= 1
+
+    async def test_concurrent_misses_share_one_load(self):
+        cache = CatalogCache(ttl_seconds=60, max_entries=10)
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "value"
+
+        results = await asyncio.gather(
+            *(cache.get_or_load("knn", "partners", "k", loader) for _ in range(5))
+        )
+
+        assert results == ["value"] * 5
+        assert calls == 1
+        assert cache.stats()["coalesced"] == 4
+
+    async def test_errors_are_not_cached(self):
+        cache = CatalogCache(ttl_seconds=60, max_entries=10)
+        loader = AsyncMock(side_effect=[RuntimeError("firestore"), "ok"])
+
+        with pytest.raises(RuntimeError):
+            await cache.get_or_load("knn", "partners", "k", loader)
+
+        assert await cache.get_or_load("knn", "partners", "k", loader) == "ok"
+
+    async def test_zero_ttl_disables_cache(self):
+        cache = CatalogCache(ttl_seconds=0, max_entries=10)
+        loader = AsyncMock(return_value="value")
+
+        await cache.get_or_load("knn", "partners", "k", loader)
+        await cache.get_or_load("knn", "partners", "k", loader)
+
+        assert loader.await_count == 2
@@ -0,0 +1,187 @@
+"""
+Testes unitários para os circuit breakers por coleção.
+"""
+
+import importlib
+
+import pytest
+
+from src import config
+from src.db.circuit_breaker import (
+    BackendUnavailableError,
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+)
+from src.db.pagination import InvalidCursorError
+
+# `src.db` reexporta a instância `circuit_breaker`, que oculta o submódulo
+# em `from src.db import circuit_breaker` e em `import ... as`
+cb_module = importlib.import_module("src.db.circuit_breaker")
+
+
+def _breaker(**overrides):
+    options = {
+        "threshold": 100,
+        "open_seconds": 30,
+        "window_seconds": 60,
+        "min_requests": 4,
+        "failure_rate": 50,
+        "slow_call_ms": 1000,
+        "slow_call_rate": 80,
+        "half_open_probes": 2,
+    }
+    return CircuitBreaker(name="test", **{**options, **overrides})
+
+
+class TestCircuitBreaker:
+    """Testes da janela deslizante e do half-open limitado."""
+
+    def test_opens_on_failure_rate_after_min_requests(self):
+        breaker = _breaker()
+
+        breaker.record_success(10)
+        breaker.record_failure()
+        breaker.record_success(10)
+        assert breaker.state == "closed"
+
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert breaker.can_execute() is False
+
+    def test_opens_on_slow_calls(self):
+        breaker = _breaker(slow_call_rate=75)
+
+        for _ in range(3):
+            breaker.record_success(1500)
+        assert breaker.state == "closed"
+        breaker.record_success(1500)
+
+        assert breaker.state == "open"
+
+    def test_opens_on_consecutive_failures(self):
+        breaker = _breaker(threshold=2, min_requests=100)
+
+        breaker.record_failure()
+        breaker.record_failure()
+
+        assert breaker.state == "open"
+
+    def test_half_open_limits_probes(self, monkeypatch):
+        breaker = _breaker(threshold=1)
+        breaker.record_failure()
+        monkeypatch.setattr(breaker, "last_failure_time", 0)
+
+        assert breaker.can_execute() is True
+        assert breaker.can_execute() is True
+        assert breaker.can_execute() is False
+        assert breaker.state == "half-open"
+
+        breaker.record_success(5)
+        assert breaker.state == "half-open"
+        breaker.record_success(5)
+        assert breaker.state == "closed"
+        assert breaker.can_execute() is True
+
+    def test_failed_probe_reopens(self, monkeypatch):
+        breaker = _breaker(threshold=1)
+        breaker.record_failure()
+        monkeypatch.setattr(breaker, "last_failure_time", 0)
+
+        assert breaker.can_execute() is True
+        breaker.record_failure()
+
+        assert breaker.state == "open"
+        assert breaker.can_execute() is False
+
+
+class TestCircuitBreakerRegistry:
+    """Testes do isolamento entre chaves."""
+
+    def test_breakers_are_isolated_per_key(self):
+        registry = CircuitBreakerRegistry()
+
+        metrics = registry.get("metrics_snapshots", "write")
+        for _ in range(metrics.threshold):
+            metrics.record_failure()
+
+        assert metrics.state == "open"
+        assert registry.get("validation_codes", "read").state == "closed"
+        assert registry.get("metrics_snapshots", "write") is metrics
+        assert registry.states()[0]["name"] == "firestore:metrics_snapshots:write"
+
+
+@pytest.mark.asyncio
+class TestWithCircuitBreaker:
+    """Testes do roteamento por chave em with_circuit_breaker."""
+
+    async def test_open_breaker_only_affects_its_key(self, monkeypatch):
+        monkeypatch.setattr(config, "POSTGRES_ENABLED", True)
+        monkeypatch.setattr(cb_module, "circuit_breakers", CircuitBreakerRegistry())
+        open_breaker = cb_module.circuit_breakers.get("metrics_snapshots", "write")
+        for _ in range(open_breaker.threshold):
+            open_breaker.record_failure()
+
+        async def firestore():
+            return "fs"
+
+        async def postgres():
+            return "pg"
+
+        assert (
+            await cb_module.with_circuit_breaker(
+                firestore, postgres, breaker=("metrics_snapshots", "write")
+            )
+            == "pg"
+        )
+        assert (
+            await cb_module.with_circuit_breaker(
+                firestore, postgres, breaker=("validation_codes", "read")
+            )
+            == "fs"
+        )
+
+    async def test_client_errors_do_not_trip_breaker(self, monkeypatch):
+        monkeypatch.setattr(config, "POSTGRES_ENABLED", True)
+        monkeypatch.setattr(cb_module, "circuit_breakers", CircuitBreakerRegistry())
+        breaker = cb_module.circuit_breakers.get("partners", "read")
+        fallbacks = []
+
+        async def firestore():
+            raise InvalidCursorError("Cursor de paginação expirado")
+
+        async def postgres():
+            fallbacks.append(1)
+            return "pg"
+
+        for _ in range(breaker.threshold + 1):
+            with pytest.raises(InvalidCursorError):
+                await cb_module.with_circuit_breaker(
+                    firestore, postgres, breaker=("partners", "read")
+                )
+
+        assert breaker.state == "closed"
+        assert breaker.snapshot()["window_calls"] == 0
+        assert fallbacks == []
+
+    async def test_open_write_breaker_without_postgres_raises(self, monkeypatch):
+        monkeypatch.setattr(config, "POSTGRES_ENABLED", False)
+        monkeypatch.setattr(cb_module, "circuit_breakers", CircuitBreakerRegistry())
+        for key in (("validation_codes", "write"), ("partners", "read")):
+            breaker = cb_module.circuit_breakers.get(*key)
+            for _ in range(breaker.threshold):
+                breaker.record_failure()
+
+        async def firestore():
+            return True
+
+        async def postgres():
+            return True
+
+        with pytest.raises(BackendUnavailableError):
+            await cb_module.with_circuit_breaker(
+                firestore, postgres, breaker=("validation_codes", "write")
+            )
+        listing = await cb_module.with_circuit_breaker(
+            firestore, postgres, breaker=("partners", "read")
+        )
+        assert listing["data"] == []
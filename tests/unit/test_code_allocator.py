@@ -0,0 +1,129 @@
+"""
+Testes unitários para o alocador de códigos de validação.
+"""
+
+import pytest
+
+from src.db.circuit_breaker import BackendUnavailableError
+from src.utils import code_allocator as allocator_module
+from src.utils.code_allocator import CodeSpaceExhaustedError, ValidationCodeAllocator
+
+
+class _Store:
+    """Coleção em memória com criação condicional (create-if-absent)."""
+
+    def __init__(self, taken=()):
+        self.docs = {doc_id: {} for doc_id in taken}
+
+    async def create_document_if_absent(self, collection, data, doc_id):
+        if doc_id in self.docs:
+            return False
+        self.docs[doc_id] = data
+        return True
+
+
+async def _primary_only(primary, fallback, *args, breaker=None, **kwargs):
+    return await primary(*args, **kwargs)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    def install(taken=()):
+        fake = _Store(taken)
+        monkeypatch.setattr(allocator_module, "firestore_client", fake)
+        monkeypatch.setattr(allocator_module, "with_circuit_breaker", _primary_only)
+        return fake
+
+    return install
+
+
+def _sequence(allocator, monkeypatch, codes):
+    """Faz o alocador sortear os códigos na ordem informada."""
+    remaining = iter(codes)
+    monkeypatch.setattr(allocator, "generate_code", lambda: next(remaining))
+
+
+@pytest.mark.asyncio
+class TestValidationCodeAllocator:
+    """Testes da reserva atômica com novas tentativas."""
+
+    async def test_collision_draws_another_code(self, store, monkeypatch):
+        taken = ValidationCodeAllocator.doc_id("knn", "PTN_1", "111111")
+        fake = store([taken])
+        allocator = ValidationCodeAllocator(
+            digits=6, max_attempts=3, occupancy_alert=50
+        )
+        _sequence(allocator, monkeypatch, ["111111", "222222"])
+
+        code, doc_id = await allocator.reserve("knn", "PTN_1", {"student_id": "S1"})
+
+        assert code == "222222"
+        assert doc_id == "knn_PTN_1_222222"
+        assert fake.docs[taken] == {}
+        shard = allocator.stats()["shards"][0]
+        assert shard["collisions"] == 1
+        assert shard["reserved"] == 1
+        assert shard["estimated_occupancy"] == 50.0
+        assert shard["alert"] is True
+
+    async def test_same_code_is_free_for_other_partner(self, store, monkeypatch):
+        store([ValidationCodeAllocator.doc_id("knn", "PTN_1", "123456")])
+        allocator = ValidationCodeAllocator(
+            digits=6, max_attempts=1, occupancy_alert=50
+        )
+        _sequence(allocator, monkeypatch, ["123456"])
+
+        code, _ = await allocator.reserve("knn", "PTN_2", {"student_id": "S1"})
+
+        assert code == "123456"
+
+    async def test_bounded_attempts_raise(self, store, monkeypatch):
+        store([ValidationCodeAllocator.doc_id("knn", "PTN_1", "000007")])
+        allocator = ValidationCodeAllocator(
+            digits=6, max_attempts=3, occupancy_alert=50
+        )
+        _sequence(allocator, monkeypatch, ["000007"] * 3)
+
+        with pytest.raises(CodeSpaceExhaustedError):
+            await allocator.reserve("knn", "PTN_1", {"student_id": "S1"})
+
+        shard = allocator.stats()["shards"][0]
+        assert shard["exhausted"] == 1
+        assert shard["expected_attempts"] is None
+
+    async def test_unconfirmed_write_is_not_a_reservation(self, monkeypatch):
+        recorded = []
+
+        async def placeholder(primary, fallback, *args, breaker=None, **kwargs):
+            # Retorno do fallback com o circuito aberto e PostgreSQL desligado
+            return {"data": [], "total": 0, "limit": 0, "offset": 0}
+
+        async def record_generated(*args):
+            recorded.append(args)
+
+        monkeypatch.setattr(allocator_module, "with_circuit_breaker", placeholder)
+        monkeypatch.setattr(
+            allocator_module.code_counters, "record_generated", record_generated
+        )
+        allocator = ValidationCodeAllocator(
+            digits=6, max_attempts=3, occupancy_alert=50
+        )
+
+        with pytest.raises(BackendUnavailableError):
+            await allocator.reserve("knn", "PTN_1", {"student_id": "S1"})
+
+        assert recorded == []
+        assert allocator.stats()["shards"] == []
+
+
+class TestGenerateCode:
+    """Testes do formato do código."""
+
+    def test_code_is_zero_padded(self, monkeypatch):
+        allocator = ValidationCodeAllocator(
+            digits=6, max_attempts=1, occupancy_alert=50
+        )
+        monkeypatch.setattr(allocator_module.secrets, "randbelow", lambda n: 42)
+
+        assert allocator.generate_code() == "000042"
+        assert allocator.keyspace == 1_000_000
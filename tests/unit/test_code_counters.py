@@ -0,0 +1,210 @@
+"""
+Testes unitários para os contadores incrementais de códigos de validação.
+"""
+
+import pytest
+
+from src.utils import code_counters as counters_module
+from src.utils.code_counters import (
+    ALL_DAYS,
+    ALL_PARTNERS,
+    CodeCounters,
+    day_key,
+    month_days,
+)
+
+
+class _Store:
+    """Coleções em memória com a interface usada pelos contadores."""
+
+    def __init__(self):
+        self.collections: dict[str, dict[str, dict]] = {}
+        self.fail_writes = False
+
+    async def upsert_counters(self, collection, rows, counters, *, increment=True):
+        if self.fail_writes:
+            raise RuntimeError("Firestore indisponível")
+        docs = self.collections.setdefault(collection, {})
+        for doc_id, row in rows.items():
+            doc = docs.get(doc_id, {}) if increment else {}
+            for field, value in row.items():
+                if increment and field in counters:
+                    doc[field] = doc.get(field, 0) + value
+                else:
+                    doc[field] = value
+            docs[doc_id] = doc
+        return True
+
+    async def get_documents_many(self, collection, ids, tenant_id):
+        docs = self.collections.get(collection, {})
+        return {
+            doc_id: {**docs[doc_id], "id": doc_id}
+            for doc_id in ids
+            if doc_id in docs and docs[doc_id]["tenant_id"] == tenant_id
+        }
+
+    async def top_by_sum(
+        self, collection, *, tenant_id, group_by, value, filters, limit
+    ):
+        ops = {"==": lambda a, b: a == b, ">=": lambda a, b: a >= b}
+        ops["<="] = lambda a, b: a <= b
+        totals = {}
+        for doc in self.collections.get(collection, {}).values():
+            if doc["tenant_id"] == tenant_id and all(
+                ops[op](doc[field], v) for field, op, v in filters
+            ):
+                totals[doc[group_by]] = totals.get(doc[group_by], 0) + doc[value]
+        return sorted(totals.items(), key=lambda item: -item[1])[:limit]
+
+    async def query_documents(
+        self, collection, *, tenant_id, limit=20, cursor=None, **kw
+    ):
+        items = [
+            {**doc, "id": doc_id}
+            for doc_id, doc in sorted(self.collections.get(collection, {}).items())
+            if doc["tenant_id"] == tenant_id
+        ]
+        start = int(cursor or 0)
+        page = items[start : start + limit]
+        next_cursor = str(start + limit) if len(page) == limit else None
+        return {"items": page, "total": None, "next_cursor": next_cursor}
+
+
+async def _primary_only(primary, fallback, *args, breaker=None, **kwargs):
+    return await primary(*args, **kwargs)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = _Store()
+    monkeypatch.setattr(counters_module, "firestore_client", store)
+    monkeypatch.setattr(counters_module, "with_circuit_breaker", _primary_only)
+    return store
+
+
+def _code(store, doc_id, partner_id, created_at, used_at=None, tenant_id="knn"):
+    store.collections.setdefault("validation_codes", {})[doc_id] = {
+        "tenant_id": tenant_id,
+        "partner_id": partner_id,
+        "created_at": created_at,
+        "used_at": used_at,
+    }
+
+
+class TestDayKey:
+    """Testes da conversão de datas em dias UTC."""
+
+    def test_converts_to_utc_day(self):
+        assert day_key("2025-03-01T01:30:00-03:00") == "2025-03-01"
+        assert day_key("2025-03-01T23:30:00-03:00") == "2025-03-02"
+        assert day_key("2025-03-01T10:00:00") == "2025-03-01"
+        assert day_key("inválido") is None
+
+    def test_month_days(self):
+        days = month_days(2024, 2)
+        assert days[0] == "2024-02-01"
+        assert days[-1] == "2024-02-29"
+
+
+@pytest.mark.asyncio
+class TestCodeCounters:
+    """Testes dos incrementos e das leituras por ID."""
+
+    async def test_record_updates_partner_and_tenant_scopes(self, store):
+        counters = CodeCounters(shards=4)
+        for _ in range(20):
+            await counters.record_generated("knn", "p1", "2025-03-01T10:00:00")
+        await counters.record_generated("knn", "p2", "2025-03-02T10:00:00")
+        await counters.record_redeemed("knn", "p1", "2025-03-02T12:00:00")
+
+        day_docs = [
+            doc
+            for doc in store.collections["code_counters"].values()
+            if doc["partner_id"] == "p1" and doc["day"] == "2025-03-01"
+        ]
+        # As escritas se espalham pelos shards
+        assert len(day_docs) > 1
+        assert await counters.totals("knn") == {"generated": 21, "redeemed": 1}
+        assert await counters.totals("knn", "p1", month_days(2025, 3)) == {
+            "generated": 20,
+            "redeemed": 1,
+        }
+        assert await counters.totals("knn", "p1", ["2025-03-02"]) == {
+            "generated": 0,
+            "redeemed": 1,
+        }
+        assert await counters.totals("knn", "p2") == {"generated": 1, "redeemed": 0}
+        assert await counters.totals("knn", "p3") == {"generated": 0, "redeemed": 0}
+        assert await counters.totals("outro") == {"generated": 0, "redeemed": 0}
+
+    async def test_top_partners_by_period(self, store):
+        counters = CodeCounters(shards=2)
+        events = [("p1", "2025-02-10")] * 5 + [("p2", "2025-03-05")] * 3
+        events += [("p3", "2025-03-20")] * 2 + [("p1", "2025-03-31")]
+        for partner_id, day in events:
+            await counters.record_redeemed("knn", partner_id, f"{day}T12:00:00")
+
+        assert await counters.top_partners("knn", 2) == [("p1", 6), ("p2", 3)]
+        assert await counters.top_partners("knn", 5, "2025-03-01", "2025-03-31") == [
+            ("p2", 3),
+            ("p3", 2),
+            ("p1", 1),
+        ]
+
+    async def test_failed_increment_is_logged_not_raised(self, store):
+        counters = CodeCounters(shards=2)
+        store.fail_writes = True
+
+        await counters.record_generated("knn", "p1")
+
+        assert counters.stats()["failed"] == 1
+        assert counters.stats()["generated"] == 0
+
+
+@pytest.mark.asyncio
+class TestBackfillAndCheck:
+    """Testes da reconstrução e da verificação de consistência."""
+
+    async def test_rebuild_matches_scan(self, store):
+        counters = CodeCounters(shards=3)
+        _code(store, "a", "p1", "2025-03-01T10:00:00", "2025-03-03T10:00:00")
+        _code(store, "b", "p1", "2025-03-01T11:00:00")
+        _code(store, "c", "p2", "2025-03-02T10:00:00")
+        _code(store, "d", "p2", "2025-03-02T10:00:00", tenant_id="outro")
+
+        report = await counters.check("knn")
+        assert not report["consistent"]
+        assert report["missing"]
+
+        await counters.rebuild("knn")
+
+        assert (await counters.check("knn"))["consistent"]
+        assert await counters.totals("knn") == {"generated": 3, "redeemed": 1}
+        assert await counters.totals("knn", "p1", ["2025-03-03"]) == {
+            "generated": 0,
+            "redeemed": 1,
+        }
+
+    async def test_deleted_codes_are_surplus_and_kept(self, store):
+        counters = CodeCounters(shards=2)
+        _code(store, "a", "p1", "2025-03-01T10:00:00")
+        _code(store, "b", "p1", "2025-03-01T11:00:00")
+        await counters.rebuild("knn")
+        # Limpeza de expirados remove um código
+        del store.collections["validation_codes"]["b"]
+
+        report = await counters.check("knn")
+        assert report["consistent"]
+        assert {(m["partner_id"], m["day"]) for m in report["surplus"]} == {
+            (ALL_PARTNERS, ALL_DAYS),
+            (ALL_PARTNERS, "2025-03-01"),
+            ("p1", ALL_DAYS),
+            ("p1", "2025-03-01"),
+        }
+
+        await counters.rebuild("knn")
+        assert (await counters.totals("knn"))["generated"] == 2
+
+        await counters.rebuild("knn", exact=True)
+        assert (await counters.totals("knn"))["generated"] == 1
+        assert (await counters.check("knn"))["surplus"] == []
@@ -0,0 +1,150 @@
+"""
+Testes unitários para os retries com orçamento e prazo do error_handler.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from src.db import error_handler
+from src.db.error_handler import (
+    DatabaseError,
+    ErrorHandler,
+    RetryBudget,
+    RetryConfig,
+    RetryStats,
+    TimeoutError,
+    is_transient_error,
+)
+from src.utils.request_deadline import reset_request_deadline, set_request_deadline
+
+FAST = RetryConfig(max_attempts=3, base_delay=0.001, max_delay=0.001, jitter=False)
+
+
+class _StatusCode:
+    def __init__(self, name):
+        self.name = name
+
+
+class _GrpcError(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.grpc_status_code = _StatusCode(code)
+
+
+class ServiceUnavailable(Exception):  # noqa: N818
+    """Mesmo nome da exceção do google.api_core."""
+
+
+@pytest.fixture(autouse=True)
+def fresh_retry_stats(monkeypatch):
+    stats = RetryStats(rate_per_second=0, burst=10)
+    monkeypatch.setattr(error_handler, "retry_stats", stats)
+    return stats
+
+
+def _flaky(errors, result="ok"):
+    calls = []
+
+    async def func():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    return func, calls
+
+
+class TestIsTransientError:
+    """Testes da classificação por código gRPC e tipo."""
+
+    def test_grpc_codes(self):
+        assert is_transient_error(_GrpcError("UNAVAILABLE")) is True
+        assert is_transient_error(_GrpcError("DEADLINE_EXCEEDED")) is True
+        assert is_transient_error(_GrpcError("NOT_FOUND")) is False
+        assert is_transient_error(_GrpcError("PERMISSION_DENIED")) is False
+
+    def test_exception_types(self):
+        assert is_transient_error(ServiceUnavailable("503")) is True
+        assert is_transient_error(ConnectionResetError()) is True
+        # A mensagem não influencia a decisão
+        assert is_transient_error(ValueError("connection timeout")) is False
+        assert is_transient_error(DatabaseError("timeout")) is False
+
+
+@pytest.mark.asyncio
+class TestRetryWithBackoff:
+    """Testes de retry com orçamento e prazo."""
+
+    async def test_transient_error_is_retried(self, fresh_retry_stats):
+        func, calls = _flaky([_GrpcError("UNAVAILABLE")])
+
+        assert await ErrorHandler.retry_with_backoff(func, FAST) == "ok"
+
+        counters = fresh_retry_stats.stats()["backends"]["firestore"]
+        assert len(calls) == 2
+        assert counters["retries"] == 1
+        assert counters["recovered"] == 1
+
+    async def test_permanent_error_is_not_retried(self, fresh_retry_stats):
+        func, calls = _flaky([ValueError("invalid")])
+
+        with pytest.raises(ValueError):
+            await ErrorHandler.retry_with_backoff(func, FAST)
+
+        assert len(calls) == 1
+        assert fresh_retry_stats.stats()["backends"]["firestore"]["non_retryable"] == 1
+
+    async def test_exhausted_budget_stops_retries(self, fresh_retry_stats):
+        fresh_retry_stats.budget("firestore")._tokens = 0
+        func, calls = _flaky([_GrpcError("UNAVAILABLE")])
+
+        with pytest.raises(DatabaseError):
+            await ErrorHandler.retry_with_backoff(func, FAST)
+
+        assert len(calls) == 1
+        counters = fresh_retry_stats.stats()["backends"]["firestore"]
+        assert counters["budget_exhausted"] == 1
+
+    async def test_request_deadline_stops_retries(self, fresh_retry_stats):
+        func, calls = _flaky([_GrpcError("UNAVAILABLE")])
+        token = set_request_deadline(0)
+        try:
+            with pytest.raises(DatabaseError):
+                await ErrorHandler.retry_with_backoff(func, FAST)
+        finally:
+            reset_request_deadline(token)
+
+        assert len(calls) == 1
+        counters = fresh_retry_stats.stats()["backends"]["firestore"]
+        assert counters["deadline_exceeded"] == 1
+
+    async def test_request_deadline_bounds_each_attempt(self, fresh_retry_stats):
+        async def hanging():
+            await asyncio.sleep(10)
+
+        token = set_request_deadline(0.05)
+        start = time.monotonic()
+        try:
+            with pytest.raises(TimeoutError) as raised:
+                await ErrorHandler.retry_with_backoff(hanging, FAST)
+        finally:
+            reset_request_deadline(token)
+
+        assert time.monotonic() - start < 1
+        assert raised.value.error_code == "DEADLINE_EXCEEDED"
+        counters = fresh_retry_stats.stats()["backends"]["firestore"]
+        assert counters["deadline_exceeded"] == 1
+        assert counters["retries"] == 0
+
+
+class TestRetryBudget:
+    """Testes do token bucket."""
+
+    def test_burst_then_empty(self):
+        budget = RetryBudget(rate_per_second=0, burst=2)
+
+        assert budget.try_acquire() is True
+        assert budget.try_acquire() is True
+        assert budget.try_acquire() is False
@@ -0,0 +1,104 @@
+"""
+Testes unitários para a fila de eventos com gravação em lote.
+"""
+
+import asyncio
+
+import pytest
+
+from src.utils.event_pipeline import EventPipeline
+
+
+class _Writer:
+    """Registra os lotes gravados."""
+
+    def __init__(self, fail: bool = False):
+        self.batches = []
+        self.fail = fail
+
+    async def __call__(self, events):
+        if self.fail:
+            raise RuntimeError("Firestore indisponível")
+        self.batches.append(list(events))
+
+
+def _pipeline(writer, **overrides):
+    options = {
+        "max_size": 10,
+        "batch_size": 3,
+        "flush_interval": 60,
+        **overrides,
+    }
+    return EventPipeline("test", writer, **options)
+
+
+@pytest.mark.asyncio
+class TestEventPipeline:
+    """Testes de enfileiramento, gravação e descarte."""
+
+    async def test_full_batch_triggers_flush(self):
+        writer = _Writer()
+        pipeline = _pipeline(writer)
+        await pipeline.start()
+
+        for i in range(7):
+            assert pipeline.enqueue({"n": i}) is True
+        await asyncio.sleep(0.01)
+
+        # Lotes cheios gravados sem esperar o intervalo
+        assert [len(batch) for batch in writer.batches] == [3, 3, 1]
+        await pipeline.stop(timeout=1)
+
+    async def test_interval_flushes_partial_batch(self):
+        writer = _Writer()
+        pipeline = _pipeline(writer, flush_interval=0.01)
+        await pipeline.start()
+
+        pipeline.enqueue({"n": 1})
+        await asyncio.sleep(0.05)
+
+        assert writer.batches == [[{"n": 1}]]
+        await pipeline.stop(timeout=1)
+
+    async def test_full_queue_policies(self):
+        newest = _pipeline(_Writer(), max_size=2, policy="drop_newest")
+        oldest = _pipeline(_Writer(), max_size=2, policy="drop_oldest")
+
+        for pipeline in (newest, oldest):
+            for i in range(3):
+                pipeline.enqueue({"n": i})
+
+        assert [newest._queue.get_nowait()["n"] for _ in range(2)] == [0, 1]
+        assert [oldest._queue.get_nowait()["n"] for _ in range(2)] == [1, 2]
+        assert newest.stats()["dropped"] == oldest.stats()["dropped"] == 1
+
+    async def test_block_policy_waits_then_drops(self):
+        pipeline = _pipeline(_Writer(), max_size=1, policy="block", put_timeout=0.01)
+
+        assert await pipeline.put({"n": 1}) is True
+        assert await pipeline.put({"n": 2}) is False
+        assert pipeline.stats()["dropped"] == 1
+
+    async def test_stop_drains_pending_events(self):
+        writer = _Writer()
+        pipeline = _pipeline(writer, batch_size=500)
+        await pipeline.start()
+
+        for i in range(5):
+            pipeline.enqueue({"n": i})
+        await pipeline.stop(timeout=1)
+
+        assert writer.batches == [[{"n": i} for i in range(5)]]
+        stats = pipeline.stats()
+        assert stats["queue_depth"] == 0
+        assert stats["flushed"] == 5
+        assert stats["running"] is False
+
+    async def test_writer_errors_are_counted(self):
+        pipeline = _pipeline(_Writer(fail=True))
+
+        pipeline.enqueue({"n": 1})
+        await pipeline.flush()
+
+        assert pipeline.stats()["failed"] == 1
+        assert pipeline.stats()["queue_depth"] == 0
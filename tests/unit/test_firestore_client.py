@@ -0,0 +1,326 @@
+"""
+Testes unitários para o caminho não bloqueante do FirestoreClient.
+"""
+
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from src.db import firestore as firestore_module
+from src.db.firestore import FirestoreClient
+
+
+class _Snapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self.exists = True
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class _SyncDocRef:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def get(self):
+        self.calls.append(threading.current_thread())
+        return _Snapshot("doc-1", {"tenant_id": "knn"})
+
+
+class _AsyncDocRef:
+    def __init__(self, calls):
+        self.calls = calls
+
+    async def get(self):
+        self.calls.append("awaited")
+        return _Snapshot("doc-1", {"tenant_id": "knn"})
+
+
+class _Client:
+    def __init__(self, doc_ref):
+        self.doc_ref = doc_ref
+
+    def collection(self, name):
+        return self
+
+    def document(self, doc_id):
+        return self.doc_ref
+
+
+@pytest.mark.asyncio
+class TestFirestoreClientExecution:
+    """Testes dos modos native e executor."""
+
+    async def test_native_mode_awaits_async_client(self):
+        calls = []
+        async_client = _Client(_AsyncDocRef(calls))
+        sync_client = _Client(_SyncDocRef(calls))
+
+        with (
+            patch.object(firestore_module, "async_db", async_client),
+            patch.object(firestore_module, "db", sync_client),
+            patch.object(firestore_module, "FIRESTORE_ASYNC_MODE", "native"),
+        ):
+            result = await FirestoreClient.get_document("partners", "doc-1", "knn")
+
+        assert result == {"tenant_id": "knn", "id": "doc-1"}
+        assert calls == ["awaited"]
+
+    async def test_executor_mode_runs_sync_client_off_loop(self):
+        calls = []
+        sync_client = _Client(_SyncDocRef(calls))
+
+        with (
+            patch.object(firestore_module, "async_db", None),
+            patch.object(firestore_module, "db", sync_client),
+            patch.object(firestore_module, "FIRESTORE_ASYNC_MODE", "executor"),
+        ):
+            result = await FirestoreClient.get_document("partners", "doc-1", "knn")
+
+        assert result["id"] == "doc-1"
+        assert len(calls) == 1
+        assert calls[0] is not threading.main_thread()
+
+    async def test_native_mode_falls_back_to_executor_without_async_client(self):
+        calls = []
+        sync_client = _Client(_SyncDocRef(calls))
+
+        with (
+            patch.object(firestore_module, "async_db", None),
+            patch.object(firestore_module, "db", sync_client),
+            patch.object(firestore_module, "FIRESTORE_ASYNC_MODE", "native"),
+        ):
+            result = await FirestoreClient.get_document("partners", "doc-1", "knn")
+
+        assert result["id"] == "doc-1"
+        assert calls[0] is not threading.main_thread()
+
+
+class _BatchClient:
+    """Cliente com get_all síncrono ou assíncrono e contagem de chamadas."""
+
+    def __init__(self, docs, native):
+        self.docs = docs
+        self.requested = []
+        self.batches = 0
+        if native:
+
+            async def get_all(refs):
+                self.batches += 1
+                for snapshot in self._snapshots(refs):
+                    yield snapshot
+
+        else:
+
+            def get_all(refs):
+                self.batches += 1
+                yield from self._snapshots(refs)
+
+        self.get_all = get_all
+
+    def _snapshots(self, refs):
+        # Ordem inversa: get_all não garante a ordem dos IDs
+        for doc_id in reversed(refs):
+            self.requested.append(doc_id)
+            snapshot = _Snapshot(doc_id, self.docs.get(doc_id, {}))
+            snapshot.exists = doc_id in self.docs
+            yield snapshot
+
+    def collection(self, name):
+        return self
+
+    def document(self, doc_id):
+        return doc_id
+
+
+@pytest.mark.asyncio
+class TestFirestoreClientGetDocumentsMany:
+    """Testes da leitura em lote com get_all."""
+
+    DOCS = {
+        "PTN_1": {"tenant_id": "knn", "active": True},
+        "PTN_2": {"tenant_id": "knn", "active": False},
+        "PTN_3": {"tenant_id": "outro", "active": True},
+    }
+
+    @pytest.mark.parametrize("mode", ["native", "executor"])
+    async def test_single_batch_dedup_and_tenant_filter(self, mode):
+        client = _BatchClient(self.DOCS, native=mode == "native")
+
+        with (
+            patch.object(firestore_module, "async_db", client),
+            patch.object(firestore_module, "db", client),
+            patch.object(firestore_module, "FIRESTORE_ASYNC_MODE", mode),
+        ):
+            result = await FirestoreClient.get_documents_many(
+                "partners",
+                ["PTN_2", "PTN_1", "PTN_2", "", "PTN_3", "PTN_404"],
+                "knn",
+            )
+
+        assert client.batches == 1
+        assert sorted(client.requested) == ["PTN_1", "PTN_2", "PTN_3", "PTN_404"]
+        assert list(result) == ["PTN_2", "PTN_1"]
+        assert result["PTN_1"] == {"tenant_id": "knn", "active": True, "id": "PTN_1"}
+
+    async def test_empty_ids_skip_firestore(self):
+        client = _BatchClient(self.DOCS, native=True)
+
+        with (
+            patch.object(firestore_module, "async_db", client),
+            patch.object(firestore_module, "FIRESTORE_ASYNC_MODE", "native"),
+        ):
+            result = await FirestoreClient.get_documents_many("partners", [], "knn")
+
+        assert result == {}
+        assert client.batches == 0
+
+
+class _QueryClient:
+    """
+    Coleção com where/select/start_after/limit e contagem de páginas.
+
+    Como o SDK, um filtro de intervalo ordena implicitamente pelo campo (e
+    depois pelo ID) e `start_after` exige esse campo no snapshot.
+    """
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.calls = {"pages": 0, "selected": None}
+        self._filters = []
+        self._after = None
+        self._limit = None
+
+    def _copy(self, **changes):
+        query = _QueryClient(self.docs)
+        query.__dict__.update({**self.__dict__, **changes})
+        return query
+
+    def collection(self, name):
+        return self
+
+    def where(self, field, op, value):
+        return self._copy(_filters=[*self._filters, (field, op, value)])
+
+    def select(self, fields):
+        self.calls["selected"] = fields
+        return self
+
+    def _order_fields(self):
+        return list(dict.fromkeys(f for f, op, _ in self._filters if op != "=="))
+
+    def _order_key(self, doc_id, data):
+        return (*(data.get(field) for field in self._order_fields()), doc_id)
+
+    def start_after(self, snapshot):
+        data = snapshot.to_dict()
+        for field in self._order_fields():
+            if field not in data:
+                raise ValueError(
+                    f'The "order by" field path {field!r} is not present in the '
+                    "cursor data"
+                )
+        return self._copy(_after=self._order_key(snapshot.id, data))
+
+    def limit(self, limit):
+        return self._copy(_limit=limit)
+
+    async def get(self):
+        self.calls["pages"] += 1
+        ops = {
+            "==": lambda a, b: a == b,
+            ">=": lambda a, b: a >= b,
+            "<=": lambda a, b: a <= b,
+        }
+        selected = self.calls["selected"]
+        matches = sorted(
+            (
+                (self._order_key(doc_id, data), doc_id, data)
+                for doc_id, data in self.docs.items()
+                if all(
+                    data.get(f) is not None and ops[op](data.get(f), v)
+                    for f, op, v in self._filters
+                )
+            ),
+            key=lambda match: match[0],
+        )
+        rows = [
+            _Snapshot(doc_id, {f: data[f] for f in selected if f in data})
+            for key, doc_id, data in matches
+            if self._after is None or key > self._after
+        ]
+        return rows[: self._limit]
+
+
+@pytest.mark.asyncio
+class TestFirestoreClientTopBySum:
+    """Testes do top-K somado no cliente."""
+
+    async def test_sums_groups_across_pages(self):
+        docs = {
+            f"c{i:03d}": {
+                "tenant_id": "knn",
+                "partner_id": f"P{i % 4}",
+                "day": "2025-03-01" if i % 2 else "2025-02-01",
+                "redeemed": i % 4,
+            }
+            for i in range(50)
+        }
+        docs["x"] = {"tenant_id": "outro", "partner_id": "P3", "redeemed": 100}
+        client = _QueryClient(docs)
+
+        with (
+            patch.object(firestore_module, "async_db", client),
+            patch.object(firestore_module, "FIRESTORE_ASYNC_MODE", "native"),
+            patch.object(firestore_module, "_TOP_PAGE_SIZE", 10),
+        ):
+            top = await FirestoreClient.top_by_sum(
+                "code_counters",
+                tenant_id="knn",
+                group_by="partner_id",
+                value="redeemed",
+                filters=[("day", ">=", "2025-03-01")],
+                limit=2,
+            )
+
+        # 25 documentos no filtro, em páginas de 10; o campo do intervalo
+        # entra na projeção para servir de cursor
+        assert client.calls == {
+            "pages": 3,
+            "selected": ["partner_id", "redeemed", "day"],
+        }
+        assert top == [("P3", 36), ("P1", 13)]
+
+    async def test_period_range_pages_past_first_page(self):
+        days = ["2025-03-01", "2025-03-02", "2025-03-03", "2025-04-01"]
+        docs = {
+            f"c{i:03d}": {
+                "tenant_id": "knn",
+                "partner_id": f"P{i % 3}",
+                "day": days[i % 4],
+                "redeemed": 1,
+            }
+            for i in range(40)
+        }
+        client = _QueryClient(docs)
+
+        with (
+            patch.object(firestore_module, "async_db", client),
+            patch.object(firestore_module, "FIRESTORE_ASYNC_MODE", "native"),
+            patch.object(firestore_module, "_TOP_PAGE_SIZE", 7),
+        ):
+            top = await FirestoreClient.top_by_sum(
+                "code_counters",
+                tenant_id="knn",
+                group_by="partner_id",
+                value="redeemed",
+                filters=[("day", ">=", "2025-03-01"), ("day", "<=", "2025-03-31")],
+                limit=3,
+            )
+
+        # 30 documentos em março, em páginas de 7
+        assert client.calls["pages"] == 5
+        assert top == [("P0", 10), ("P1", 10), ("P2", 10)]
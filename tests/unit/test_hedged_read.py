@@ -0,0 +1,138 @@
+"""
+Testes unitários para as leituras com hedge entre Firestore e PostgreSQL.
+"""
+
+import asyncio
+import importlib
+
+import pytest
+
+from src import config
+
+# `src.db` reexporta a instância `circuit_breaker`, que oculta o submódulo
+# em `from src.db import circuit_breaker` e em `import ... as`
+cb_module = importlib.import_module("src.db.circuit_breaker")
+
+
+@pytest.fixture
+def hedging(monkeypatch):
+    """Habilita o hedge com prazo fixo curto e zera contadores."""
+    monkeypatch.setattr(cb_module, "HEDGED_READS_ENABLED", True)
+    monkeypatch.setattr(config, "POSTGRES_ENABLED", True)
+    monkeypatch.setattr(cb_module, "HEDGE_DEADLINES_MS", {"op": 20})
+    cb_module.hedge_tracker.reset()
+    cb_module.circuit_breaker.reset()
+    yield cb_module.hedge_tracker
+    cb_module.hedge_tracker.reset()
+    cb_module.circuit_breaker.reset()
+
+
+def _reader(result, delay=0.0, error=None, calls=None):
+    async def read():
+        if calls is not None:
+            calls.append(result)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return result
+
+    return read
+
+
+@pytest.mark.asyncio
+class TestWithHedgedRead:
+    """Testes de with_hedged_read."""
+
+    async def test_fast_primary_does_not_hedge(self, hedging):
+        calls = []
+
+        result = await cb_module.with_hedged_read(
+            "op", _reader("fs", calls=calls), _reader("pg", calls=calls)
+        )
+
+        assert result == "fs"
+        assert calls == ["fs"]
+        assert hedging.stats()["operations"]["op"]["hedged"] == 0
+
+    async def test_slow_primary_loses_to_hedge(self, hedging):
+        result = await cb_module.with_hedged_read(
+            "op", _reader("fs", delay=1), _reader("pg")
+        )
+
+        stats = hedging.stats()["operations"]["op"]
+        assert result == "pg"
+        assert stats["hedged"] == 1
+        assert stats["hedge_wins"] == 1
+        assert cb_module.circuit_breaker.failures == 0
+
+    async def test_cancelled_primary_is_slow_sample_and_frees_probe(self, hedging):
+        breaker = cb_module.circuit_breaker
+        breaker.state = "half-open"
+
+        result = await cb_module.with_hedged_read(
+            "op", _reader("fs", delay=1), _reader("pg")
+        )
+
+        assert result == "pg"
+        assert breaker.snapshot()["probes_in_flight"] == 0
+        assert breaker.state == "half-open"
+        # A leitura cancelada entra no percentil com ao menos o prazo de hedge
+        assert list(hedging._latencies["op"]) >= [20]
+
+    async def test_primary_still_wins_after_hedge(self, hedging):
+        result = await cb_module.with_hedged_read(
+            "op", _reader("fs", delay=0.04), _reader("pg", delay=1)
+        )
+
+        stats = hedging.stats()["operations"]["op"]
+        assert result == "fs"
+        assert stats["primary_wins"] == 1
+
+    async def test_failed_hedge_waits_for_primary(self, hedging):
+        result = await cb_module.with_hedged_read(
+            "op",
+            _reader("fs", delay=0.05),
+            _reader("pg", error=RuntimeError("pg fora")),
+        )
+
+        assert result == "fs"
+
+    async def test_fast_failure_falls_back(self, hedging):
+        result = await cb_module.with_hedged_read(
+            "op", _reader("fs", error=RuntimeError("fs fora")), _reader("pg")
+        )
+
+        assert result == "pg"
+        assert cb_module.circuit_breaker.failures == 1
+        assert hedging.stats()["operations"]["op"]["hedged"] == 0
+
+    async def test_disabled_uses_circuit_breaker(self, hedging, monkeypatch):
+        monkeypatch.setattr(cb_module, "HEDGED_READS_ENABLED", False)
+        calls = []
+
+        result = await cb_module.with_hedged_read(
+            "op", _reader("fs", delay=0.05, calls=calls), _reader("pg", calls=calls)
+        )
+
+        assert result == "fs"
+        assert calls == ["fs"]
+        assert hedging.stats()["operations"] == {}
+
+
+class TestHedgeTracker:
+    """Testes do prazo baseado em percentil."""
+
+    def test_deadline_follows_percentile_within_bounds(self, monkeypatch):
+        monkeypatch.setattr(cb_module, "HEDGE_DEADLINES_MS", {})
+        monkeypatch.setattr(cb_module, "HEDGE_MIN_DELAY_MS", 20)
+        monkeypatch.setattr(cb_module, "HEDGE_MAX_DELAY_MS", 500)
+        tracker = cb_module.HedgeTracker(window=100, min_samples=10)
+
+        assert tracker.deadline("op") == 0.5
+        for latency in range(1, 101):
+            tracker.record_latency("op", float(latency))
+        assert tracker.deadline("op") == pytest.approx(0.095)
+
+        for _ in range(100):
+            tracker.record_latency("op", 5.0)
+        assert tracker.deadline("op") == pytest.approx(0.02)
@@ -0,0 +1,96 @@
+"""
+Testes unitários para os histogramas de latência e a exposição Prometheus.
+"""
+
+import random
+
+import pytest
+
+from src.db.circuit_breaker import CircuitBreaker
+from src.utils.histograms import (
+    LatencyHistogram,
+    MetricsRegistry,
+    breaker_transitions,
+)
+
+
+class TestLatencyHistogram:
+    """Testes de precisão dos percentis."""
+
+    def test_quantiles_within_bucket_error(self):
+        rng = random.Random(42)
+        samples = sorted(rng.lognormvariate(-4, 1) for _ in range(20_000))
+        histogram = LatencyHistogram()
+        for sample in samples:
+            histogram.observe(sample)
+
+        for q in (0.5, 0.95, 0.99):
+            exact = samples[int(q * len(samples)) - 1]
+            assert histogram.quantile(q) == pytest.approx(exact, rel=0.04)
+        assert histogram.count == len(samples)
+        assert histogram.max == samples[-1]
+
+    def test_cumulative_buckets(self):
+        histogram = LatencyHistogram()
+        for seconds in (0.003, 0.02, 0.02, 0.3, 20):
+            histogram.observe(seconds)
+
+        assert histogram.cumulative((0.005, 0.025, 0.5, 10)) == [1, 3, 4, 4]
+
+    def test_empty_histogram(self):
+        assert LatencyHistogram().quantile(0.5) is None
+
+
+class TestMetricsRegistry:
+    """Testes de séries por labels e do formato de exposição."""
+
+    def test_series_beyond_limit_fold_into_other(self):
+        registry = MetricsRegistry(series_limit=2)
+        latency = registry.histogram("latency", "Latência", ("route",))
+
+        for route in ("/a", "/b", "/c", "/d"):
+            latency.observe(0.01, route=route)
+        latency.observe(0.01, route="/a")
+
+        assert latency.get(route="/a").count == 2
+        assert latency.get(route="other").count == 2
+        assert latency.get(route="/c") is None
+
+    def test_render_prometheus_text(self):
+        registry = MetricsRegistry()
+        latency = registry.histogram("latency", "Latência", ("route",))
+        errors = registry.counter("errors_total", "Erros", ("kind",))
+        latency.observe(0.002, route='/x"y')
+        errors.inc(kind="timeout")
+        errors.inc(2, kind="timeout")
+
+        lines = registry.render().splitlines()
+
+        assert lines[:2] == ["# HELP latency Latência", "# TYPE latency histogram"]
+        assert 'latency_bucket{route="/x\\"y",le="0.001"} 0' not in lines
+        assert 'latency_bucket{route="/x\\"y",le="0.005"} 1' in lines
+        assert 'latency_bucket{route="/x\\"y",le="+Inf"} 1' in lines
+        assert 'latency_count{route="/x\\"y"} 1' in lines
+        assert "# TYPE errors_total counter" in lines
+        assert 'errors_total{kind="timeout"} 3' in lines
+
+
+class TestBreakerTransitions:
+    """Testes da contagem de transições dos circuit breakers."""
+
+    def test_open_and_close_are_counted(self):
+        breaker = CircuitBreaker("test_histograms")
+        labels = {"breaker": "test_histograms"}
+        before = breaker_transitions.get(**labels, from_state="closed", to_state="open")
+
+        breaker._open("teste")
+        breaker._open("teste")
+        breaker._close()
+
+        assert (
+            breaker_transitions.get(**labels, from_state="closed", to_state="open")
+            == before + 1
+        )
+        assert (
+            breaker_transitions.get(**labels, from_state="open", to_state="closed") >= 1
+        )
@@ -0,0 +1,173 @@
+"""
+Testes unitários para o armazenamento de chaves JWKS e a verificação RS256.
+"""
+
+import asyncio
+import json
+import time
+
+import httpx
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from src import auth
+from src.utils import jwks as jwks_module
+from src.utils.jwks import JWKSKeyStore, parse_max_age
+from src.utils.token_cache import VerifiedTokenCache
+
+
+def _rsa_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def _jwks(private_key, kid: str) -> dict:
+    jwk = jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+    return {"keys": [{**jwk, "kid": kid, "alg": "RS256", "use": "sig"}]}
+
+
+def _rs256_token(private_key, kid: str, **claims) -> str:
+    now = int(time.time())
+    payload = {
+        "sub": "ADM_1",
+        "role": "admin",
+        "tenant": "knn",
+        "iat": now,
+        "exp": now + 3600,
+        **claims,
+    }
+    return jwt.encode(payload, private_key, algorithm="RS256", headers={"kid": kid})
+
+
+@pytest.fixture(scope="module")
+def signing_key():
+    return _rsa_key()
+
+
+@pytest.fixture
+def static_store(tmp_path, signing_key):
+    """JWKS em arquivo local, no lugar da URL do emissor."""
+    path = tmp_path / "jwks.json"
+    path.write_text(json.dumps(_jwks(signing_key, "knn-1")))
+    store = JWKSKeyStore("knn", None, 600, static_file=str(path))
+    store.load_static(str(path))
+    return store
+
+
+class TestParseMaxAge:
+    """Testes da leitura do Cache-Control."""
+
+    def test_max_age_and_defaults(self):
+        assert parse_max_age("public, max-age=19800, must-revalidate", 600) == 19800
+        assert parse_max_age(None, 600) == 600
+        assert parse_max_age("public", 600) == 600
+        assert parse_max_age("no-store", 600) == 0
+
+
+class TestJWKSKeyStore:
+    """Testes do carregamento e da renovação das chaves."""
+
+    def test_static_file_resolves_kid(self, static_store):
+        assert static_store.get_key("knn-1") is not None
+        assert static_store.get_key("outro") is None
+        assert static_store.stats()["unknown_kid"] == 1
+        assert static_store.stats()["expires_in_seconds"] is None
+
+    @pytest.mark.asyncio
+    async def test_refresh_honors_cache_control(self, monkeypatch, signing_key):
+        body = _jwks(signing_key, "fb-1")
+
+        def handler(request):
+            return httpx.Response(
+                200, json=body, headers={"Cache-Control": "public, max-age=1000"}
+            )
+
+        real_client = httpx.AsyncClient
+        monkeypatch.setattr(
+            jwks_module.httpx,
+            "AsyncClient",
+            lambda **kw: real_client(transport=httpx.MockTransport(handler), **kw),
+        )
+        store = JWKSKeyStore("firebase", "https://jwks.test", 600)
+
+        assert await store.refresh() is True
+        assert store.has_key("fb-1")
+        assert 700 <= store._next_refresh_delay() <= 800
+
+    @pytest.mark.asyncio
+    async def test_failed_refresh_keeps_keys_and_backs_off(
+        self, monkeypatch, static_store
+    ):
+        def handler(request):
+            return httpx.Response(503)
+
+        real_client = httpx.AsyncClient
+        monkeypatch.setattr(
+            jwks_module.httpx,
+            "AsyncClient",
+            lambda **kw: real_client(transport=httpx.MockTransport(handler), **kw),
+        )
+        static_store.static_file = None
+        static_store.url = "https://jwks.test"
+        static_store.min_refresh_interval = 10
+
+        assert await static_store.refresh() is False
+        assert await static_store.refresh() is False
+        assert static_store.has_key("knn-1")
+        assert static_store._next_refresh_delay() == 20
+
+    @pytest.mark.asyncio
+    async def test_unknown_kid_does_not_wait_for_network(self, monkeypatch):
+        started = asyncio.Event()
+
+        async def slow_refresh():
+            started.set()
+            await asyncio.sleep(10)
+
+        store = JWKSKeyStore("knn", "https://jwks.test", 600, min_refresh_interval=0)
+        monkeypatch.setattr(store, "refresh", slow_refresh)
+
+        assert store.get_key("novo") is None
+        await asyncio.wait_for(started.wait(), 1)
+        await store.stop()
+
+
+@pytest.mark.asyncio
+class TestGetCurrentUserJWKS:
+    """Testes da verificação RS256 na dependência get_current_user."""
+
+    @pytest.fixture
+    def jwks_auth(self, monkeypatch, static_store):
+        monkeypatch.setattr(auth, "TESTING_MODE", False)
+        monkeypatch.setattr(auth, "ENVIRONMENT", "production")
+        monkeypatch.setattr(auth, "token_cache", VerifiedTokenCache(max_entries=10))
+        monkeypatch.setattr(auth, "jwks_store", static_store)
+        # Configurado, mas sem chaves e sem renovação pela rede
+        firebase_store = JWKSKeyStore(
+            "firebase", None, 600, static_file=static_store.static_file
+        )
+        monkeypatch.setattr(auth, "firebase_jwks_store", firebase_store)
+        return static_store
+
+    async def test_rs256_token_is_verified_with_jwks(self, jwks_auth, signing_key):
+        token = _rs256_token(signing_key, "knn-1")
+
+        user = await auth.get_current_user(
+            HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+        )
+
+        assert user.sub == "ADM_1"
+        assert auth.token_cache.stats()["verifications"] == {"jwks": 1}
+
+    async def test_wrong_signature_and_unknown_kid_are_rejected(self, jwks_auth):
+        other_key = _rsa_key()
+
+        for kid in ("knn-1", "desconhecido"):
+            token = _rs256_token(other_key, kid)
+            with pytest.raises(HTTPException) as exc:
+                await auth.get_current_user(
+                    HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+                )
+            assert exc.value.status_code == 401
@@ -0,0 +1,247 @@
+"""
+Testes unitários para os rollups por faixa de tempo das métricas históricas.
+"""
+
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils import metrics_rollups as rollups_module
+from src.utils.metrics_rollups import (
+    MetricsRollups,
+    bucket_end,
+    bucket_start,
+    choose_level,
+    numeric_fields,
+)
+
+
+class _Transform:
+    def __init__(self, op, value):
+        self.op = op
+        self.value = value
+
+    def apply(self, current):
+        if current is None:
+            return self.value
+        return self.op(current, self.value)
+
+
+def _apply(doc, data):
+    for field, value in data.items():
+        if isinstance(value, _Transform):
+            doc[field] = value.apply(doc.get(field))
+        elif isinstance(value, dict):
+            doc[field] = _apply(dict(doc.get(field) or {}), value)
+        else:
+            doc[field] = value
+    return doc
+
+
+class _Snapshot:
+    def __init__(self, data):
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class _Query:
+    """Coleção em memória com where/order_by/stream do cliente assíncrono."""
+
+    ops = {
+        "==": lambda a, b: a == b,
+        ">=": lambda a, b: a >= b,
+        "<=": lambda a, b: a <= b,
+    }
+
+    def __init__(self, db, name, filters=(), order=None):
+        self.db = db
+        self.name = name
+        self.filters = filters
+        self.order = order
+
+    def document(self, doc_id):
+        return (self.name, doc_id)
+
+    def where(self, field, op, value):
+        filters = (*self.filters, (field, op, value))
+        return _Query(self.db, self.name, filters, self.order)
+
+    def order_by(self, field):
+        return _Query(self.db, self.name, self.filters, field)
+
+    async def add(self, data):
+        self.db.docs[(self.name, str(len(self.db.docs)))] = dict(data)
+
+    async def stream(self):
+        self.db.reads += 1
+        docs = [
+            data
+            for (name, _), data in self.db.docs.items()
+            if name == self.name
+            and all(self.ops[op](data[f], v) for f, op, v in self.filters)
+        ]
+        if self.order:
+            docs.sort(key=lambda data: data[self.order])
+        for data in docs:
+            yield _Snapshot(data)
+
+
+class _Batch:
+    def __init__(self, db):
+        self.db = db
+        self.writes = []
+
+    def set(self, ref, data, merge=False):
+        self.writes.append((ref, data, merge))
+
+    async def commit(self):
+        self.db.commits += 1
+        for ref, data, merge in self.writes:
+            doc = self.db.docs.get(ref, {}) if merge else {}
+            self.db.docs[ref] = _apply(dict(doc), data)
+
+
+class _Db:
+    def __init__(self):
+        self.docs: dict[tuple[str, str], dict] = {}
+        self.reads = 0
+        self.commits = 0
+
+    def collection(self, name):
+        return _Query(self, name)
+
+    def batch(self):
+        return _Batch(self)
+
+
+@pytest.fixture(autouse=True)
+def fake_transforms(monkeypatch):
+    monkeypatch.setattr(
+        rollups_module,
+        "firestore",
+        SimpleNamespace(
+            Increment=lambda value: _Transform(lambda a, b: a + b, value),
+            Minimum=lambda value: _Transform(min, value),
+            Maximum=lambda value: _Transform(max, value),
+        ),
+    )
+
+
+def _metrics(students, used=None):
+    return {
+        "users": {"total_students": students, "active": True},
+        "codes": {"codes_used": used},
+    }
+
+
+class TestBuckets:
+    """Testes das faixas de tempo e da escolha do nível."""
+
+    def test_bucket_boundaries(self):
+        moment = datetime(2025, 12, 31, 15, 42, tzinfo=UTC)
+        assert bucket_start(moment, "hourly") == datetime(2025, 12, 31, 15)
+        assert bucket_start(moment, "daily") == datetime(2025, 12, 31)
+        assert bucket_start(moment, "weekly") == datetime(2025, 12, 29)
+        assert bucket_start(moment, "monthly") == datetime(2025, 12, 1)
+        assert bucket_end(datetime(2025, 12, 1), "monthly") == datetime(2026, 1, 1)
+
+    def test_level_is_coarsened_for_long_periods(self):
+        start = datetime(2025, 1, 1)
+        assert choose_level(start, start + timedelta(days=3), "hourly", 200) == (
+            "hourly"
+        )
+        assert choose_level(start, start + timedelta(days=365), "hourly", 200) == (
+            "weekly"
+        )
+        assert choose_level(start, start + timedelta(days=365), "daily", 10) == (
+            "monthly"
+        )
+
+    def test_numeric_fields_skip_none_and_bool(self):
+        assert numeric_fields(_metrics(10, None)) == {"users.total_students": 10}
+
+
+@pytest.mark.asyncio
+class TestMetricsRollups:
+    """Testes da atualização por snapshot e da leitura da série."""
+
+    async def test_timeline_reads_rollups_not_snapshots(self):
+        db = _Db()
+        rollups = MetricsRollups(max_points=200)
+        day = datetime(2025, 3, 10)
+        samples = [(1, 10, 2), (2, 14, None), (26, 20, 5)]
+        for hour, students, used in samples:
+            await rollups.record(
+                db, "knn", day + timedelta(hours=hour), _metrics(students, used)
+            )
+        await rollups.record(db, "outro", day, _metrics(99))
+
+        result = await rollups.timeline(
+            db, "knn", day, day + timedelta(days=2), "daily"
+        )
+
+        assert db.reads == 1
+        assert result["level"] == "daily"
+        assert result["total_snapshots"] == 3
+        first, second = result["timeline"]
+        assert first["start"] == "2025-03-10T00:00:00"
+        assert first["count"] == 2
+        assert first["metrics"]["users.total_students"] == {
+            "sum": 24,
+            "min": 10,
+            "max": 14,
+            "count": 2,
+            "avg": 12,
+        }
+        assert first["metrics"]["codes.codes_used"]["count"] == 1
+        assert second["metrics"]["users.total_students"]["max"] == 20
+
+    async def test_long_periods_are_downsampled(self):
+        db = _Db()
+        rollups = MetricsRollups(max_points=2)
+        for month in range(1, 6):
+            await rollups.record(db, "knn", datetime(2025, month, 5), _metrics(month))
+
+        result = await rollups.timeline(
+            db, "knn", datetime(2025, 1, 1), datetime(2025, 6, 1), "daily"
+        )
+
+        assert result["level"] == "monthly"
+        assert result["downsampled"]
+        first, second = result["timeline"]
+        assert (first["start"], first["end"]) == (
+            "2025-01-01T00:00:00",
+            "2025-04-01T00:00:00",
+        )
+        assert first["metrics"]["users.total_students"]["sum"] == 6
+        assert second["metrics"]["users.total_students"]["min"] == 4
+        assert second["count"] == 2
+
+    async def test_rebuild_matches_incremental_rollups(self):
+        db = _Db()
+        rollups = MetricsRollups()
+        start = datetime(2025, 3, 1, 8)
+        for index in range(6):
+            timestamp = start + timedelta(hours=7 * index)
+            metrics = _metrics(index * 3, index)
+            await db.collection("metrics_snapshots").add(
+                {"tenant_id": "knn", "timestamp": timestamp, "metrics": metrics}
+            )
+            await rollups.record(db, "knn", timestamp, metrics)
+        incremental = {
+            ref: doc for ref, doc in db.docs.items() if ref[0] == "metrics_rollups"
+        }
+        for ref in incremental:
+            del db.docs[ref]
+
+        report = await rollups.rebuild(db, "knn")
+
+        assert report["snapshots"] == 6
+        assert report["buckets"]["hourly"] == 6
+        rebuilt = {
+            ref: doc for ref, doc in db.docs.items() if ref[0] == "metrics_rollups"
+        }
+        assert rebuilt == incremental
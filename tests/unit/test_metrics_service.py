@@ -0,0 +1,161 @@
+"""
+Testes unitários para a coleta concorrente das métricas em tempo real.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from src.utils import code_counters as counters_module
+from src.utils import metrics_service as metrics_module
+from src.utils.metrics_service import MetricsService
+
+
+class _Firestore:
+    """Contagens com latência; coleções em `slow` demoram, em `broken` falham."""
+
+    def __init__(self, latency=0.05, slow=(), broken=()):
+        self.latency = latency
+        self.slow = slow
+        self.broken = broken
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def query_documents(self, collection, *, tenant_id, filters=None, **kw):
+        key = (collection, bool(filters))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(10 if key in self.slow else self.latency)
+            if key in self.broken:
+                raise RuntimeError("Firestore indisponível")
+            return {"items": [], "total": 4 if filters else 10}
+        finally:
+            self.in_flight -= 1
+
+    async def get_documents_many(self, collection, ids, tenant_id):
+        """Contadores de códigos: o primeiro shard tem os totais do tenant."""
+        await self.query_documents(collection, tenant_id=tenant_id)
+        return {ids[0]: {"generated": 10, "redeemed": 4}}
+
+
+class _Snapshots:
+    def collection(self, name):
+        return self
+
+    async def add(self, data):
+        self.saved = data
+
+
+async def _primary_only(primary, fallback, *args, breaker=None, **kwargs):
+    return await primary(*args, **kwargs)
+
+
+@pytest.fixture
+def make_service(monkeypatch):
+    monkeypatch.setattr(metrics_module, "with_circuit_breaker", _primary_only)
+    monkeypatch.setattr(counters_module, "with_circuit_breaker", _primary_only)
+
+    def make(store, **options):
+        monkeypatch.setattr(metrics_module, "firestore_client", store)
+        monkeypatch.setattr(counters_module, "firestore_client", store)
+        service = MetricsService(**options)
+        service.db = _Snapshots()
+        return service
+
+    return make
+
+
+@pytest.mark.asyncio
+class TestCollectRealTimeMetrics:
+    """Testes do paralelismo, do limite e dos resultados parciais."""
+
+    async def test_counts_run_concurrently(self, make_service):
+        store = _Firestore(latency=0.05)
+        service = make_service(store, max_concurrency=8, collect_timeout=1)
+
+        start = time.perf_counter()
+        metrics = await service.collect_real_time_metrics("knn")
+        elapsed = time.perf_counter() - start
+
+        # Três contagens e a leitura dos contadores de códigos, 50 ms cada:
+        # em paralelo, bem abaixo de 200 ms
+        assert elapsed < 0.15
+        assert store.max_in_flight == 4
+        assert metrics["codes"] == {
+            "total_codes": 10,
+            "redeemed_codes": 4,
+            "pending_codes": 6,
+            "redemption_rate": 40.0,
+        }
+        assert service.db.saved["metrics"] == metrics
+
+    async def test_concurrency_is_bounded(self, make_service):
+        store = _Firestore(latency=0.01)
+        service = make_service(store, max_concurrency=2, collect_timeout=1)
+
+        await service.collect_real_time_metrics("knn")
+
+        assert store.max_in_flight == 2
+
+    async def test_slow_or_failed_submetrics_are_null(self, make_service):
+        store = _Firestore(
+            latency=0.01,
+            slow={("code_counters", False)},
+            broken={("partners", True)},
+        )
+        service = make_service(store, collect_timeout=0.1)
+
+        start = time.perf_counter()
+        metrics = await service.collect_real_time_metrics("knn")
+
+        assert time.perf_counter() - start < 0.5
+        assert metrics["codes"]["total_codes"] is None
+        assert metrics["codes"]["redemption_rate"] is None
+        assert metrics["partners"]["active_partners"] is None
+        assert metrics["users"]["active_users"] == 4
+
+
+class _Partners:
+    """Parceiros lidos em lote pelo ranking de resgates."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.requested = []
+
+    async def get_documents_many(self, collection, ids, tenant_id):
+        self.requested.append(list(ids))
+        return {doc_id: self.docs[doc_id] for doc_id in ids if doc_id in self.docs}
+
+
+@pytest.mark.asyncio
+class TestTopPartners:
+    """Testes do ranking de parceiros a partir dos contadores."""
+
+    async def test_ranking_skips_inactive_partners(self, make_service, monkeypatch):
+        ranking = [("p1", 9), ("p2", 7), ("p3", 4), ("p4", 1)]
+        requested_limits = []
+
+        async def top_partners(tenant_id, limit, start_day=None, end_day=None):
+            requested_limits.append(limit)
+            return ranking[:limit]
+
+        monkeypatch.setattr(metrics_module.code_counters, "top_partners", top_partners)
+        store = _Partners(
+            {
+                "p1": {"trade_name": "Um", "active": True},
+                "p2": {"trade_name": "Dois", "active": False},
+                "p3": {"trade_name": "Três", "active": True},
+            }
+        )
+        service = make_service(store)
+
+        top = await service.get_top_partners("knn", limit=2)
+
+        assert requested_limits == [4]
+        assert store.requested == [["p1", "p2", "p3", "p4"]]
+        assert top == [
+            {"partner_id": "p1", "trade_name": "Um", "redemptions": 9},
+            {"partner_id": "p3", "trade_name": "Três", "redemptions": 4},
+        ]
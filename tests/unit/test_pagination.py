@@ -0,0 +1,48 @@
+"""
+Testes unitários para os cursores opacos de paginação.
+"""
+
+import pytest
+
+from src.db.pagination import (
+    InvalidCursorError,
+    cursor_backend,
+    decode_cursor,
+    decode_document_cursor,
+    encode_cursor,
+)
+from src.db.query_compiler import encode_keyset
+
+
+class TestPaginationCursor:
+    """Testes de codificação e decodificação de cursores."""
+
+    def test_round_trip(self):
+        payload = {"c": "partners", "id": "PTN_000123"}
+
+        cursor = encode_cursor(payload)
+
+        assert "=" not in cursor
+        assert decode_cursor(cursor) == payload
+
+    def test_invalid_cursor_raises(self):
+        with pytest.raises(InvalidCursorError):
+            decode_cursor("não-é-um-cursor")
+
+    def test_non_object_payload_raises(self):
+        # "[1,2]" em base64: JSON válido, mas não é um objeto
+        with pytest.raises(InvalidCursorError):
+            decode_cursor("WzEsMl0")
+
+    def test_cursor_backend(self):
+        document = encode_cursor({"b": "firestore", "c": "partners", "id": "P1"})
+        keyset = encode_keyset("partners", ["id"], {"id": "P1"})
+
+        assert cursor_backend(document) == "firestore"
+        assert cursor_backend(keyset) == "postgres"
+        # Cursores emitidos antes da marca `b`
+        assert cursor_backend(encode_cursor({"c": "partners", "id": "P1"})) == (
+            "firestore"
+        )
+        with pytest.raises(InvalidCursorError):
+            decode_document_cursor(keyset, "partners")
@@ -5,15 +5,24 @@ Este módulo contém testes para a lógica comum compartilhada
 entre os endpoints de listagem de parceiros.
 """
 
+import asyncio
+import importlib
 from unittest.mock import AsyncMock, patch
 
 import pytest
 import pytest_asyncio
 
+from src import config
 from src.auth import JWTPayload
+from src.db.circuit_breaker import BackendUnavailableError
+from src.db.pagination import InvalidCursorError, encode_cursor
+from src.db.query_compiler import encode_keyset
 from src.models import PartnerListResponse
 from src.utils.partners_service import PartnersService
 
+# `src.db` reexporta a instância `circuit_breaker`, que oculta o submódulo
+cb_module = importlib.import_module("src.db.circuit_breaker")
+
 
 @pytest.mark.asyncio
 class TestPartnersService:
@@ -340,7 +349,7 @@ class TestPartnersService:
     async def test_query_with_circuit_breaker(self, mock_user, mock_partners_data):
         """Testa método _query_with_circuit_breaker."""
         with patch(
-            "src.utils.partners_service.with_circuit_breaker", new_callable=AsyncMock
+            "src.utils.partners_service.with_hedged_read", new_callable=AsyncMock
         ) as mock_circuit_breaker:
             mock_circuit_breaker.return_value = mock_partners_data
 
@@ -376,6 +385,8 @@ class TestPartnersService:
                 order_by=[("trade_name", "ASCENDING")],
                 limit=20,
                 offset=0,
+                cursor=None,
+                count_total=False,
             )
 
     async def test_query_firestore_only_with_none_order_by(
@@ -401,4 +412,149 @@ class TestPartnersService:
                 order_by=None,
                 limit=20,
                 offset=0,
+                cursor=None,
+                count_total=False,
+            )
+
+    async def test_invalid_cursor_rejected_before_circuit_breaker(self, mock_user):
+        """Cursor malformado é erro do cliente e não passa pelo breaker."""
+        with patch(
+            "src.utils.partners_service.with_circuit_breaker", new_callable=AsyncMock
+        ) as mock_circuit_breaker:
+            with pytest.raises(InvalidCursorError):
+                await PartnersService._query_with_circuit_breaker(
+                    current_user=mock_user,
+                    filters=[("active", "==", True)],
+                    order_by=[],
+                    limit=20,
+                    offset=0,
+                    cursor="nao-e-um-cursor",
+                )
+
+            mock_circuit_breaker.assert_not_called()
+
+    async def test_postgres_cursor_pages_on_postgres(self, mock_user):
+        """Página servida pelo PostgreSQL (fallback/hedge) continua nele."""
+        order_by = [("trade_name", "ASCENDING")]
+        last = {"id": "partner-1", "trade_name": "Parceiro A"}
+        first_page = {
+            "items": [last],
+            "next_cursor": encode_keyset("partners", ["trade_name", "id"], last),
+        }
+        second_page = {"items": [{"id": "partner-2"}], "next_cursor": None}
+
+        async def postgres_wins(operation, firestore_func, postgres_func, **kwargs):
+            return await postgres_func()
+
+        with (
+            patch(
+                "src.utils.partners_service.with_hedged_read", side_effect=postgres_wins
+            ),
+            patch(
+                "src.utils.partners_service.postgres_client.query_documents",
+                new_callable=AsyncMock,
+                side_effect=[first_page, second_page],
+            ) as mock_postgres,
+            patch(
+                "src.utils.partners_service.firestore_client.query_documents",
+                new_callable=AsyncMock,
+            ) as mock_firestore,
+        ):
+            page = await PartnersService._query_with_circuit_breaker(
+                current_user=mock_user,
+                filters=[("active", "==", True)],
+                order_by=order_by,
+                limit=1,
+                offset=0,
+            )
+            result = await PartnersService._query_with_circuit_breaker(
+                current_user=mock_user,
+                filters=[("active", "==", True)],
+                order_by=order_by,
+                limit=1,
+                offset=0,
+                cursor=page["next_cursor"],
+            )
+
+        assert result == second_page
+        assert mock_postgres.call_args.kwargs["cursor"] == page["next_cursor"]
+        mock_firestore.assert_not_called()
+
+    async def test_firestore_cursor_has_no_postgres_fallback(self, mock_user):
+        """Cursor do Firestore com o circuito aberto não vai ao PostgreSQL."""
+        cursor = encode_cursor({"b": "firestore", "c": "partners", "id": "partner-1"})
+
+        async def circuit_open(firestore_func, postgres_func, **kwargs):
+            return await postgres_func()
+
+        with (
+            patch(
+                "src.utils.partners_service.with_circuit_breaker",
+                side_effect=circuit_open,
+            ),
+            patch(
+                "src.utils.partners_service.postgres_client.query_documents",
+                new_callable=AsyncMock,
+            ) as mock_postgres,
+            pytest.raises(BackendUnavailableError),
+        ):
+            await PartnersService._query_with_circuit_breaker(
+                current_user=mock_user,
+                filters=[("active", "==", True)],
+                order_by=[],
+                limit=20,
+                offset=0,
+                cursor=cursor,
             )
+
+        mock_postgres.assert_not_called()
+
+    async def test_hedge_win_cursor_pages_on_postgres(self, mock_user, monkeypatch):
+        """Cursor de uma primeira página vencida pelo hedge segue no PostgreSQL."""
+        monkeypatch.setattr(cb_module, "HEDGED_READS_ENABLED", True)
+        monkeypatch.setattr(config, "POSTGRES_ENABLED", True)
+        monkeypatch.setattr(cb_module, "HEDGE_DEADLINES_MS", {"partners_list": 20})
+        cb_module.circuit_breakers.reset()
+        last = {"id": "partner-1", "trade_name": "Parceiro A"}
+        pages = [
+            {
+                "items": [last],
+                "next_cursor": encode_keyset("partners", ["trade_name", "id"], last),
+            },
+            {"items": [{"id": "partner-2"}], "next_cursor": None},
+        ]
+
+        async def slow_firestore(**kwargs):
+            await asyncio.sleep(1)
+
+        try:
+            with (
+                patch.object(
+                    PartnersService,
+                    "_query_firestore_only",
+                    side_effect=slow_firestore,
+                ) as mock_firestore,
+                patch(
+                    "src.utils.partners_service.postgres_client.query_documents",
+                    new_callable=AsyncMock,
+                    side_effect=pages,
+                ),
+            ):
+                query = {
+                    "current_user": mock_user,
+                    "filters": [("active", "==", True)],
+                    "order_by": [("trade_name", "ASCENDING")],
+                    "limit": 1,
+                    "offset": 0,
+                }
+                page = await PartnersService._query_with_circuit_breaker(**query)
+                result = await PartnersService._query_with_circuit_breaker(
+                    **query, cursor=page["next_cursor"]
+                )
+        finally:
+            cb_module.circuit_breakers.reset()
+            cb_module.hedge_tracker.reset()
+
+        assert page == pages[0]
+        assert result == pages[1]
+        mock_firestore.assert_called_once()
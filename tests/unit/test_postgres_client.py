@@ -0,0 +1,157 @@
+"""
+Testes unitários para o ciclo de vida das conexões do PostgresClient.
+"""
+
+import pytest
+
+from src.db.postgres import PostgresClient
+
+
+class _Connection:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.closed = False
+
+    async def fetchrow(self, query, *params):
+        if self.fail:
+            raise RuntimeError("falha na query")
+        return {"id": params[0], "tenant_id": "knn"}
+
+    async def execute(self, query, *params):
+        return "OK"
+
+    async def close(self):
+        self.closed = True
+
+
+class _Pool:
+    def __init__(self, conn, max_size=4):
+        self.conn = conn
+        self.max_size = max_size
+        self.in_use = 0
+        self.released = []
+
+    async def acquire(self):
+        self.in_use += 1
+        return self.conn
+
+    async def release(self, conn):
+        self.in_use -= 1
+        self.released.append(conn)
+
+    def get_size(self):
+        return self.max_size
+
+    def get_idle_size(self):
+        return self.max_size - self.in_use
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    """Substitui o pool asyncpg por um pool em memória."""
+
+    def install(conn):
+        pool = _Pool(conn)
+        monkeypatch.setattr(PostgresClient, "_pool", pool)
+        monkeypatch.setattr(PostgresClient, "_acquisitions", 0)
+        monkeypatch.setattr(PostgresClient, "_acquire_errors", 0)
+        monkeypatch.setattr(PostgresClient, "_acquire_wait_total_ms", 0.0)
+        monkeypatch.setattr(PostgresClient, "_acquire_wait_max_ms", 0.0)
+        return pool
+
+    return install
+
+
+@pytest.mark.asyncio
+class TestPostgresClientConnection:
+    """Testes da devolução de conexões ao pool."""
+
+    async def test_get_document_releases_to_pool(self, fake_pool):
+        conn = _Connection()
+        pool = fake_pool(conn)
+
+        doc = await PostgresClient.get_document("partners", "PTN_1", "knn")
+
+        assert doc == {"id": "PTN_1", "tenant_id": "knn"}
+        assert pool.released == [conn]
+        assert pool.in_use == 0
+        assert conn.closed is False
+
+    async def test_connection_released_when_query_fails(self, fake_pool):
+        conn = _Connection(fail=True)
+        pool = fake_pool(conn)
+
+        with pytest.raises(RuntimeError):
+            await PostgresClient.update_document("partners", "PTN_1", {"a": 1})
+
+        assert pool.released == [conn]
+        assert pool.in_use == 0
+        assert conn.closed is False
+
+    async def test_write_methods_release_to_pool(self, fake_pool):
+        conn = _Connection()
+        pool = fake_pool(conn)
+
+        await PostgresClient.create_document("partners", {"id": "PTN_1"})
+        await PostgresClient.delete_document("partners", "PTN_1")
+
+        assert pool.released == [conn, conn]
+        assert conn.closed is False
+
+    async def test_pool_stats_reports_utilization(self, fake_pool):
+        pool = fake_pool(_Connection())
+
+        async with PostgresClient.connection():
+            stats = PostgresClient.pool_stats()
+
+        assert stats["initialized"] is True
+        assert stats["in_use"] == 1
+        assert stats["idle"] == pool.max_size - 1
+        assert PostgresClient.pool_stats()["in_use"] == 0
+        assert PostgresClient.pool_stats()["acquisitions"] == 1
+
+
+class _QueryConnection:
+    def __init__(self, rows, count=None):
+        self.rows = rows
+        self.count = count
+        self.queries = []
+
+    async def fetch(self, query, *params):
+        self.queries.append((query, params))
+        return self.rows
+
+    async def fetchval(self, query, *params):
+        self.queries.append((query, params))
+        return self.count
+
+
+@pytest.mark.asyncio
+class TestPostgresClientQueryDocuments:
+    """Testes do total e do cursor em query_documents."""
+
+    async def test_total_comes_from_window_count(self, fake_pool):
+        rows = [{"id": f"PTN_{i}", "__total": 57} for i in range(2)]
+        conn = _QueryConnection(rows)
+        fake_pool(conn)
+
+        result = await PostgresClient.query_documents(
+            "partners", tenant_id="knn", filters=[("active", "==", True)], limit=2
+        )
+
+        assert result["total"] == 57
+        assert result["items"] == [{"id": "PTN_0"}, {"id": "PTN_1"}]
+        assert result["next_cursor"] is not None
+        assert len(conn.queries) == 1
+
+    async def test_empty_page_past_end_counts_separately(self, fake_pool):
+        conn = _QueryConnection([], count=12)
+        fake_pool(conn)
+
+        result = await PostgresClient.query_documents(
+            "partners", tenant_id="knn", limit=20, offset=40
+        )
+
+        assert result["total"] == 12
+        assert result["next_cursor"] is None
+        assert conn.queries[-1][0].startswith("SELECT count(*) FROM partners")
@@ -0,0 +1,133 @@
+"""
+Testes unitários para o profiling sob demanda.
+"""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from src.middleware import profiling_middleware
+from src.middleware.profiling_middleware import ProfilingMiddleware
+from src.utils.profiling import RequestProfiler
+
+
+def _busy_handler():
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+
+
+class TestRequestProfiler:
+    """Testes dos limites e do conteúdo dos perfis."""
+
+    def test_cprofile_report(self):
+        profiler = RequestProfiler(max_concurrent=2, max_stored=5)
+
+        session = profiler.start("p1", "cprofile")
+        _busy_handler()
+        summary = session.finish("/items", "GET", 200)
+
+        assert summary["id"] == "p1"
+        assert "output" not in summary
+        assert "_busy_handler" in profiler.get("p1")["output"]
+
+    def test_sample_collapsed_stacks(self):
+        profiler = RequestProfiler(sample_interval_ms=1)
+
+        session = profiler.start("p1", "sample")
+        _busy_handler()
+        session.finish("/items", "GET", 200)
+
+        lines = profiler.get("p1")["output"].splitlines()
+        assert any("_busy_handler" in line for line in lines)
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+    def test_concurrency_cap(self):
+        profiler = RequestProfiler(max_concurrent=2)
+
+        first = profiler.start("p1", "cprofile")
+        # Apenas um cProfile por vez; o limite total é 2
+        assert profiler.start("p2", "cprofile") is None
+        second = profiler.start("p3", "sample")
+        assert profiler.start("p4", "sample") is None
+        second.finish("/", "GET", 200)
+        first.finish("/", "GET", 200)
+
+        assert profiler.stats()["rejected"] == 2
+        assert profiler.stats()["active"] == 0
+
+    def test_oldest_profiles_are_evicted(self):
+        profiler = RequestProfiler(max_stored=2)
+
+        for profile_id in ("a", "b", "c"):
+            profiler.start(profile_id, "cprofile").finish("/", "GET", 200)
+
+        assert [p["id"] for p in profiler.summaries()] == ["c", "b"]
+        assert profiler.stats()["evicted"] == 1
+
+
+class TestProfilingMiddleware:
+    """Testes da ativação pelo cabeçalho de admin e por sorteio."""
+
+    @pytest.fixture
+    def make_client(self, monkeypatch):
+        async def current_user(credentials):
+            if credentials.credentials == "invalid":
+                raise HTTPException(status_code=401)
+            return SimpleNamespace(role=credentials.credentials)
+
+        monkeypatch.setattr(profiling_middleware, "get_current_user", current_user)
+
+        def make(sample_rate=0.0):
+            profiler = RequestProfiler(max_stored=10)
+            app = FastAPI()
+            app.add_middleware(
+                ProfilingMiddleware, profiler=profiler, sample_rate=sample_rate
+            )
+
+            @app.get("/items/{item_id}")
+            def get_item(item_id: str):
+                return {"id": item_id}
+
+            return TestClient(app), profiler
+
+        return make
+
+    def test_admin_header_profiles_request(self, make_client):
+        http, profiler = make_client()
+
+        response = http.get(
+            "/items/1",
+            headers={
+                "authorization": "Bearer admin",
+                "x-profile": "cprofile",
+                "x-request-id": "req-1",
+            },
+        )
+
+        assert response.headers["X-Profile-ID"] == "req-1"
+        profile = profiler.get("req-1")
+        assert profile["route"] == "/items/{item_id}"
+        assert profile["mode"] == "cprofile"
+
+    def test_non_admin_header_is_ignored(self, make_client):
+        http, profiler = make_client()
+
+        for token in ("student", "invalid"):
+            response = http.get(
+                "/items/1",
+                headers={"authorization": f"Bearer {token}", "x-profile": "sample"},
+            )
+            assert "X-Profile-ID" not in response.headers
+        assert profiler.stats()["started"] == 0
+
+    def test_sampled_requests_use_stack_sampling(self, make_client):
+        http, profiler = make_client(sample_rate=1.0)
+
+        response = http.get("/items/1")
+
+        profile = profiler.get(response.headers["X-Profile-ID"])
+        assert profile["mode"] == "sample"
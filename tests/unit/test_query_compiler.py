@@ -0,0 +1,183 @@
+"""
+Testes unitários para o compilador de consultas do PostgreSQL.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from src.db.pagination import InvalidCursorError
+from src.db.query_compiler import (
+    QueryCompileError,
+    compile_conditional_update,
+    compile_count,
+    compile_query,
+    compile_top,
+    decode_keyset,
+    encode_keyset,
+)
+
+
+class TestCompileQuery:
+    """Testes da geração de SQL parametrizado."""
+
+    def test_values_are_parameters(self):
+        sql, params = compile_query(
+            "partners",
+            "knn",
+            [("active", "==", True), ("category", "==", "Saúde")],
+            [("trade_name", "ASCENDING")],
+            20,
+            40,
+            None,
+            True,
+        )
+
+        assert sql == (
+            "SELECT *, count(*) OVER () AS __total FROM partners "
+            "WHERE tenant_id = $1 AND active = $2 AND category = $3 "
+            "ORDER BY trade_name ASC, id ASC LIMIT $4 OFFSET $5"
+        )
+        assert params == ["knn", True, "Saúde", 20, 40]
+
+    def test_same_shape_produces_same_sql(self):
+        first, _ = compile_query(
+            "partners", "a", [("active", "==", True)], None, 10, 0, None, True
+        )
+        second, _ = compile_query(
+            "partners", "b", [("active", "==", False)], None, 50, 100, None, True
+        )
+
+        assert first == second
+
+    def test_none_comparison_uses_is_null(self):
+        sql, params = compile_query(
+            "validation_codes",
+            "knn",
+            [("used_at", "!=", None), ("partner_id", "in", ("P1", "P2"))],
+            None,
+            20,
+            0,
+            None,
+            False,
+        )
+
+        assert "used_at IS NOT NULL AND partner_id = ANY($2)" in sql
+        assert sql.startswith("SELECT * FROM validation_codes")
+        assert params == ["knn", ["P1", "P2"], 20, 0]
+
+    def test_rejects_unknown_table_column_and_operator(self):
+        with pytest.raises(QueryCompileError):
+            compile_query("pg_user", "knn", None, None, 20, 0, None, True)
+        with pytest.raises(QueryCompileError):
+            compile_query(
+                "partners", "knn", [("1=1; --", "==", 1)], None, 20, 0, None, True
+            )
+        with pytest.raises(QueryCompileError):
+            compile_query(
+                "partners", "knn", [("active", "like", 1)], None, 20, 0, None, True
+            )
+
+    def test_compile_count_matches_filters(self):
+        sql, params = compile_count("students", "knn", [("active_until", ">=", "x")])
+
+        assert sql == (
+            "SELECT count(*) FROM students WHERE tenant_id = $1 AND active_until >= $2"
+        )
+        assert params == ["knn", "x"]
+
+    def test_conditional_update_checks_filters_in_where(self):
+        sql, params = compile_conditional_update(
+            "validation_codes",
+            "knn",
+            "knn_P1_123456",
+            {"used_at": "t", "redeemed_by_partner_id": "P1"},
+            [("partner_id", "==", "P1"), ("used_at", "==", None)],
+        )
+
+        assert sql == (
+            "UPDATE validation_codes SET used_at = $3, redeemed_by_partner_id = $4 "
+            "WHERE tenant_id = $1 AND partner_id = $2 AND used_at IS NULL "
+            "AND id = $5 RETURNING *"
+        )
+        assert params == ["knn", "P1", "t", "P1", "knn_P1_123456"]
+
+
+class TestCompileTop:
+    """Testes do top-K agrupado (GROUP BY)."""
+
+    def test_group_sum_with_limit_parameter(self):
+        sql, params = compile_top(
+            "code_counters",
+            "knn",
+            "partner_id",
+            "redeemed",
+            [("day", ">=", "2025-03-01"), ("day", "<=", "2025-03-31")],
+            6,
+        )
+
+        assert sql == (
+            "SELECT partner_id AS key, sum(redeemed) AS total FROM code_counters "
+            "WHERE tenant_id = $1 AND day >= $2 AND day <= $3 "
+            "GROUP BY partner_id ORDER BY total DESC, partner_id LIMIT $4"
+        )
+        assert params == ["knn", "2025-03-01", "2025-03-31", 6]
+
+    def test_rejects_unknown_columns(self):
+        with pytest.raises(QueryCompileError):
+            compile_top("code_counters", "knn", "partner_id", "x; --", None, 5)
+
+
+class TestKeysetPagination:
+    """Testes da paginação por cursor (keyset)."""
+
+    def test_cursor_adds_keyset_condition(self):
+        row = {"id": "PTN_9", "trade_name": "Zeta"}
+        cursor = encode_keyset("partners", ["trade_name", "id"], row)
+
+        sql, params = compile_query(
+            "partners",
+            "knn",
+            [("active", "==", True)],
+            [("trade_name", "DESCENDING")],
+            20,
+            500,
+            cursor,
+            False,
+        )
+
+        assert "((trade_name < $3) OR (trade_name = $3 AND id < $4))" in sql
+        assert params == ["knn", True, "Zeta", "PTN_9", 20, 0]
+
+    def test_total_on_cursor_page_ignores_keyset(self):
+        cursor = encode_keyset("partners", ["id"], {"id": "PTN_20"})
+
+        sql, params = compile_query(
+            "partners", "knn", [("active", "==", True)], None, 20, 0, cursor, True
+        )
+
+        # Página 2: o total é o do conjunto filtrado, como em compile_count
+        count_sql, _ = compile_count("partners", "knn", [("active", "==", True)])
+        assert sql == (
+            f"SELECT *, ({count_sql}) AS __total FROM partners "
+            "WHERE tenant_id = $1 AND active = $2 AND ((id > $3)) "
+            "ORDER BY id ASC LIMIT $4 OFFSET $5"
+        )
+        assert "OVER ()" not in sql
+        assert params == ["knn", True, "PTN_20", 20, 0]
+
+    def test_datetime_values_round_trip(self):
+        used_at = datetime(2025, 9, 21, 21, 13, 20)
+        cursor = encode_keyset(
+            "validation_codes", ["used_at", "id"], {"used_at": used_at, "id": "C1"}
+        )
+
+        values = decode_keyset(cursor, "validation_codes", ["used_at", "id"])
+
+        assert values == [used_at, "C1"]
+
+    def test_cursor_from_other_query_is_rejected(self):
+        cursor = encode_keyset("partners", ["id"], {"id": "PTN_1"})
+
+        with pytest.raises(InvalidCursorError):
+            decode_keyset(cursor, "students", ["id"])
@@ -0,0 +1,119 @@
+"""
+Testes unitários para o rate limit por token bucket.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Depends, FastAPI, Header
+from fastapi.testclient import TestClient
+
+from src.utils import rate_limit as rate_limit_module
+from src.utils.rate_limit import (
+    MemoryBucketStore,
+    TokenBucketLimiter,
+    parse_rate,
+    rate_limit,
+)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestParseRate:
+    """Testes da leitura dos limites configurados."""
+
+    def test_formats(self):
+        assert parse_rate("5/minute") == (5, 60)
+        assert parse_rate("100/hours") == (100, 3600)
+        for invalid in ("5", "0/minute", "x/minute", "5/week"):
+            with pytest.raises(ValueError):
+                parse_rate(invalid)
+
+
+@pytest.mark.asyncio
+class TestMemoryBucketStore:
+    """Testes do token bucket em memória."""
+
+    async def test_burst_then_refill(self, monkeypatch):
+        clock = _Clock()
+        monkeypatch.setattr(rate_limit_module.time, "monotonic", clock)
+        store = MemoryBucketStore(max_keys=10)
+
+        results = [await store.consume("k", 5, 5 / 60) for _ in range(6)]
+
+        assert [allowed for allowed, _ in results] == [True] * 5 + [False]
+        assert results[-1][1] == pytest.approx(12)
+        clock.now += 12
+        assert (await store.consume("k", 5, 5 / 60))[0] is True
+
+    async def test_least_recent_keys_are_evicted(self):
+        store = MemoryBucketStore(max_keys=2)
+
+        for key in ("a", "b", "c"):
+            await store.consume(key, 1, 1)
+
+        assert list(store._buckets) == ["b", "c"]
+
+    async def test_store_errors_fail_open(self):
+        class _Broken:
+            name = "redis"
+
+            async def consume(self, *args):
+                raise ConnectionError("sem conexão")
+
+        limiter = TokenBucketLimiter(_Broken())
+
+        assert await limiter.hit("redeem", "knn", "PTN_1", 5, 60) == (True, 0.0)
+        assert limiter.stats()["decisions"]["redeem"]["errors"] == 1
+
+
+class TestRateLimitDependency:
+    """Testes da dependência aplicada aos endpoints."""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        limiter = TokenBucketLimiter(MemoryBucketStore(max_keys=100))
+        monkeypatch.setattr(rate_limit_module, "token_bucket_limiter", limiter)
+
+        async def current_user(x_entity: str = Header()):
+            return SimpleNamespace(tenant="knn", entity_id=x_entity, sub="u")
+
+        app = FastAPI()
+
+        @app.post(
+            "/redeem",
+            dependencies=[Depends(rate_limit("redeem", "2/minute", current_user))],
+        )
+        async def redeem(user=Depends(current_user)):
+            return {"entity": user.entity_id}
+
+        return TestClient(app), limiter
+
+    def test_buckets_are_per_entity_not_per_ip(self, client):
+        http, limiter = client
+
+        statuses = [
+            http.post("/redeem", headers={"x-entity": "PTN_1"}).status_code
+            for _ in range(3)
+        ]
+        other = http.post("/redeem", headers={"x-entity": "PTN_2"})
+        limited = http.post("/redeem", headers={"x-entity": "PTN_1"})
+
+        assert statuses == [200, 200, 429]
+        assert other.status_code == 200
+        assert limited.headers["Retry-After"] == "30"
+        assert limited.json()["detail"]["error"]["code"] == "RATE_LIMIT_EXCEEDED"
+        stats = limiter.stats()
+        assert stats["backend"] == "memory"
+        assert stats["decisions"]["redeem"] == {
+            "allowed": 3,
+            "limited": 2,
+            "errors": 0,
+        }
+        assert stats["latency_ms"]["samples"] == 5
@@ -0,0 +1,171 @@
+"""
+Testes unitários para o resgate atômico de códigos de validação.
+"""
+
+import asyncio
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from src.utils import redemption as redemption_module
+from src.utils.catalog_cache import CatalogCache
+from src.utils.redemption import RedemptionEngine, RedemptionError, check_redeemable
+
+NOW = datetime(2025, 1, 15, 12, 0, tzinfo=UTC)
+SHARDED_ID = "knn_PTN_1_123456"
+
+
+class _Firestore:
+    """Coleção em memória com leitura-validação-escrita serializada."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.lock = asyncio.Lock()
+
+    async def claim_document(self, collection, doc_id, updates, check, tenant_id):
+        async with self.lock:
+            data = self.docs.get(doc_id)
+            if data is None or data.get("tenant_id") != tenant_id:
+                return None, None
+            await asyncio.sleep(0)
+            data = {**data, "id": doc_id}
+            reason = check(data)
+            if reason is None:
+                self.docs[doc_id].update(updates)
+                data.update(updates)
+            return data, reason
+
+
+class _Unified:
+    """Leituras de parceiros e alunos."""
+
+    docs = {
+        ("partners", "PTN_1"): {"id": "PTN_1", "cnpj": "12345678000190"},
+        ("students", "STD_1"): {"id": "STD_1", "name": "Maria"},
+    }
+
+    @classmethod
+    async def get_document(cls, collection, doc_id, tenant_id, *, hedge=None):
+        return cls.docs.get((collection, doc_id))
+
+
+async def _primary_only(primary, fallback, *args, breaker=None, **kwargs):
+    return await primary(*args, **kwargs)
+
+
+def _code(**overrides):
+    return {
+        "tenant_id": "knn",
+        "partner_id": "PTN_1",
+        "student_id": "STD_1",
+        "expires": (datetime.now(UTC) + timedelta(minutes=3)).isoformat(),
+        "used_at": None,
+        **overrides,
+    }
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    def install(docs):
+        fake = _Firestore(docs)
+        monkeypatch.setattr(redemption_module, "firestore_client", fake)
+        monkeypatch.setattr(redemption_module, "with_circuit_breaker", _primary_only)
+        monkeypatch.setattr(redemption_module, "UnifiedDatabaseClient", _Unified)
+        monkeypatch.setattr(redemption_module, "catalog_cache", CatalogCache(60, 100))
+        return fake
+
+    return install
+
+
+class TestCheckRedeemable:
+    """Testes das regras de validação do código."""
+
+    def test_rejection_reasons(self):
+        assert check_redeemable(_code(partner_id="PTN_2"), "PTN_1", NOW) == (
+            "not_found"
+        )
+        assert check_redeemable(_code(used_at=NOW), "PTN_1", NOW) == "already_used"
+        expired = _code(expires="2025-01-15T11:59:00Z")
+        assert check_redeemable(expired, "PTN_1", NOW) == "expired"
+
+    def test_legacy_naive_expires_at_is_utc(self):
+        code = _code(expires=None, expires_at=datetime(2025, 1, 15, 12, 1))
+
+        assert check_redeemable(code, "PTN_1", NOW) is None
+
+
+@pytest.mark.asyncio
+class TestRedemptionEngine:
+    """Testes do resgate com verificação e marcação atômicas."""
+
+    async def test_redeem_marks_code_used(self, engine):
+        fake = engine({SHARDED_ID: _code()})
+
+        result = await RedemptionEngine().redeem(
+            "knn", "PTN_1", "12345678000190", "123456"
+        )
+
+        assert result["code_id"] == SHARDED_ID
+        assert result["user_name"] == "Maria"
+        assert fake.docs[SHARDED_ID]["used_at"] == result["redeemed_at"]
+        assert fake.docs[SHARDED_ID]["redeemed_by_partner_id"] == "PTN_1"
+
+    async def test_legacy_code_id_and_rejections(self, engine):
+        engine({"654321": _code()})
+        redeemer = RedemptionEngine()
+
+        result = await redeemer.redeem("knn", "PTN_1", "12345678000190", "654321")
+        assert result["code_id"] == "654321"
+
+        for cnpj, code, reason in (
+            ("12345678000190", "654321", "already_used"),
+            ("12345678000190", "000000", "not_found"),
+            ("00000000000000", "654321", "cnpj_mismatch"),
+        ):
+            with pytest.raises(RedemptionError) as exc:
+                await redeemer.redeem("knn", "PTN_1", cnpj, code)
+            assert exc.value.reason == reason
+
+    async def test_concurrent_redeems_succeed_once(self, engine):
+        engine({SHARDED_ID: _code()})
+        redeemer = RedemptionEngine()
+
+        results = await asyncio.gather(
+            *(
+                redeemer.redeem("knn", "PTN_1", "12345678000190", "123456")
+                for _ in range(20)
+            ),
+            return_exceptions=True,
+        )
+
+        successes = [r for r in results if isinstance(r, dict)]
+        assert len(successes) == 1
+        assert {r.reason for r in results if isinstance(r, RedemptionError)} == {
+            "already_used"
+        }
+        stats = redeemer.stats()
+        assert stats["outcomes"] == {"redeemed": 1, "already_used": 19}
+        assert stats["coalesced_claims"] == 19
+        assert stats["claims_in_flight"] == 0
+
+    async def test_postgres_fallback_reports_reason(self, engine, monkeypatch):
+        engine({})
+
+        class _Postgres:
+            async def update_if(self, table, doc_id, data, *, tenant_id, filters):
+                return None
+
+            async def get_document(self, table, doc_id, tenant_id):
+                if doc_id == SHARDED_ID:
+                    return {**_code(used_at=NOW), "id": doc_id}
+                return None
+
+        async def _fallback_only(primary, fallback, *args, breaker=None, **kwargs):
+            return await fallback(*args, **kwargs)
+
+        monkeypatch.setattr(redemption_module, "postgres_client", _Postgres())
+        monkeypatch.setattr(redemption_module, "with_circuit_breaker", _fallback_only)
+
+        with pytest.raises(RedemptionError) as exc:
+            await RedemptionEngine().redeem("knn", "PTN_1", "12345678000190", "123456")
+        assert exc.value.reason == "already_used"
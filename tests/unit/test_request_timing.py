@@ -0,0 +1,118 @@
+"""
+Testes unitários para os tempos por fase e o orçamento de leituras.
+"""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.middleware.request_timing_middleware import RequestTimingMiddleware
+from src.utils.histograms import db_budget_exceeded, request_latency
+from src.utils.request_timing import (
+    count_event,
+    current_timing,
+    db_call,
+    end_request_timing,
+    start_request_timing,
+    timed_phase,
+)
+
+
+class _Client:
+    """Cliente de banco falso com métodos decorados."""
+
+    @staticmethod
+    @db_call("firestore")
+    async def get_document(doc_id: str):
+        await asyncio.sleep(0)
+        return {"id": doc_id}
+
+    @staticmethod
+    @db_call("firestore", "write")
+    async def create_document(doc_id: str):
+        # Chamada aninhada não conta uma segunda leitura
+        await _Client.get_document(doc_id)
+        return {"id": doc_id}
+
+
+@pytest.mark.asyncio
+class TestDbCall:
+    """Testes do registro das chamadas de banco."""
+
+    async def test_reads_writes_and_nested_calls(self):
+        token = start_request_timing()
+        try:
+            await asyncio.gather(*(_Client.get_document(str(i)) for i in range(3)))
+            await _Client.create_document("x")
+            count_event("retries")
+            with timed_phase("auth"):
+                pass
+            summary = current_timing().summary()
+        finally:
+            end_request_timing(token)
+
+        assert summary["db_reads"] == 3
+        assert summary["db_writes"] == 1
+        assert summary["phases"]["firestore"]["calls"] == 4
+        assert summary["phases"]["auth"]["calls"] == 1
+        assert summary["retries"] == 1
+
+    async def test_outside_request_is_ignored(self):
+        assert await _Client.get_document("1") == {"id": "1"}
+        count_event("fallbacks")
+        assert current_timing() is None
+
+
+class TestRequestTimingMiddleware:
+    """Testes do cabeçalho Server-Timing e do orçamento por rota."""
+
+    @pytest.fixture
+    def http(self):
+        app = FastAPI()
+        app.add_middleware(
+            RequestTimingMiddleware, read_budgets={"/partners/{partner_id}": 2}
+        )
+
+        @app.get("/partners/{partner_id}")
+        async def get_partner(partner_id: str, reads: int = 1):
+            for _ in range(reads):
+                await _Client.get_document(partner_id)
+            count_event("fallbacks")
+            return {"id": partner_id}
+
+        return TestClient(app)
+
+    def test_server_timing_header(self, http):
+        response = http.get("/partners/PTN_1?reads=2")
+
+        metrics = {
+            item.split(";")[0]: item
+            for item in response.headers["Server-Timing"].split(", ")
+        }
+        assert metrics["firestore"].endswith('desc="2 calls"')
+        assert metrics["fallbacks"] == 'fallbacks;desc="1"'
+        assert {"app", "total"} <= set(metrics)
+
+    def test_read_budget_exceeded_is_counted(self, http):
+        route = "/partners/{partner_id}"
+        before = db_budget_exceeded.get(route=route)
+
+        http.get("/partners/PTN_1?reads=2")
+        http.get("/partners/PTN_1?reads=3")
+
+        assert db_budget_exceeded.get(route=route) == before + 1
+
+    def test_request_latency_is_recorded(self, http):
+        labels = {
+            "route": "/partners/{partner_id}",
+            "method": "GET",
+            "status_class": "2xx",
+        }
+        series = request_latency.get(**labels)
+        before = series.count if series else 0
+
+        http.get("/partners/PTN_1")
+
+        assert request_latency.get(**labels).count == before + 1
@@ -0,0 +1,116 @@
+"""
+Testes unitários para a amostragem das requisições rastreadas.
+"""
+
+import uuid
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from src.middleware import performance_middleware
+from src.middleware.performance_middleware import (
+    PerformanceMiddleware,
+    track_database_operation,
+)
+from src.utils.sampling import TraceSampler, extract_trace_id
+
+
+class TestTraceSampler:
+    """Testes da decisão de amostragem."""
+
+    def test_rate_is_respected_for_fractional_rates(self):
+        sampler = TraceSampler(default_rate=0.3, slow_ms=1000)
+
+        kept = sum(
+            sampler.decide(uuid.uuid4().hex, "/v1/x", 200, 10) is not None
+            for _ in range(20_000)
+        )
+
+        assert kept / 20_000 == pytest.approx(0.3, abs=0.02)
+
+    def test_decision_is_consistent_per_trace(self):
+        first = TraceSampler(default_rate=0.5)
+        second = TraceSampler(default_rate=0.5)
+        trace_ids = [uuid.uuid4().hex for _ in range(200)]
+
+        assert [first.decide(t, "/r", 200, 1) for t in trace_ids] == [
+            second.decide(t, "/r", 200, 1) for t in trace_ids
+        ]
+
+    def test_errors_and_slow_requests_are_always_kept(self):
+        sampler = TraceSampler(
+            default_rate=1, route_rates={"/v1/health": 0}, slow_ms=500
+        )
+
+        assert sampler.decide("a", "/v1/health", 200, 10) is None
+        assert sampler.decide("a", "/v1/health", 503, 10) == "error"
+        assert sampler.decide("a", "/v1/health", 200, 10, error=True) == "error"
+        assert sampler.decide("a", "/v1/health", 200, 500) == "slow"
+        assert sampler.decide("a", "/v1/other", 200, 10) == "sampled"
+        assert sampler.stats()["decisions"] == {
+            "error": 2,
+            "slow": 1,
+            "sampled": 1,
+            "dropped": 1,
+        }
+
+    def test_invalid_rate(self):
+        with pytest.raises(ValueError):
+            TraceSampler(default_rate=1.5)
+
+    def test_extract_trace_id(self):
+        trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+        assert (
+            extract_trace_id({"traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"})
+            == trace_id
+        )
+        assert extract_trace_id({"x-cloud-trace-context": "abc/1;o=1"}) == "abc"
+        assert extract_trace_id({"x-request-id": "req-1"}) == "req-1"
+        assert len(extract_trace_id({})) == 32
+
+
+class TestPerformanceMiddlewareSampling:
+    """Testes dos spans gravados junto com a requisição."""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        events = []
+        monkeypatch.setattr(
+            performance_middleware.analytics_client,
+            "enqueue_event",
+            lambda name, parameters, **kwargs: events.append((name, parameters)),
+        )
+        app = FastAPI()
+        app.add_middleware(
+            PerformanceMiddleware,
+            sampler=TraceSampler(default_rate=0, slow_ms=10_000),
+        )
+
+        @app.get("/items/{item_id}")
+        async def get_item(item_id: str):
+            await track_database_operation("select", "firestore", 1.5)
+            if item_id == "fail":
+                raise HTTPException(status_code=503)
+            return {"id": item_id}
+
+        return TestClient(app), events
+
+    def test_dropped_request_drops_its_spans(self, client):
+        http, events = client
+
+        response = http.get("/items/1", headers={"x-request-id": "trace-1"})
+
+        assert response.headers["X-Request-ID"] == "trace-1"
+        assert events == []
+
+    def test_error_keeps_request_and_spans(self, client):
+        http, events = client
+
+        http.get("/items/fail", headers={"x-request-id": "trace-2"})
+
+        names = [name for name, _ in events]
+        assert names == ["endpoint_performance", "database_operation"]
+        assert {params["trace_id"] for _, params in events} == {"trace-2"}
+        assert events[0][1]["sampling_reason"] == "error"
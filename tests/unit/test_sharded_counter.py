@@ -0,0 +1,159 @@
+"""
+Testes unitários para os contadores distribuídos da coleção metadata.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils import sharded_counter as counter_module
+from src.utils.metrics_service import MetricsService
+from src.utils.sharded_counter import ShardedCounter
+
+
+class _Increment:
+    def __init__(self, value):
+        self.value = value
+
+
+class _Snapshot:
+    def __init__(self, data):
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class _DocRef:
+    """Documento em memória com a interface do AsyncDocumentReference."""
+
+    def __init__(self, db, path):
+        self.db = db
+        self.path = path
+
+    def collection(self, name):
+        return _CollectionRef(self.db, f"{self.path}/{name}")
+
+    async def set(self, data, merge=False):
+        await asyncio.sleep(0)
+        self.db.writes.append(self.path)
+        doc = dict(self.db.docs.get(self.path, {})) if merge else {}
+        for field, value in data.items():
+            if isinstance(value, _Increment):
+                doc[field] = doc.get(field, 0) + value.value
+            else:
+                doc[field] = value
+        self.db.docs[self.path] = doc
+
+    async def get(self):
+        self.db.reads += 1
+        return _Snapshot(self.db.docs.get(self.path))
+
+
+class _CollectionRef:
+    def __init__(self, db, path):
+        self.db = db
+        self.path = path
+
+    def document(self, doc_id):
+        return _DocRef(self.db, f"{self.path}/{doc_id}")
+
+    async def stream(self):
+        self.db.reads += 1
+        for path, data in list(self.db.docs.items()):
+            if path.rsplit("/", 1)[0] == self.path:
+                yield _Snapshot(data)
+
+
+class _Db:
+    def __init__(self):
+        self.docs: dict[str, dict] = {}
+        self.writes: list[str] = []
+        self.reads = 0
+
+    def collection(self, name):
+        return _CollectionRef(self, name)
+
+
+@pytest.fixture(autouse=True)
+def fake_increment(monkeypatch):
+    monkeypatch.setattr(
+        counter_module, "firestore", SimpleNamespace(Increment=_Increment)
+    )
+
+
+@pytest.mark.asyncio
+class TestShardedCounter:
+    """Testes dos incrementos distribuídos e da leitura somada."""
+
+    async def test_increments_spread_over_shards(self):
+        db = _Db()
+        counter = ShardedCounter(shards=8, cache_ttl=0)
+        doc_ref = db.collection("metadata").document("knn_student_info")
+
+        await asyncio.gather(*(counter.increment(doc_ref, 1) for _ in range(100)))
+        await counter.increment(doc_ref, -3)
+
+        # Nenhuma escrita no documento principal e várias shards usadas
+        assert doc_ref.path not in db.writes
+        assert len(set(db.writes)) > 1
+        assert (await counter.read(doc_ref))["total"] == 97
+
+    async def test_set_overrides_legacy_total_and_shards(self):
+        db = _Db()
+        counter = ShardedCounter(shards=4, cache_ttl=0)
+        doc_ref = db.collection("metadata").document("knn_partner_info")
+        # Documento anterior aos shards: o total é o valor-base
+        db.docs[doc_ref.path] = {"total": 40, "last_updated": "2025-01-01T00:00"}
+        await counter.increment(doc_ref, 2, {"last_updated": "2025-02-01T00:00"})
+
+        value = await counter.read(doc_ref)
+        assert value["total"] == 42
+        assert value["last_updated"] == "2025-02-01T00:00"
+
+        await counter.set(doc_ref, 10, {"last_updated": "2025-03-01T00:00"})
+        assert (await counter.read(doc_ref))["total"] == 10
+        assert await counter.read(db.collection("metadata").document("x")) is None
+
+    async def test_reads_are_cached_until_local_write(self):
+        db = _Db()
+        counter = ShardedCounter(shards=2, cache_ttl=60)
+        doc_ref = db.collection("metadata").document("knn_benefit_info")
+        await counter.increment(doc_ref, 5)
+
+        assert (await counter.read(doc_ref))["total"] == 5
+        reads = db.reads
+        assert (await counter.read(doc_ref))["total"] == 5
+        assert db.reads == reads
+
+        await counter.increment(doc_ref, 1)
+        assert (await counter.read(doc_ref))["total"] == 6
+        assert counter.stats()["cache_hits"] == 1
+
+
+@pytest.mark.asyncio
+class TestMetadataCounters:
+    """Testes do uso dos contadores pelo MetricsService."""
+
+    async def test_crud_updates_and_aggregated_read(self):
+        service = MetricsService()
+        service.db = _Db()
+        service.metadata_counter = ShardedCounter(shards=4, cache_ttl=0)
+        # Contador global legado (sem tenant) para funcionários
+        service.db.docs["metadata/employee_info"] = {"total": 7}
+
+        await asyncio.gather(
+            *(service.update_metadata_on_crud("students", "knn") for _ in range(30))
+        )
+        await service.update_metadata_on_crud("students", "knn", "sub", 5)
+        await service.update_metadata_on_crud("partners", "knn", "set", set_total=12)
+
+        counters = await service.get_aggregated_counters("knn")
+
+        assert counters["students"]["total"] == 25
+        assert counters["partners"]["total"] == 12
+        assert counters["employees"]["total"] == 7
+        assert counters["benefits"] == {"total": 0, "last_updated": None}
+        assert counters["last_updated"] is not None
@@ -0,0 +1,135 @@
+"""
+Testes unitários para o cache de tokens verificados e a escolha do verificador.
+"""
+
+import time
+
+import jwt
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from src import auth
+from src.config import JWT_SECRET_KEY
+from src.utils.jwks import JWKSKeyStore
+from src.utils.token_cache import VerifiedTokenCache, token_digest
+
+
+def _local_token(exp_in: int = 3600, sub: str = "STD_1") -> str:
+    now = int(time.time())
+    return jwt.encode(
+        {
+            "sub": sub,
+            "role": "student",
+            "tenant": "knn",
+            "iat": now,
+            "exp": now + exp_in,
+        },
+        JWT_SECRET_KEY,
+        algorithm="HS256",
+    )
+
+
+def _credentials(token: str) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+@pytest.fixture
+def auth_cache(monkeypatch):
+    """Desativa o modo de teste e usa um cache isolado."""
+    cache = VerifiedTokenCache(max_entries=10)
+    monkeypatch.setattr(auth, "TESTING_MODE", False)
+    monkeypatch.setattr(auth, "ENVIRONMENT", "development")
+    monkeypatch.setattr(auth, "token_cache", cache)
+    return cache
+
+
+class TestVerifiedTokenCache:
+    """Testes do cache LRU com expiração no `exp`."""
+
+    def test_entry_expires_at_exp(self, monkeypatch):
+        cache = VerifiedTokenCache(max_entries=10)
+        cache.put("tok", "payload", exp=int(time.time()) + 60)
+
+        assert cache.get("tok") == "payload"
+
+        monkeypatch.setattr(time, "time", lambda: 10**12)
+        assert cache.get("tok") is None
+        assert cache.stats()["expired"] == 1
+
+    def test_lru_eviction_and_digest_key(self):
+        cache = VerifiedTokenCache(max_entries=2)
+        exp = int(time.time()) + 60
+        for token in ("a", "b", "c"):
+            cache.put(token, token.upper(), exp)
+
+        assert cache.get("a") is None
+        assert cache.get("c") == "C"
+        assert "c" not in cache._entries
+        assert token_digest("c") in cache._entries
+        assert cache.stats()["evictions"] == 1
+
+    def test_disabled_cache_stores_nothing(self):
+        cache = VerifiedTokenCache(max_entries=0)
+        cache.put("tok", "payload", exp=int(time.time()) + 60)
+
+        assert cache.get("tok") is None
+        assert cache.stats()["entries"] == 0
+
+
+class TestSelectVerifier:
+    """Testes do roteamento pelo cabeçalho do JWT."""
+
+    def test_routes_by_alg_and_kid(self, monkeypatch):
+        # Sem FIREBASE_JWKS_URL, tokens RS256 vão para o SDK do Firebase
+        monkeypatch.setattr(
+            auth, "firebase_jwks_store", JWKSKeyStore("firebase", None, 600)
+        )
+        rs256_header = jwt.utils.base64url_encode(b'{"alg":"RS256","kid":"k1"}')
+        firebase_like = rs256_header.decode() + ".e30.sig"
+
+        assert auth.select_verifier(_local_token()) == "local"
+        assert auth.select_verifier(firebase_like) == "firebase"
+
+    def test_rejects_malformed_and_unknown_alg(self):
+        none_token = jwt.encode({"sub": "x"}, None, algorithm="none")
+
+        with pytest.raises(HTTPException):
+            auth.select_verifier("nao-e-um-jwt")
+        with pytest.raises(HTTPException):
+            auth.select_verifier(none_token)
+
+
+@pytest.mark.asyncio
+class TestGetCurrentUserCache:
+    """Testes do cache na dependência get_current_user."""
+
+    async def test_second_request_hits_cache(self, auth_cache, monkeypatch):
+        calls = []
+
+        def verify_id_token(token):
+            calls.append(token)
+            raise AssertionError("Firebase não deve ser consultado para HS256")
+
+        monkeypatch.setattr(auth.auth, "verify_id_token", verify_id_token)
+        token = _local_token()
+
+        first = await auth.get_current_user(_credentials(token))
+        second = await auth.get_current_user(_credentials(token))
+
+        stats = auth_cache.stats()
+        assert second is first
+        assert calls == []
+        assert stats["hits"] == 1
+        assert stats["verifications"] == {"local": 1}
+
+    async def test_invalid_token_is_not_cached(self, auth_cache):
+        token = _local_token()[:-4] + "AAAA"
+
+        for _ in range(2):
+            with pytest.raises(HTTPException):
+                await auth.get_current_user(_credentials(token))
+
+        stats = auth_cache.stats()
+        assert stats["entries"] == 0
+        assert stats["rejections"] == {"local": 2}